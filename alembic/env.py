@@ -19,6 +19,7 @@ from app.models.purchases import Supplier, PurchaseOrder, PurchaseOrderItem, Quo
 from app.models.attachments import Attachment
 from app.models.audit import AuditLog
 from app.models.cost_centers import CostCenter
+from app.models.notas_fiscais import NotaFiscal, NotaFiscalItem, ProcessamentoLog, NotaFiscalRollupMensal
 
 # this is the Alembic Config object, which provides
 # access to the values within the .ini file in use.
@@ -0,0 +1,78 @@
+"""add unique indexes used by the bulk NF upsert
+
+Revision ID: a1d5e7c3f9b2
+Revises: f2c8d4a6b9e3
+Create Date: 2025-10-17 09:30:00.000000
+
+Chaves naturais de notas_fiscais para o INSERT ... ON CONFLICT de POST /nf/bulk:
+
+- uq_notas_fiscais_chave_acesso: chave_acesso (quando informada)
+- uq_notas_fiscais_numero_serie_cnpj: numero, serie, cnpj_fornecedor (NFs sem chave)
+
+Com o particionamento (f2c8d4a6b9e3) os índices únicos precisam conter a chave
+de partição, então data_emissao entra nos dois índices.
+
+Chaves de acesso em branco ('') são gravadas como NULL antes da verificação:
+equivalem a NF sem chave, como na API. Duplicatas existentes não são removidas:
+a migração falha listando algumas delas para correção manual.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'a1d5e7c3f9b2'
+down_revision = 'f2c8d4a6b9e3'
+branch_labels = None
+depends_on = None
+
+
+# (índice, colunas, predicado)
+UPSERT_INDEXES = [
+    ('uq_notas_fiscais_chave_acesso', ['chave_acesso'], 'chave_acesso IS NOT NULL'),
+    ('uq_notas_fiscais_numero_serie_cnpj', ['numero', 'serie', 'cnpj_fornecedor'], 'chave_acesso IS NULL'),
+]
+
+
+def _particionada(connection) -> bool:
+    if connection.dialect.name != 'postgresql':
+        return False
+    return connection.execute(sa.text(
+        "SELECT EXISTS (SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass('notas_fiscais'))"
+    )).scalar()
+
+
+def _verificar_duplicatas(connection, colunas, predicado) -> None:
+    lista = ", ".join(colunas)
+    duplicatas = connection.execute(sa.text(f"""
+        SELECT {lista}, COUNT(*) FROM notas_fiscais
+        WHERE {predicado}
+        GROUP BY {lista} HAVING COUNT(*) > 1
+        LIMIT 10
+    """)).all()
+    if duplicatas:
+        exemplos = "; ".join(str(tuple(linha)) for linha in duplicatas)
+        raise RuntimeError(
+            f"notas_fiscais tem NFs duplicadas em ({lista}); corrija antes de migrar. Exemplos: {exemplos}"
+        )
+
+
+def upgrade() -> None:
+    connection = op.get_bind()
+    particionada = _particionada(connection)
+
+    # '' não é NULL: cairia no índice de chave de acesso e colidiria entre NFs sem chave
+    op.execute("UPDATE notas_fiscais SET chave_acesso = NULL WHERE trim(chave_acesso) = ''")
+
+    for index_name, columns, where in UPSERT_INDEXES:
+        colunas = columns + ['data_emissao'] if particionada else columns
+        _verificar_duplicatas(connection, colunas, where)
+        op.create_index(
+            index_name, 'notas_fiscais', colunas, unique=True,
+            postgresql_where=sa.text(where),
+            sqlite_where=sa.text(where)
+        )
+
+
+def downgrade() -> None:
+    for index_name, columns, where in reversed(UPSERT_INDEXES):
+        op.drop_index(index_name, table_name='notas_fiscais', if_exists=True)
@@ -0,0 +1,78 @@
+"""create nf_monthly_rollup table
+
+Revision ID: b41c7e2d9a10
+Revises: 2575a27aa575
+Create Date: 2025-10-06 09:12:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'b41c7e2d9a10'
+down_revision = '2575a27aa575'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table('nf_monthly_rollup',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('mes', sa.Date(), nullable=False),
+        sa.Column('contrato_id', sa.Integer(), nullable=True),
+        sa.Column('cnpj_fornecedor', sa.String(length=18), nullable=False),
+        sa.Column('centro_custo_id', sa.Integer(), nullable=True),
+        sa.Column('status_processamento', sa.String(length=50), nullable=False),
+        sa.Column('nome_fornecedor', sa.String(length=255), nullable=True),
+        sa.Column('quantidade_nfs', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('valor_total', sa.DECIMAL(precision=15, scale=2), nullable=False, server_default='0'),
+        sa.Column('quantidade_itens', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('valor_itens', sa.DECIMAL(precision=15, scale=2), nullable=False, server_default='0'),
+        sa.Column('atualizado_em', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+        sa.ForeignKeyConstraint(['contrato_id'], ['contracts.id'], ),
+        sa.ForeignKeyConstraint(['centro_custo_id'], ['cost_centers.id'], ),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_nf_monthly_rollup_id'), 'nf_monthly_rollup', ['id'], unique=False)
+    op.create_index('ix_nf_monthly_rollup_grupo', 'nf_monthly_rollup', ['mes', 'contrato_id', 'cnpj_fornecedor'], unique=False)
+    op.create_index('ix_nf_monthly_rollup_mes_status', 'nf_monthly_rollup', ['mes', 'status_processamento'], unique=False)
+
+    connection = op.get_bind()
+    if connection.dialect.name != 'postgresql':
+        # Em outros bancos o agregado é populado por POST /nf/rollup/rebuild
+        return
+
+    # Carga inicial: cabeçalhos (centro_custo_id nulo) + itens por centro de custo
+    print("Populando nf_monthly_rollup a partir de notas_fiscais/nf_itens...")
+    connection.execute(sa.text("""
+        INSERT INTO nf_monthly_rollup (
+            mes, contrato_id, cnpj_fornecedor, centro_custo_id, status_processamento,
+            nome_fornecedor, quantidade_nfs, valor_total, quantidade_itens, valor_itens
+        )
+        SELECT mes, contrato_id, cnpj_fornecedor, centro_custo_id, status_processamento,
+               MAX(nome_fornecedor), SUM(quantidade_nfs), SUM(valor_total),
+               SUM(quantidade_itens), SUM(valor_itens)
+        FROM (
+            SELECT date_trunc('month', nf.data_emissao)::date AS mes,
+                   nf.contrato_id, nf.cnpj_fornecedor, NULL::integer AS centro_custo_id,
+                   nf.status_processamento, nf.nome_fornecedor,
+                   1 AS quantidade_nfs, nf.valor_total,
+                   0 AS quantidade_itens, 0 AS valor_itens
+            FROM notas_fiscais nf
+            UNION ALL
+            SELECT date_trunc('month', nf.data_emissao)::date,
+                   nf.contrato_id, nf.cnpj_fornecedor, i.centro_custo_id,
+                   nf.status_processamento, nf.nome_fornecedor,
+                   0, 0, 1, i.valor_total
+            FROM nf_itens i
+            JOIN notas_fiscais nf ON nf.id = i.nota_id
+        ) fatos
+        GROUP BY mes, contrato_id, cnpj_fornecedor, centro_custo_id, status_processamento
+    """))
+
+
+def downgrade() -> None:
+    op.drop_index('ix_nf_monthly_rollup_mes_status', table_name='nf_monthly_rollup')
+    op.drop_index('ix_nf_monthly_rollup_grupo', table_name='nf_monthly_rollup')
+    op.drop_index(op.f('ix_nf_monthly_rollup_id'), table_name='nf_monthly_rollup')
+    op.drop_table('nf_monthly_rollup')
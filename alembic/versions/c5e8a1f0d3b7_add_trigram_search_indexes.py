@@ -0,0 +1,47 @@
+"""add trigram indexes for substring filters
+
+Revision ID: c5e8a1f0d3b7
+Revises: b41c7e2d9a10
+Create Date: 2025-10-08 10:30:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'c5e8a1f0d3b7'
+down_revision = 'b41c7e2d9a10'
+branch_labels = None
+depends_on = None
+
+
+# (índice, tabela, coluna) usados por filtros ilike('%x%')
+TRIGRAM_INDEXES = [
+    ('ix_notas_fiscais_nome_fornecedor_trgm', 'notas_fiscais', 'nome_fornecedor'),
+    ('ix_contracts_cliente_trgm', 'contracts', 'cliente'),
+    ('ix_invoice_items_centro_custo_trgm', 'invoice_items', 'centro_custo'),
+    ('ix_suppliers_nome_trgm', 'suppliers', 'nome'),
+]
+
+
+def upgrade() -> None:
+    # Apenas PostgreSQL. No SQLite nenhum índice atende LIKE '%x%' (o planejador
+    # não usa B-tree para substring), então a busca continua com varredura
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    for index_name, table, column in TRIGRAM_INDEXES:
+        op.create_index(
+            index_name, table, [column], unique=False,
+            postgresql_using='gin',
+            postgresql_ops={column: 'gin_trgm_ops'}
+        )
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+
+    for index_name, table, column in reversed(TRIGRAM_INDEXES):
+        op.drop_index(index_name, table_name=table)
@@ -0,0 +1,98 @@
+"""add full-text search over nf_itens
+
+Revision ID: d9b3c6e2f4a8
+Revises: c5e8a1f0d3b7
+Create Date: 2025-10-09 14:05:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'd9b3c6e2f4a8'
+down_revision = 'c5e8a1f0d3b7'
+branch_labels = None
+depends_on = None
+
+# Índice FTS5 de nf_itens no SQLite (conteúdo externo, mantido por triggers).
+# Cópia fixa da definição em app.models.notas_fiscais na época desta revisão
+FTS_SQLITE_DDL = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS nf_itens_fts USING fts5(
+        descricao, codigo_produto, ncm,
+        content='nf_itens', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS nf_itens_fts_ai AFTER INSERT ON nf_itens BEGIN
+        INSERT INTO nf_itens_fts(rowid, descricao, codigo_produto, ncm)
+        VALUES (new.id, new.descricao, new.codigo_produto, new.ncm);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS nf_itens_fts_ad AFTER DELETE ON nf_itens BEGIN
+        INSERT INTO nf_itens_fts(nf_itens_fts, rowid, descricao, codigo_produto, ncm)
+        VALUES ('delete', old.id, old.descricao, old.codigo_produto, old.ncm);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS nf_itens_fts_au AFTER UPDATE OF descricao, codigo_produto, ncm ON nf_itens BEGIN
+        INSERT INTO nf_itens_fts(nf_itens_fts, rowid, descricao, codigo_produto, ncm)
+        VALUES ('delete', old.id, old.descricao, old.codigo_produto, old.ncm);
+        INSERT INTO nf_itens_fts(rowid, descricao, codigo_produto, ncm)
+        VALUES (new.id, new.descricao, new.codigo_produto, new.ncm);
+    END
+    """,
+]
+
+
+def upgrade() -> None:
+    connection = op.get_bind()
+
+    if connection.dialect.name == 'postgresql':
+        op.execute('CREATE EXTENSION IF NOT EXISTS unaccent')
+
+        # Configuração portuguesa sem acentos ("aço" casa com "aco")
+        op.execute("""
+            DO $$
+            BEGIN
+                IF NOT EXISTS (SELECT 1 FROM pg_ts_config WHERE cfgname = 'portuguese_unaccent') THEN
+                    CREATE TEXT SEARCH CONFIGURATION portuguese_unaccent (COPY = portuguese);
+                    ALTER TEXT SEARCH CONFIGURATION portuguese_unaccent
+                        ALTER MAPPING FOR hword, hword_part, word WITH unaccent, portuguese_stem;
+                END IF;
+            END
+            $$
+        """)
+
+        # Coluna gerada: mantida pelo banco, inclusive para inserções diretas do n8n
+        op.execute("""
+            ALTER TABLE nf_itens ADD COLUMN busca tsvector
+            GENERATED ALWAYS AS (
+                setweight(to_tsvector('portuguese_unaccent', coalesce(descricao, '')), 'A') ||
+                setweight(to_tsvector('portuguese_unaccent', coalesce(codigo_produto, '')), 'A') ||
+                setweight(to_tsvector('portuguese_unaccent', coalesce(ncm, '')), 'B')
+            ) STORED
+        """)
+        op.create_index('ix_nf_itens_busca', 'nf_itens', ['busca'], unique=False, postgresql_using='gin')
+
+    elif connection.dialect.name == 'sqlite':
+        for ddl in FTS_SQLITE_DDL:
+            op.execute(ddl)
+        # Indexa os itens já existentes
+        op.execute("INSERT INTO nf_itens_fts(nf_itens_fts) VALUES ('rebuild')")
+
+
+def downgrade() -> None:
+    connection = op.get_bind()
+
+    if connection.dialect.name == 'postgresql':
+        op.drop_index('ix_nf_itens_busca', table_name='nf_itens')
+        op.drop_column('nf_itens', 'busca')
+        op.execute('DROP TEXT SEARCH CONFIGURATION IF EXISTS portuguese_unaccent')
+
+    elif connection.dialect.name == 'sqlite':
+        for trigger in ('nf_itens_fts_ai', 'nf_itens_fts_ad', 'nf_itens_fts_au'):
+            op.execute(f'DROP TRIGGER IF EXISTS {trigger}')
+        op.execute('DROP TABLE IF EXISTS nf_itens_fts')
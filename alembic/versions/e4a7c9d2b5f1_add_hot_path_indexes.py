@@ -0,0 +1,53 @@
+"""add composite and foreign key indexes for hot filter paths
+
+Revision ID: e4a7c9d2b5f1
+Revises: d9b3c6e2f4a8
+Create Date: 2025-10-10 16:20:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'e4a7c9d2b5f1'
+down_revision = 'd9b3c6e2f4a8'
+branch_labels = None
+depends_on = None
+
+
+# (índice, tabela, colunas, colunas incluídas no PostgreSQL)
+HOT_PATH_INDEXES = [
+    ('ix_notas_fiscais_contrato_status', 'notas_fiscais', ['contrato_id', 'status_processamento'], None),
+    ('ix_notas_fiscais_status_data', 'notas_fiscais', ['status_processamento', 'data_emissao'], None),
+    ('ix_nf_itens_centro_custo_nota', 'nf_itens', ['centro_custo_id', 'nota_id'], ['valor_total']),
+    ('ix_invoices_contract_id', 'invoices', ['contract_id'], None),
+    ('ix_invoices_purchase_order_id', 'invoices', ['purchase_order_id'], None),
+    ('ix_invoice_items_invoice_id', 'invoice_items', ['invoice_id'], None),
+    ('ix_purchase_orders_contract_id', 'purchase_orders', ['contract_id'], None),
+    ('ix_budget_items_contract_id', 'budget_items', ['contract_id'], None),
+    ('ix_valor_previsto_contract_id', 'valor_previsto', ['contract_id'], None),
+]
+
+
+def upgrade() -> None:
+    connection = op.get_bind()
+
+    if connection.dialect.name == 'postgresql':
+        # CONCURRENTLY não bloqueia escritas do n8n, mas não roda dentro de transação
+        with op.get_context().autocommit_block():
+            for index_name, table, columns, include in HOT_PATH_INDEXES:
+                op.create_index(
+                    index_name, table, columns, unique=False,
+                    if_not_exists=True,
+                    postgresql_concurrently=True,
+                    postgresql_include=include or []
+                )
+        return
+
+    for index_name, table, columns, include in HOT_PATH_INDEXES:
+        op.create_index(index_name, table, columns, unique=False, if_not_exists=True)
+
+
+def downgrade() -> None:
+    for index_name, table, columns, include in reversed(HOT_PATH_INDEXES):
+        op.drop_index(index_name, table_name=table, if_exists=True)
@@ -0,0 +1,327 @@
+"""partition notas_fiscais and nf_itens by emission month (optional)
+
+Revision ID: f2c8d4a6b9e3
+Revises: e4a7c9d2b5f1
+Create Date: 2025-10-13 11:00:00.000000
+
+Migração opcional (somente PostgreSQL). Só converte as tabelas quando habilitada:
+
+    NF_PARTITIONING=true alembic upgrade head
+    alembic -x nf_partitioning=true upgrade head
+
+Sem a opção a revisão é registrada sem alterar nada; para converter depois,
+volte para e4a7c9d2b5f1 e rode o upgrade novamente com a opção.
+
+- notas_fiscais: PARTITION BY RANGE (data_emissao), PK (id, data_emissao)
+- nf_itens: recebe data_emissao_nf (cópia da data de emissão da NF) e é
+  particionada pelo mesmo mês; FK (nota_id, data_emissao_nf) com ON UPDATE CASCADE
+- requer PostgreSQL 15+: só a partir dessa versão um UPDATE que move a NF para
+  outra partição dispara o ON UPDATE CASCADE (antes vira DELETE + INSERT e a FK
+  falha); em versões anteriores o upgrade é interrompido
+- partições mensais nf_*_pYYYYMM + partição default em cada tabela
+- nf_criar_particoes_futuras(meses) cria as partições dos próximos meses
+  (agendada no pg_cron se disponível; a API também chama na inicialização)
+- itens inseridos sem data_emissao_nf (API/n8n) entram na partição default com a
+  data sentinela e um trigger os move para a partição do mês da NF
+"""
+import os
+
+from alembic import op, context
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'f2c8d4a6b9e3'
+down_revision = 'e4a7c9d2b5f1'
+branch_labels = None
+depends_on = None
+
+
+SENTINELA = '1900-01-01'
+MESES_A_FRENTE = 3
+
+# ON UPDATE CASCADE entre partições (mudança de data_emissao da NF)
+VERSAO_MINIMA = 150000
+
+FUNCAO_CRIAR_PARTICAO = """
+CREATE OR REPLACE FUNCTION nf_criar_particao(mes date) RETURNS void AS $$
+DECLARE
+    inicio date := date_trunc('month', mes)::date;
+    fim date := (date_trunc('month', mes) + interval '1 month')::date;
+    tabela text;
+    coluna text;
+    particao text;
+    existe boolean;
+BEGIN
+    FOREACH tabela IN ARRAY ARRAY['notas_fiscais', 'nf_itens'] LOOP
+        coluna := CASE tabela WHEN 'notas_fiscais' THEN 'data_emissao' ELSE 'data_emissao_nf' END;
+        particao := tabela || '_p' || to_char(inicio, 'YYYYMM');
+
+        IF to_regclass(particao) IS NOT NULL THEN
+            CONTINUE;
+        END IF;
+
+        -- Linhas do mês já gravadas na partição default ficam lá (criar a partição falharia)
+        EXECUTE format('SELECT EXISTS (SELECT 1 FROM %I WHERE %I >= $1 AND %I < $2)',
+                       tabela || '_default', coluna, coluna)
+            INTO existe USING inicio, fim;
+        IF existe THEN
+            RAISE NOTICE 'Partição % não criada: há linhas do mês em %_default', particao, tabela;
+            CONTINUE;
+        END IF;
+
+        EXECUTE format('CREATE TABLE %I PARTITION OF %I FOR VALUES FROM (%L) TO (%L)',
+                       particao, tabela, inicio, fim);
+    END LOOP;
+END
+$$ LANGUAGE plpgsql
+"""
+
+FUNCAO_PARTICOES_FUTURAS = """
+CREATE OR REPLACE FUNCTION nf_criar_particoes_futuras(meses integer DEFAULT 3) RETURNS void AS $$
+BEGIN
+    FOR i IN 0..meses LOOP
+        PERFORM nf_criar_particao((date_trunc('month', now()) + make_interval(months => i))::date);
+    END LOOP;
+END
+$$ LANGUAGE plpgsql
+"""
+
+
+def _habilitada() -> bool:
+    valor = context.get_x_argument(as_dictionary=True).get(
+        'nf_partitioning', os.getenv('NF_PARTITIONING', '')
+    )
+    return valor.lower() in ('1', 'true', 'yes', 'sim')
+
+
+def _particionada(connection) -> bool:
+    return connection.execute(sa.text(
+        "SELECT EXISTS (SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass('notas_fiscais'))"
+    )).scalar()
+
+
+def _indices(connection, tabela: str):
+    """Definições dos índices não únicos da tabela (recriados após a troca)"""
+    return [
+        definicao.replace(' ON ONLY ', ' ON ')
+        for (definicao,) in connection.execute(sa.text("""
+            SELECT indexdef FROM pg_indexes
+            WHERE schemaname = current_schema() AND tablename = :tabela
+              AND indexdef NOT LIKE 'CREATE UNIQUE%'
+        """), {"tabela": tabela})
+    ]
+
+
+def _chaves_estrangeiras(connection, tabela: str, exceto_referencia: str):
+    """FKs da tabela (exceto a que aponta para exceto_referencia)"""
+    return connection.execute(sa.text("""
+        SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint
+        WHERE conrelid = to_regclass(:tabela) AND contype = 'f' AND conparentid = 0
+          AND confrelid <> to_regclass(:referencia)
+    """), {"tabela": tabela, "referencia": exceto_referencia}).all()
+
+
+def _colunas(connection, tabela: str):
+    """Colunas graváveis (sem colunas geradas), na ordem da tabela"""
+    return [
+        nome for (nome,) in connection.execute(sa.text("""
+            SELECT column_name FROM information_schema.columns
+            WHERE table_schema = current_schema() AND table_name = :tabela
+              AND is_generated = 'NEVER'
+            ORDER BY ordinal_position
+        """), {"tabela": tabela})
+    ]
+
+
+def _mover_sequencia(tabela_nova: str, tabela_antiga: str) -> None:
+    op.execute(f"""
+        DO $$
+        DECLARE seq text := pg_get_serial_sequence('{tabela_antiga}', 'id');
+        BEGIN
+            IF seq IS NOT NULL THEN
+                EXECUTE format('ALTER SEQUENCE %s OWNED BY {tabela_nova}.id', seq);
+            END IF;
+        END
+        $$
+    """)
+
+
+def upgrade() -> None:
+    connection = op.get_bind()
+    if connection.dialect.name != 'postgresql' or not _habilitada() or _particionada(connection):
+        print("Particionamento de notas_fiscais/nf_itens não habilitado (NF_PARTITIONING): nada a fazer")
+        return
+
+    versao = int(connection.execute(sa.text("SHOW server_version_num")).scalar())
+    if versao < VERSAO_MINIMA:
+        raise RuntimeError(
+            "Particionamento de notas_fiscais/nf_itens requer PostgreSQL 15+ "
+            f"(server_version_num {versao}): a FK dos itens depende de ON UPDATE CASCADE entre partições"
+        )
+
+    indices_nf = _indices(connection, 'notas_fiscais')
+    indices_itens = _indices(connection, 'nf_itens')
+    fks_nf = _chaves_estrangeiras(connection, 'notas_fiscais', 'notas_fiscais')
+    fks_itens = _chaves_estrangeiras(connection, 'nf_itens', 'notas_fiscais')
+    colunas_nf = _colunas(connection, 'notas_fiscais')
+    colunas_itens = _colunas(connection, 'nf_itens')
+
+    primeiro_mes = connection.execute(sa.text(
+        "SELECT date_trunc('month', COALESCE(MIN(data_emissao), now()))::date FROM notas_fiscais"
+    )).scalar()
+
+    op.execute('ALTER TABLE nf_itens RENAME TO nf_itens_legado')
+    op.execute('ALTER TABLE notas_fiscais RENAME TO notas_fiscais_legado')
+
+    # Tabelas particionadas com as mesmas colunas, defaults e colunas geradas
+    op.execute("""
+        CREATE TABLE notas_fiscais (
+            LIKE notas_fiscais_legado INCLUDING DEFAULTS INCLUDING GENERATED INCLUDING CONSTRAINTS
+        ) PARTITION BY RANGE (data_emissao)
+    """)
+    op.execute(f"""
+        CREATE TABLE nf_itens (
+            LIKE nf_itens_legado INCLUDING DEFAULTS INCLUDING GENERATED INCLUDING CONSTRAINTS,
+            data_emissao_nf timestamp NOT NULL DEFAULT '{SENTINELA}'
+        ) PARTITION BY RANGE (data_emissao_nf)
+    """)
+    op.execute('CREATE TABLE notas_fiscais_default PARTITION OF notas_fiscais DEFAULT')
+    op.execute('CREATE TABLE nf_itens_default PARTITION OF nf_itens DEFAULT')
+
+    op.execute(FUNCAO_CRIAR_PARTICAO)
+    op.execute(FUNCAO_PARTICOES_FUTURAS)
+    op.execute(sa.text(f"""
+        SELECT nf_criar_particao(mes::date)
+        FROM generate_series(
+            CAST(:primeiro_mes AS date),
+            date_trunc('month', now()) + interval '{MESES_A_FRENTE} months',
+            interval '1 month'
+        ) AS mes
+    """).bindparams(primeiro_mes=primeiro_mes))
+
+    # Cópia dos dados (itens recebem a data de emissão da NF)
+    lista_nf = ", ".join(colunas_nf)
+    op.execute(f"INSERT INTO notas_fiscais ({lista_nf}) SELECT {lista_nf} FROM notas_fiscais_legado")
+    lista_itens = ", ".join(colunas_itens)
+    lista_itens_origem = ", ".join(f"i.{coluna}" for coluna in colunas_itens)
+    op.execute(f"""
+        INSERT INTO nf_itens ({lista_itens}, data_emissao_nf)
+        SELECT {lista_itens_origem}, nf.data_emissao
+        FROM nf_itens_legado i
+        JOIN notas_fiscais_legado nf ON nf.id = i.nota_id
+    """)
+
+    _mover_sequencia('notas_fiscais', 'notas_fiscais_legado')
+    _mover_sequencia('nf_itens', 'nf_itens_legado')
+    op.execute('DROP TABLE nf_itens_legado')
+    op.execute('DROP TABLE notas_fiscais_legado CASCADE')
+
+    # Chaves, índices e FKs
+    op.execute('ALTER TABLE notas_fiscais ADD CONSTRAINT notas_fiscais_pkey PRIMARY KEY (id, data_emissao)')
+    op.execute('ALTER TABLE nf_itens ADD CONSTRAINT nf_itens_pkey PRIMARY KEY (id, data_emissao_nf)')
+    for definicao in indices_nf + indices_itens:
+        op.execute(definicao)
+    for nome, definicao in fks_nf:
+        op.execute(f'ALTER TABLE notas_fiscais ADD CONSTRAINT {nome} {definicao}')
+    for nome, definicao in fks_itens:
+        op.execute(f'ALTER TABLE nf_itens ADD CONSTRAINT {nome} {definicao}')
+
+    # Verificada no commit: o item com a data sentinela já terá sido realocado
+    op.execute("""
+        ALTER TABLE nf_itens ADD CONSTRAINT nf_itens_nota_fkey
+        FOREIGN KEY (nota_id, data_emissao_nf) REFERENCES notas_fiscais (id, data_emissao)
+        ON UPDATE CASCADE DEFERRABLE INITIALLY DEFERRED
+    """)
+
+    # Itens gravados sem data_emissao_nf: mover para a partição do mês da NF
+    valores = ", ".join(
+        "nf.data_emissao" if coluna == 'data_emissao_nf' else f"NEW.{coluna}"
+        for coluna in colunas_itens + ['data_emissao_nf']
+    )
+    op.execute(f"""
+        CREATE OR REPLACE FUNCTION nf_itens_realocar() RETURNS trigger AS $$
+        BEGIN
+            IF NEW.data_emissao_nf <> '{SENTINELA}' THEN
+                RETURN NULL;
+            END IF;
+
+            DELETE FROM nf_itens_default WHERE id = NEW.id AND data_emissao_nf = NEW.data_emissao_nf;
+            INSERT INTO nf_itens ({lista_itens}, data_emissao_nf)
+            SELECT {valores}
+            FROM notas_fiscais nf WHERE nf.id = NEW.nota_id;
+
+            IF NOT FOUND THEN
+                RAISE foreign_key_violation USING MESSAGE = format('NF %s não encontrada para o item %s', NEW.nota_id, NEW.id);
+            END IF;
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql
+    """)
+    op.execute("""
+        CREATE TRIGGER nf_itens_realocar AFTER INSERT ON nf_itens_default
+        FOR EACH ROW EXECUTE FUNCTION nf_itens_realocar()
+    """)
+
+    # Agendamento mensal das partições futuras, se o pg_cron estiver instalado
+    if connection.execute(sa.text("SELECT to_regnamespace('cron') IS NOT NULL")).scalar():
+        op.execute(f"""
+            SELECT cron.schedule('nf_particoes_futuras', '0 3 1 * *',
+                                 'SELECT nf_criar_particoes_futuras({MESES_A_FRENTE})')
+        """)
+
+
+def downgrade() -> None:
+    connection = op.get_bind()
+    if connection.dialect.name != 'postgresql' or not _particionada(connection):
+        return
+
+    if connection.execute(sa.text("SELECT to_regnamespace('cron') IS NOT NULL")).scalar():
+        op.execute("SELECT cron.unschedule(jobid) FROM cron.job WHERE jobname = 'nf_particoes_futuras'")
+
+    indices_nf = _indices(connection, 'notas_fiscais')
+    indices_itens = [d for d in _indices(connection, 'nf_itens') if 'data_emissao_nf' not in d]
+    fks_nf = _chaves_estrangeiras(connection, 'notas_fiscais', 'notas_fiscais')
+    fks_itens = _chaves_estrangeiras(connection, 'nf_itens', 'notas_fiscais')
+    colunas_nf = _colunas(connection, 'notas_fiscais')
+    colunas_itens = [c for c in _colunas(connection, 'nf_itens') if c != 'data_emissao_nf']
+
+    op.execute('ALTER TABLE nf_itens RENAME TO nf_itens_particionada')
+    op.execute('ALTER TABLE notas_fiscais RENAME TO notas_fiscais_particionada')
+
+    op.execute("""
+        CREATE TABLE notas_fiscais (
+            LIKE notas_fiscais_particionada INCLUDING DEFAULTS INCLUDING GENERATED INCLUDING CONSTRAINTS
+        )
+    """)
+    op.execute("""
+        CREATE TABLE nf_itens (
+            LIKE nf_itens_particionada INCLUDING DEFAULTS INCLUDING GENERATED INCLUDING CONSTRAINTS
+        )
+    """)
+    op.execute('ALTER TABLE nf_itens DROP COLUMN data_emissao_nf')
+
+    lista_nf = ", ".join(colunas_nf)
+    op.execute(f"INSERT INTO notas_fiscais ({lista_nf}) SELECT {lista_nf} FROM notas_fiscais_particionada")
+    lista_itens = ", ".join(colunas_itens)
+    op.execute(f"INSERT INTO nf_itens ({lista_itens}) SELECT {lista_itens} FROM nf_itens_particionada")
+
+    _mover_sequencia('notas_fiscais', 'notas_fiscais_particionada')
+    _mover_sequencia('nf_itens', 'nf_itens_particionada')
+    op.execute('DROP TABLE nf_itens_particionada CASCADE')
+    op.execute('DROP TABLE notas_fiscais_particionada CASCADE')
+    op.execute('DROP FUNCTION IF EXISTS nf_itens_realocar()')
+    op.execute('DROP FUNCTION IF EXISTS nf_criar_particoes_futuras(integer)')
+    op.execute('DROP FUNCTION IF EXISTS nf_criar_particao(date)')
+
+    op.execute('ALTER TABLE notas_fiscais ADD CONSTRAINT notas_fiscais_pkey PRIMARY KEY (id)')
+    op.execute('ALTER TABLE nf_itens ADD CONSTRAINT nf_itens_pkey PRIMARY KEY (id)')
+    for definicao in indices_nf + indices_itens:
+        op.execute(definicao)
+    for nome, definicao in fks_nf:
+        op.execute(f'ALTER TABLE notas_fiscais ADD CONSTRAINT {nome} {definicao}')
+    for nome, definicao in fks_itens:
+        op.execute(f'ALTER TABLE nf_itens ADD CONSTRAINT {nome} {definicao}')
+    op.execute("""
+        ALTER TABLE nf_itens ADD CONSTRAINT nf_itens_nota_id_fkey
+        FOREIGN KEY (nota_id) REFERENCES notas_fiscais (id)
+    """)
@@ -0,0 +1,49 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from typing import Optional
+from app.api.dependencies import get_admin_user
+from app.core.slow_queries import slow_query_log
+from app.models.users import User
+
+router = APIRouter()
+
+
+@router.get("/slow-queries")
+async def list_slow_queries(
+    route: Optional[str] = Query(None, description="Filtrar por trecho da rota (ex.: /dashboards)"),
+    min_ms: float = Query(0, ge=0, description="Duração mínima em ms"),
+    limit: int = Query(50, ge=1, le=1000),
+    current_user: User = Depends(get_admin_user)
+):
+    """Consultas lentas mais recentes (buffer em memória deste processo)"""
+
+    return {
+        "enabled": slow_query_log.enabled,
+        "threshold_ms": slow_query_log.threshold_ms,
+        "queries": slow_query_log.entries(route=route, min_ms=min_ms, limit=limit)
+    }
+
+
+@router.get("/slow-queries/{query_id}")
+async def get_slow_query(
+    query_id: int,
+    current_user: User = Depends(get_admin_user)
+):
+    """Consulta lenta com parâmetros e plano de execução"""
+
+    entry = slow_query_log.get(query_id)
+    if entry is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Consulta não encontrada (o buffer mantém apenas as mais recentes)"
+        )
+    return entry
+
+
+@router.delete("/slow-queries")
+async def clear_slow_queries(
+    current_user: User = Depends(get_admin_user)
+):
+    """Esvazia o buffer de consultas lentas"""
+
+    removidas = slow_query_log.clear()
+    return {"success": True, "message": f"{removidas} consulta(s) removida(s)"}
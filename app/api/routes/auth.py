@@ -3,7 +3,7 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.orm import Session
 from app.core.database import get_db
-from app.core.auth import verify_password, get_password_hash, create_access_token
+from app.core.auth import verify_and_update_password_async, get_password_hash_async, create_access_token
 from app.core.config import settings
 from app.models.users import User
 from app.schemas.auth import UserLogin, UserCreate, UserResponse, Token
@@ -26,12 +26,13 @@ async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session =
             headers={"WWW-Authenticate": "Bearer"},
         )
 
-    # Debug: verificar senha
+    # bcrypt no pool de hash; senhas em texto puro ou com custo antigo são refeitas
     password_correct = False
-    if user.hashed_password:
-        password_correct = verify_password(form_data.password, user.hashed_password)
-    elif user.password:  # Fallback para campo não hashado
-        password_correct = (form_data.password == user.password)
+    if user.password:
+        password_correct, new_hash = await verify_and_update_password_async(form_data.password, user.password)
+        if password_correct and new_hash:
+            user.password = new_hash
+            db.commit()
 
     if not password_correct:
         raise HTTPException(
@@ -68,12 +69,11 @@ async def register(user_data: UserCreate, db: Session = Depends(get_db)):
         )
     
     # Criar novo usuário
-    hashed_password = get_password_hash(user_data.password)
+    hashed_password = await get_password_hash_async(user_data.password)
     new_user = User(
         username=user_data.username,
         email=user_data.email,
-        full_name=user_data.full_name,
-        hashed_password=hashed_password,
+        password=hashed_password,
         role=user_data.role
     )
     
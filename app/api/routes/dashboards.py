@@ -8,6 +8,7 @@ from app.api.dependencies import get_current_user, get_suprimentos_user, get_dir
 from app.models.users import User
 from app.schemas.dashboards import SuppliesDashboard, ExecutiveDashboard, DashboardFilters
 from app.services.dashboards_simple import SimpleDashboardService
+from app.services.dashboards import DashboardService
 
 router = APIRouter()
 
@@ -57,7 +58,7 @@ async def get_executive_dashboard(
         cliente=cliente
     )
     
-    service = SimpleDashboardService(db)
+    service = DashboardService(db)
     return service.get_executive_dashboard(filters)
 
 
@@ -87,7 +88,7 @@ async def get_kpis_summary(
         }
     
     # Para diretoria, retornar KPIs estratégicos
-    executive_dashboard = service.get_executive_dashboard(filters)
+    executive_dashboard = DashboardService(db).get_executive_dashboard(filters)
     return {
         "percentual_realizado_total": executive_dashboard.percentual_realizado_total,
         "economia_total": executive_dashboard.economia_total,
@@ -0,0 +1,80 @@
+from fastapi import APIRouter, Depends, Header, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session
+from typing import Optional
+from app.core.config import settings
+from app.core.database import get_db
+from app.core.events import change_bus
+from app.core.responses import dumps
+from app.api.dependencies import get_current_user
+from app.models.users import User
+
+router = APIRouter()
+
+
+# Intervalo sugerido ao navegador para reconectar (EventSource)
+RETRY_MS = 3000
+
+
+def format_event(evento) -> str:
+    linhas = []
+    if evento["id"] is not None:
+        linhas.append(f"id: {evento['id']}")
+    linhas.append(f"event: {evento['type']}")
+    linhas.append(f"data: {dumps(evento).decode()}")
+    return "\n".join(linhas) + "\n\n"
+
+
+async def event_stream(types: Optional[set], last_event_id: Optional[int]):
+    # Assinatura criada já dentro do stream: a saída do cliente sempre a encerra
+    assinatura = change_bus.subscribe(types=types, last_event_id=last_event_id)
+    try:
+        yield f"retry: {RETRY_MS}\n\n"
+        while True:
+            evento = await assinatura.get(settings.change_stream_heartbeat_seconds)
+            if evento is None:
+                yield ": ping\n\n"  # mantém a conexão aberta em proxies
+                continue
+            yield format_event(evento)
+    finally:
+        assinatura.close()
+
+
+@router.get("/stream")
+async def stream_changes(
+    types: Optional[str] = Query(None, description="Prefixos separados por vírgula (nf, processing_log, contract)"),
+    last_event_id: Optional[str] = Header(None),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Stream (Server-Sent Events) de alterações de NFs, logs de processamento e
+    totais de contratos. O cliente recarrega apenas o que mudou; no evento
+    "resync" deve recarregar tudo.
+    """
+
+    # A sessão usada na autenticação não fica presa durante o stream
+    db.close()
+
+    filtro = {t.strip() for t in types.split(",") if t.strip()} if types else None
+    ultimo_id = int(last_event_id) if last_event_id and last_event_id.isdigit() else None
+
+    return StreamingResponse(
+        event_stream(filtro, ultimo_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@router.get("/recent")
+async def recent_changes(
+    limit: int = Query(50, ge=1, le=500),
+    current_user: User = Depends(get_current_user)
+):
+    """Eventos recentes deste processo (diagnóstico)"""
+
+    return {
+        "listening": change_bus.listening,
+        "subscribers": change_bus.subscriber_count,
+        "events": change_bus.recent(limit)
+    }
@@ -1,27 +1,22 @@
-from fastapi import APIRouter, Depends, UploadFile, File, Form, HTTPException, status
+from fastapi import APIRouter, BackgroundTasks, Depends, Header, UploadFile, File, Form, HTTPException, status
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 from typing import List, Optional
+from app.core.config import settings
 from app.core.database import get_db
 from app.api.dependencies import get_current_user, get_suprimentos_user
+from app.api.routes.events import RETRY_MS, format_event
 from app.models.users import User
 from app.models.purchases import Invoice, InvoiceItem
 from app.services.invoice_processing_service import InvoiceProcessingService
-from app.schemas.invoices import InvoiceResponse, InvoiceUploadResponse, OneDriveUrlRequest
+from app.services.invoice_jobs import invoice_jobs, InvoiceIngestionJob, JOB_FINISHED
+from app.schemas.invoices import InvoiceResponse, InvoiceUploadResponse, OneDriveUrlRequest, InvoiceJobResponse
 
 router = APIRouter()
 
 
-@router.post("/upload-zip/{contract_id}", response_model=InvoiceUploadResponse)
-async def upload_invoices_zip(
-    contract_id: int,
-    file: UploadFile = File(..., description="Arquivo ZIP contendo notas fiscais"),
-    current_user: User = Depends(get_suprimentos_user),
-    db: Session = Depends(get_db)
-):
-    """
-    Upload de arquivo ZIP contendo múltiplas notas fiscais.
-    Processa automaticamente todos os arquivos XML/PDF dentro do ZIP.
-    """
+async def _read_zip_upload(file: UploadFile) -> bytes:
+    """Valida extensão e tamanho do ZIP enviado e retorna o conteúdo"""
 
     # Validar se é arquivo ZIP
     if not file.filename.lower().endswith('.zip'):
@@ -31,17 +26,43 @@ async def upload_invoices_zip(
         )
 
     # Validar tamanho do arquivo (máximo 100MB)
-    file_size = 0
     content = await file.read()
-    file_size = len(content)
     await file.seek(0)  # Reset file position
 
-    if file_size > 100 * 1024 * 1024:  # 100MB
+    if len(content) > 100 * 1024 * 1024:  # 100MB
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Arquivo ZIP muito grande. Máximo permitido: 100MB"
         )
 
+    return content
+
+
+def _get_job(job_id: str) -> InvoiceIngestionJob:
+    job = invoice_jobs.get(job_id)
+    if not job:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Job de processamento não encontrado"
+        )
+    return job
+
+
+@router.post("/upload-zip/{contract_id}", response_model=InvoiceUploadResponse)
+async def upload_invoices_zip(
+    contract_id: int,
+    file: UploadFile = File(..., description="Arquivo ZIP contendo notas fiscais"),
+    current_user: User = Depends(get_suprimentos_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Upload de arquivo ZIP contendo múltiplas notas fiscais.
+    Processa automaticamente todos os arquivos XML/PDF dentro do ZIP.
+    Para arquivos grandes, prefira POST /upload-zip/{contract_id}/jobs (com progresso).
+    """
+
+    await _read_zip_upload(file)
+
     try:
         service = InvoiceProcessingService(db)
         result = await service.process_zip_file(
@@ -102,6 +123,124 @@ async def process_onedrive_url(
         )
 
 
+@router.post("/upload-zip/{contract_id}/jobs", response_model=InvoiceJobResponse, status_code=status.HTTP_202_ACCEPTED)
+async def create_zip_job(
+    contract_id: int,
+    background_tasks: BackgroundTasks,
+    file: UploadFile = File(..., description="Arquivo ZIP contendo notas fiscais"),
+    current_user: User = Depends(get_suprimentos_user)
+):
+    """
+    Agenda o processamento do ZIP em segundo plano e retorna o job.
+    O progresso arquivo a arquivo sai em GET /invoices/jobs/{job_id}/stream;
+    reenviar o mesmo ZIP durante o processamento retorna o mesmo job.
+    """
+
+    content = await _read_zip_upload(file)
+
+    job, needs_run = invoice_jobs.submit("zip", contract_id, current_user.id, content)
+    if needs_run:
+        background_tasks.add_task(invoice_jobs.run_zip, job.job_id, content, file.filename)
+
+    return InvoiceJobResponse(**job.snapshot())
+
+
+@router.post("/onedrive-url/{contract_id}/jobs", response_model=InvoiceJobResponse, status_code=status.HTTP_202_ACCEPTED)
+async def create_onedrive_job(
+    contract_id: int,
+    request: OneDriveUrlRequest,
+    background_tasks: BackgroundTasks,
+    current_user: User = Depends(get_suprimentos_user)
+):
+    """
+    Agenda o processamento da pasta do OneDrive em segundo plano e retorna o job.
+    """
+
+    job, needs_run = invoice_jobs.submit("onedrive", contract_id, current_user.id, request.folder_url.encode())
+    if needs_run:
+        background_tasks.add_task(invoice_jobs.run_onedrive, job.job_id, request.folder_url)
+
+    return InvoiceJobResponse(**job.snapshot())
+
+
+@router.get("/jobs/{job_id}", response_model=InvoiceJobResponse)
+async def get_invoice_job(
+    job_id: str,
+    current_user: User = Depends(get_current_user)
+):
+    """Estado atual de um job de processamento"""
+
+    return InvoiceJobResponse(**_get_job(job_id).snapshot())
+
+
+async def job_event_stream(job: InvoiceIngestionJob, last_event_id: Optional[int]):
+    assinatura = job.bus.subscribe(last_event_id=last_event_id)
+    try:
+        yield f"retry: {RETRY_MS}\n\n"
+
+        # Conexão nova (ou job já encerrado): estado completo antes dos eventos
+        if last_event_id is None or (job.finished and assinatura.queue.empty()):
+            yield format_event(job.snapshot_event())
+            if job.finished:
+                return
+
+        while True:
+            evento = await assinatura.get(settings.change_stream_heartbeat_seconds)
+            if evento is None:
+                if job.finished:
+                    return
+                yield ": ping\n\n"
+                continue
+            if evento["type"] == "resync":
+                # Eventos perdidos: o estado completo substitui a recarga
+                evento = job.snapshot_event()
+            yield format_event(evento)
+            if evento["type"] == JOB_FINISHED or (evento["id"] is None and job.finished):
+                return
+    finally:
+        assinatura.close()
+
+
+@router.get("/jobs/{job_id}/stream")
+async def stream_invoice_job(
+    job_id: str,
+    last_event_id: Optional[str] = Header(None),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Stream (Server-Sent Events) do progresso de um job: job.snapshot, job.started,
+    file.parsed, file.classified, file.inserted, file.failed e job.finished,
+    cada um com os contadores acumulados. O stream termina com o job.
+    """
+
+    # A sessão usada na autenticação não fica presa durante o stream
+    db.close()
+
+    job = _get_job(job_id)
+    ultimo_id = int(last_event_id) if last_event_id and last_event_id.isdigit() else None
+
+    return StreamingResponse(
+        job_event_stream(job, ultimo_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@router.post("/jobs/{job_id}/cancel", response_model=InvoiceJobResponse)
+async def cancel_invoice_job(
+    job_id: str,
+    current_user: User = Depends(get_suprimentos_user)
+):
+    """
+    Cancela o job a partir do próximo arquivo. As notas fiscais já gravadas permanecem.
+    """
+
+    job = _get_job(job_id)
+    invoice_jobs.cancel(job_id)
+    return InvoiceJobResponse(**job.snapshot())
+
+
 @router.get("/contract/{contract_id}", response_model=List[InvoiceResponse])
 async def get_contract_invoices(
     contract_id: int,
@@ -1,25 +1,46 @@
 """Endpoints para gestão de Notas Fiscais"""
 
 from fastapi import APIRouter, Depends, HTTPException, status, Query, UploadFile, File
+from fastapi.responses import StreamingResponse
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 from typing import List, Optional
-from datetime import datetime
-import httpx
+from datetime import datetime, date
+import json
 from app.core.database import get_db
-from app.api.dependencies import get_current_user, get_suprimentos_user
+from app.core.lazy import lazy_import
+from app.core.responses import ORJSONResponse
+from app.api.dependencies import get_current_user, get_suprimentos_user, get_admin_user
 from app.models.users import User
 from app.models.notas_fiscais import NotaFiscal, NotaFiscalItem, ProcessamentoLog
 from app.models.contracts import Contract
+from app.models.cost_centers import CostCenter
 from app.services.nf_service import NotaFiscalService
+from app.services.nf_rollup_service import NotaFiscalRollupService
+from app.services.nf_search_service import NotaFiscalItemSearchService
+from app.services.nf_partition_service import NotaFiscalPartitionService
+from app.services.nf_bulk_service import NotaFiscalBulkService, DEFAULT_CHUNK_SIZE
+from app.services.n8n_client import get_n8n_client, N8nUnavailableError, N8nResponseError
+from app.services.nf_serializers import (
+    NF_LIST,
+    NF_DETAIL,
+    NF_ITEM_DETAIL,
+    NF_CONTRACT_DETAIL,
+    NF_ITEM_CONTRACT_DETAIL
+)
 from app.schemas.notas_fiscais import (
     ProcessFolderRequest,
     ProcessFolderResponse,
     NotaFiscalListResponse,
     NotaFiscalStats,
     ProcessamentoLogListResponse,
-    NotaFiscalItemUpdate
+    NotaFiscalItemUpdate,
+    NotaFiscalBulkRequest,
+    NotaFiscalBatchStatusRequest
 )
 
+httpx = lazy_import("httpx")
+
 router = APIRouter()
 
 
@@ -35,52 +56,34 @@ async def get_nfs(
 ):
     """Lista todas as notas fiscais processadas pelo n8n"""
 
-    # Consultar notas fiscais reais do banco
-    query = db.query(NotaFiscal)
-
-    # Aplicar filtros
+    # Filtros aplicados à contagem e à página
+    filtros = []
     if status_filter:
-        query = query.filter(NotaFiscal.status_processamento.ilike(f"%{status_filter}%"))
+        filtros.append(NotaFiscal.status_processamento == status_filter)
 
     if supplier:
-        query = query.filter(NotaFiscal.nome_fornecedor.ilike(f"%{supplier}%"))
+        filtros.append(NotaFiscal.nome_fornecedor.ilike(f"%{supplier}%"))
 
     if contract_id:
-        query = query.filter(NotaFiscal.contrato_id == contract_id)
+        filtros.append(NotaFiscal.contrato_id == contract_id)
 
     # Contar total antes da paginação
-    total = query.count()
+    total = db.query(NotaFiscal.id).filter(*filtros).count()
 
-    # Aplicar paginação
-    nfs = query.offset(skip).limit(limit).all()
+    # Página como tuplas (contrato por LEFT JOIN e itens por subconsulta de contagem)
+    rows = db.query(*NF_LIST.columns).select_from(NotaFiscal).outerjoin(
+        Contract, Contract.id == NotaFiscal.contrato_id
+    ).filter(*filtros).offset(skip).limit(limit).all()
 
-    return {
-        "nfs": [
-            {
-                "id": nf.id,
-                "number": nf.numero,
-                "series": nf.serie,
-                "supplier": nf.nome_fornecedor,
-                "contract": nf.contrato.nome_projeto if nf.contrato else None,
-                "contract_id": nf.contrato_id,
-                "valor_total": float(nf.valor_total) if nf.valor_total else 0,
-                "date": nf.data_emissao.strftime("%Y-%m-%d") if nf.data_emissao else None,
-                "status": nf.status_processamento,
-                "pasta_origem": nf.pasta_origem,
-                "subpasta": nf.subpasta,
-                "chave_acesso": nf.chave_acesso,
-                "items_count": len(nf.itens) if nf.itens else 0,
-                "processed_at": nf.processed_by_n8n_at.isoformat() if nf.processed_by_n8n_at else None
-            }
-            for nf in nfs
-        ],
+    return ORJSONResponse({
+        "nfs": NF_LIST.many(rows),
         "total": total,
         "page": skip // limit + 1,
         "per_page": limit
-    }
+    })
 
 
-@router.get("/{nf_id}")
+@router.get("/{nf_id:int}")
 async def get_nf(
     nf_id: int,
     current_user: User = Depends(get_current_user),
@@ -88,55 +91,60 @@ async def get_nf(
 ):
     """Detalhe de uma nota fiscal específica com seus itens"""
 
-    nf = db.query(NotaFiscal).filter(NotaFiscal.id == nf_id).first()
-    if not nf:
+    row = db.query(*NF_DETAIL.columns).select_from(NotaFiscal).outerjoin(
+        Contract, Contract.id == NotaFiscal.contrato_id
+    ).filter(NotaFiscal.id == nf_id).first()
+    if not row:
         raise HTTPException(status_code=404, detail="Nota fiscal não encontrada")
 
+    item_rows = db.query(*NF_ITEM_DETAIL.columns).select_from(NotaFiscalItem).outerjoin(
+        CostCenter, CostCenter.id == NotaFiscalItem.centro_custo_id
+    ).filter(NotaFiscalItem.nota_id == nf_id).order_by(NotaFiscalItem.id).all()
+
+    nf = NF_DETAIL.serialize(row)
+    nf["items"] = NF_ITEM_DETAIL.many(item_rows)
+    return ORJSONResponse(nf)
+
+
+@router.get("/items/search")
+async def search_nf_items(
+    q: str = Query(..., min_length=2, description="Texto na descrição, código do produto ou NCM"),
+    skip: int = Query(0, ge=0),
+    limit: int = Query(20, ge=1, le=100),
+    contract_id: Optional[int] = Query(None),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Busca itens de NF por texto, ordenados por relevância"""
+
+    results, total = NotaFiscalItemSearchService(db).search(q, skip=skip, limit=limit, contract_id=contract_id)
+
     return {
-        "id": nf.id,
-        "number": nf.numero,
-        "series": nf.serie,
-        "chave_acesso": nf.chave_acesso,
-        "supplier": nf.nome_fornecedor,
-        "cnpj_fornecedor": nf.cnpj_fornecedor,
-        "contract": nf.contrato.nome_projeto if nf.contrato else None,
-        "contract_id": nf.contrato_id,
-        "value": float(nf.valor_total) if nf.valor_total else 0,
-        "valor_produtos": float(nf.valor_produtos) if nf.valor_produtos else 0,
-        "valor_impostos": float(nf.valor_impostos) if nf.valor_impostos else 0,
-        "valor_frete": float(nf.valor_frete) if nf.valor_frete else 0,
-        "date": nf.data_emissao.strftime("%Y-%m-%d") if nf.data_emissao else None,
-        "data_entrada": nf.data_entrada.strftime("%Y-%m-%d") if nf.data_entrada else None,
-        "status": nf.status_processamento,
-        "pasta_origem": nf.pasta_origem,
-        "subpasta": nf.subpasta,
-        "observacoes": nf.observacoes,
-        "ordem_compra_id": nf.ordem_compra_id,
-        "processed_at": nf.processed_by_n8n_at.isoformat() if nf.processed_by_n8n_at else None,
-        "created_at": nf.created_at.isoformat() if nf.created_at else None,
         "items": [
             {
                 "id": item.id,
+                "nota_id": item.nota_id,
+                "nf_number": item.nota_fiscal.numero if item.nota_fiscal else None,
+                "supplier": item.nota_fiscal.nome_fornecedor if item.nota_fiscal else None,
+                "contract_id": item.nota_fiscal.contrato_id if item.nota_fiscal else None,
+                "date": item.nota_fiscal.data_emissao.strftime("%Y-%m-%d") if item.nota_fiscal and item.nota_fiscal.data_emissao else None,
                 "numero_item": item.numero_item,
                 "codigo_produto": item.codigo_produto,
                 "description": item.descricao,
+                "ncm": item.ncm,
                 "quantity": float(item.quantidade) if item.quantidade else 0,
+                "unit": item.unidade,
                 "unitValue": float(item.valor_unitario) if item.valor_unitario else 0,
                 "totalValue": float(item.valor_total) if item.valor_total else 0,
-                "unit": item.unidade,
-                "peso_liquido": float(item.peso_liquido) if item.peso_liquido else None,
-                "peso_bruto": float(item.peso_bruto) if item.peso_bruto else None,
-                "ncm": item.ncm,
                 "centro_custo_id": item.centro_custo_id,
                 "centro_custo": item.centro_custo.nome if item.centro_custo else None,
-                "item_orcamento_id": item.item_orcamento_id,
-                "classificationScore": float(item.score_classificacao) if item.score_classificacao else None,
-                "classificationSource": item.fonte_classificacao,
-                "status_integracao": item.status_integracao,
-                "integrado_em": item.integrado_em.isoformat() if item.integrado_em else None
+                "rank": rank
             }
-            for item in nf.itens
-        ] if nf.itens else []
+            for item, rank in results
+        ],
+        "total": total,
+        "skip": skip,
+        "limit": limit
     }
 
 
@@ -248,30 +256,142 @@ async def get_nf_stats(
 ):
     """Estatísticas das notas fiscais processadas"""
 
-    from sqlalchemy import func, extract
+    service = NotaFiscalService(db)
+    return service.get_statistics()
+
+
+@router.get("/contracts/summary")
+async def get_contracts_summary(
+    stream: bool = Query(False, description="Transmite os contratos em NDJSON à medida que são calculados"),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Sumário de todos os contratos com contagens e valor realizado das NFs"""
+
+    service = NotaFiscalService(db)
+
+    if stream:
+        rows = service.get_contracts_summary_with_nfs(stream=True)
+        return StreamingResponse(
+            (json.dumps(row, ensure_ascii=False) + "\n" for row in rows),
+            media_type="application/x-ndjson"
+        )
+
+    contracts = service.get_contracts_summary_with_nfs()
+    return {
+        "contracts": contracts,
+        "total": len(contracts)
+    }
+
+
+@router.post("/rollup/rebuild")
+async def rebuild_nf_rollup(
+    data_inicio: Optional[datetime] = Query(None, description="Mês inicial a reconstruir"),
+    data_fim: Optional[datetime] = Query(None, description="Mês final a reconstruir"),
+    current_user: User = Depends(get_admin_user),
+    db: Session = Depends(get_db)
+):
+    """Reconstrói o agregado mensal de NFs (nf_monthly_rollup) a partir das tabelas de fatos"""
+
+    rollup = NotaFiscalRollupService(db)
+    linhas = rollup.rebuild(data_inicio, data_fim)
+
+    return {
+        "success": True,
+        "message": "Agregado mensal reconstruído com sucesso",
+        "rows": linhas,
+        "data_inicio": data_inicio.isoformat() if data_inicio else None,
+        "data_fim": data_fim.isoformat() if data_fim else None
+    }
+
+
+@router.post("/rollup/sync")
+async def sync_nf_rollup(
+    current_user: User = Depends(get_suprimentos_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Atualiza o agregado mensal com as NFs gravadas fora da API desde a última
+    atualização (ex.: ao final do processamento de uma pasta pelo n8n)
+    """
+
+    linhas = await run_in_threadpool(NotaFiscalRollupService(db).sincronizar_pendentes)
 
-    # Estatísticas básicas
-    total_nfs = db.query(NotaFiscal).count()
+    return {"success": True, "rows": linhas}
 
-    # Distribuição por status
-    status_counts = db.query(
-        NotaFiscal.status_processamento,
-        func.count(NotaFiscal.id).label('count')
-    ).group_by(NotaFiscal.status_processamento).all()
 
-    status_distribution = {status: count for status, count in status_counts}
+@router.post("/partitions/ensure")
+async def ensure_nf_partitions(
+    meses: Optional[int] = Query(None, ge=0, le=24, description="Meses à frente (padrão: configuração)"),
+    current_user: User = Depends(get_admin_user),
+    db: Session = Depends(get_db)
+):
+    """Cria as partições mensais futuras de notas_fiscais/nf_itens (se particionadas)"""
 
-    # Valor total
-    total_value_result = db.query(func.sum(NotaFiscal.valor_total)).scalar()
-    total_value = float(total_value_result) if total_value_result else 0
+    service = NotaFiscalPartitionService(db)
+    particionada = service.ensure_future_partitions(meses)
 
     return {
-        "total_nfs": total_nfs,
-        "pending_validation": status_distribution.get("processado", 0),
-        "validated": status_distribution.get("validado", 0),
-        "rejected": status_distribution.get("erro", 0),
-        "total_value": total_value,
-        "status_distribution": status_distribution
+        "success": True,
+        "partitioned": particionada,
+        "partitions": service.list_partitions()
+    }
+
+
+@router.post("/partitions/detach")
+async def detach_nf_partitions(
+    mes: date = Query(..., description="Mês a desanexar (qualquer dia do mês)"),
+    current_user: User = Depends(get_admin_user),
+    db: Session = Depends(get_db)
+):
+    """Desanexa as partições de um mês antigo (os dados permanecem em tabelas avulsas)"""
+
+    service = NotaFiscalPartitionService(db)
+    if not service.is_partitioned():
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="notas_fiscais não está particionada"
+        )
+
+    inicio_mes_atual = date.today().replace(day=1)
+    if mes.replace(day=1) >= inicio_mes_atual:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Somente meses anteriores ao mês corrente podem ser desanexados"
+        )
+
+    desanexadas = service.detach_month(mes)
+
+    return {
+        "success": True,
+        "message": f"{len(desanexadas)} partição(ões) desanexada(s)",
+        "detached": desanexadas
+    }
+
+
+@router.post("/bulk")
+async def bulk_upsert_nfs(
+    bulk_data: NotaFiscalBulkRequest,
+    chunk_size: int = Query(DEFAULT_CHUNK_SIZE, ge=1, le=1000, description="NFs por transação"),
+    current_user: User = Depends(get_suprimentos_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Grava um lote de notas fiscais com itens (usado pelo n8n).
+
+    Cada NF é criada ou atualizada pela chave de acesso (ou número/série/CNPJ do
+    fornecedor, quando não há chave); os itens enviados substituem os gravados.
+    O lote é gravado em transações de chunk_size NFs: um erro marca apenas as
+    NFs do bloco afetado. O resultado traz o status de cada NF na ordem recebida
+    (criada, atualizada, ignorada ou erro).
+    """
+
+    service = NotaFiscalBulkService(db)
+    resultado = await run_in_threadpool(service.upsert, bulk_data.nfs, chunk_size)
+
+    return {
+        "success": resultado["erros"] == 0,
+        **resultado
     }
 
 
@@ -304,17 +424,17 @@ async def process_folder(
     db.commit()
     db.refresh(processing_log)
 
-    try:
-        # Chamar webhook do n8n
-        n8n_webhook_url = f"https://n8n.gmxindustrial.com.br/webhook/nome_pasta/{folder_name}"
+    n8n = get_n8n_client()
+    n8n_webhook_url = n8n.folder_url(folder_name)
 
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            response = await client.post(n8n_webhook_url, json={
-                "nome_pasta": folder_name,
-                "user_id": current_user.id,
-                "user_name": current_user.full_name,
-                "timestamp": datetime.now().isoformat()
-            })
+    try:
+        # Chamar webhook do n8n (cliente compartilhado: pool de conexões, novas tentativas e circuit breaker)
+        response = await n8n.process_folder(folder_name, {
+            "nome_pasta": folder_name,
+            "user_id": current_user.id,
+            "user_name": current_user.full_name,
+            "timestamp": datetime.now().isoformat()
+        })
 
         # Atualizar log com sucesso
         processing_log.status = "webhook_enviado"
@@ -329,6 +449,29 @@ async def process_folder(
             "n8n_url": n8n_webhook_url
         }
 
+    except N8nUnavailableError as e:
+        # Circuito aberto: n8n falhou repetidamente, não tenta novamente agora
+        processing_log.status = "erro"
+        processing_log.detalhes_erro = str(e)
+        db.commit()
+
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=f"n8n indisponível no momento. Tente novamente em {e.retry_after:.0f} segundos.",
+            headers={"Retry-After": str(max(1, round(e.retry_after)))}
+        )
+
+    except N8nResponseError as e:
+        # n8n respondeu com erro mesmo após as novas tentativas
+        processing_log.status = "erro"
+        processing_log.detalhes_erro = str(e)
+        db.commit()
+
+        raise HTTPException(
+            status_code=status.HTTP_502_BAD_GATEWAY,
+            detail=f"Erro no n8n ao processar a pasta (status {e.status_code})"
+        )
+
     except httpx.TimeoutException:
         # Atualizar log com erro de timeout
         processing_log.status = "erro"
@@ -404,46 +547,74 @@ async def validate_nota_fiscal(
 ):
     """Valida uma nota fiscal e integra valores ao contrato"""
 
-    nf = db.query(NotaFiscal).filter(NotaFiscal.id == nf_id).first()
-    if not nf:
+    service = NotaFiscalService(db)
+    resultado = service.change_status_batch([nf_id], "validado")
+    if resultado["not_found"]:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Nota fiscal não encontrada"
         )
 
-    # Atualizar status para validado
-    nf.status_processamento = "validado"
-    nf.updated_at = datetime.now()
+    # Valor realizado do contrato já atualizado pela validação (se houver contrato)
+    contrato = resultado["contracts"][0] if resultado["contracts"] else None
 
-    # Se tem contrato associado, marcar itens como integrados
-    if nf.contrato_id:
-        for item in nf.itens:
-            if item.status_integracao == "pendente":
-                item.status_integracao = "integrado"
-                item.integrado_em = datetime.now()
-                item.updated_at = datetime.now()
+    return {
+        "success": True,
+        "message": "Nota fiscal validada com sucesso",
+        "nf_id": nf_id,
+        "status": "validado",
+        "contrato_id": contrato["contrato_id"] if contrato else None,
+        "valor_realizado_contrato": contrato["valor_realizado"] if contrato else None,
+        "validated_by": current_user.full_name,
+        "validated_at": datetime.now().isoformat()
+    }
 
-    db.commit()
-    db.refresh(nf)
 
-    # Calcular novo valor realizado do contrato se aplicável
-    valor_realizado = None
-    if nf.contrato_id:
-        service = NotaFiscalService(db)
-        valor_realizado = float(service.calculate_contract_realized_value(nf.contrato_id))
+@router.post("/validate-batch")
+async def validate_nfs_batch(
+    batch_data: NotaFiscalBatchStatusRequest,
+    current_user: User = Depends(get_suprimentos_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Valida várias notas fiscais de uma vez (ex.: fechamento do mês).
+    Retorna a variação e o novo valor realizado de cada contrato afetado.
+    """
+
+    service = NotaFiscalService(db)
+    resultado = await run_in_threadpool(service.change_status_batch, batch_data.nf_ids, "validado", batch_data.motivo)
 
     return {
         "success": True,
-        "message": "Nota fiscal validada com sucesso",
-        "nf_id": nf_id,
-        "status": nf.status_processamento,
-        "contrato_id": nf.contrato_id,
-        "valor_realizado_contrato": valor_realizado,
+        "message": f"{resultado['updated']} nota(s) fiscal(is) validada(s)",
+        "status": "validado",
+        **resultado,
         "validated_by": current_user.full_name,
         "validated_at": datetime.now().isoformat()
     }
 
 
+@router.post("/reject-batch")
+async def reject_nfs_batch(
+    batch_data: NotaFiscalBatchStatusRequest,
+    current_user: User = Depends(get_suprimentos_user),
+    db: Session = Depends(get_db)
+):
+    """Rejeita várias notas fiscais de uma vez (status 'erro'), com motivo opcional"""
+
+    service = NotaFiscalService(db)
+    resultado = await run_in_threadpool(service.change_status_batch, batch_data.nf_ids, "erro", batch_data.motivo)
+
+    return {
+        "success": True,
+        "message": f"{resultado['updated']} nota(s) fiscal(is) rejeitada(s)",
+        "status": "erro",
+        **resultado,
+        "rejected_by": current_user.full_name,
+        "rejected_at": datetime.now().isoformat()
+    }
+
+
 @router.patch("/item/{item_id}")
 async def update_item(
     item_id: int,
@@ -572,70 +743,35 @@ async def get_contract_nfs_detailed(
         )
 
     # Buscar NFs do contrato
-    query = db.query(NotaFiscal).filter(NotaFiscal.contrato_id == contract_id)
-    total = query.count()
-    nfs = query.offset(skip).limit(limit).all()
-
-    # Montar resposta detalhada
-    nfs_detailed = []
-    for nf in nfs:
-        nf_data = {
-            "id": nf.id,
-            "numero": nf.numero,
-            "serie": nf.serie,
-            "chave_acesso": nf.chave_acesso,
-            "fornecedor": nf.nome_fornecedor,
-            "cnpj_fornecedor": nf.cnpj_fornecedor,
-            "valor_total": float(nf.valor_total) if nf.valor_total else 0,
-            "valor_produtos": float(nf.valor_produtos) if nf.valor_produtos else 0,
-            "valor_impostos": float(nf.valor_impostos) if nf.valor_impostos else 0,
-            "valor_frete": float(nf.valor_frete) if nf.valor_frete else 0,
-            "data_emissao": nf.data_emissao.strftime("%Y-%m-%d") if nf.data_emissao else None,
-            "data_entrada": nf.data_entrada.strftime("%Y-%m-%d") if nf.data_entrada else None,
-            "status_processamento": nf.status_processamento,
-            "pasta_origem": nf.pasta_origem,
-            "subpasta": nf.subpasta,
-            "observacoes": nf.observacoes,
-            "created_at": nf.created_at.isoformat() if nf.created_at else None,
-            "processed_at": nf.processed_by_n8n_at.isoformat() if nf.processed_by_n8n_at else None,
-            "items": []
-        }
-
-        # Adicionar itens da NF
-        for item in nf.itens:
-            item_data = {
-                "id": item.id,
-                "numero_item": item.numero_item,
-                "codigo_produto": item.codigo_produto,
-                "descricao": item.descricao,
-                "ncm": item.ncm,
-                "quantidade": float(item.quantidade) if item.quantidade else 0,
-                "unidade": item.unidade,
-                "valor_unitario": float(item.valor_unitario) if item.valor_unitario else 0,
-                "valor_total": float(item.valor_total) if item.valor_total else 0,
-                "peso_liquido": float(item.peso_liquido) if item.peso_liquido else None,
-                "peso_bruto": float(item.peso_bruto) if item.peso_bruto else None,
-                "centro_custo_id": item.centro_custo_id,
-                "centro_custo": item.centro_custo.nome if item.centro_custo else None,
-                "item_orcamento_id": item.item_orcamento_id,
-                "score_classificacao": float(item.score_classificacao) if item.score_classificacao else None,
-                "fonte_classificacao": item.fonte_classificacao,
-                "status_integracao": item.status_integracao,
-                "integrado_em": item.integrado_em.isoformat() if item.integrado_em else None
-            }
-            nf_data["items"].append(item_data)
-
-        nfs_detailed.append(nf_data)
+    total = db.query(NotaFiscal.id).filter(NotaFiscal.contrato_id == contract_id).count()
+    nf_rows = db.query(*NF_CONTRACT_DETAIL.columns).filter(
+        NotaFiscal.contrato_id == contract_id
+    ).offset(skip).limit(limit).all()
+
+    # Montar resposta detalhada (itens da página inteira numa única consulta)
+    nfs_detailed = NF_CONTRACT_DETAIL.many(nf_rows)
+    itens_por_nf = {}
+    for nf in nfs_detailed:
+        nf["items"] = itens_por_nf[nf["id"]] = []
+
+    total_itens = 0
+    if itens_por_nf:
+        item_rows = db.query(*NF_ITEM_CONTRACT_DETAIL.columns).select_from(NotaFiscalItem).outerjoin(
+            CostCenter, CostCenter.id == NotaFiscalItem.centro_custo_id
+        ).filter(NotaFiscalItem.nota_id.in_(list(itens_por_nf))).order_by(NotaFiscalItem.id).all()
+
+        serialize_item = NF_ITEM_CONTRACT_DETAIL.serialize
+        for item in item_rows:
+            itens_por_nf[item[0]].append(serialize_item(item))
+        total_itens = len(item_rows)
 
     # Calcular estatísticas do contrato
     service = NotaFiscalService(db)
     valor_realizado = service.calculate_contract_realized_value(contract_id)
 
-    nfs_validadas = len([nf for nf in nfs if nf.status_processamento == "validado"])
-    nfs_pendentes = len([nf for nf in nfs if nf.status_processamento == "processado"])
-    nfs_erro = len([nf for nf in nfs if nf.status_processamento == "erro"])
+    status_nfs = [nf["status_processamento"] for nf in nfs_detailed]
 
-    return {
+    return ORJSONResponse({
         "contract": {
             "id": contract.id,
             "numero_contrato": contract.numero_contrato,
@@ -646,13 +782,13 @@ async def get_contract_nfs_detailed(
         },
         "summary": {
             "total_nfs": total,
-            "nfs_validadas": nfs_validadas,
-            "nfs_pendentes": nfs_pendentes,
-            "nfs_erro": nfs_erro,
+            "nfs_validadas": status_nfs.count("validado"),
+            "nfs_pendentes": status_nfs.count("processado"),
+            "nfs_erro": status_nfs.count("erro"),
             "valor_realizado": float(valor_realizado),
             "percentual_realizado": (float(valor_realizado) / float(contract.valor_original) * 100) if contract.valor_original > 0 else 0,
             "saldo_restante": float(contract.valor_original) - float(valor_realizado),
-            "total_itens": sum(len(nf.itens) for nf in nfs) if nfs else 0
+            "total_itens": total_itens
         },
         "nfs": nfs_detailed,
         "pagination": {
@@ -662,4 +798,4 @@ async def get_contract_nfs_detailed(
             "has_next": (skip + limit) < total,
             "has_prev": skip > 0
         }
-    }
\ No newline at end of file
+    })
\ No newline at end of file
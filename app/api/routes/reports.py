@@ -1,22 +1,24 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Response
-from fastapi.responses import FileResponse
+from fastapi import APIRouter, Depends, HTTPException, status, Response, Query, BackgroundTasks
+from fastapi.responses import FileResponse, StreamingResponse
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
+from typing import Optional
+from datetime import datetime
 from app.core.database import get_db
 from app.api.dependencies import get_current_user, get_diretoria_user
 from app.models.users import User, UserRole
-from app.schemas.reports import ReportRequest, ReportResponse
-from app.services.reports_simple import SimpleReportsService
+from app.schemas.reports import (
+    ReportRequest, ReportResponse, ReportFilter, ReportFormat, ExportFormat,
+    ReportJobResponse, ReportJobStatus
+)
+from app.services.reports import ReportsService
+from app.services.report_jobs import report_jobs
 import os
 
 router = APIRouter()
 
 
-@router.post("/generate", response_model=ReportResponse)
-async def generate_report(
-    request: ReportRequest,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
-):
+def _check_report_access(request: ReportRequest, current_user: User) -> None:
     # Controle de acesso baseado no tipo de relatório
     if request.report_type.value == "analitico":
         # Relatório analítico: apenas Suprimentos e Diretoria
@@ -31,16 +33,84 @@ async def generate_report(
         # Clientes só veem dados dos seus contratos (implementar filtro por cliente)
         pass
 
-    service = SimpleReportsService(db)
-    
-    try:
-        result = service.generate_report(request)
-        return ReportResponse(**result)
-    except Exception as e:
+
+@router.post("/generate", response_model=ReportResponse)
+async def generate_report(
+    request: ReportRequest,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    _check_report_access(request, current_user)
+
+    if request.format == ReportFormat.JSON:
+        try:
+            result = ReportsService(db).generate_report(request)
+            return ReportResponse(**result)
+        except Exception as e:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Erro ao gerar relatório: {str(e)}"
+            )
+
+    # PDF/Excel: reaproveita o artefato já gerado para os mesmos filtros e dados
+    job, needs_render = report_jobs.submit(db, request)
+    if needs_render:
+        # A renderização roda no pool de processos; a thread apenas aguarda
+        job = await run_in_threadpool(report_jobs.run, job["job_id"], request)
+
+    if job["status"] == ReportJobStatus.ERRO:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"Erro ao gerar relatório: {str(e)}"
+            detail=f"Erro ao gerar relatório: {job['error']}"
         )
+    if job["status"] != ReportJobStatus.CONCLUIDO:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Relatório em geração: acompanhe o job {job['job_id']}"
+        )
+
+    return ReportResponse(
+        report_id=job["job_id"],
+        report_type=request.report_type,
+        format=request.format,
+        generated_at=job["finished_at"],
+        file_url=job["file_url"]
+    )
+
+
+@router.post("/jobs", response_model=ReportJobResponse, status_code=status.HTTP_202_ACCEPTED)
+async def create_report_job(
+    request: ReportRequest,
+    background_tasks: BackgroundTasks,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Agenda a geração do relatório em segundo plano e retorna o id do job"""
+    _check_report_access(request, current_user)
+
+    try:
+        job, needs_render = report_jobs.submit(db, request)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+    if needs_render:
+        background_tasks.add_task(report_jobs.run, job["job_id"], request)
+
+    return ReportJobResponse(**job)
+
+
+@router.get("/jobs/{job_id}", response_model=ReportJobResponse)
+async def get_report_job(
+    job_id: str,
+    current_user: User = Depends(get_current_user)
+):
+    job = report_jobs.get(job_id)
+    if not job:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Job de relatório não encontrado"
+        )
+    return ReportJobResponse(**job)
 
 
 @router.get("/download/{filename}")
@@ -48,7 +118,7 @@ async def download_report(
     filename: str,
     current_user: User = Depends(get_current_user)
 ):
-    file_path = os.path.join("reports", filename)
+    file_path = os.path.join("reports", os.path.basename(filename))
     
     if not os.path.exists(file_path):
         raise HTTPException(
@@ -63,6 +133,46 @@ async def download_report(
     )
 
 
+@router.get("/analytical/export")
+async def export_analytical_report(
+    export_format: ExportFormat = Query(ExportFormat.CSV, alias="format"),
+    contract_id: Optional[int] = Query(None),
+    cliente: Optional[str] = Query(None),
+    data_inicio: Optional[datetime] = Query(None),
+    data_fim: Optional[datetime] = Query(None),
+    centro_custo: Optional[str] = Query(None),
+    fornecedor: Optional[str] = Query(None),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Exporta o relatório analítico em CSV ou NDJSON, transmitido linha a linha"""
+    if current_user.role not in [UserRole.SUPRIMENTOS, UserRole.DIRETORIA, UserRole.ADMIN]:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Acesso negado: Relatório analítico disponível apenas para Suprimentos e Diretoria"
+        )
+
+    filters = ReportFilter(
+        contract_id=contract_id,
+        cliente=cliente,
+        data_inicio=data_inicio,
+        data_fim=data_fim,
+        centro_custo=centro_custo,
+        fornecedor=fornecedor
+    )
+
+    service = ReportsService(db)
+    extension = export_format.value
+    media_type = "text/csv" if export_format == ExportFormat.CSV else "application/x-ndjson"
+    filename = f"relatorio_analitico_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{extension}"
+
+    return StreamingResponse(
+        service.stream_analytical_report(filters, export_format),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+
 @router.get("/analytical/preview")
 async def preview_analytical_report(
     contract_id: int,
@@ -76,7 +186,7 @@ async def preview_analytical_report(
             detail="Acesso negado"
         )
     
-    service = SimpleReportsService(db)
+    service = ReportsService(db)
     
     request = ReportRequest(
         report_type="analitico",
@@ -100,7 +210,7 @@ async def preview_balance_report(
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    service = SimpleReportsService(db)
+    service = ReportsService(db)
     
     request = ReportRequest(
         report_type="conta_corrente",
@@ -1,10 +1,52 @@
+import asyncio
+import hmac
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Optional, Tuple
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from .config import settings
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+def build_password_context(rounds: int) -> CryptContext:
+    """
+    Contexto bcrypt com custo fixo: hashes com custo diferente de `rounds`
+    (maior ou menor) são considerados desatualizados e refeitos no login.
+    """
+    return CryptContext(
+        schemes=["bcrypt"],
+        deprecated="auto",
+        bcrypt__default_rounds=rounds,
+        bcrypt__min_rounds=rounds,
+        bcrypt__max_rounds=rounds,
+    )
+
+
+pwd_context = build_password_context(settings.bcrypt_rounds)
+
+# bcrypt libera o GIL: o hash roda em paralelo ao event loop, limitado ao tamanho do pool
+_hash_pool: Optional[ThreadPoolExecutor] = None
+_hash_pool_lock = threading.Lock()
+
+
+def get_password_hash_pool() -> ThreadPoolExecutor:
+    global _hash_pool
+    with _hash_pool_lock:
+        if _hash_pool is None:
+            _hash_pool = ThreadPoolExecutor(
+                max_workers=settings.password_hash_workers,
+                thread_name_prefix="password-hash"
+            )
+        return _hash_pool
+
+
+def shutdown_password_hash_pool() -> None:
+    global _hash_pool
+    with _hash_pool_lock:
+        if _hash_pool is not None:
+            _hash_pool.shutdown(wait=False, cancel_futures=True)
+            _hash_pool = None
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
@@ -15,6 +57,32 @@ def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
 
+def verify_and_update_password(plain_password: str, stored_password: str) -> Tuple[bool, Optional[str]]:
+    """
+    Confere a senha e, se correta, retorna o novo hash quando o armazenado
+    precisa ser refeito (custo do bcrypt alterado ou senha legada em texto puro).
+    """
+    if pwd_context.identify(stored_password) is None:
+        # Senha legada gravada sem hash
+        if hmac.compare_digest(plain_password.encode(), stored_password.encode()):
+            return True, pwd_context.hash(plain_password)
+        return False, None
+    return pwd_context.verify_and_update(plain_password, stored_password)
+
+
+async def verify_and_update_password_async(plain_password: str, stored_password: str) -> Tuple[bool, Optional[str]]:
+    """verify_and_update_password no pool de hash, sem bloquear o event loop"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        get_password_hash_pool(), verify_and_update_password, plain_password, stored_password
+    )
+
+
+async def get_password_hash_async(password: str) -> str:
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_password_hash_pool(), get_password_hash, password)
+
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
     if expires_delta:
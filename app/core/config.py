@@ -15,6 +15,26 @@ class Settings(BaseSettings):
     redis_url: str = "redis://localhost:6379"
     cors_origins: str = "http://localhost:3000,http://localhost:5173,http://localhost:8080"
     debug: bool = True
+    report_render_workers: int = 2
+    nf_partition_months_ahead: int = 3
+    query_repeat_threshold: int = 10
+    slow_query_log: bool = False
+    slow_query_threshold_ms: int = 500
+    slow_query_buffer_size: int = 200
+    slow_query_explain_timeout_ms: int = 10000
+    bcrypt_rounds: int = 12
+    password_hash_workers: int = 4
+    n8n_webhook_url: str = "https://n8n.gmxindustrial.com.br/webhook/nome_pasta/{nome_pasta}"
+    n8n_timeout_seconds: float = 10.0
+    n8n_connect_timeout_seconds: float = 3.0
+    n8n_max_connections: int = 10
+    n8n_max_retries: int = 2
+    n8n_retry_backoff_seconds: float = 0.5
+    n8n_breaker_failures: int = 5
+    n8n_breaker_reset_seconds: float = 30.0
+    change_bus_backend: str = "auto"  # auto (LISTEN/NOTIFY no PostgreSQL) ou memory
+    change_stream_heartbeat_seconds: float = 15.0
+    change_stream_queue_size: int = 1000
 
     class Config:
         env_file = ".env"
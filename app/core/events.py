@@ -0,0 +1,287 @@
+"""
+Barramento de alterações (NFs, logs de processamento, totais de contratos).
+
+Os serviços registram eventos na sessão com publish_change(db, tipo, **dados) e
+eles só são entregues depois do commit (um rollback os descarta):
+
+- PostgreSQL (psycopg2): os eventos saem com pg_notify no canal CHANNEL dentro
+  da própria transação, e cada processo da API os recebe por uma conexão
+  dedicada com LISTEN, inclusive os de outros workers e de processos externos,
+  que podem publicar com NOTIFY gmx_changes, '{"type": "...", "data": {...}}'.
+- Demais bancos ou CHANGE_BUS_BACKEND=memory: entrega apenas aos assinantes do
+  próprio processo, logo após o commit.
+
+Cada assinante (GET /events/stream) tem uma fila própria. Se a fila encher,
+ou se a conexão do LISTEN cair, ele recebe "resync" e deve recarregar tudo.
+"""
+
+import asyncio
+import itertools
+import json
+import select
+import threading
+from collections import deque
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional
+
+from sqlalchemy import event, text
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+
+
+CHANNEL = "gmx_changes"
+SESSION_KEY = "change_events"
+
+# Listas de ids nos eventos são truncadas (o payload do NOTIFY é limitado a 8000 bytes)
+MAX_EVENT_IDS = 100
+MAX_NOTIFY_BYTES = 7900
+
+RECENT_EVENTS = 500
+MAX_RECONNECT_SECONDS = 30.0
+
+
+def ids_payload(ids: Iterable[int]) -> Dict[str, Any]:
+    """Ids afetados para o evento: no máximo MAX_EVENT_IDS, com a contagem total"""
+    ids = list(ids)
+    return {"ids": ids[:MAX_EVENT_IDS], "count": len(ids), "truncated": len(ids) > MAX_EVENT_IDS}
+
+
+class Subscription:
+    """Fila de eventos de um assinante, consumida no event loop em que foi criada"""
+
+    def __init__(self, bus: "ChangeBus", types: Optional[Iterable[str]], queue_size: int):
+        self.bus = bus
+        self.types = frozenset(types) if types else None
+        self.loop = asyncio.get_running_loop()
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+
+    def accepts(self, evento: Dict[str, Any]) -> bool:
+        # Filtro pelo prefixo do tipo ("nf", "contract", ...); resync vale para todos
+        return self.types is None or evento["type"] == "resync" or evento["type"].split(".")[0] in self.types
+
+    def deliver(self, evento: Dict[str, Any]) -> None:
+        """Entrega a partir de qualquer thread"""
+        try:
+            self.loop.call_soon_threadsafe(self._put, evento)
+        except RuntimeError:
+            pass  # loop encerrado: o assinante já saiu
+
+    def _put(self, evento: Dict[str, Any]) -> None:
+        try:
+            self.queue.put_nowait(evento)
+        except asyncio.QueueFull:
+            # Assinante lento: descarta o atrasado e pede recarga completa
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(self.bus.resync_event("fila cheia"))
+
+    async def get(self, timeout: float) -> Optional[Dict[str, Any]]:
+        """Próximo evento, ou None após timeout segundos sem eventos"""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def close(self) -> None:
+        self.bus.unsubscribe(self)
+
+
+class ChangeBus:
+    """Distribui eventos de alteração aos assinantes do processo"""
+
+    def __init__(self, recent_events: int = RECENT_EVENTS):
+        self._subscribers = set()
+        self._lock = threading.Lock()
+        self._sequence = itertools.count(1)
+        self._recent = deque(maxlen=recent_events)
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self.listening = False
+
+    # === ASSINANTES ===
+
+    def subscribe(
+        self,
+        types: Optional[Iterable[str]] = None,
+        last_event_id: Optional[int] = None,
+        queue_size: int = None
+    ) -> Subscription:
+        """
+        Nova assinatura (chamar dentro do event loop). Com last_event_id, reenvia os
+        eventos recentes posteriores a ele, ou resync se já saíram do histórico.
+        """
+        assinatura = Subscription(self, types, queue_size or settings.change_stream_queue_size)
+        with self._lock:
+            self._subscribers.add(assinatura)
+            if last_event_id is not None:
+                # Id posterior ao último evento: veio de outro processo (ou de antes de um restart)
+                ultimo = self._recent[-1]["id"] if self._recent else 0
+                coberto = last_event_id <= ultimo and (not self._recent or self._recent[0]["id"] <= last_event_id + 1)
+                pendentes = [e for e in self._recent if e["id"] > last_event_id]
+                for evento in (pendentes if coberto else [self.resync_event("histórico indisponível")]):
+                    if assinatura.accepts(evento):
+                        assinatura._put(evento)
+        return assinatura
+
+    def unsubscribe(self, assinatura: Subscription) -> None:
+        with self._lock:
+            self._subscribers.discard(assinatura)
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+    # === ENTREGA ===
+
+    def dispatch(self, tipo: str, dados: Dict[str, Any]) -> Dict[str, Any]:
+        """Entrega um evento aos assinantes deste processo (qualquer thread)"""
+        with self._lock:
+            evento = {"id": next(self._sequence), "type": tipo, "data": dados, "at": datetime.now().isoformat()}
+            self._recent.append(evento)
+            assinantes = [s for s in self._subscribers if s.accepts(evento)]
+        for assinatura in assinantes:
+            assinatura.deliver(evento)
+        return evento
+
+    def resync_event(self, motivo: str) -> Dict[str, Any]:
+        # Sem id: não entra no histórico nem altera o Last-Event-ID do cliente
+        return {"id": None, "type": "resync", "data": {"reason": motivo}, "at": datetime.now().isoformat()}
+
+    def resync(self, motivo: str) -> None:
+        evento = self.resync_event(motivo)
+        with self._lock:
+            assinantes = list(self._subscribers)
+        for assinatura in assinantes:
+            assinatura.deliver(evento)
+
+    def recent(self, limit: int = 50) -> List[Dict[str, Any]]:
+        with self._lock:
+            return list(self._recent)[-limit:]
+
+    # === POSTGRESQL (LISTEN/NOTIFY) ===
+
+    @staticmethod
+    def uses_notify(engine) -> bool:
+        """Eventos deste banco saem por NOTIFY (e chegam pelo LISTEN)"""
+        return (
+            settings.change_bus_backend != "memory"
+            and engine.dialect.name == "postgresql"
+            and engine.dialect.driver == "psycopg2"
+        )
+
+    def start(self, engine) -> bool:
+        """Inicia a thread de LISTEN (se o banco usar NOTIFY)"""
+        if not self.uses_notify(engine) or self._thread is not None:
+            return False
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._listen, args=(engine,), name="change-bus-listen", daemon=True)
+        self._thread.start()
+        return True
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+        self._thread = None
+        self.listening = False
+
+    def _connect(self, engine):
+        cargs, cparams = engine.dialect.create_connect_args(engine.url)
+        conexao = engine.dialect.dbapi.connect(*cargs, **cparams)
+        conexao.autocommit = True
+        with conexao.cursor() as cursor:
+            cursor.execute(f"LISTEN {CHANNEL}")
+        return conexao
+
+    def _listen(self, engine) -> None:
+        tentativas = 0
+        while not self._stop.is_set():
+            conexao = None
+            try:
+                conexao = self._connect(engine)
+                self.listening = True
+                if tentativas:
+                    # Eventos publicados durante a queda não chegaram
+                    self.resync("reconexão ao banco")
+                tentativas = 0
+
+                while not self._stop.is_set():
+                    if select.select([conexao], [], [], 1.0) == ([], [], []):
+                        continue
+                    conexao.poll()
+                    while conexao.notifies:
+                        self._receive(conexao.notifies.pop(0).payload)
+            except Exception as e:
+                self.listening = False
+                tentativas += 1
+                espera = min(MAX_RECONNECT_SECONDS, 2 ** tentativas)
+                motivo = str(e).strip().splitlines()[0] if str(e).strip() else type(e).__name__
+                print(f"LISTEN {CHANNEL} interrompido ({motivo}); nova tentativa em {espera:.0f}s")
+                self._stop.wait(espera)
+            finally:
+                if conexao is not None:
+                    try:
+                        conexao.close()
+                    except Exception:
+                        pass
+        self.listening = False
+
+    def _receive(self, payload: str) -> None:
+        try:
+            mensagem = json.loads(payload)
+            self.dispatch(mensagem["type"], mensagem.get("data") or {})
+        except (ValueError, KeyError, TypeError):
+            print(f"Evento inválido no canal {CHANNEL}: {payload[:200]}")
+
+
+change_bus = ChangeBus()
+
+
+# === PUBLICAÇÃO TRANSACIONAL ===
+
+def publish_change(db: Session, tipo: str, **dados) -> None:
+    """Registra um evento para ser publicado no commit da sessão"""
+    db.info.setdefault(SESSION_KEY, []).append((tipo, dados))
+
+
+def _notify_payload(tipo: str, dados: Dict[str, Any]) -> str:
+    payload = json.dumps({"type": tipo, "data": dados}, default=str)
+    if len(payload.encode()) > MAX_NOTIFY_BYTES:
+        payload = json.dumps({"type": tipo, "data": {"truncated": True}})
+    return payload
+
+
+def _send_notify(session: Session, payloads: List[str]) -> None:
+    # O PostgreSQL só entrega as notificações se a transação for confirmada
+    session.execute(
+        text("SELECT pg_notify(:canal, payload) FROM unnest(CAST(:payloads AS text[])) AS payload"),
+        {"canal": CHANNEL, "payloads": payloads}
+    )
+
+
+@event.listens_for(Session, "before_commit")
+def _notify_pending(session: Session) -> None:
+    if not change_bus.uses_notify(session.get_bind()):
+        return
+    # before_commit roda antes do flush final do commit: os eventos publicados
+    # pelos hooks de mapeamento (ex.: processing_log.status) só existem após o flush
+    session.flush()
+    eventos = session.info.get(SESSION_KEY)
+    if not eventos:
+        return
+    _send_notify(session, [_notify_payload(tipo, dados) for tipo, dados in eventos])
+    session.info.pop(SESSION_KEY, None)
+
+
+@event.listens_for(Session, "after_commit")
+def _dispatch_pending(session: Session) -> None:
+    for tipo, dados in session.info.pop(SESSION_KEY, None) or []:
+        change_bus.dispatch(tipo, dados)
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _discard_pending(session: Session, transacao) -> None:
+    # Também quando a sessão ainda não tinha aberto transação no banco
+    if not transacao.nested:
+        session.info.pop(SESSION_KEY, None)
@@ -0,0 +1,48 @@
+"""
+Importação sob demanda de bibliotecas pesadas (pandas, numpy, openpyxl, httpx).
+
+    pd = lazy_import("pandas")
+
+O módulo só é importado no primeiro acesso a um atributo (pd.read_excel), de
+modo que importar o serviço (e subir a API) não paga o custo da biblioteca. Após
+a carga os atributos do módulo são copiados para o proxy e os acessos seguintes
+não passam mais por __getattr__.
+
+Anotações de tipo avaliadas na definição (ex.: df: pd.DataFrame) também
+disparam a importação; use `from __future__ import annotations` nesses módulos.
+"""
+
+import importlib
+import threading
+from types import ModuleType
+
+
+class LazyModule:
+    """Proxy que importa o módulo no primeiro acesso a um atributo"""
+
+    def __init__(self, name: str):
+        self.__dict__["_lazy_name"] = name
+        self.__dict__["_lazy_module"] = None
+        self.__dict__["_lazy_lock"] = threading.Lock()
+
+    def _load(self) -> ModuleType:
+        with self._lazy_lock:
+            if self._lazy_module is None:
+                module = importlib.import_module(self._lazy_name)
+                self.__dict__.update(module.__dict__)
+                self.__dict__["_lazy_module"] = module
+        return self._lazy_module
+
+    def __getattr__(self, attr: str):
+        return getattr(self._load(), attr)
+
+    def __dir__(self):
+        return dir(self._load())
+
+    def __repr__(self) -> str:
+        estado = "carregado" if self._lazy_module is not None else "não carregado"
+        return f"<módulo sob demanda {self._lazy_name!r} ({estado})>"
+
+
+def lazy_import(name: str) -> LazyModule:
+    return LazyModule(name)
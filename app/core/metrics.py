@@ -0,0 +1,159 @@
+"""
+Métricas da API no formato Prometheus (exportadas em /metrics).
+
+- Por rota (template, ex.: /api/v1/nf/{nf_id}): contagem de requisições,
+  latência, tamanho da resposta e tempo gasto no banco.
+- Ingestão: NFs interpretadas, itens classificados e bytes recebidos em uploads.
+- Consultas SQL da requisição (app.core.query_stats): cabeçalhos X-DB-Queries e
+  X-DB-Time em modo debug e aviso de N+1; a rota também identifica as
+  consultas lentas (app.core.slow_queries).
+
+Com gunicorn (vários workers), defina PROMETHEUS_MULTIPROC_DIR para que /metrics
+agregue os valores de todos os processos.
+"""
+
+import os
+import time
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    CollectorRegistry,
+    Counter,
+    Histogram,
+    REGISTRY,
+    generate_latest,
+    multiprocess,
+)
+
+from app.core.config import settings
+from app.core.query_stats import RequestDbStats, current_db_stats, db_stats_headers, report_n_plus_one
+from app.core.slow_queries import current_request_scope
+
+
+# Rota usada quando a requisição não casa com nenhum endpoint (evita cardinalidade ilimitada)
+UNMATCHED_ROUTE = "unmatched"
+
+# Caminhos não medidos
+EXCLUDED_PATHS = {"/metrics"}
+
+METRICS_CONTENT_TYPE = CONTENT_TYPE_LATEST
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+DB_TIME_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216, 67108864)
+
+REQUESTS = Counter(
+    "gmx_http_requests_total",
+    "Requisições HTTP por rota, método e status",
+    ["method", "route", "status"]
+)
+REQUEST_LATENCY = Histogram(
+    "gmx_http_request_duration_seconds",
+    "Latência das requisições HTTP",
+    ["method", "route"],
+    buckets=LATENCY_BUCKETS
+)
+RESPONSE_SIZE = Histogram(
+    "gmx_http_response_size_bytes",
+    "Tamanho do corpo das respostas HTTP",
+    ["method", "route"],
+    buckets=SIZE_BUCKETS
+)
+REQUEST_DB_TIME = Histogram(
+    "gmx_http_request_db_seconds",
+    "Tempo gasto em consultas ao banco por requisição",
+    ["method", "route"],
+    buckets=DB_TIME_BUCKETS
+)
+UPLOAD_BYTES = Counter(
+    "gmx_upload_bytes_total",
+    "Bytes recebidos em uploads (multipart/form-data)",
+    ["route"]
+)
+NFS_PARSED = Counter(
+    "gmx_nf_parsed_total",
+    "Notas fiscais interpretadas na ingestão",
+    ["formato", "resultado"]
+)
+ITEMS_CLASSIFIED = Counter(
+    "gmx_nf_items_classified_total",
+    "Itens classificados em centro de custo",
+    ["origem", "resultado"]
+)
+
+
+def record_nf_parsed(formato: str, sucesso: bool) -> None:
+    NFS_PARSED.labels(formato, "ok" if sucesso else "erro").inc()
+
+
+def record_item_classified(origem: str, classificado: bool) -> None:
+    ITEMS_CLASSIFIED.labels(origem, "classificado" if classificado else "nao_classificado").inc()
+
+
+def route_template(scope) -> str:
+    """Template da rota que atendeu a requisição (preenchido pelo roteador)"""
+    route = scope.get("route")
+    return getattr(route, "path", None) or UNMATCHED_ROUTE
+
+
+class MetricsMiddleware:
+    """Middleware ASGI que registra as métricas HTTP de cada requisição"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in EXCLUDED_PATHS:
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestDbStats()
+        token = current_db_stats.set(stats)
+        scope_token = current_request_scope.set(scope)
+        inicio = time.perf_counter()
+        resposta = {"status": 500, "bytes": 0}
+        upload = {"bytes": 0}
+
+        headers = dict(scope.get("headers") or [])
+        is_upload = headers.get(b"content-type", b"").startswith(b"multipart/form-data")
+
+        async def receive_wrapper():
+            message = await receive()
+            if message["type"] == "http.request":
+                upload["bytes"] += len(message.get("body", b""))
+            return message
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                resposta["status"] = message["status"]
+                if settings.debug:
+                    message["headers"] = list(message.get("headers", [])) + db_stats_headers(stats)
+            elif message["type"] == "http.response.body":
+                resposta["bytes"] += len(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, receive_wrapper if is_upload else receive, send_wrapper)
+        finally:
+            current_db_stats.reset(token)
+            current_request_scope.reset(scope_token)
+            method = scope["method"]
+            route = route_template(scope)
+
+            REQUESTS.labels(method, route, str(resposta["status"])).inc()
+            REQUEST_LATENCY.labels(method, route).observe(time.perf_counter() - inicio)
+            RESPONSE_SIZE.labels(method, route).observe(resposta["bytes"])
+            REQUEST_DB_TIME.labels(method, route).observe(stats.seconds)
+            if is_upload:
+                UPLOAD_BYTES.labels(route).inc(upload["bytes"])
+            report_n_plus_one(stats, f"{method} {route}")
+
+
+def render_metrics() -> bytes:
+    """Métricas no formato texto do Prometheus"""
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry)
+    return generate_latest(REGISTRY)
+
@@ -0,0 +1,133 @@
+"""
+Contagem de consultas SQL por requisição e detector de N+1.
+
+Os eventos do SQLAlchemy (registrados para todas as Engines) somam, no
+acumulador da requisição corrente, o número de consultas, o tempo gasto e
+quantas vezes cada formato de consulta foi executado. Um mesmo formato
+repetido mais de settings.query_repeat_threshold vezes numa requisição
+costuma ser um N+1 (ex.: relacionamento carregado item a item num loop).
+Os mesmos eventos alimentam o registro de consultas lentas (app.core.slow_queries).
+"""
+
+import re
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, List, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.core.config import settings
+from app.core.slow_queries import slow_query_log
+
+
+# Listas de parâmetros de tamanhos variados (IN (?, ?, ?)) viram um único formato
+_PARAM_LIST = re.compile(r"\(\s*(\?|%\([^)]+\)s|%s|:\w+)(\s*,\s*(\?|%\([^)]+\)s|%s|:\w+))+\s*\)")
+_NUMBER = re.compile(r"\b\d+\b")
+_SPACES = re.compile(r"\s+")
+
+
+def statement_shape(statement: str) -> str:
+    """Formato da consulta: sem literais numéricos, listas de parâmetros e espaços extras"""
+    shape = _PARAM_LIST.sub("(?)", statement)
+    shape = _NUMBER.sub("N", shape)
+    return _SPACES.sub(" ", shape).strip()
+
+
+class RequestDbStats:
+    """Acumulador das consultas executadas durante uma requisição (ou bloco monitorado)"""
+
+    __slots__ = ("queries", "seconds", "shapes")
+
+    def __init__(self):
+        self.queries = 0
+        self.seconds = 0.0
+        self.shapes: Counter = Counter()
+
+    def record(self, statement: str, elapsed: float) -> None:
+        self.queries += 1
+        self.seconds += elapsed
+        self.shapes[statement_shape(statement)] += 1
+
+    def repeated(self, threshold: int) -> List[Tuple[str, int]]:
+        """Formatos executados mais de threshold vezes, do mais repetido para o menos"""
+        return [(shape, count) for shape, count in self.shapes.most_common() if count > threshold]
+
+    def describe(self, limit: int = 10) -> str:
+        """Resumo legível das consultas mais frequentes"""
+        linhas = [f"{self.queries} consultas em {self.seconds * 1000:.1f} ms"]
+        for shape, count in self.shapes.most_common(limit):
+            linhas.append(f"  {count:>4}x {shape[:200]}")
+        return "\n".join(linhas)
+
+
+# Objeto mutável: consultas feitas no threadpool (endpoints síncronos) somam no mesmo acumulador
+current_db_stats: ContextVar[Optional[RequestDbStats]] = ContextVar("current_db_stats", default=None)
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info["query_start"] = time.perf_counter()
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_start"]
+    stats = current_db_stats.get()
+    if stats is not None:
+        stats.record(statement, elapsed)
+    if slow_query_log.enabled:
+        slow_query_log.observe(conn, statement, parameters, elapsed, executemany)
+
+
+def report_n_plus_one(stats: RequestDbStats, origem: str, threshold: Optional[int] = None) -> List[Tuple[str, int]]:
+    """Registra no log os formatos de consulta repetidos além do limite"""
+    threshold = settings.query_repeat_threshold if threshold is None else threshold
+    repetidos = stats.repeated(threshold)
+    for shape, count in repetidos:
+        print(f"[N+1] {origem}: mesma consulta executada {count}x: {shape[:300]}")
+    return repetidos
+
+
+def db_stats_headers(stats: RequestDbStats) -> List[Tuple[bytes, bytes]]:
+    """Cabeçalhos X-DB-Queries / X-DB-Time (ms) com o total da requisição"""
+    return [
+        (b"x-db-queries", str(stats.queries).encode()),
+        (b"x-db-time", f"{stats.seconds * 1000:.2f}".encode()),
+    ]
+
+
+@contextmanager
+def track_queries(engine: Optional[Engine] = None) -> Iterator[RequestDbStats]:
+    """
+    Conta as consultas executadas dentro do bloco.
+
+    Com engine, o contador escuta diretamente a Engine (inclui consultas feitas
+    em outras threads, como as do TestClient); sem engine, usa o acumulador do
+    contexto corrente.
+    """
+    stats = RequestDbStats()
+
+    if engine is None:
+        token = current_db_stats.set(stats)
+        try:
+            yield stats
+        finally:
+            current_db_stats.reset(token)
+        return
+
+    def before(conn, cursor, statement, parameters, context, executemany):
+        conn.info["track_start"] = time.perf_counter()
+
+    def after(conn, cursor, statement, parameters, context, executemany):
+        stats.record(statement, time.perf_counter() - conn.info["track_start"])
+
+    event.listen(engine, "before_cursor_execute", before)
+    event.listen(engine, "after_cursor_execute", after)
+    try:
+        yield stats
+    finally:
+        event.remove(engine, "before_cursor_execute", before)
+        event.remove(engine, "after_cursor_execute", after)
@@ -0,0 +1,38 @@
+"""
+Resposta JSON padrão da API, serializada com orjson.
+
+Usada como default_response_class da aplicação. Endpoints com payloads grandes
+podem retornar ORJSONResponse(conteudo) diretamente: assim o conteúdo (já
+composto de tipos simples) não passa pelo jsonable_encoder do FastAPI.
+"""
+
+from decimal import Decimal
+from typing import Any
+
+import orjson
+from fastapi.responses import JSONResponse
+
+
+ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+
+def _default(valor: Any) -> Any:
+    """Tipos que o orjson não serializa nativamente"""
+    if isinstance(valor, Decimal):
+        return float(valor)
+    if isinstance(valor, (set, frozenset)):
+        return list(valor)
+    if hasattr(valor, "model_dump"):
+        return valor.model_dump(mode="json")
+    raise TypeError(f"Tipo não serializável em JSON: {type(valor).__name__}")
+
+
+def dumps(conteudo: Any) -> bytes:
+    return orjson.dumps(conteudo, default=_default, option=ORJSON_OPTIONS)
+
+
+class ORJSONResponse(JSONResponse):
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
@@ -0,0 +1,196 @@
+"""
+Registro de consultas lentas com captura do plano de execução.
+
+Com settings.slow_query_log ativo, toda consulta acima de
+settings.slow_query_threshold_ms é registrada (log + buffer circular em
+memória) com os parâmetros, a rota que a executou e o plano capturado em
+segundo plano:
+
+- PostgreSQL: EXPLAIN (ANALYZE, BUFFERS), somente para SELECT, numa transação
+  desfeita ao final e com statement_timeout;
+- SQLite: EXPLAIN QUERY PLAN.
+
+O EXPLAIN roda numa thread própria, com uma fila limitada, e nunca atrasa a
+requisição. O buffer pode ser consultado pelos administradores em
+/api/v1/admin/slow-queries.
+"""
+
+import threading
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from contextvars import ContextVar
+from datetime import datetime
+from itertools import count
+from typing import Any, Dict, List, Optional
+
+from app.core.config import settings
+
+
+# Opção de execução que impede o registro (usada na própria conexão do EXPLAIN)
+SKIP_OPTION = "slow_query_log"
+
+# EXPLAINs aguardando execução; acima disso o plano é descartado
+MAX_PENDING_EXPLAINS = 8
+
+MAX_STATEMENT_CHARS = 10000
+MAX_PARAMETER_CHARS = 200
+
+# Escopo ASGI da requisição corrente (preenchido pelo MetricsMiddleware)
+current_request_scope: ContextVar[Optional[dict]] = ContextVar("current_request_scope", default=None)
+
+
+def _current_route() -> Optional[str]:
+    scope = current_request_scope.get()
+    if scope is None:
+        return None
+    route = getattr(scope.get("route"), "path", None) or scope.get("path")
+    return f"{scope.get('method')} {route}"
+
+
+def _safe_value(valor: Any) -> Any:
+    if valor is None or isinstance(valor, (bool, int, float)):
+        return valor
+    texto = valor.hex() if isinstance(valor, (bytes, bytearray, memoryview)) else str(valor)
+    return texto if len(texto) <= MAX_PARAMETER_CHARS else texto[:MAX_PARAMETER_CHARS] + "..."
+
+
+def _safe_parameters(parameters: Any) -> Any:
+    """Parâmetros em formato serializável (valores longos truncados)"""
+    if isinstance(parameters, dict):
+        return {str(chave): _safe_value(valor) for chave, valor in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        return [_safe_value(valor) for valor in parameters]
+    return _safe_value(parameters)
+
+
+def _explainable(statement: str) -> bool:
+    return statement.lstrip().lower().startswith("select")
+
+
+class SlowQueryLog:
+    """Buffer circular de consultas lentas e captura assíncrona dos planos"""
+
+    def __init__(self, enabled: bool, threshold_ms: float, size: int, explain_timeout_ms: int):
+        self.enabled = enabled
+        self.threshold_ms = threshold_ms
+        self.explain_timeout_ms = explain_timeout_ms
+        self._entries: deque = deque(maxlen=size)
+        self._ids = count(1)
+        self._lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._pending: List[Future] = []
+
+    # === REGISTRO ===
+
+    def observe(self, conn, statement: str, parameters: Any, elapsed: float, executemany: bool) -> None:
+        """Chamado após cada consulta (app.core.query_stats); registra se passar do limite"""
+        duration_ms = elapsed * 1000
+        if duration_ms < self.threshold_ms or not conn.get_execution_options().get(SKIP_OPTION, True):
+            return
+
+        entry = {
+            "id": next(self._ids),
+            "timestamp": datetime.now().isoformat(),
+            "route": _current_route(),
+            "duration_ms": round(duration_ms, 2),
+            "statement": statement[:MAX_STATEMENT_CHARS],
+            "parameters": _safe_parameters(parameters[0] if executemany and parameters else parameters),
+            "executemany": executemany,
+            "plan": None,
+            "plan_status": "pendente",
+        }
+        with self._lock:
+            self._entries.append(entry)
+
+        print(
+            f"[SLOW QUERY] {entry['route'] or '-'} {entry['duration_ms']:.0f} ms: "
+            f"{statement[:300]} | parâmetros: {str(entry['parameters'])[:300]}"
+        )
+
+        if self.explain_timeout_ms <= 0:
+            entry["plan_status"] = "desativado"
+        elif executemany or not _explainable(statement):
+            entry["plan_status"] = "ignorado"
+        else:
+            self._submit_explain(conn.engine, entry, parameters)
+
+    def _submit_explain(self, engine, entry: Dict[str, Any], parameters: Any) -> None:
+        with self._lock:
+            self._pending = [future for future in self._pending if not future.done()]
+            if len(self._pending) >= MAX_PENDING_EXPLAINS:
+                entry["plan_status"] = "descartado"
+                return
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="slow-query-explain")
+            self._pending.append(self._executor.submit(self._explain, engine, entry, parameters))
+
+    def _explain(self, engine, entry: Dict[str, Any], parameters: Any) -> None:
+        try:
+            with engine.connect().execution_options(**{SKIP_OPTION: False}) as conn:
+                with conn.begin() as transaction:
+                    if engine.dialect.name == "postgresql":
+                        conn.exec_driver_sql(f"SET LOCAL statement_timeout = {int(self.explain_timeout_ms)}")
+                        linhas = conn.exec_driver_sql(
+                            "EXPLAIN (ANALYZE, BUFFERS) " + entry["statement"], parameters or ()
+                        ).fetchall()
+                        plano = "\n".join(linha[0] for linha in linhas)
+                    elif engine.dialect.name == "sqlite":
+                        linhas = conn.exec_driver_sql(
+                            "EXPLAIN QUERY PLAN " + entry["statement"], parameters or ()
+                        ).fetchall()
+                        plano = "\n".join(linha[-1] for linha in linhas)
+                    else:
+                        entry["plan_status"] = "ignorado"
+                        return
+                    # ANALYZE executa a consulta: nada do que ela fizer é mantido
+                    transaction.rollback()
+            entry["plan"] = plano
+            entry["plan_status"] = "ok"
+        except Exception as e:
+            entry["plan"] = str(e).splitlines()[0] if str(e) else type(e).__name__
+            entry["plan_status"] = "erro"
+
+    # === CONSULTA ===
+
+    def entries(self, route: Optional[str] = None, min_ms: float = 0, limit: int = 50) -> List[Dict[str, Any]]:
+        """Registros mais recentes primeiro"""
+        with self._lock:
+            registros = list(reversed(self._entries))
+        if route:
+            registros = [r for r in registros if r["route"] and route in r["route"]]
+        registros = [r for r in registros if r["duration_ms"] >= min_ms]
+        return [dict(r) for r in registros[:limit]]
+
+    def get(self, entry_id: int) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            for entry in self._entries:
+                if entry["id"] == entry_id:
+                    return dict(entry)
+        return None
+
+    def clear(self) -> int:
+        with self._lock:
+            removidos = len(self._entries)
+            self._entries.clear()
+        return removidos
+
+    def flush(self, timeout: Optional[float] = None) -> None:
+        """Aguarda os EXPLAINs pendentes"""
+        with self._lock:
+            pendentes = list(self._pending)
+        wait(pendentes, timeout=timeout)
+
+    def shutdown(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+            self._pending = []
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+slow_query_log = SlowQueryLog(
+    enabled=settings.slow_query_log,
+    threshold_ms=settings.slow_query_threshold_ms,
+    size=settings.slow_query_buffer_size,
+    explain_timeout_ms=settings.slow_query_explain_timeout_ms,
+)
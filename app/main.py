@@ -1,12 +1,22 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
 from app.core.config import settings
+from app.core.responses import ORJSONResponse
 from app.api import api_router
+from app.core.database import SessionLocal, engine
+from app.core.events import change_bus
+from app.core.metrics import MetricsMiddleware, render_metrics, METRICS_CONTENT_TYPE
+from app.core.slow_queries import slow_query_log
+from app.core.auth import shutdown_password_hash_pool
+from app.services.render_pool import shutdown_render_pool
+from app.services.n8n_client import close_n8n_client
+from app.services.nf_partition_service import NotaFiscalPartitionService
 
 app = FastAPI(
     title="GMX - Módulo de Custos de Obras",
     description="Sistema de gestão de custos de construção para GMX",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=ORJSONResponse
 )
 
 # FRONTEND ORIGINS
@@ -24,9 +34,43 @@ app.add_middleware(
     expose_headers=["*"],
 )
 
+# Latência, tamanho da resposta e tempo de banco por rota (exportados em /metrics)
+app.add_middleware(MetricsMiddleware)
+
 app.include_router(api_router, prefix="/api/v1")
 
 
+@app.on_event("startup")
+def ensure_nf_partitions():
+    # Partições dos próximos meses (somente se notas_fiscais estiver particionada)
+    db = SessionLocal()
+    try:
+        NotaFiscalPartitionService(db).ensure_future_partitions()
+    except Exception as e:
+        print(f"Não foi possível verificar as partições de notas_fiscais: {e}")
+    finally:
+        db.close()
+
+
+@app.on_event("startup")
+def start_change_bus():
+    # LISTEN das alterações publicadas por todos os processos (somente PostgreSQL)
+    change_bus.start(engine)
+
+
+@app.on_event("shutdown")
+def close_background_pools():
+    change_bus.stop()
+    shutdown_render_pool()
+    slow_query_log.shutdown()
+    shutdown_password_hash_pool()
+
+
+@app.on_event("shutdown")
+async def close_n8n():
+    await close_n8n_client()
+
+
 @app.get("/")
 async def root():
     return {"message": "GMX - Módulo de Custos de Obras API"}
@@ -35,3 +79,8 @@ async def root():
 @app.get("/health")
 async def health_check():
     return {"status": "healthy"}
+
+
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    return Response(content=render_metrics(), media_type=METRICS_CONTENT_TYPE)
@@ -4,7 +4,7 @@ from .purchases import Supplier, PurchaseOrder, Invoice, Quotation
 from .cost_centers import CostCenter
 from .attachments import Attachment
 from .audit import AuditLog
-from .notas_fiscais import NotaFiscal, NotaFiscalItem, ProcessamentoLog
+from .notas_fiscais import NotaFiscal, NotaFiscalItem, ProcessamentoLog, NotaFiscalRollupMensal
 
 __all__ = [
     "User",
@@ -19,5 +19,6 @@ __all__ = [
     "AuditLog",
     "NotaFiscal",
     "NotaFiscalItem",
-    "ProcessamentoLog"
+    "ProcessamentoLog",
+    "NotaFiscalRollupMensal"
 ]
\ No newline at end of file
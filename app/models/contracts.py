@@ -53,7 +53,7 @@ class BudgetItem(Base):
     __tablename__ = "budget_items"
 
     id = Column(Integer, primary_key=True, index=True)
-    contract_id = Column(Integer, ForeignKey("contracts.id"), nullable=False)
+    contract_id = Column(Integer, ForeignKey("contracts.id"), nullable=False, index=True)
     codigo_item = Column(String, nullable=False)
     descricao = Column(Text, nullable=False)
     centro_custo = Column(String, nullable=False)
@@ -77,7 +77,7 @@ class ValorPrevisto(Base):
     __tablename__ = "valor_previsto"
 
     id = Column(Integer, primary_key=True, index=True)
-    contract_id = Column(Integer, ForeignKey("contracts.id"), nullable=False)
+    contract_id = Column(Integer, ForeignKey("contracts.id"), nullable=False, index=True)
 
     # Colunas específicas da sheet QQP_Cliente
     item = Column(String, nullable=False)  # Coluna 2: Código do item
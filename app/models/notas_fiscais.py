@@ -1,8 +1,8 @@
 """Modelos para Notas Fiscais processadas pelo n8n"""
 
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, Boolean, DECIMAL
+from sqlalchemy import Column, Integer, String, DateTime, Date, ForeignKey, Text, Boolean, DECIMAL, Index, DDL, event
 from sqlalchemy.orm import relationship
-from sqlalchemy.sql import func
+from sqlalchemy.sql import func, text
 from app.core.database import Base
 
 
@@ -61,6 +61,23 @@ class NotaFiscal(Base):
     )
     ordem_compra = relationship("PurchaseOrder", foreign_keys=[ordem_compra_id])
 
+    __table_args__ = (
+        Index("ix_notas_fiscais_contrato_status", "contrato_id", "status_processamento"),
+        Index("ix_notas_fiscais_status_data", "status_processamento", "data_emissao"),
+        # Chaves naturais do upsert em lote (POST /nf/bulk); com o particionamento
+        # opcional a migração a1d5e7c3f9b2 acrescenta data_emissao aos dois índices
+        Index(
+            "uq_notas_fiscais_chave_acesso", "chave_acesso", unique=True,
+            postgresql_where=text("chave_acesso IS NOT NULL"),
+            sqlite_where=text("chave_acesso IS NOT NULL")
+        ),
+        Index(
+            "uq_notas_fiscais_numero_serie_cnpj", "numero", "serie", "cnpj_fornecedor", unique=True,
+            postgresql_where=text("chave_acesso IS NULL"),
+            sqlite_where=text("chave_acesso IS NULL")
+        ),
+    )
+
     def __repr__(self):
         return f"<NotaFiscal(numero={self.numero}, fornecedor={self.nome_fornecedor})>"
 
@@ -80,6 +97,10 @@ class NotaFiscalItem(Base):
     codigo_produto = Column(String(60), nullable=True)
     descricao = Column(Text, nullable=False)
     ncm = Column(String(10), nullable=True)
+    # Busca textual: coluna gerada "busca" (tsvector) no PostgreSQL / nf_itens_fts no SQLite
+    # (NF_ITENS_FTS_SQLITE_DDL), mantidas pelo banco e não mapeadas aqui (ver NotaFiscalItemSearchService)
+    # Com o particionamento opcional (f2c8d4a6b9e3) há também "data_emissao_nf", preenchida
+    # pelo banco a partir da NF e igualmente não mapeada (ver NotaFiscalPartitionService)
 
     # Quantidades e medidas
     quantidade = Column(DECIMAL(15, 4), nullable=False)
@@ -111,10 +132,59 @@ class NotaFiscalItem(Base):
     nota_fiscal = relationship("NotaFiscal", back_populates="itens")
     centro_custo = relationship("CostCenter", foreign_keys=[centro_custo_id])
 
+    __table_args__ = (
+        # Cobre as somas por centro de custo sem visitar a tabela (PostgreSQL)
+        Index(
+            "ix_nf_itens_centro_custo_nota", "centro_custo_id", "nota_id",
+            postgresql_include=["valor_total"]
+        ),
+    )
+
     def __repr__(self):
         return f"<NotaFiscalItem(descricao={self.descricao[:50]}, valor={self.valor_total})>"
 
 
+# Índice FTS5 de nf_itens no SQLite (conteúdo externo, mantido por triggers).
+# Criado junto com a tabela (create_all); a migração d9b3c6e2f4a8 mantém a própria cópia
+# desta definição, então alterações aqui exigem uma nova migração
+NF_ITENS_FTS_SQLITE_DDL = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS nf_itens_fts USING fts5(
+        descricao, codigo_produto, ncm,
+        content='nf_itens', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS nf_itens_fts_ai AFTER INSERT ON nf_itens BEGIN
+        INSERT INTO nf_itens_fts(rowid, descricao, codigo_produto, ncm)
+        VALUES (new.id, new.descricao, new.codigo_produto, new.ncm);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS nf_itens_fts_ad AFTER DELETE ON nf_itens BEGIN
+        INSERT INTO nf_itens_fts(nf_itens_fts, rowid, descricao, codigo_produto, ncm)
+        VALUES ('delete', old.id, old.descricao, old.codigo_produto, old.ncm);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS nf_itens_fts_au AFTER UPDATE OF descricao, codigo_produto, ncm ON nf_itens BEGIN
+        INSERT INTO nf_itens_fts(nf_itens_fts, rowid, descricao, codigo_produto, ncm)
+        VALUES ('delete', old.id, old.descricao, old.codigo_produto, old.ncm);
+        INSERT INTO nf_itens_fts(rowid, descricao, codigo_produto, ncm)
+        VALUES (new.id, new.descricao, new.codigo_produto, new.ncm);
+    END
+    """,
+]
+
+for _ddl in NF_ITENS_FTS_SQLITE_DDL:
+    event.listen(NotaFiscalItem.__table__, "after_create", DDL(_ddl).execute_if(dialect="sqlite"))
+event.listen(
+    NotaFiscalItem.__table__, "before_drop",
+    DDL("DROP TABLE IF EXISTS nf_itens_fts").execute_if(dialect="sqlite")
+)
+
+
 class ProcessamentoLog(Base):
     """
     Log de processamentos do n8n para auditoria
@@ -135,4 +205,43 @@ class ProcessamentoLog(Base):
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
     def __repr__(self):
-        return f"<ProcessamentoLog(pasta={self.pasta_nome}, status={self.status})>"
\ No newline at end of file
+        return f"<ProcessamentoLog(pasta={self.pasta_nome}, status={self.status})>"
+
+
+class NotaFiscalRollupMensal(Base):
+    """
+    Agregado mensal das notas fiscais por contrato, fornecedor, centro de custo e status
+    Mantido incrementalmente pelo NotaFiscalRollupService e lido pelos gráficos de séries temporais
+
+    As medidas de cabeçalho (quantidade_nfs, valor_total) ficam na linha com centro_custo_id nulo;
+    as medidas de itens (quantidade_itens, valor_itens) ficam na linha do centro de custo do item.
+    """
+    __tablename__ = "nf_monthly_rollup"
+
+    id = Column(Integer, primary_key=True, index=True)
+
+    # Chave do agregado
+    mes = Column(Date, nullable=False)  # Primeiro dia do mês de emissão
+    contrato_id = Column(Integer, ForeignKey("contracts.id"), nullable=True)
+    cnpj_fornecedor = Column(String(18), nullable=False)
+    centro_custo_id = Column(Integer, ForeignKey("cost_centers.id"), nullable=True)
+    status_processamento = Column(String(50), nullable=False)
+
+    # Atributos descritivos
+    nome_fornecedor = Column(String(255), nullable=True)
+
+    # Medidas
+    quantidade_nfs = Column(Integer, nullable=False, default=0)
+    valor_total = Column(DECIMAL(15, 2), nullable=False, default=0)
+    quantidade_itens = Column(Integer, nullable=False, default=0)
+    valor_itens = Column(DECIMAL(15, 2), nullable=False, default=0)
+
+    atualizado_em = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+    __table_args__ = (
+        Index("ix_nf_monthly_rollup_grupo", "mes", "contrato_id", "cnpj_fornecedor"),
+        Index("ix_nf_monthly_rollup_mes_status", "mes", "status_processamento"),
+    )
+
+    def __repr__(self):
+        return f"<NotaFiscalRollupMensal(mes={self.mes}, fornecedor={self.cnpj_fornecedor}, valor={self.valor_total})>"
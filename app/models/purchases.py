@@ -25,7 +25,7 @@ class PurchaseOrder(Base):
     __tablename__ = "purchase_orders"
 
     id = Column(Integer, primary_key=True, index=True)
-    contract_id = Column(Integer, ForeignKey("contracts.id"), nullable=False)
+    contract_id = Column(Integer, ForeignKey("contracts.id"), nullable=False, index=True)
     numero_oc = Column(String, unique=True, index=True, nullable=False)
     supplier_id = Column(Integer, ForeignKey("suppliers.id"), nullable=False)
     valor_total = Column(Numeric(15, 2), nullable=False)
@@ -95,8 +95,8 @@ class Invoice(Base):
     __tablename__ = "invoices"
 
     id = Column(Integer, primary_key=True, index=True)
-    contract_id = Column(Integer, ForeignKey("contracts.id"), nullable=True)  # Novo: vinculação direta ao contrato
-    purchase_order_id = Column(Integer, ForeignKey("purchase_orders.id"), nullable=True)  # Agora opcional
+    contract_id = Column(Integer, ForeignKey("contracts.id"), nullable=True, index=True)  # Novo: vinculação direta ao contrato
+    purchase_order_id = Column(Integer, ForeignKey("purchase_orders.id"), nullable=True, index=True)  # Agora opcional
     numero_nf = Column(String, nullable=False, index=True)
     fornecedor = Column(String, nullable=True)  # Novo: nome do fornecedor
     valor_total = Column(Numeric(15, 2), nullable=False)
@@ -117,7 +117,7 @@ class InvoiceItem(Base):
     __tablename__ = "invoice_items"
 
     id = Column(Integer, primary_key=True, index=True)
-    invoice_id = Column(Integer, ForeignKey("invoices.id"), nullable=False)
+    invoice_id = Column(Integer, ForeignKey("invoices.id"), nullable=False, index=True)
     descricao = Column(Text, nullable=False)
     centro_custo = Column(String, nullable=False)
     unidade = Column(String)
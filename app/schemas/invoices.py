@@ -1,5 +1,6 @@
 from pydantic import BaseModel, validator, ConfigDict
 from typing import List, Optional
+from enum import Enum
 from decimal import Decimal
 from datetime import datetime
 
@@ -115,4 +116,30 @@ class InvoiceProcessingError(BaseSchema):
 class InvoicesSummary(BaseSchema):
     total_invoices: int
     total_value: float
-    recent_invoices: List[InvoiceResponse]
\ No newline at end of file
+    recent_invoices: List[InvoiceResponse]
+
+
+class InvoiceJobStatus(str, Enum):
+    PENDENTE = "pendente"
+    PROCESSANDO = "processando"
+    CONCLUIDO = "concluido"
+    CANCELADO = "cancelado"
+    ERRO = "erro"
+
+
+class InvoiceJobResponse(BaseSchema):
+    job_id: str
+    source: str
+    status: InvoiceJobStatus
+    contract_id: int
+    total_files: Optional[int] = None
+    processed_count: int = 0
+    failed_count: int = 0
+    current_file: Optional[str] = None
+    invoice_ids: List[int] = []
+    errors: List[str] = []
+    error: Optional[str] = None
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    stream_url: str
\ No newline at end of file
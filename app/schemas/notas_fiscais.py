@@ -1,6 +1,6 @@
 """Schemas Pydantic para Notas Fiscais"""
 
-from pydantic import BaseModel, Field, ConfigDict
+from pydantic import BaseModel, Field, ConfigDict, field_validator
 from typing import Optional, List
 from decimal import Decimal
 from datetime import datetime
@@ -67,6 +67,14 @@ class NotaFiscalBase(BaseModel):
     data_emissao: datetime = Field(..., description="Data de emissão da NF")
     data_entrada: Optional[datetime] = Field(None, description="Data de entrada")
 
+    @field_validator("chave_acesso", mode="before")
+    @classmethod
+    def chave_em_branco_como_nula(cls, valor):
+        # Chave em branco = NF sem chave (o índice único parcial cobre só chaves informadas)
+        if isinstance(valor, str) and not valor.strip():
+            return None
+        return valor
+
 
 class NotaFiscalCreate(NotaFiscalBase):
     """Schema para criação de nota fiscal"""
@@ -78,6 +86,17 @@ class NotaFiscalCreate(NotaFiscalBase):
     itens: Optional[List[NotaFiscalItemCreate]] = Field(default_factory=list)
 
 
+class NotaFiscalBulkRequest(BaseModel):
+    """Schema para gravação em lote de notas fiscais (n8n)"""
+    nfs: List[NotaFiscalCreate] = Field(..., min_length=1, max_length=2000, description="Notas fiscais com itens")
+
+
+class NotaFiscalBatchStatusRequest(BaseModel):
+    """Schema para validação/rejeição de notas fiscais em lote"""
+    nf_ids: List[int] = Field(..., min_length=1, max_length=10000, description="IDs das notas fiscais")
+    motivo: Optional[str] = Field(None, max_length=1000, description="Motivo (anexado às observações)")
+
+
 class NotaFiscalUpdate(BaseModel):
     """Schema para atualização de nota fiscal"""
     contrato_id: Optional[int] = None
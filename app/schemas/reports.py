@@ -17,6 +17,11 @@ class ReportFormat(str, Enum):
     JSON = "json"
 
 
+class ExportFormat(str, Enum):
+    CSV = "csv"
+    NDJSON = "ndjson"
+
+
 class ReportFilter(BaseModel):
     contract_id: Optional[int] = None
     cliente: Optional[str] = None
@@ -86,4 +91,22 @@ class ReportResponse(BaseModel):
     format: ReportFormat
     generated_at: datetime
     file_url: Optional[str] = None
-    data: Optional[Dict[str, Any]] = None
\ No newline at end of file
+    data: Optional[Dict[str, Any]] = None
+
+
+class ReportJobStatus(str, Enum):
+    PENDENTE = "pendente"
+    PROCESSANDO = "processando"
+    CONCLUIDO = "concluido"
+    ERRO = "erro"
+
+
+class ReportJobResponse(BaseModel):
+    job_id: str
+    status: ReportJobStatus
+    report_type: Optional[ReportType] = None
+    format: ReportFormat
+    created_at: datetime
+    finished_at: Optional[datetime] = None
+    file_url: Optional[str] = None
+    error: Optional[str] = None
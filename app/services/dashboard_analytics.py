@@ -0,0 +1,367 @@
+"""Motor analítico vetorizado para as métricas do dashboard executivo"""
+
+from __future__ import annotations
+
+from sqlalchemy.orm import Session
+from sqlalchemy import func
+from typing import List, Optional, Dict, Any, Iterable
+from decimal import Decimal
+from datetime import datetime
+
+from app.models.contracts import Contract, BudgetItem
+from app.models.cost_centers import CostCenter
+from app.models.notas_fiscais import NotaFiscalRollupMensal
+from app.schemas.dashboards import ChartData, CostCenterMetric, ContractProgress, DashboardFilters
+from app.core.lazy import lazy_import
+
+np = lazy_import("numpy")
+pd = lazy_import("pandas")
+
+
+SEM_CENTRO_CUSTO = "Outros"
+
+# Limiares de risco
+RISCO_CONSUMO_EXCEDIDO = 1.0  # realizado acima do valor do contrato
+RISCO_DESVIO_PRAZO = 0.2  # consumo 20 p.p. acima do prazo decorrido
+RISCO_CONSUMO_ALTO = 0.9
+
+
+def to_cents(values: Iterable[Any]) -> np.ndarray:
+    """Converte valores monetários (Decimal/None) em um array int64 de centavos"""
+    return np.fromiter(
+        (int((Decimal(v) * 100).to_integral_value()) if v is not None else 0 for v in values),
+        dtype=np.int64
+    )
+
+
+def from_cents(cents: Any) -> Decimal:
+    return Decimal(int(cents)) / 100
+
+
+def to_decimal(value: float) -> Decimal:
+    if not np.isfinite(value):
+        return Decimal('0')
+    return Decimal(str(round(float(value), 2)))
+
+
+class ExecutiveAnalytics:
+    """
+    Extração colunar única (contratos, orçamento e NFs validadas) e cálculo de
+    todas as métricas do dashboard executivo com operações vetorizadas.
+
+    Valores monetários são mantidos em centavos (int64) para evitar erros de
+    arredondamento; os totais de NFs vêm do agregado nf_monthly_rollup.
+    """
+
+    def __init__(self, contracts: pd.DataFrame, budget: pd.DataFrame, realized: pd.DataFrame, now: Optional[datetime] = None):
+        self.contracts = contracts
+        self.budget = budget
+        self.realized = realized
+        self.now = now or datetime.now()
+
+        # Totais por contrato alinhados ao índice de contratos
+        self.previsto = budget.groupby("contract_id")["previsto"].sum().reindex(contracts.index, fill_value=0).astype(np.int64)
+        self.realizado = realized.groupby("contract_id")["realizado"].sum().reindex(contracts.index, fill_value=0).astype(np.int64)
+
+    # === EXTRAÇÃO ===
+
+    @classmethod
+    def from_db(cls, db: Session, filters: DashboardFilters) -> "ExecutiveAnalytics":
+        contract_query = db.query(
+            Contract.id,
+            Contract.numero_contrato,
+            Contract.nome_projeto,
+            Contract.cliente,
+            Contract.valor_original,
+            Contract.meta_reducao_percentual,
+            Contract.status,
+            Contract.data_inicio,
+            Contract.data_fim_prevista
+        )
+        if filters.contract_ids:
+            contract_query = contract_query.filter(Contract.id.in_(filters.contract_ids))
+        if filters.cliente:
+            contract_query = contract_query.filter(Contract.cliente.ilike(f"%{filters.cliente}%"))
+
+        rows = contract_query.order_by(Contract.id).all()
+        contract_ids = [row[0] for row in rows]
+
+        contracts = pd.DataFrame({
+            "numero_contrato": [row[1] for row in rows],
+            "nome_projeto": [row[2] for row in rows],
+            "cliente": [row[3] for row in rows],
+            "valor_original": to_cents(row[4] for row in rows),
+            "meta": np.array([float(row[5] or 0) for row in rows], dtype=np.float64),
+            "status": [row[6] for row in rows],
+            "data_inicio": pd.to_datetime([row[7] for row in rows]),
+            "data_fim_prevista": pd.to_datetime([row[8] for row in rows]),
+        }, index=pd.Index(contract_ids, name="contract_id", dtype=np.int64))
+        # Datas com fuso não podem ser comparadas com datetime.now()
+        for column in ("data_inicio", "data_fim_prevista"):
+            if getattr(contracts[column].dt, "tz", None) is not None:
+                contracts[column] = contracts[column].dt.tz_localize(None)
+
+        # Orçamento previsto por contrato e centro de custo (agregado no banco)
+        budget_rows = []
+        realized_rows = []
+        if contract_ids:
+            budget_rows = db.query(
+                BudgetItem.contract_id,
+                BudgetItem.centro_custo,
+                func.sum(BudgetItem.valor_total_previsto)
+            ).filter(
+                BudgetItem.contract_id.in_(contract_ids)
+            ).group_by(BudgetItem.contract_id, BudgetItem.centro_custo).all()
+
+            # Realizado (NFs validadas) por contrato, mês e centro de custo
+            realized_query = db.query(
+                NotaFiscalRollupMensal.contrato_id,
+                NotaFiscalRollupMensal.mes,
+                CostCenter.nome,
+                func.sum(NotaFiscalRollupMensal.valor_total),
+                func.sum(NotaFiscalRollupMensal.valor_itens)
+            ).outerjoin(
+                CostCenter, CostCenter.id == NotaFiscalRollupMensal.centro_custo_id
+            ).filter(
+                NotaFiscalRollupMensal.contrato_id.in_(contract_ids),
+                NotaFiscalRollupMensal.status_processamento == 'validado'
+            )
+            if filters.data_inicio:
+                realized_query = realized_query.filter(NotaFiscalRollupMensal.mes >= filters.data_inicio.date().replace(day=1))
+            if filters.data_fim:
+                realized_query = realized_query.filter(NotaFiscalRollupMensal.mes <= filters.data_fim.date())
+
+            realized_rows = realized_query.group_by(
+                NotaFiscalRollupMensal.contrato_id,
+                NotaFiscalRollupMensal.mes,
+                CostCenter.nome
+            ).all()
+
+        budget = pd.DataFrame({
+            "contract_id": np.array([row[0] for row in budget_rows], dtype=np.int64),
+            "centro_custo": [row[1] or SEM_CENTRO_CUSTO for row in budget_rows],
+            "previsto": to_cents(row[2] for row in budget_rows),
+        })
+
+        # Linhas de cabeçalho (centro nulo) carregam o valor da NF; linhas de
+        # centro de custo carregam o valor dos itens classificados.
+        realized = pd.DataFrame({
+            "contract_id": np.array([row[0] for row in realized_rows], dtype=np.int64),
+            "mes": pd.to_datetime([row[1] for row in realized_rows]),
+            "centro_custo": [row[2] for row in realized_rows],
+            "realizado": to_cents(row[3] for row in realized_rows),
+            "itens": to_cents(row[4] for row in realized_rows),
+        })
+
+        return cls(contracts, budget, realized)
+
+    # === KPIs ===
+
+    def total_contracts_value(self) -> int:
+        return int(self.contracts["valor_original"].sum())
+
+    def total_realized(self) -> int:
+        return int(self.realizado.sum())
+
+    def overall_completion_percentage(self) -> Decimal:
+        total = self.total_contracts_value()
+        return to_decimal(self.total_realized() / total * 100) if total > 0 else Decimal('0')
+
+    def total_contract_balance(self) -> Decimal:
+        return from_cents(self.total_contracts_value() - self.total_realized())
+
+    def total_savings(self) -> Decimal:
+        return from_cents(int(self.previsto.sum() - self.realizado.sum()))
+
+    def overall_target_achievement(self) -> Decimal:
+        """Percentual médio da meta de redução atingida pelos contratos com meta e realizado"""
+        previsto = self.previsto.to_numpy(dtype=np.float64)
+        realizado = self.realizado.to_numpy(dtype=np.float64)
+        meta = self.contracts["meta"].to_numpy()
+
+        mask = (meta > 0) & (previsto > 0) & (realizado > 0)
+        if not mask.any():
+            return Decimal('0')
+
+        percentual_economia = (previsto[mask] - realizado[mask]) / previsto[mask] * 100
+        percentual_meta = percentual_economia / meta[mask] * 100
+        return to_decimal(percentual_meta.mean())
+
+    # === GRÁFICOS ===
+
+    def budget_vs_actual(self) -> ChartData:
+        return ChartData(
+            labels=self.contracts["nome_projeto"].tolist(),
+            datasets=[
+                {
+                    'label': 'Previsto',
+                    'data': (self.previsto.to_numpy() / 100).tolist(),
+                    'backgroundColor': '#36A2EB'
+                },
+                {
+                    'label': 'Realizado',
+                    'data': (self.realizado.to_numpy() / 100).tolist(),
+                    'backgroundColor': '#FF6384'
+                }
+            ]
+        )
+
+    def contracts_evolution(self) -> ChartData:
+        """Realizado mensal e percentual acumulado sobre o valor total dos contratos"""
+        headers = self.realized[self.realized["centro_custo"].isna()]
+        monthly = headers.groupby("mes")["realizado"].sum().sort_index()
+
+        total = self.total_contracts_value()
+        cumulative = monthly.cumsum().to_numpy(dtype=np.float64)
+        cumulative_pct = np.round(cumulative / total * 100, 2) if total > 0 else np.zeros(len(monthly))
+
+        return ChartData(
+            labels=[mes.strftime("%m/%Y") for mes in monthly.index],
+            datasets=[
+                {
+                    'label': 'Realizado no Mês',
+                    'data': (monthly.to_numpy() / 100).tolist(),
+                    'backgroundColor': '#36A2EB'
+                },
+                {
+                    'label': '% Realizado Acumulado',
+                    'data': cumulative_pct.tolist(),
+                    'borderColor': '#FF6384',
+                    'type': 'line'
+                }
+            ]
+        )
+
+    def _cost_center_frame(self) -> pd.DataFrame:
+        previsto = self.budget.groupby("centro_custo")["previsto"].sum()
+        items = self.realized.dropna(subset=["centro_custo"])
+        realizado = items.groupby("centro_custo")["itens"].sum()
+
+        frame = pd.concat([previsto.rename("previsto"), realizado.rename("realizado")], axis=1).fillna(0).astype(np.int64)
+        frame["economia"] = frame["previsto"] - frame["realizado"]
+        previsto_float = frame["previsto"].to_numpy(dtype=np.float64)
+        frame["percentual_economia"] = np.divide(
+            frame["economia"].to_numpy(dtype=np.float64) * 100,
+            previsto_float,
+            out=np.zeros(len(frame)),
+            where=previsto_float > 0
+        )
+        return frame.sort_values("economia", ascending=False)
+
+    def savings_distribution(self) -> ChartData:
+        frame = self._cost_center_frame()
+        frame = frame[frame["economia"] > 0]
+        return ChartData(
+            labels=frame.index.tolist(),
+            datasets=[{
+                'label': 'Economia por Centro de Custo',
+                'data': (frame["economia"].to_numpy() / 100).tolist(),
+                'backgroundColor': ['#FF6384', '#36A2EB', '#FFCE56', '#4BC0C0', '#9966FF']
+            }]
+        )
+
+    # === MÉTRICAS DETALHADAS ===
+
+    def cost_centers_performance(self) -> List[CostCenterMetric]:
+        frame = self._cost_center_frame()
+        return [
+            CostCenterMetric(
+                centro_custo=centro,
+                valor_previsto=from_cents(previsto),
+                valor_realizado=from_cents(realizado),
+                economia=from_cents(economia),
+                percentual_economia=to_decimal(percentual)
+            )
+            for centro, previsto, realizado, economia, percentual in zip(
+                frame.index,
+                frame["previsto"].to_numpy(),
+                frame["realizado"].to_numpy(),
+                frame["economia"].to_numpy(),
+                frame["percentual_economia"].to_numpy()
+            )
+        ]
+
+    def _consumption(self) -> np.ndarray:
+        valor = self.contracts["valor_original"].to_numpy(dtype=np.float64)
+        return np.divide(self.realizado.to_numpy(dtype=np.float64), valor, out=np.zeros(len(valor)), where=valor > 0)
+
+    def _elapsed(self) -> np.ndarray:
+        """Fração do prazo decorrido (NaN quando o contrato não tem data prevista de fim)"""
+        inicio = self.contracts["data_inicio"].to_numpy(dtype="datetime64[ns]")
+        fim = self.contracts["data_fim_prevista"].to_numpy(dtype="datetime64[ns]")
+        now = np.datetime64(self.now, "ns")
+
+        duracao = (fim - inicio).astype("timedelta64[s]").astype(np.float64)
+        decorrido = (now - inicio).astype("timedelta64[s]").astype(np.float64)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            elapsed = np.where(duracao > 0, decorrido / duracao, np.nan)
+        return np.clip(elapsed, 0, None)
+
+    def contracts_progress(self) -> List[ContractProgress]:
+        consumo = self._consumption() * 100
+        previsto = self.previsto.to_numpy(dtype=np.float64)
+        realizado = self.realizado.to_numpy(dtype=np.float64)
+        meta = self.contracts["meta"].to_numpy()
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            percentual_economia = np.where(previsto > 0, (previsto - realizado) / previsto * 100, 0)
+            percentual_meta = np.where(meta > 0, percentual_economia / meta * 100, 0)
+
+        return [
+            ContractProgress(
+                contract_id=int(contract_id),
+                numero_contrato=numero,
+                nome_projeto=nome,
+                percentual_realizado=to_decimal(pct_realizado),
+                percentual_meta=to_decimal(pct_meta),
+                status=status or "Em Andamento"
+            )
+            for contract_id, numero, nome, status, pct_realizado, pct_meta in zip(
+                self.contracts.index,
+                self.contracts["numero_contrato"],
+                self.contracts["nome_projeto"],
+                self.contracts["status"],
+                consumo,
+                percentual_meta
+            )
+        ]
+
+    def at_risk_contracts(self) -> List[Dict[str, Any]]:
+        """Contratos com orçamento excedido, consumo acima do prazo ou vencidos"""
+        consumo = self._consumption()
+        elapsed = self._elapsed()
+        ativo = (self.contracts["status"].fillna("Em Andamento") != "Concluído").to_numpy()
+
+        excedido = consumo > RISCO_CONSUMO_EXCEDIDO
+        adiantado = ~np.isnan(elapsed) & (consumo - np.nan_to_num(elapsed) > RISCO_DESVIO_PRAZO)
+        vencido = ~np.isnan(elapsed) & (elapsed > 1) & ativo
+        alto = consumo > RISCO_CONSUMO_ALTO
+
+        risco = ativo & (excedido | adiantado | vencido | alto)
+
+        result = []
+        for pos in np.flatnonzero(risco):
+            motivos = []
+            if excedido[pos]:
+                motivos.append("Orçamento excedido")
+            elif alto[pos]:
+                motivos.append("Consumo acima de 90% do orçamento")
+            if adiantado[pos]:
+                motivos.append("Consumo acima do prazo decorrido")
+            if vencido[pos]:
+                motivos.append("Prazo previsto encerrado")
+
+            result.append({
+                "contract_id": int(self.contracts.index[pos]),
+                "numero_contrato": self.contracts["numero_contrato"].iat[pos],
+                "nome_projeto": self.contracts["nome_projeto"].iat[pos],
+                "cliente": self.contracts["cliente"].iat[pos],
+                "percentual_realizado": round(float(consumo[pos] * 100), 2),
+                "percentual_prazo": None if np.isnan(elapsed[pos]) else round(float(elapsed[pos] * 100), 2),
+                "saldo": float(from_cents(self.contracts["valor_original"].iat[pos] - self.realizado.iat[pos])),
+                "severidade": "high" if excedido[pos] or vencido[pos] else "medium",
+                "motivos": motivos
+            })
+
+        result.sort(key=lambda item: item["percentual_realizado"], reverse=True)
+        return result
@@ -4,16 +4,25 @@ from typing import List, Optional, Dict, Any
 from decimal import Decimal
 from datetime import datetime, timedelta
 from app.models.contracts import Contract, BudgetItem
-from app.models.purchases import PurchaseOrder, Invoice, Supplier, Quotation
+from app.models.purchases import PurchaseOrder, Invoice, InvoiceItem, Supplier, Quotation
 from app.schemas.dashboards import (
     SuppliesDashboard, ExecutiveDashboard, KPICard, ChartData,
     SupplierMetric, CostCenterMetric, ContractProgress, DashboardFilters
 )
+from app.services.dashboard_analytics import ExecutiveAnalytics
 
 
 class DashboardService:
     def __init__(self, db: Session):
         self.db = db
+        self._analytics_cache: Dict[str, ExecutiveAnalytics] = {}
+
+    def _analytics(self, filters: DashboardFilters) -> ExecutiveAnalytics:
+        # Uma única extração colunar por conjunto de filtros atende todo o dashboard executivo
+        key = filters.model_dump_json()
+        if key not in self._analytics_cache:
+            self._analytics_cache[key] = ExecutiveAnalytics.from_db(self.db, filters)
+        return self._analytics_cache[key]
 
     def get_supplies_dashboard(self, filters: DashboardFilters) -> SuppliesDashboard:
         # Base query with filters
@@ -92,7 +101,7 @@ class DashboardService:
     def get_executive_dashboard(self, filters: DashboardFilters) -> ExecutiveDashboard:
         # KPIs estratégicos
         percentual_realizado_total = self._calculate_overall_completion_percentage(filters)
-        economia_total = self._calculate_total_savings(filters)
+        economia_total = self._calculate_contracts_savings(filters)
         saldo_contratos_total = self._calculate_total_contract_balance(filters)
         meta_reducao_atingida = self._calculate_overall_target_achievement(filters)
 
@@ -174,25 +183,58 @@ class DashboardService:
     def _count_approved_suppliers(self) -> int:
         return self.db.query(Supplier).filter(Supplier.is_approved == True).count()
 
+    def _budget_by_contract(self):
+        # Previsto pré-agregado por contrato (uma linha por contrato)
+        return self.db.query(
+            BudgetItem.contract_id.label('contract_id'),
+            func.sum(BudgetItem.valor_total_previsto).label('previsto')
+        ).group_by(BudgetItem.contract_id).subquery()
+
+    @staticmethod
+    def _invoice_contract():
+        # Contrato da nota fiscal: vínculo direto (ingestão de ZIP/OneDrive) ou pela
+        # ordem de compra; usar com outerjoin de PurchaseOrder (_invoices_with_contract)
+        return func.coalesce(Invoice.contract_id, PurchaseOrder.contract_id)
+
+    @staticmethod
+    def _invoices_with_contract(query):
+        return query.outerjoin(PurchaseOrder, Invoice.purchase_order_id == PurchaseOrder.id)
+
+    def _invoices_by_contract(self, filters: DashboardFilters):
+        # Realizado pré-agregado por contrato (notas fiscais vinculadas a um contrato)
+        contrato = self._invoice_contract()
+        query = self._invoices_with_contract(self.db.query(
+            contrato.label('contract_id'),
+            func.sum(Invoice.valor_total).label('realizado')
+        ).select_from(Invoice)).filter(contrato.isnot(None))
+
+        for condition in self._build_date_filter(filters):
+            query = query.filter(condition)
+
+        return query.group_by(contrato).subquery()
+
     def _calculate_total_savings(self, filters: DashboardFilters) -> Decimal:
         # Calcula economia como diferença entre previsto e realizado
+        previsto = self._budget_by_contract()
+        realizado = self._invoices_by_contract(filters)
+
         query = self.db.query(
-            func.sum(BudgetItem.valor_total_previsto).label('previsto'),
-            func.sum(Invoice.valor_total).label('realizado')
-        ).select_from(Contract).join(BudgetItem).join(PurchaseOrder).join(Invoice)
-        
+            func.sum(previsto.c.previsto).label('previsto'),
+            func.sum(realizado.c.realizado).label('realizado')
+        ).select_from(Contract).outerjoin(
+            previsto, previsto.c.contract_id == Contract.id
+        ).outerjoin(
+            realizado, realizado.c.contract_id == Contract.id
+        )
+
         if filters.contract_ids:
             query = query.filter(Contract.id.in_(filters.contract_ids))
-        
-        date_filters = self._build_date_filter(filters)
-        for condition in date_filters:
-            query = query.filter(condition)
-        
+
         result = query.first()
-        previsto = result.previsto or Decimal('0')
-        realizado = result.realizado or Decimal('0')
-        
-        return previsto - realizado
+        previsto_total = result.previsto or Decimal('0')
+        realizado_total = result.realizado or Decimal('0')
+
+        return previsto_total - realizado_total
 
     def _calculate_total_budget(self, filters: DashboardFilters) -> Decimal:
         query = self.db.query(func.sum(BudgetItem.valor_total_previsto))
@@ -203,26 +245,47 @@ class DashboardService:
         return query.scalar() or Decimal('0')
 
     def _get_spending_by_cost_center(self, filters: DashboardFilters) -> ChartData:
-        query = self.db.query(
-            Invoice.valor_total,
-            func.coalesce(BudgetItem.centro_custo, 'Outros').label('centro_custo')
-        ).select_from(Invoice).join(PurchaseOrder).outerjoin(
-            BudgetItem, PurchaseOrder.id == BudgetItem.contract_id
+        centro_custo = func.coalesce(InvoiceItem.centro_custo, 'Outros')
+        contrato = self._invoice_contract()
+
+        # Itens das notas fiscais agrupados por centro de custo no banco; mesmas
+        # notas do realizado (_invoices_by_contract): as vinculadas a um contrato
+        query = self._invoices_with_contract(self.db.query(
+            centro_custo.label('centro_custo'),
+            func.sum(InvoiceItem.valor_total).label('total')
+        ).select_from(InvoiceItem).join(
+            Invoice, InvoiceItem.invoice_id == Invoice.id
+        )).filter(contrato.isnot(None))
+
+        # Notas fiscais sem itens entram integralmente em "Outros"
+        without_items = self._invoices_with_contract(self.db.query(
+            func.sum(Invoice.valor_total)
+        ).select_from(Invoice)).filter(
+            contrato.isnot(None),
+            ~self.db.query(InvoiceItem.id).filter(InvoiceItem.invoice_id == Invoice.id).exists()
         )
-        
-        date_filters = self._build_date_filter(filters)
-        for condition in date_filters:
+
+        if filters.contract_ids:
+            query = query.filter(contrato.in_(filters.contract_ids))
+            without_items = without_items.filter(contrato.in_(filters.contract_ids))
+
+        if filters.centro_custo:
+            query = query.filter(InvoiceItem.centro_custo == filters.centro_custo)
+
+        for condition in self._build_date_filter(filters):
             query = query.filter(condition)
-        
-        # Group by cost center
-        results = query.all()
-        cost_centers = {}
-        
-        for valor, centro_custo in results:
-            if centro_custo not in cost_centers:
-                cost_centers[centro_custo] = Decimal('0')
-            cost_centers[centro_custo] += valor
-        
+            without_items = without_items.filter(condition)
+
+        cost_centers = {
+            centro: Decimal(total or 0)
+            for centro, total in query.group_by(centro_custo).order_by(desc('total')).all()
+        }
+
+        if not filters.centro_custo:
+            outros = without_items.scalar()
+            if outros:
+                cost_centers['Outros'] = cost_centers.get('Outros', Decimal('0')) + outros
+
         return ChartData(
             labels=list(cost_centers.keys()),
             datasets=[{
@@ -286,81 +349,34 @@ class DashboardService:
         )
 
     def _calculate_overall_completion_percentage(self, filters: DashboardFilters) -> Decimal:
-        query = self.db.query(
-            func.sum(Contract.valor_original).label('total_contratos'),
-            func.sum(Invoice.valor_total).label('total_realizado')
-        ).select_from(Contract).outerjoin(PurchaseOrder).outerjoin(Invoice)
-        
-        if filters.contract_ids:
-            query = query.filter(Contract.id.in_(filters.contract_ids))
-        
-        result = query.first()
-        total_contratos = result.total_contratos or Decimal('0')
-        total_realizado = result.total_realizado or Decimal('0')
-        
-        return (total_realizado / total_contratos * 100) if total_contratos > 0 else Decimal('0')
+        # Realizado (NFs validadas) sobre o valor total dos contratos
+        return self._analytics(filters).overall_completion_percentage()
 
     def _calculate_total_contract_balance(self, filters: DashboardFilters) -> Decimal:
-        query = self.db.query(
-            func.sum(Contract.valor_original).label('total_contratos'),
-            func.sum(Invoice.valor_total).label('total_realizado')
-        ).select_from(Contract).outerjoin(PurchaseOrder).outerjoin(Invoice)
-        
-        if filters.contract_ids:
-            query = query.filter(Contract.id.in_(filters.contract_ids))
-        
-        result = query.first()
-        total_contratos = result.total_contratos or Decimal('0')
-        total_realizado = result.total_realizado or Decimal('0')
-        
-        return total_contratos - total_realizado
+        return self._analytics(filters).total_contract_balance()
+
+    def _calculate_contracts_savings(self, filters: DashboardFilters) -> Decimal:
+        # Orçamento previsto menos realizado, na mesma base dos gráficos do dashboard executivo
+        return self._analytics(filters).total_savings()
 
     def _calculate_overall_target_achievement(self, filters: DashboardFilters) -> Decimal:
         # Calcular o percentual médio de meta atingida
-        query = self.db.query(
-            Contract.meta_reducao_percentual,
-            func.sum(BudgetItem.valor_total_previsto).label('previsto'),
-            func.sum(Invoice.valor_total).label('realizado')
-        ).select_from(Contract).join(BudgetItem).join(PurchaseOrder).join(Invoice).group_by(
-            Contract.id, Contract.meta_reducao_percentual
-        )
-        
-        if filters.contract_ids:
-            query = query.filter(Contract.id.in_(filters.contract_ids))
-        
-        results = query.all()
-        total_meta_atingida = Decimal('0')
-        contratos_com_meta = 0
-        
-        for meta, previsto, realizado in results:
-            if meta and previsto:
-                economia = previsto - realizado
-                percentual_economia = (economia / previsto * 100)
-                percentual_meta = (percentual_economia / meta * 100) if meta > 0 else Decimal('0')
-                total_meta_atingida += percentual_meta
-                contratos_com_meta += 1
-        
-        return (total_meta_atingida / contratos_com_meta) if contratos_com_meta > 0 else Decimal('0')
+        return self._analytics(filters).overall_target_achievement()
 
     def _get_budget_vs_actual(self, filters: DashboardFilters) -> ChartData:
-        # Implementar gráfico previsto vs realizado por contrato
-        pass
+        return self._analytics(filters).budget_vs_actual()
 
     def _get_contracts_evolution(self, filters: DashboardFilters) -> ChartData:
-        # Implementar evolução dos contratos ao longo do tempo
-        pass
+        return self._analytics(filters).contracts_evolution()
 
     def _get_savings_distribution(self, filters: DashboardFilters) -> ChartData:
-        # Implementar distribuição de economia por centro de custo
-        pass
+        return self._analytics(filters).savings_distribution()
 
     def _get_contracts_progress(self, filters: DashboardFilters) -> List[ContractProgress]:
-        # Implementar progresso detalhado dos contratos
-        return []
+        return self._analytics(filters).contracts_progress()
 
     def _get_cost_centers_performance(self, filters: DashboardFilters) -> List[CostCenterMetric]:
-        # Implementar desempenho por centro de custo
-        return []
+        return self._analytics(filters).cost_centers_performance()
 
     def _get_supplier_performance(self, filters: DashboardFilters) -> List[SupplierMetric]:
         # Implementar métricas de desempenho dos fornecedores
@@ -376,7 +392,7 @@ class DashboardService:
 
     def _identify_at_risk_contracts(self, filters: DashboardFilters) -> List[Dict[str, Any]]:
         # Identificar contratos em risco
-        return []
+        return self._analytics(filters).at_risk_contracts()
 
     def _identify_savings_opportunities(self, filters: DashboardFilters) -> List[Dict[str, Any]]:
         # Identificar oportunidades de economia
@@ -1,4 +1,5 @@
-import pandas as pd
+from __future__ import annotations
+
 import xml.etree.ElementTree as ET
 import json
 import asyncio
@@ -10,11 +11,15 @@ from fastapi import UploadFile, HTTPException, status
 import os
 import tempfile
 import aiofiles
-import openpyxl
 from app.models.contracts import Contract, BudgetItem, ValorPrevisto
 from app.models.purchases import Invoice, InvoiceItem, PurchaseOrder
 from app.models.cost_centers import CostCenter
 from app.schemas.contracts import BudgetItemCreate
+from app.core.metrics import record_nf_parsed, record_item_classified
+from app.core.lazy import lazy_import
+
+pd = lazy_import("pandas")
+openpyxl = lazy_import("openpyxl")
 
 
 class DataImportService:
@@ -198,6 +203,7 @@ class DataImportService:
             
             # Extrair dados da NF-e (padrão brasileiro)
             nfe_data = self._extract_nfe_data(root)
+            record_nf_parsed('xml', True)
             
             # Criar invoice
             invoice = Invoice(
@@ -215,6 +221,7 @@ class DataImportService:
             # Criar itens da invoice
             for item_data in nfe_data['itens']:
                 centro_custo = self._classify_cost_center(item_data['descricao'])
+                record_item_classified('importacao_xml', centro_custo != 'OUTROS')
                 
                 invoice_item = InvoiceItem(
                     invoice_id=invoice.id,
@@ -319,6 +326,7 @@ class DataImportService:
             for index, row in df_mapped.iterrows():
                 try:
                     centro_custo = self._classify_cost_center(row['descricao'])
+                    record_item_classified('importacao_excel', centro_custo != 'OUTROS')
                     
                     invoice_item = InvoiceItem(
                         invoice_id=invoice.id,
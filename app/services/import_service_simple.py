@@ -1,7 +1,6 @@
 """Serviço de importação de dados simplificado"""
 
 import json
-import openpyxl
 from io import BytesIO
 from typing import Dict, List, Any, Optional
 from fastapi import UploadFile, HTTPException
@@ -10,6 +9,9 @@ from datetime import datetime
 
 from app.models.contracts import Contract, BudgetItem
 from app.models.purchases import Invoice, InvoiceItem
+from app.core.lazy import lazy_import
+
+openpyxl = lazy_import("openpyxl")
 
 
 class SimpleDataImportService:
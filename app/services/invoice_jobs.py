@@ -0,0 +1,236 @@
+"""
+Jobs de ingestão de notas fiscais (ZIP e pasta do OneDrive) com progresso ao vivo.
+
+O upload registra o job e responde na hora; o processamento roda em segundo
+plano, numa sessão própria, e cada arquivo gera eventos com os contadores
+acumulados:
+
+- job.started: total de arquivos
+- file.parsed, file.classified, file.inserted, file.failed: arquivo e dados da etapa
+- job.finished: status final (concluido, cancelado ou erro)
+
+Os eventos de cada job passam por um ChangeBus próprio (app.core.events), que
+já oferece fila por assinante, histórico para Last-Event-ID e resync.
+
+O registro fica em memória, como o dos jobs de relatório: o acompanhamento
+precisa chegar ao mesmo processo que recebeu o upload. Reenvios do mesmo
+arquivo para o mesmo contrato, enquanto o job anterior não termina, retornam
+o job existente em vez de processar tudo de novo.
+"""
+
+import asyncio
+import hashlib
+import threading
+import uuid
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from app.core.database import SessionLocal
+from app.core.events import ChangeBus
+from app.schemas.invoices import InvoiceJobStatus
+from app.services.invoice_processing_service import IngestionProgress, InvoiceProcessingService
+
+
+JOB_STARTED = "job.started"
+JOB_FINISHED = "job.finished"
+JOB_SNAPSHOT = "job.snapshot"
+
+# Eventos guardados por job para reconexão (Last-Event-ID); além disso, resync
+RECENT_EVENTS = 2000
+MAX_FINISHED_JOBS = 100
+
+ACTIVE_STATUSES = (InvoiceJobStatus.PENDENTE, InvoiceJobStatus.PROCESSANDO)
+
+
+class InvoiceIngestionJob(IngestionProgress):
+    """Estado e eventos de um job; atualizado pela thread de processamento"""
+
+    def __init__(self, source: str, contract_id: int, uploaded_by: int, fingerprint: str):
+        self.job_id = uuid.uuid4().hex
+        self.source = source
+        self.contract_id = contract_id
+        self.uploaded_by = uploaded_by
+        self.fingerprint = fingerprint
+        self.status = InvoiceJobStatus.PENDENTE
+        self.total_files: Optional[int] = None
+        self.processed_count = 0
+        self.failed_count = 0
+        self.current_file: Optional[str] = None
+        self.invoice_ids: List[int] = []
+        self.errors: List[str] = []
+        self.error: Optional[str] = None
+        self.created_at = datetime.utcnow()
+        self.started_at: Optional[datetime] = None
+        self.finished_at: Optional[datetime] = None
+        self.bus = ChangeBus(recent_events=RECENT_EVENTS)
+        self._cancel = threading.Event()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancel.is_set()
+
+    @property
+    def finished(self) -> bool:
+        return self.status not in ACTIVE_STATUSES
+
+    def request_cancel(self) -> None:
+        self._cancel.set()
+
+    # === IngestionProgress ===
+
+    def start(self, total: int) -> None:
+        self.total_files = total
+        self._publish(JOB_STARTED)
+
+    def step(self, etapa: str, arquivo: str, resultado: Dict[str, Any], **dados) -> None:
+        self.processed_count = resultado['processed_count']
+        self.failed_count = resultado['failed_count']
+        self.current_file = arquivo
+        if etapa == 'inserted':
+            self.invoice_ids.append(dados['invoice_id'])
+        elif etapa == 'failed':
+            self.errors.append(dados['error'])
+        self._publish(f"file.{etapa}", file=arquivo, **dados)
+
+    # === ESTADO ===
+
+    def begin(self) -> None:
+        self.status = InvoiceJobStatus.PROCESSANDO
+        self.started_at = datetime.utcnow()
+
+    def finish(self, status: InvoiceJobStatus, error: Optional[str] = None) -> None:
+        self.current_file = None
+        self.error = error
+        self.finished_at = datetime.utcnow()
+        self.status = status
+        self._publish(JOB_FINISHED, status=status.value, error=error)
+
+    def counts(self) -> Dict[str, Any]:
+        return {
+            "total": self.total_files,
+            "processed": self.processed_count,
+            "failed": self.failed_count,
+            "done": self.processed_count + self.failed_count
+        }
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "job_id": self.job_id,
+            "source": self.source,
+            "status": self.status,
+            "contract_id": self.contract_id,
+            "total_files": self.total_files,
+            "processed_count": self.processed_count,
+            "failed_count": self.failed_count,
+            "current_file": self.current_file,
+            "invoice_ids": list(self.invoice_ids),
+            "errors": list(self.errors),
+            "error": self.error,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "stream_url": f"/invoices/jobs/{self.job_id}/stream"
+        }
+
+    def snapshot_event(self) -> Dict[str, Any]:
+        # Sem id, como o resync: não altera o Last-Event-ID do cliente
+        return {"id": None, "type": JOB_SNAPSHOT, "data": self.snapshot(), "at": datetime.now().isoformat()}
+
+    def _publish(self, tipo: str, **dados) -> None:
+        self.bus.dispatch(tipo, {**dados, "progress": self.counts()})
+
+
+class InvoiceJobManager:
+    """Registro em memória dos jobs de ingestão de notas fiscais"""
+
+    def __init__(self, session_factory: Callable = SessionLocal, max_finished_jobs: int = MAX_FINISHED_JOBS):
+        self.session_factory = session_factory
+        self.max_finished_jobs = max_finished_jobs
+        self._jobs: Dict[str, InvoiceIngestionJob] = {}
+        self._active: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def fingerprint(source: str, contract_id: int, content: bytes) -> str:
+        return hashlib.sha256(f"{source}:{contract_id}:".encode() + content).hexdigest()
+
+    def submit(self, source: str, contract_id: int, uploaded_by: int, content: bytes) -> Tuple[InvoiceIngestionJob, bool]:
+        """Registra o job; retorna (job, precisa_processar)"""
+        fingerprint = self.fingerprint(source, contract_id, content)
+
+        with self._lock:
+            job_id = self._active.get(fingerprint)
+            if job_id is not None:
+                return self._jobs[job_id], False
+
+            job = InvoiceIngestionJob(source, contract_id, uploaded_by, fingerprint)
+            self._jobs[job.job_id] = job
+            self._active[fingerprint] = job.job_id
+            self._prune()
+            return job, True
+
+    def get(self, job_id: str) -> Optional[InvoiceIngestionJob]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def cancel(self, job_id: str) -> Optional[InvoiceIngestionJob]:
+        """Pede o cancelamento; o arquivo em andamento termina e as NFs já gravadas permanecem"""
+        job = self.get(job_id)
+        if job is not None and not job.finished:
+            job.request_cancel()
+        return job
+
+    def run_zip(self, job_id: str, content: bytes, filename: str) -> Optional[InvoiceIngestionJob]:
+        """Processa o ZIP do job (executado em segundo plano)"""
+        return self._run(job_id, lambda service, job: service.process_zip_content(
+            content, filename, job.contract_id, job.uploaded_by, progress=job
+        ))
+
+    def run_onedrive(self, job_id: str, folder_url: str) -> Optional[InvoiceIngestionJob]:
+        """Processa a pasta do OneDrive do job (executado em segundo plano)"""
+        return self._run(job_id, lambda service, job: service.process_onedrive_folder(
+            folder_url, job.contract_id, job.uploaded_by, progress=job
+        ))
+
+    def _run(
+        self,
+        job_id: str,
+        processar: Callable[[InvoiceProcessingService, InvoiceIngestionJob], Awaitable[Dict[str, Any]]]
+    ) -> Optional[InvoiceIngestionJob]:
+        job = self.get(job_id)
+        if job is None:
+            return None
+
+        if job.cancelled:
+            # Cancelado antes de começar
+            job.finish(InvoiceJobStatus.CANCELADO)
+            self._release(job)
+            return job
+
+        job.begin()
+        db = self.session_factory()
+        try:
+            # Thread própria: o processamento não bloqueia o event loop dos streams
+            resultado = asyncio.run(processar(InvoiceProcessingService(db), job))
+            job.finish(InvoiceJobStatus.CANCELADO if resultado['cancelled'] else InvoiceJobStatus.CONCLUIDO)
+        except Exception as e:
+            job.finish(InvoiceJobStatus.ERRO, error=str(e))
+        finally:
+            db.close()
+            self._release(job)
+
+        return job
+
+    def _release(self, job: InvoiceIngestionJob) -> None:
+        with self._lock:
+            if self._active.get(job.fingerprint) == job.job_id:
+                del self._active[job.fingerprint]
+
+    def _prune(self) -> None:
+        # Mantém apenas os max_finished_jobs jobs encerrados mais recentes
+        encerrados = [job_id for job_id, job in self._jobs.items() if job.finished]
+        for job_id in encerrados[:max(0, len(encerrados) - self.max_finished_jobs)]:
+            del self._jobs[job_id]
+
+
+invoice_jobs = InvoiceJobManager()
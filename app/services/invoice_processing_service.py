@@ -1,19 +1,36 @@
 import zipfile
 import os
 import tempfile
-import requests
 import xml.etree.ElementTree as ET
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Tuple
 from decimal import Decimal
 from datetime import datetime
 from fastapi import UploadFile
 from sqlalchemy.orm import Session
 from app.models.purchases import Invoice, InvoiceItem
 from app.schemas.invoices import InvoiceResponse
+from app.core.metrics import record_nf_parsed, record_item_classified
 import re
 import io
 
 
+class IngestionProgress:
+    """
+    Acompanhamento do processamento arquivo a arquivo. Sem efeito por padrão;
+    os jobs de ingestão (app.services.invoice_jobs) publicam cada etapa e pedem
+    o cancelamento por aqui.
+    """
+
+    cancelled = False
+
+    def start(self, total: int) -> None:
+        pass
+
+    def step(self, etapa: str, arquivo: str, resultado: Dict[str, Any], **dados) -> None:
+        """etapa: parsed, classified, inserted ou failed; resultado traz os contadores acumulados"""
+        pass
+
+
 class InvoiceProcessingService:
     def __init__(self, db: Session):
         self.db = db
@@ -22,21 +39,30 @@ class InvoiceProcessingService:
         self,
         file: UploadFile,
         contract_id: int,
-        uploaded_by: int
+        uploaded_by: int,
+        progress: Optional[IngestionProgress] = None
     ) -> Dict[str, Any]:
         """
         Processa arquivo ZIP contendo múltiplas notas fiscais.
         """
-        processed_count = 0
-        failed_count = 0
-        invoices = []
-        errors = []
+        content = await file.read()
+        return await self.process_zip_content(content, file.filename, contract_id, uploaded_by, progress)
 
+    async def process_zip_content(
+        self,
+        content: bytes,
+        filename: str,
+        contract_id: int,
+        uploaded_by: int,
+        progress: Optional[IngestionProgress] = None
+    ) -> Dict[str, Any]:
+        """
+        Processa o conteúdo de um ZIP já lido (usado também pelos jobs em segundo plano).
+        """
         # Criar diretório temporário
         with tempfile.TemporaryDirectory() as temp_dir:
             # Salvar ZIP temporariamente
-            zip_path = os.path.join(temp_dir, file.filename)
-            content = await file.read()
+            zip_path = os.path.join(temp_dir, os.path.basename(filename))
 
             with open(zip_path, 'wb') as f:
                 f.write(content)
@@ -45,94 +71,98 @@ class InvoiceProcessingService:
             try:
                 with zipfile.ZipFile(zip_path, 'r') as zip_ref:
                     zip_ref.extractall(temp_dir)
-
-                # Processar cada arquivo extraído
-                for root, dirs, files in os.walk(temp_dir):
-                    for filename in files:
-                        if filename.lower().endswith(('.xml', '.pdf')):
-                            file_path = os.path.join(root, filename)
-
-                            try:
-                                invoice_data = await self._extract_invoice_data(file_path, filename)
-                                if invoice_data:
-                                    # Criar invoice no banco
-                                    invoice = await self._create_invoice(
-                                        invoice_data,
-                                        contract_id,
-                                        file_path
-                                    )
-                                    invoices.append(invoice)
-                                    processed_count += 1
-                                else:
-                                    errors.append(f"Não foi possível extrair dados de {filename}")
-                                    failed_count += 1
-
-                            except Exception as e:
-                                errors.append(f"Erro ao processar {filename}: {str(e)}")
-                                failed_count += 1
-
             except zipfile.BadZipFile:
                 raise Exception("Arquivo ZIP corrompido ou inválido")
 
-        return {
-            'processed_count': processed_count,
-            'failed_count': failed_count,
-            'invoices': invoices,
-            'errors': errors
-        }
+            # Arquivos extraídos (a lista completa dá o total para o progresso)
+            arquivos = sorted(
+                (os.path.join(root, nome), nome)
+                for root, dirs, files in os.walk(temp_dir)
+                for nome in files
+                if nome.lower().endswith(('.xml', '.pdf'))
+            )
+
+            return await self._process_files(
+                [(caminho, nome, caminho, False) for caminho, nome in arquivos],
+                contract_id,
+                progress or IngestionProgress()
+            )
 
     async def process_onedrive_folder(
         self,
         folder_url: str,
         contract_id: int,
-        uploaded_by: int
+        uploaded_by: int,
+        progress: Optional[IngestionProgress] = None
     ) -> Dict[str, Any]:
         """
         Processa pasta do OneDrive contendo notas fiscais.
         """
-        processed_count = 0
-        failed_count = 0
-        invoices = []
-        errors = []
-
         try:
             # Baixar arquivos da pasta do OneDrive
             downloaded_files = await self._download_onedrive_files(folder_url)
-
-            for file_info in downloaded_files:
-                try:
-                    invoice_data = await self._extract_invoice_data(
-                        file_info['content'],
-                        file_info['filename'],
-                        is_content=True
-                    )
-
-                    if invoice_data:
-                        # Criar invoice no banco
-                        invoice = await self._create_invoice(
-                            invoice_data,
-                            contract_id,
-                            folder_url  # URL original como referência
-                        )
-                        invoices.append(invoice)
-                        processed_count += 1
-                    else:
-                        errors.append(f"Não foi possível extrair dados de {file_info['filename']}")
-                        failed_count += 1
-
-                except Exception as e:
-                    errors.append(f"Erro ao processar {file_info['filename']}: {str(e)}")
-                    failed_count += 1
-
         except Exception as e:
             raise Exception(f"Erro ao acessar pasta do OneDrive: {str(e)}")
 
-        return {
-            'processed_count': processed_count,
-            'failed_count': failed_count,
-            'invoices': invoices,
-            'errors': errors
+        # URL original como referência do arquivo
+        return await self._process_files(
+            [(info['content'], info['filename'], folder_url, True) for info in downloaded_files],
+            contract_id,
+            progress or IngestionProgress()
+        )
+
+    async def _process_files(
+        self,
+        arquivos: List[Tuple[str, str, str, bool]],
+        contract_id: int,
+        progress: IngestionProgress
+    ) -> Dict[str, Any]:
+        """
+        Extrai, classifica e grava cada arquivo (origem, nome, arquivo_original, is_content).
+        Cada NF é confirmada individualmente; o cancelamento vale a partir do próximo arquivo.
+        """
+        resultado = {
+            'processed_count': 0,
+            'failed_count': 0,
+            'invoices': [],
+            'errors': [],
+            'cancelled': False
         }
+        progress.start(len(arquivos))
+
+        for origem, nome, arquivo_original, is_content in arquivos:
+            if progress.cancelled:
+                resultado['cancelled'] = True
+                break
+
+            try:
+                invoice_data = await self._extract_invoice_data(origem, nome, is_content=is_content)
+                if not invoice_data:
+                    self._register_failure(resultado, progress, nome, f"Não foi possível extrair dados de {nome}")
+                    continue
+                progress.step('parsed', nome, resultado, numero_nf=invoice_data['numero_nf'], items=len(invoice_data['items']))
+
+                classificados = self._classify_items(invoice_data['items'])
+                progress.step(
+                    'classified', nome, resultado,
+                    classified=classificados, unclassified=len(invoice_data['items']) - classificados
+                )
+
+                # Criar invoice no banco
+                invoice = await self._create_invoice(invoice_data, contract_id, arquivo_original)
+                resultado['invoices'].append(invoice)
+                resultado['processed_count'] += 1
+                progress.step('inserted', nome, resultado, invoice_id=invoice.id, numero_nf=invoice.numero_nf)
+
+            except Exception as e:
+                self._register_failure(resultado, progress, nome, f"Erro ao processar {nome}: {str(e)}")
+
+        return resultado
+
+    def _register_failure(self, resultado: Dict[str, Any], progress: IngestionProgress, nome: str, erro: str) -> None:
+        resultado['errors'].append(erro)
+        resultado['failed_count'] += 1
+        progress.step('failed', nome, resultado, error=erro)
 
     async def _extract_invoice_data(
         self,
@@ -217,6 +247,7 @@ class InvoiceProcessingService:
                     }
                     items.append(item_data)
 
+            record_nf_parsed('xml', True)
             return {
                 'numero_nf': numero_nf,
                 'fornecedor': fornecedor,
@@ -226,6 +257,7 @@ class InvoiceProcessingService:
             }
 
         except Exception as e:
+            record_nf_parsed('xml', False)
             print(f"Erro ao processar XML: {str(e)}")
             return None
 
@@ -239,6 +271,7 @@ class InvoiceProcessingService:
             # Em produção, seria necessário usar uma biblioteca como PyPDF2 ou pdfplumber
 
             # Por enquanto, retornar dados mock para PDFs
+            record_nf_parsed('pdf', True)
             return {
                 'numero_nf': f"PDF-{datetime.now().strftime('%Y%m%d%H%M%S')}",
                 'fornecedor': 'Fornecedor PDF',
@@ -255,6 +288,7 @@ class InvoiceProcessingService:
             }
 
         except Exception as e:
+            record_nf_parsed('pdf', False)
             print(f"Erro ao processar PDF: {str(e)}")
             return None
 
@@ -320,7 +354,7 @@ class InvoiceProcessingService:
                 invoice_item = InvoiceItem(
                     invoice_id=invoice.id,
                     descricao=item_data['descricao'],
-                    centro_custo=self._classify_cost_center(item_data['descricao']),
+                    centro_custo=item_data['centro_custo'],
                     unidade=item_data.get('unidade'),
                     quantidade=item_data.get('quantidade'),
                     valor_unitario=item_data.get('valor_unitario'),
@@ -351,6 +385,14 @@ class InvoiceProcessingService:
             self.db.rollback()
             raise Exception(f"Erro ao criar invoice no banco: {str(e)}")
 
+    def _classify_items(self, items: List[Dict[str, Any]]) -> int:
+        """
+        Classifica o centro de custo de cada item; retorna quantos foram classificados.
+        """
+        for item in items:
+            item['centro_custo'] = self._classify_cost_center(item['descricao'])
+        return sum(1 for item in items if item['centro_custo'] != 'Não Classificado')
+
     def _classify_cost_center(self, description: str) -> str:
         """
         Classifica automaticamente o centro de custo baseado na descrição.
@@ -359,10 +401,13 @@ class InvoiceProcessingService:
 
         # Classificação baseada em palavras-chave
         if any(keyword in description_lower for keyword in ['aço', 'ferro', 'metal', 'estrutura', 'viga', 'pilar']):
-            return 'Matéria-prima'
+            centro_custo = 'Matéria-prima'
         elif any(keyword in description_lower for keyword in ['soldador', 'serviço', 'mão de obra', 'montagem', 'instalação']):
-            return 'Mão-de-obra'
+            centro_custo = 'Mão-de-obra'
         elif any(keyword in description_lower for keyword in ['transporte', 'frete', 'mobilização', 'desmobilização']):
-            return 'Mobilização'
+            centro_custo = 'Mobilização'
         else:
-            return 'Não Classificado'
\ No newline at end of file
+            centro_custo = 'Não Classificado'
+
+        record_item_classified('invoice_processing', centro_custo != 'Não Classificado')
+        return centro_custo
\ No newline at end of file
@@ -0,0 +1,207 @@
+"""
+Cliente do webhook do n8n (processamento de pastas de NFs).
+
+- Um único httpx.AsyncClient por processo, com conexões keep-alive reaproveitadas
+  entre requisições (sem novo handshake TCP/TLS a cada chamada).
+- Timeouts de conexão e de resposta configuráveis (settings.n8n_*).
+- Novas tentativas limitadas, com backoff exponencial, somente quando o n8n não
+  chegou a processar a chamada: falha de conexão ou respostas 429/503.
+  502/504 e timeout de leitura não são repetidos: o proxy pode ter desistido
+  depois de o webhook já ter disparado o fluxo, que não é idempotente.
+- Circuit breaker: após settings.n8n_breaker_failures chamadas com falha
+  seguidas, novas chamadas falham imediatamente (N8nUnavailableError) por
+  settings.n8n_breaker_reset_seconds; depois disso uma chamada de teste decide
+  se o circuito fecha.
+"""
+
+import asyncio
+import random
+import threading
+import time
+from typing import Any, Dict, Optional
+from urllib.parse import quote
+
+from app.core.config import settings
+from app.core.lazy import lazy_import
+
+httpx = lazy_import("httpx")
+
+
+# Respostas em que o webhook certamente não executou o fluxo
+RETRY_STATUS = {429, 503}
+MAX_BACKOFF_SECONDS = 5.0
+
+
+class N8nUnavailableError(Exception):
+    """Circuito aberto: o n8n falhou repetidamente e as chamadas estão suspensas"""
+
+    def __init__(self, retry_after: float):
+        super().__init__(f"n8n indisponível; nova tentativa em {retry_after:.0f}s")
+        self.retry_after = retry_after
+
+
+class N8nResponseError(Exception):
+    """O n8n respondeu com erro mesmo após as novas tentativas"""
+
+    def __init__(self, status_code: int):
+        super().__init__(f"n8n respondeu com status {status_code}")
+        self.status_code = status_code
+
+
+class CircuitBreaker:
+    """Circuit breaker simples (fechado -> aberto -> meio-aberto)"""
+
+    def __init__(self, failure_threshold: int, reset_timeout: float, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._probe_started: Optional[float] = None
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "fechado"
+        if self.clock() - self.opened_at >= self.reset_timeout:
+            return "meio-aberto"
+        return "aberto"
+
+    def before_call(self) -> None:
+        """Levanta N8nUnavailableError se o circuito estiver aberto"""
+        with self._lock:
+            estado = self.state
+            if estado == "fechado":
+                return
+            agora = self.clock()
+            if estado == "meio-aberto" and (
+                self._probe_started is None or agora - self._probe_started >= self.reset_timeout
+            ):
+                # Uma única chamada de teste (por período); as demais seguem falhando rápido
+                self._probe_started = agora
+                return
+            restante = max(0.0, self.reset_timeout - (agora - self.opened_at))
+            raise N8nUnavailableError(restante or self.reset_timeout)
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._probe_started = None
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            if self._probe_started is not None or self.failures >= self.failure_threshold:
+                self.opened_at = self.clock()
+            self._probe_started = None
+
+
+class N8nClient:
+    """Chamadas ao webhook do n8n com pool de conexões, novas tentativas e circuit breaker"""
+
+    def __init__(
+        self,
+        webhook_url: str = None,
+        timeout: float = None,
+        connect_timeout: float = None,
+        max_connections: int = None,
+        max_retries: int = None,
+        backoff: float = None,
+        breaker: CircuitBreaker = None,
+    ):
+        self.webhook_url = webhook_url or settings.n8n_webhook_url
+        self.timeout = settings.n8n_timeout_seconds if timeout is None else timeout
+        self.connect_timeout = settings.n8n_connect_timeout_seconds if connect_timeout is None else connect_timeout
+        self.max_connections = max_connections or settings.n8n_max_connections
+        self.max_retries = settings.n8n_max_retries if max_retries is None else max_retries
+        self.backoff = settings.n8n_retry_backoff_seconds if backoff is None else backoff
+        self.breaker = breaker or CircuitBreaker(settings.n8n_breaker_failures, settings.n8n_breaker_reset_seconds)
+        self._client = None
+        self._loop = None
+
+    def folder_url(self, nome_pasta: str) -> str:
+        return self.webhook_url.format(nome_pasta=quote(nome_pasta, safe=""))
+
+    @property
+    def client(self):
+        # As conexões pertencem ao event loop em que foram abertas
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._loop is not loop:
+            self._client = httpx.AsyncClient(
+                timeout=httpx.Timeout(self.timeout, connect=self.connect_timeout),
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_connections
+                ),
+            )
+            self._loop = loop
+        return self._client
+
+    async def aclose(self) -> None:
+        if self._client is not None and self._loop is asyncio.get_running_loop():
+            await self._client.aclose()
+        self._client = None
+        self._loop = None
+
+    async def _sleep_backoff(self, tentativa: int) -> None:
+        espera = min(MAX_BACKOFF_SECONDS, self.backoff * 2 ** tentativa)
+        await asyncio.sleep(espera * random.uniform(0.5, 1.0))
+
+    async def post(self, url: str, payload: Dict[str, Any]):
+        """
+        POST com novas tentativas. Retorna a resposta (inclusive 4xx, que não são
+        repetidos) ou levanta N8nUnavailableError, N8nResponseError ou o erro do httpx.
+        """
+        self.breaker.before_call()
+
+        tentativa = 0
+        while True:
+            try:
+                response = await self.client.post(url, json=payload)
+            except (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout):
+                if tentativa < self.max_retries:
+                    await self._sleep_backoff(tentativa)
+                    tentativa += 1
+                    continue
+                self.breaker.record_failure()
+                raise
+            except httpx.RequestError:
+                self.breaker.record_failure()
+                raise
+
+            if response.status_code in RETRY_STATUS and tentativa < self.max_retries:
+                await self._sleep_backoff(tentativa)
+                tentativa += 1
+                continue
+            if response.status_code >= 500 or response.status_code in RETRY_STATUS:
+                self.breaker.record_failure()
+                raise N8nResponseError(response.status_code)
+
+            self.breaker.record_success()
+            return response
+
+    async def process_folder(self, nome_pasta: str, payload: Dict[str, Any]):
+        return await self.post(self.folder_url(nome_pasta), payload)
+
+
+_client: Optional[N8nClient] = None
+_client_lock = threading.Lock()
+
+
+def get_n8n_client() -> N8nClient:
+    """Cliente compartilhado do processo (pool de conexões e estado do circuit breaker)"""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = N8nClient()
+        return _client
+
+
+async def close_n8n_client() -> None:
+    global _client
+    with _client_lock:
+        client, _client = _client, None
+    if client is not None:
+        await client.aclose()
@@ -0,0 +1,320 @@
+"""Gravação em lote de Notas Fiscais vindas do n8n (INSERT ... ON CONFLICT)"""
+
+from sqlalchemy.orm import Session
+from sqlalchemy import func, insert, update, delete, or_, tuple_, bindparam
+from sqlalchemy.dialects import postgresql, sqlite
+from typing import List, Optional, Dict, Any, Tuple
+from datetime import datetime
+
+from app.models.notas_fiscais import NotaFiscal, NotaFiscalItem
+from app.services.nf_rollup_service import NotaFiscalRollupService, inicio_mes
+from app.services.nf_partition_service import NotaFiscalPartitionService
+from app.services.nf_events import publish_nf_change, NF_CREATED, NF_UPDATED
+from app.schemas.notas_fiscais import NotaFiscalCreate
+
+
+DEFAULT_CHUNK_SIZE = 200
+
+# Colunas opcionais: valor nulo no lote não apaga o que já está gravado
+# (ex.: contrato associado manualmente antes de o n8n reenviar a NF)
+COALESCE_COLUMNS = (
+    "valor_produtos", "valor_impostos", "valor_frete", "data_entrada", "subpasta",
+    "contrato_id", "ordem_compra_id", "observacoes"
+)
+
+# Classificação dos itens preservada quando a NF é reenviada sem ela
+CLASSIFICACAO_CENTRO = ("centro_custo_id", "score_classificacao", "fonte_classificacao")
+CLASSIFICACAO_ORCAMENTO = ("item_orcamento_id", "status_integracao", "integrado_em")
+
+ITEM_COLUMNS = (
+    "numero_item", "codigo_produto", "descricao", "ncm", "quantidade", "unidade",
+    "valor_unitario", "valor_total", "peso_liquido", "peso_bruto", "centro_custo_id",
+    "item_orcamento_id", "score_classificacao", "fonte_classificacao",
+    "status_integracao", "integrado_em"
+)
+
+# Chave natural: ("chave", chave_acesso) ou ("numero", numero, serie, cnpj_fornecedor)
+Chave = Tuple
+
+
+def chave_natural(numero: str, serie: str, cnpj: str, chave_acesso: Optional[str]) -> Chave:
+    if chave_acesso:
+        return ("chave", chave_acesso)
+    return ("numero", numero, serie, cnpj)
+
+
+class NotaFiscalBulkService:
+    """
+    Upsert em lote de NFs com itens (POST /nf/bulk).
+
+    As NFs são gravadas em blocos de chunk_size, cada bloco na sua transação:
+
+    - uma consulta localiza as NFs já gravadas pela chave de acesso ou, sem ela,
+      por número/série/CNPJ do fornecedor;
+    - um INSERT ... ON CONFLICT DO UPDATE ... RETURNING por chave natural grava os
+      cabeçalhos (índices únicos parciais da migração a1d5e7c3f9b2);
+    - os itens das NFs que vieram com itens são substituídos com um DELETE e um
+      INSERT de várias linhas, mantendo a classificação (centro de custo, item do
+      orçamento) dos itens de mesmo número quando o lote não a informa;
+    - o agregado mensal é recalculado para os grupos antigos e novos do bloco.
+
+    Um erro desfaz apenas o bloco em que ocorreu; os demais seguem gravados.
+    """
+
+    def __init__(self, db: Session):
+        self.db = db
+        self.rollup = NotaFiscalRollupService(db)
+        self._is_partitioned: Optional[bool] = None
+
+    def upsert(self, nfs: List[NotaFiscalCreate], chunk_size: int = DEFAULT_CHUNK_SIZE) -> Dict[str, Any]:
+        """Grava as NFs e retorna o resultado de cada uma, na ordem recebida"""
+        resultados: List[Dict[str, Any]] = [
+            {
+                "index": indice,
+                "numero": nf.numero,
+                "serie": nf.serie,
+                "chave_acesso": nf.chave_acesso,
+                "status": None,
+                "id": None,
+                "erro": None
+            }
+            for indice, nf in enumerate(nfs)
+        ]
+
+        # Mesma NF repetida no lote: vale a última ocorrência
+        ultimas: Dict[Chave, int] = {}
+        for indice, nf in enumerate(nfs):
+            chave = chave_natural(nf.numero, nf.serie, nf.cnpj_fornecedor, nf.chave_acesso)
+            anterior = ultimas.get(chave)
+            if anterior is not None:
+                resultados[anterior].update(status="ignorada", erro="NF repetida no lote")
+            ultimas[chave] = indice
+
+        indices = sorted(ultimas.values())
+        for inicio in range(0, len(indices), chunk_size):
+            bloco = indices[inicio:inicio + chunk_size]
+            try:
+                self._gravar_bloco([(indice, nfs[indice]) for indice in bloco], resultados)
+                self.db.commit()
+            except Exception as e:
+                self.db.rollback()
+                print(f"Erro ao gravar bloco de NFs ({len(bloco)} NFs): {e}")
+                for indice in bloco:
+                    resultados[indice].update(status="erro", id=None, erro=str(e).splitlines()[0])
+
+        contagem = {"criadas": 0, "atualizadas": 0, "ignoradas": 0, "erros": 0}
+        nomes = {"criada": "criadas", "atualizada": "atualizadas", "ignorada": "ignoradas", "erro": "erros"}
+        for resultado in resultados:
+            contagem[nomes[resultado["status"]]] += 1
+
+        return {"total": len(nfs), **contagem, "resultados": resultados}
+
+    # === BLOCO ===
+
+    def _gravar_bloco(self, bloco: List[Tuple[int, NotaFiscalCreate]], resultados: List[Dict[str, Any]]) -> None:
+        existentes = self._buscar_existentes([nf for _, nf in bloco])
+        agora = datetime.now()
+
+        # Resolver a NF gravada de cada entrada e montar as linhas do INSERT
+        linhas: Dict[str, List[Dict[str, Any]]] = {"chave": [], "numero": []}
+        destino: Dict[Chave, int] = {}
+        ids_existentes = {}
+        adotar_chave = []
+        grupos_antigos = []
+
+        for indice, nf in bloco:
+            linha = nf.model_dump(exclude={'itens'})
+            linha["processed_by_n8n_at"] = agora
+            existente = self._localizar(existentes, nf)
+
+            if existente is not None:
+                if existente["id"] in ids_existentes:
+                    resultados[indice].update(status="ignorada", erro="Mesma NF de outra entrada do lote")
+                    continue
+                if self._particionada() and existente["data_emissao"] != nf.data_emissao:
+                    resultados[indice].update(
+                        status="erro",
+                        erro="data_emissao difere da NF já gravada (tabela particionada)"
+                    )
+                    continue
+
+                ids_existentes[existente["id"]] = indice
+                grupos_antigos.append(self._grupo(existente))
+                if not linha["chave_acesso"] and existente["chave_acesso"]:
+                    # NF gravada com chave e reenviada sem ela: atualizar a mesma linha
+                    linha["chave_acesso"] = existente["chave_acesso"]
+                elif linha["chave_acesso"] and not existente["chave_acesso"]:
+                    # NF gravada sem chave e reenviada com ela: a linha passa a ter a chave
+                    adotar_chave.append({"b_id": existente["id"], "b_chave": linha["chave_acesso"]})
+
+            chave = chave_natural(linha["numero"], linha["serie"], linha["cnpj_fornecedor"], linha["chave_acesso"])
+            destino[chave] = indice
+            linhas[chave[0]].append(linha)
+
+        if adotar_chave:
+            self.db.execute(
+                update(NotaFiscal.__table__)
+                .where(NotaFiscal.__table__.c.id == bindparam("b_id"))
+                .values(chave_acesso=bindparam("b_chave")),
+                adotar_chave
+            )
+
+        gravadas = []
+        for tipo, valores in linhas.items():
+            if valores:
+                gravadas += self._upsert_cabecalhos(tipo, valores, agora)
+
+        grupos_novos = []
+        nota_por_indice = {}
+        for gravada in gravadas:
+            indice = destino[chave_natural(gravada.numero, gravada.serie, gravada.cnpj_fornecedor, gravada.chave_acesso)]
+            nota_por_indice[indice] = gravada.id
+            resultados[indice].update(
+                status="atualizada" if gravada.id in ids_existentes else "criada",
+                id=gravada.id
+            )
+            grupos_novos.append(self._grupo(gravada._mapping))
+
+        # Publicados no commit do bloco (descartados se ele for desfeito)
+        publish_nf_change(self.db, NF_CREATED, [g.id for g in gravadas if g.id not in ids_existentes])
+        publish_nf_change(self.db, NF_UPDATED, [g.id for g in gravadas if g.id in ids_existentes])
+
+        self._substituir_itens(
+            {nota_por_indice[indice]: nf.itens for indice, nf in bloco if nf.itens and indice in nota_por_indice},
+            set(ids_existentes),
+            agora
+        )
+        self.rollup.refresh_grupos(grupos_antigos + grupos_novos)
+
+    def _buscar_existentes(self, nfs: List[NotaFiscalCreate]) -> Dict[Chave, List[Dict[str, Any]]]:
+        """NFs já gravadas, indexadas pela chave de acesso e por número/série/CNPJ"""
+        chaves = {nf.chave_acesso for nf in nfs if nf.chave_acesso}
+        numeros = {(nf.numero, nf.serie, nf.cnpj_fornecedor) for nf in nfs}
+
+        condicoes = [tuple_(NotaFiscal.numero, NotaFiscal.serie, NotaFiscal.cnpj_fornecedor).in_(numeros)]
+        if chaves:
+            condicoes.append(NotaFiscal.chave_acesso.in_(chaves))
+
+        existentes: Dict[Chave, List[Dict[str, Any]]] = {}
+        for linha in self.db.query(
+            NotaFiscal.id,
+            NotaFiscal.numero,
+            NotaFiscal.serie,
+            NotaFiscal.cnpj_fornecedor,
+            NotaFiscal.chave_acesso,
+            NotaFiscal.data_emissao,
+            NotaFiscal.contrato_id
+        ).filter(or_(*condicoes)).all():
+            registro = dict(linha._mapping)
+            if registro["chave_acesso"]:
+                existentes.setdefault(("chave", registro["chave_acesso"]), []).append(registro)
+            existentes.setdefault(("numero", registro["numero"], registro["serie"], registro["cnpj_fornecedor"]), []).append(registro)
+        return existentes
+
+    @staticmethod
+    def _localizar(existentes: Dict[Chave, List[Dict[str, Any]]], nf: NotaFiscalCreate) -> Optional[Dict[str, Any]]:
+        """
+        NF gravada que a entrada atualiza: pela chave de acesso; sem correspondência,
+        pela NF de mesmo número/série/CNPJ (preferindo a que ainda não tem chave)
+        """
+        if nf.chave_acesso and existentes.get(("chave", nf.chave_acesso)):
+            return existentes[("chave", nf.chave_acesso)][0]
+
+        candidatas = existentes.get(("numero", nf.numero, nf.serie, nf.cnpj_fornecedor), [])
+        sem_chave = [c for c in candidatas if not c["chave_acesso"]]
+        if sem_chave:
+            return sem_chave[0]
+        if not nf.chave_acesso and candidatas:
+            return candidatas[0]
+        return None
+
+    def _upsert_cabecalhos(self, tipo: str, linhas: List[Dict[str, Any]], agora: datetime) -> List[Any]:
+        """INSERT ... ON CONFLICT DO UPDATE de um tipo de chave natural"""
+        dialeto = self.db.get_bind().dialect.name
+        if dialeto == "postgresql":
+            stmt = postgresql.insert(NotaFiscal.__table__)
+        elif dialeto == "sqlite":
+            stmt = sqlite.insert(NotaFiscal.__table__)
+        else:
+            raise NotImplementedError(f"Upsert em lote não suportado no banco {dialeto}")
+
+        stmt = stmt.values(linhas)
+        excluded = stmt.excluded
+        tabela = NotaFiscal.__table__
+
+        if tipo == "chave":
+            indice, predicado = ["chave_acesso"], tabela.c.chave_acesso.isnot(None)
+        else:
+            indice, predicado = ["numero", "serie", "cnpj_fornecedor"], tabela.c.chave_acesso.is_(None)
+        if self._particionada():
+            indice = indice + ["data_emissao"]
+
+        valores = {
+            coluna: func.coalesce(excluded[coluna], tabela.c[coluna]) if coluna in COALESCE_COLUMNS else excluded[coluna]
+            for coluna in linhas[0]
+            if coluna not in indice
+        }
+        valores["updated_at"] = agora
+
+        stmt = stmt.on_conflict_do_update(
+            index_elements=indice,
+            index_where=predicado,
+            set_=valores
+        ).returning(
+            tabela.c.id,
+            tabela.c.numero,
+            tabela.c.serie,
+            tabela.c.cnpj_fornecedor,
+            tabela.c.chave_acesso,
+            tabela.c.data_emissao,
+            tabela.c.contrato_id
+        )
+        return self.db.execute(stmt).all()
+
+    def _substituir_itens(self, itens_por_nota: Dict[int, List[Any]], notas_existentes: set, agora: datetime) -> None:
+        """Troca os itens das NFs pelos do lote, preservando a classificação anterior"""
+        if not itens_por_nota:
+            return
+
+        anteriores: Dict[Tuple[int, int], Dict[str, Any]] = {}
+        reenviadas = [nota_id for nota_id in itens_por_nota if nota_id in notas_existentes]
+        if reenviadas:
+            tabela = NotaFiscalItem.__table__
+            for linha in self.db.execute(
+                tabela.select().with_only_columns(
+                    tabela.c.nota_id, tabela.c.numero_item,
+                    *(tabela.c[coluna] for coluna in CLASSIFICACAO_CENTRO + CLASSIFICACAO_ORCAMENTO)
+                ).where(tabela.c.nota_id.in_(reenviadas))
+            ):
+                anteriores[(linha.nota_id, linha.numero_item)] = dict(linha._mapping)
+            self.db.execute(delete(tabela).where(tabela.c.nota_id.in_(reenviadas)))
+
+        linhas = []
+        for nota_id, itens in itens_por_nota.items():
+            for item in itens:
+                linha = {coluna: None for coluna in ITEM_COLUMNS}
+                linha.update(item.model_dump())
+                linha.update(nota_id=nota_id, status_integracao="pendente", created_at=agora)
+
+                anterior = anteriores.get((nota_id, item.numero_item))
+                if anterior:
+                    if linha["centro_custo_id"] is None and anterior["centro_custo_id"] is not None:
+                        linha.update({coluna: anterior[coluna] for coluna in CLASSIFICACAO_CENTRO})
+                    if linha["item_orcamento_id"] is None and anterior["item_orcamento_id"] is not None:
+                        linha.update({coluna: anterior[coluna] for coluna in CLASSIFICACAO_ORCAMENTO})
+                linhas.append(linha)
+
+        self.db.execute(insert(NotaFiscalItem.__table__), linhas)
+
+    # === AUXILIARES ===
+
+    @staticmethod
+    def _grupo(nf) -> Optional[Tuple]:
+        if not nf["data_emissao"] or not nf["cnpj_fornecedor"]:
+            return None
+        return (inicio_mes(nf["data_emissao"]), nf["contrato_id"], nf["cnpj_fornecedor"])
+
+    def _particionada(self) -> bool:
+        if self._is_partitioned is None:
+            self._is_partitioned = NotaFiscalPartitionService(self.db).is_partitioned()
+        return self._is_partitioned
@@ -0,0 +1,61 @@
+"""
+Eventos de alteração de NFs, logs de processamento e contratos (app.core.events).
+
+Tipos publicados (o campo data de cada evento):
+
+- nf.created, nf.updated, nf.deleted, nf.validated, nf.rejected:
+  ids (até MAX_EVENT_IDS), count, truncated
+- processing_log.status: id, pasta_nome, status
+- contract.totals: contracts [{contrato_id, delta_valor_realizado, valor_realizado}]
+"""
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+from typing import Any, Dict, Iterable, List
+
+from app.core.events import publish_change, ids_payload
+from app.models.notas_fiscais import ProcessamentoLog
+
+
+NF_CREATED = "nf.created"
+NF_UPDATED = "nf.updated"
+NF_DELETED = "nf.deleted"
+NF_VALIDATED = "nf.validated"
+NF_REJECTED = "nf.rejected"
+PROCESSING_LOG_STATUS = "processing_log.status"
+CONTRACT_TOTALS = "contract.totals"
+
+# Evento da mudança de status de NFs em lote
+NF_STATUS_EVENTS = {"validado": NF_VALIDATED, "erro": NF_REJECTED}
+
+
+def publish_nf_change(db: Session, tipo: str, ids: Iterable[int]) -> None:
+    ids = list(ids)
+    if ids:
+        publish_change(db, tipo, **ids_payload(ids))
+
+
+def publish_contract_totals(db: Session, contratos: List[Dict[str, Any]]) -> None:
+    if contratos:
+        publish_change(db, CONTRACT_TOTALS, contracts=contratos)
+
+
+# Logs de processamento mudam de status em vários pontos (rota de pastas,
+# serviço de NFs): o evento sai do próprio mapeamento
+
+def _publish_log_status(mapper, connection, log: ProcessamentoLog) -> None:
+    db = Session.object_session(log)
+    if db is None:
+        return
+    publish_change(db, PROCESSING_LOG_STATUS, id=log.id, pasta_nome=log.pasta_nome, status=log.status)
+
+
+@event.listens_for(ProcessamentoLog, "after_insert")
+def _log_created(mapper, connection, log: ProcessamentoLog) -> None:
+    _publish_log_status(mapper, connection, log)
+
+
+@event.listens_for(ProcessamentoLog, "after_update")
+def _log_updated(mapper, connection, log: ProcessamentoLog) -> None:
+    if inspect(log).attrs.status.history.has_changes():
+        _publish_log_status(mapper, connection, log)
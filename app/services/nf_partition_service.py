@@ -0,0 +1,114 @@
+"""Manutenção das partições mensais de notas_fiscais/nf_itens (migração f2c8d4a6b9e3)"""
+
+from sqlalchemy.orm import Session
+from sqlalchemy import text
+from typing import List, Dict, Any
+from datetime import date
+
+from app.core.config import settings
+from app.services.nf_rollup_service import NotaFiscalRollupService
+
+
+# Tabelas particionadas, na ordem de desanexação (itens antes das NFs, por causa da FK)
+PARTITIONED_TABLES = ("nf_itens", "notas_fiscais")
+
+
+class NotaFiscalPartitionService:
+    """
+    Cria partições futuras e desanexa meses antigos.
+
+    O particionamento é opcional (NF_PARTITIONING na migração) e só existe no
+    PostgreSQL; em bancos não particionados todos os métodos são inócuos.
+    """
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def is_partitioned(self) -> bool:
+        """Indica se notas_fiscais é uma tabela particionada"""
+        if self.db.get_bind().dialect.name != "postgresql":
+            return False
+        return bool(self.db.execute(text(
+            "SELECT EXISTS (SELECT 1 FROM pg_partitioned_table "
+            "WHERE partrelid = to_regclass('notas_fiscais'))"
+        )).scalar())
+
+    def ensure_future_partitions(self, meses: int = None) -> bool:
+        """Cria as partições do mês corrente e dos próximos meses (idempotente)"""
+        if not self.is_partitioned():
+            return False
+
+        meses = settings.nf_partition_months_ahead if meses is None else meses
+        self.db.execute(text("SELECT nf_criar_particoes_futuras(:meses)"), {"meses": meses})
+        self.db.commit()
+        return True
+
+    def list_partitions(self) -> List[Dict[str, Any]]:
+        """Partições anexadas com seus limites e número estimado de linhas"""
+        if not self.is_partitioned():
+            return []
+
+        linhas = self.db.execute(text("""
+            SELECT pai.relname, filha.relname,
+                   pg_get_expr(filha.relpartbound, filha.oid), filha.reltuples
+            FROM pg_inherits h
+            JOIN pg_class pai ON pai.oid = h.inhparent
+            JOIN pg_class filha ON filha.oid = h.inhrelid
+            WHERE pai.relname IN ('notas_fiscais', 'nf_itens')
+            ORDER BY pai.relname, filha.relname
+        """)).all()
+
+        return [
+            {
+                "tabela": tabela,
+                "particao": particao,
+                "limites": limites,
+                "linhas_estimadas": max(int(linhas_estimadas), 0)
+            }
+            for tabela, particao, limites, linhas_estimadas in linhas
+        ]
+
+    def detach_month(self, mes: date) -> List[str]:
+        """
+        Desanexa as partições de um mês (nf_itens_pYYYYMM e notas_fiscais_pYYYYMM).
+
+        As tabelas continuam no banco como tabelas comuns, prontas para arquivamento
+        (pg_dump/DROP). A FK cópia deixada na partição de itens é removida para que
+        a partição de NFs também possa sair.
+
+        O agregado mensal (nf_monthly_rollup) do mês é reconstruído na mesma
+        transação; como as NFs saíram de notas_fiscais, as linhas do mês somem.
+        """
+        if not self.is_partitioned():
+            return []
+
+        sufixo = mes.strftime("%Y%m")
+        desanexadas = []
+
+        for tabela in PARTITIONED_TABLES:
+            particao = f"{tabela}_p{sufixo}"
+            anexada = self.db.execute(text("""
+                SELECT 1 FROM pg_inherits
+                WHERE inhrelid = to_regclass(:particao) AND inhparent = to_regclass(:tabela)
+            """), {"particao": particao, "tabela": tabela}).first()
+            if not anexada:
+                continue
+
+            self.db.execute(text(f'ALTER TABLE "{tabela}" DETACH PARTITION "{particao}"'))
+
+            if tabela == "nf_itens":
+                fks = self.db.execute(text("""
+                    SELECT conname FROM pg_constraint
+                    WHERE conrelid = to_regclass(:particao) AND contype = 'f'
+                      AND confrelid = to_regclass('notas_fiscais')
+                """), {"particao": particao}).scalars().all()
+                for fk in fks:
+                    self.db.execute(text(f'ALTER TABLE "{particao}" DROP CONSTRAINT "{fk}"'))
+
+            desanexadas.append(particao)
+
+        if desanexadas:
+            NotaFiscalRollupService(self.db).rebuild(mes, mes)
+        else:
+            self.db.commit()
+        return desanexadas
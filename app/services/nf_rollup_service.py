@@ -0,0 +1,331 @@
+"""Manutenção do agregado mensal de Notas Fiscais (nf_monthly_rollup)"""
+
+import zlib
+from sqlalchemy.orm import Session
+from sqlalchemy import func, extract, text, tuple_, and_, or_
+from typing import List, Optional, Dict, Any, Iterable, Tuple
+from decimal import Decimal
+from datetime import datetime, date, timedelta
+
+from app.models.notas_fiscais import NotaFiscal, NotaFiscalItem, NotaFiscalRollupMensal
+
+
+# Grupo de recálculo: (mês, contrato_id, cnpj_fornecedor)
+Grupo = Tuple[date, Optional[int], str]
+
+# Margem de segurança para capturar NFs inseridas diretamente pelo n8n
+SYNC_MARGIN = timedelta(minutes=2)
+
+
+def inicio_mes(valor: datetime) -> date:
+    """Primeiro dia do mês de uma data"""
+    return date(valor.year, valor.month, 1)
+
+
+def proximo_mes(mes: date) -> date:
+    """Primeiro dia do mês seguinte"""
+    if mes.month == 12:
+        return date(mes.year + 1, 1, 1)
+    return date(mes.year, mes.month + 1, 1)
+
+
+class NotaFiscalRollupService:
+    """
+    Mantém a tabela nf_monthly_rollup sincronizada com notas_fiscais/nf_itens.
+
+    A atualização é incremental por grupo (mês, contrato, fornecedor): quando uma NF
+    é criada, validada ou alterada, apenas os grupos afetados são recalculados a
+    partir das tabelas de fatos. NFs gravadas diretamente no banco pelo n8n entram
+    no agregado por sincronizar_pendentes (POST /nf/rollup/sync).
+    """
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    # === GRUPOS ===
+
+    @staticmethod
+    def grupo_da_nf(nf: NotaFiscal) -> Optional[Grupo]:
+        """Retorna o grupo de agregação de uma NF (ou None se incompleta)"""
+        if not nf.data_emissao or not nf.cnpj_fornecedor:
+            return None
+        return (inicio_mes(nf.data_emissao), nf.contrato_id, nf.cnpj_fornecedor)
+
+    def refresh_nfs(self, nfs: Iterable[NotaFiscal]) -> int:
+        """Recalcula os grupos das NFs informadas (estado atual)"""
+        return self.refresh_grupos(self.grupo_da_nf(nf) for nf in nfs)
+
+    def refresh_grupos(self, grupos: Iterable[Optional[Grupo]]) -> int:
+        """
+        Recalcula as linhas do agregado para os grupos informados.
+        Não faz commit: deve rodar na mesma transação da alteração da NF.
+        """
+        grupos_unicos = sorted({g for g in grupos if g is not None}, key=lambda g: (g[0], g[1] or 0, g[2]))
+        if not grupos_unicos:
+            return 0
+
+        # Garantir que as alterações pendentes da sessão entrem no recálculo
+        self.db.flush()
+        self._lock_grupos(grupos_unicos)
+
+        # Todos os grupos de uma vez: um DELETE, uma agregação e uma inserção
+        com_contrato = [(mes, contrato_id, cnpj) for mes, contrato_id, cnpj in grupos_unicos if contrato_id is not None]
+        sem_contrato = [(mes, cnpj) for mes, contrato_id, cnpj in grupos_unicos if contrato_id is None]
+        condicoes = []
+        if com_contrato:
+            condicoes.append(tuple_(
+                NotaFiscalRollupMensal.mes,
+                NotaFiscalRollupMensal.contrato_id,
+                NotaFiscalRollupMensal.cnpj_fornecedor
+            ).in_(com_contrato))
+        if sem_contrato:
+            condicoes.append(and_(
+                NotaFiscalRollupMensal.contrato_id.is_(None),
+                tuple_(NotaFiscalRollupMensal.mes, NotaFiscalRollupMensal.cnpj_fornecedor).in_(sem_contrato)
+            ))
+        self.db.query(NotaFiscalRollupMensal).filter(or_(*condicoes)).delete(synchronize_session=False)
+
+        # A agregação cobre o intervalo de meses, fornecedores e contratos dos grupos;
+        # linhas de combinações fora da lista são descartadas
+        contratos = {contrato_id for _, contrato_id, _ in com_contrato}
+        filtro_contrato = [NotaFiscal.contrato_id.in_(contratos)] if contratos else []
+        if sem_contrato:
+            filtro_contrato.append(NotaFiscal.contrato_id.is_(None))
+        filtros = [
+            NotaFiscal.data_emissao >= grupos_unicos[0][0],
+            NotaFiscal.data_emissao < proximo_mes(grupos_unicos[-1][0]),
+            NotaFiscal.cnpj_fornecedor.in_({cnpj for _, _, cnpj in grupos_unicos}),
+            or_(*filtro_contrato)
+        ]
+        grupos_set = set(grupos_unicos)
+        linhas = {
+            chave: medidas
+            for chave, medidas in self._agregar(filtros).items()
+            if chave[:3] in grupos_set
+        }
+        return self._inserir(linhas)
+
+    def sincronizar_pendentes(self) -> int:
+        """
+        Recalcula os grupos das NFs criadas ou alteradas (updated_at) desde a última
+        atualização do agregado. Cobre gravações feitas pelo n8n fora da API, desde
+        que elas preencham updated_at (o POST /nf/bulk preenche).
+
+        Limitação: o grupo é o do estado atual da NF. Uma alteração externa de mês,
+        contrato ou fornecedor deixa o grupo antigo desatualizado até um rebuild().
+        """
+        watermark = self.db.query(func.max(NotaFiscalRollupMensal.atualizado_em)).scalar()
+
+        query = self.db.query(
+            NotaFiscal.data_emissao,
+            NotaFiscal.contrato_id,
+            NotaFiscal.cnpj_fornecedor
+        )
+        if watermark:
+            desde = watermark - SYNC_MARGIN
+            query = query.filter(or_(NotaFiscal.created_at >= desde, NotaFiscal.updated_at >= desde))
+
+        grupos = {
+            (inicio_mes(data_emissao), contrato_id, cnpj)
+            for data_emissao, contrato_id, cnpj in query.all()
+            if data_emissao and cnpj
+        }
+        if not grupos:
+            return 0
+
+        linhas = self.refresh_grupos(grupos)
+        self.db.commit()
+        return linhas
+
+    def rebuild(self, data_inicio: Optional[date] = None, data_fim: Optional[date] = None) -> int:
+        """Reconstrói o agregado para um intervalo de meses (ou por completo)"""
+        delete_query = self.db.query(NotaFiscalRollupMensal)
+        filtros = []
+
+        if data_inicio:
+            mes_inicio = inicio_mes(data_inicio)
+            delete_query = delete_query.filter(NotaFiscalRollupMensal.mes >= mes_inicio)
+            filtros.append(NotaFiscal.data_emissao >= mes_inicio)
+
+        if data_fim:
+            mes_fim = proximo_mes(inicio_mes(data_fim))
+            delete_query = delete_query.filter(NotaFiscalRollupMensal.mes < mes_fim)
+            filtros.append(NotaFiscal.data_emissao < mes_fim)
+
+        delete_query.delete(synchronize_session=False)
+        linhas = self._inserir(self._agregar(filtros))
+        self.db.commit()
+        return linhas
+
+    # === LEITURA ===
+
+    def get_monthly_stats(self, desde: date, status: Optional[str] = None) -> List[Tuple[date, int, Decimal]]:
+        """Quantidade e valor de NFs por mês a partir de uma data"""
+        query = self.db.query(
+            NotaFiscalRollupMensal.mes,
+            func.sum(NotaFiscalRollupMensal.quantidade_nfs).label('count'),
+            func.sum(NotaFiscalRollupMensal.valor_total).label('value')
+        ).filter(
+            NotaFiscalRollupMensal.mes >= inicio_mes(desde)
+        )
+        if status:
+            query = query.filter(NotaFiscalRollupMensal.status_processamento == status)
+
+        return query.group_by(
+            NotaFiscalRollupMensal.mes
+        ).order_by(
+            NotaFiscalRollupMensal.mes.desc()
+        ).all()
+
+    def get_cost_center_totals(self, status: Optional[str] = 'validado') -> List[Tuple[int, int, Decimal]]:
+        """Quantidade e valor de itens por centro de custo"""
+        query = self.db.query(
+            NotaFiscalRollupMensal.centro_custo_id,
+            func.sum(NotaFiscalRollupMensal.quantidade_itens).label('total_itens'),
+            func.sum(NotaFiscalRollupMensal.valor_itens).label('valor_total')
+        ).filter(
+            NotaFiscalRollupMensal.centro_custo_id.isnot(None)
+        )
+        if status:
+            query = query.filter(NotaFiscalRollupMensal.status_processamento == status)
+
+        return query.group_by(NotaFiscalRollupMensal.centro_custo_id).all()
+
+    def get_contract_totals(self, contract_ids: Iterable[int], status: str = 'validado') -> Dict[int, Decimal]:
+        """Valor das NFs por contrato (padrão: valor realizado, NFs validadas)"""
+        contract_ids = set(contract_ids)
+        if not contract_ids:
+            return {}
+
+        totais = dict(self.db.query(
+            NotaFiscalRollupMensal.contrato_id,
+            func.sum(NotaFiscalRollupMensal.valor_total)
+        ).filter(
+            NotaFiscalRollupMensal.contrato_id.in_(contract_ids),
+            NotaFiscalRollupMensal.status_processamento == status
+        ).group_by(NotaFiscalRollupMensal.contrato_id).all())
+
+        return {contrato_id: Decimal(totais.get(contrato_id) or 0) for contrato_id in contract_ids}
+
+    def get_top_suppliers(
+        self,
+        limit: int = 5,
+        status: Optional[str] = None,
+        desde: Optional[date] = None
+    ) -> List[Tuple[str, str, int, Decimal]]:
+        """Fornecedores com maior valor em NFs"""
+        total = func.sum(NotaFiscalRollupMensal.valor_total).label('total')
+        query = self.db.query(
+            NotaFiscalRollupMensal.cnpj_fornecedor,
+            func.max(NotaFiscalRollupMensal.nome_fornecedor).label('nome'),
+            func.sum(NotaFiscalRollupMensal.quantidade_nfs).label('count'),
+            total
+        )
+        if status:
+            query = query.filter(NotaFiscalRollupMensal.status_processamento == status)
+        if desde:
+            query = query.filter(NotaFiscalRollupMensal.mes >= inicio_mes(desde))
+
+        return query.group_by(
+            NotaFiscalRollupMensal.cnpj_fornecedor
+        ).order_by(total.desc()).limit(limit).all()
+
+    # === AUXILIARES ===
+
+    def _lock_grupos(self, grupos: List[Grupo]) -> None:
+        """Serializa recálculos concorrentes dos mesmos grupos (apenas PostgreSQL)"""
+        if self.db.get_bind().dialect.name != "postgresql":
+            return
+        # Ordem fixa das chaves: duas transações com grupos em comum não entram em deadlock
+        chaves = sorted({
+            zlib.crc32(f"nf_rollup|{mes.isoformat()}|{contrato_id}|{cnpj}".encode())
+            for mes, contrato_id, cnpj in grupos
+        })
+        self.db.execute(text(
+            "SELECT count(pg_advisory_xact_lock(chave)) "
+            "FROM (SELECT unnest(CAST(:chaves AS bigint[])) AS chave ORDER BY 1) AS chaves"
+        ), {"chaves": chaves})
+
+    def _agregar(self, filtros: List[Any]) -> Dict[Tuple, Dict[str, Any]]:
+        """Agrega cabeçalhos e itens das NFs que atendem aos filtros"""
+        ano = extract('year', NotaFiscal.data_emissao)
+        mes = extract('month', NotaFiscal.data_emissao)
+
+        linhas: Dict[Tuple, Dict[str, Any]] = {}
+
+        def linha(ano_valor, mes_valor, contrato_id, cnpj, centro_custo_id, status, nome):
+            chave = (date(int(ano_valor), int(mes_valor), 1), contrato_id, cnpj, centro_custo_id, status)
+            if chave not in linhas:
+                linhas[chave] = {
+                    "nome_fornecedor": nome,
+                    "quantidade_nfs": 0,
+                    "valor_total": Decimal('0'),
+                    "quantidade_itens": 0,
+                    "valor_itens": Decimal('0')
+                }
+            return linhas[chave]
+
+        # Medidas de cabeçalho
+        cabecalhos = self.db.query(
+            ano, mes,
+            NotaFiscal.contrato_id,
+            NotaFiscal.cnpj_fornecedor,
+            NotaFiscal.status_processamento,
+            func.max(NotaFiscal.nome_fornecedor),
+            func.count(NotaFiscal.id),
+            func.sum(NotaFiscal.valor_total)
+        ).filter(*filtros).group_by(
+            ano, mes,
+            NotaFiscal.contrato_id,
+            NotaFiscal.cnpj_fornecedor,
+            NotaFiscal.status_processamento
+        ).all()
+
+        for ano_v, mes_v, contrato_id, cnpj, status, nome, quantidade, valor in cabecalhos:
+            registro = linha(ano_v, mes_v, contrato_id, cnpj, None, status, nome)
+            registro["quantidade_nfs"] += quantidade
+            registro["valor_total"] += Decimal(valor or 0)
+
+        # Medidas de itens por centro de custo
+        itens = self.db.query(
+            ano, mes,
+            NotaFiscal.contrato_id,
+            NotaFiscal.cnpj_fornecedor,
+            NotaFiscalItem.centro_custo_id,
+            NotaFiscal.status_processamento,
+            func.max(NotaFiscal.nome_fornecedor),
+            func.count(NotaFiscalItem.id),
+            func.sum(NotaFiscalItem.valor_total)
+        ).join(
+            NotaFiscalItem, NotaFiscalItem.nota_id == NotaFiscal.id
+        ).filter(*filtros).group_by(
+            ano, mes,
+            NotaFiscal.contrato_id,
+            NotaFiscal.cnpj_fornecedor,
+            NotaFiscalItem.centro_custo_id,
+            NotaFiscal.status_processamento
+        ).all()
+
+        for ano_v, mes_v, contrato_id, cnpj, centro_custo_id, status, nome, quantidade, valor in itens:
+            registro = linha(ano_v, mes_v, contrato_id, cnpj, centro_custo_id, status, nome)
+            registro["quantidade_itens"] += quantidade
+            registro["valor_itens"] += Decimal(valor or 0)
+
+        return linhas
+
+    def _inserir(self, linhas: Dict[Tuple, Dict[str, Any]]) -> int:
+        if not linhas:
+            return 0
+
+        self.db.bulk_insert_mappings(NotaFiscalRollupMensal, [
+            {
+                "mes": mes,
+                "contrato_id": contrato_id,
+                "cnpj_fornecedor": cnpj,
+                "centro_custo_id": centro_custo_id,
+                "status_processamento": status or 'processado',
+                **medidas
+            }
+            for (mes, contrato_id, cnpj, centro_custo_id, status), medidas in linhas.items()
+        ])
+        return len(linhas)
@@ -0,0 +1,122 @@
+"""Busca textual nos itens de Notas Fiscais (descrição, código do produto e NCM)"""
+
+import re
+from sqlalchemy.orm import Session, joinedload
+from sqlalchemy import text
+from typing import List, Optional, Tuple
+
+from app.models.notas_fiscais import NotaFiscalItem
+
+
+# Limite de termos por consulta (evita consultas patológicas)
+MAX_TERMS = 10
+
+def extrair_termos(consulta: str) -> List[str]:
+    """Palavras da consulta do usuário (sem operadores ou pontuação)"""
+    return re.findall(r"\w+", consulta.lower())[:MAX_TERMS]
+
+
+class NotaFiscalItemSearchService:
+    """
+    Busca ranqueada em nf_itens.
+
+    PostgreSQL: coluna gerada nf_itens.busca (tsvector, configuração
+    portuguese_unaccent) com índice GIN, criada pela migração d9b3c6e2f4a8.
+    SQLite: tabela virtual FTS5 nf_itens_fts mantida por triggers, criada junto
+    com a tabela nf_itens (NF_ITENS_FTS_SQLITE_DDL) ou pela mesma migração.
+    Todos os termos são obrigatórios e casam por prefixo.
+    """
+
+    def __init__(self, db: Session):
+        self.db = db
+        self.dialect = db.get_bind().dialect.name
+
+    def search(
+        self,
+        consulta: str,
+        skip: int = 0,
+        limit: int = 20,
+        contract_id: Optional[int] = None
+    ) -> Tuple[List[Tuple[NotaFiscalItem, float]], int]:
+        """Retorna ([(item, relevância)], total) ordenados pela relevância"""
+        termos = extrair_termos(consulta)
+        if not termos:
+            return [], 0
+
+        if self.dialect == "postgresql":
+            ranking, total = self._search_postgres(termos, skip, limit, contract_id)
+        else:
+            ranking, total = self._search_sqlite(termos, skip, limit, contract_id)
+
+        if not ranking:
+            return [], total
+
+        ids = [item_id for item_id, _ in ranking]
+        itens = {
+            item.id: item
+            for item in self.db.query(NotaFiscalItem).options(
+                joinedload(NotaFiscalItem.nota_fiscal),
+                joinedload(NotaFiscalItem.centro_custo)
+            ).filter(NotaFiscalItem.id.in_(ids)).all()
+        }
+
+        return [(itens[item_id], rank) for item_id, rank in ranking if item_id in itens], total
+
+    # === AUXILIARES ===
+
+    def _search_postgres(self, termos, skip, limit, contract_id):
+        params = {
+            "consulta": " & ".join(f"{termo}:*" for termo in termos),
+            "skip": skip,
+            "limit": limit
+        }
+        filtro_contrato = ""
+        if contract_id is not None:
+            filtro_contrato = "AND i.nota_id IN (SELECT id FROM notas_fiscais WHERE contrato_id = :contract_id)"
+            params["contract_id"] = contract_id
+
+        base = f"""
+            FROM nf_itens i,
+                 to_tsquery('portuguese_unaccent', :consulta) AS q
+            WHERE i.busca @@ q {filtro_contrato}
+        """
+
+        total = self.db.execute(text(f"SELECT count(*) {base}"), params).scalar()
+        ranking = self.db.execute(text(f"""
+            SELECT i.id, ts_rank_cd(i.busca, q) AS rank
+            {base}
+            ORDER BY rank DESC, i.id
+            LIMIT :limit OFFSET :skip
+        """), params).all()
+
+        return [(item_id, float(rank)) for item_id, rank in ranking], total
+
+    def _search_sqlite(self, termos, skip, limit, contract_id):
+        params = {
+            "consulta": " ".join(f'"{termo}"*' for termo in termos),
+            "skip": skip,
+            "limit": limit
+        }
+        filtro_contrato = ""
+        if contract_id is not None:
+            filtro_contrato = """
+                AND nf_itens_fts.rowid IN (
+                    SELECT i.id FROM nf_itens i
+                    JOIN notas_fiscais nf ON nf.id = i.nota_id
+                    WHERE nf.contrato_id = :contract_id
+                )
+            """
+            params["contract_id"] = contract_id
+
+        base = f"FROM nf_itens_fts WHERE nf_itens_fts MATCH :consulta {filtro_contrato}"
+
+        total = self.db.execute(text(f"SELECT count(*) {base}"), params).scalar()
+        ranking = self.db.execute(text(f"""
+            SELECT nf_itens_fts.rowid, bm25(nf_itens_fts) AS rank
+            {base}
+            ORDER BY rank, nf_itens_fts.rowid
+            LIMIT :limit OFFSET :skip
+        """), params).all()
+
+        # bm25 é menor para os mais relevantes: inverter o sinal para manter "maior é melhor"
+        return [(item_id, -float(rank)) for item_id, rank in ranking], total
@@ -0,0 +1,176 @@
+"""
+Serializadores de linhas de Notas Fiscais e itens para as respostas da API.
+
+Cada serializador declara as colunas consultadas e a conversão de cada valor
+(Decimal -> float, datas -> texto). A função que transforma a linha (tupla do
+resultado) em dict é gerada uma única vez, na importação, com as conversões
+escritas em linha: sem getattr por atributo do model nem chamadas por campo.
+
+    rows = db.query(*NF_LIST.columns).select_from(NotaFiscal).all()
+    nfs = NF_LIST.many(rows)
+"""
+
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from sqlalchemy import func, select
+
+from app.models.contracts import Contract
+from app.models.cost_centers import CostCenter
+from app.models.notas_fiscais import NotaFiscal, NotaFiscalItem
+
+
+# Conversões ({v} é o valor da coluna); mesmas regras usadas nos endpoints de NF
+NUMBER_OR_ZERO = "float({v}) if {v} else 0"
+NUMBER_OR_NONE = "float({v}) if {v} else None"
+DATE = "{v}.strftime('%Y-%m-%d') if {v} else None"
+ISO = "{v}.isoformat() if {v} else None"
+
+# (chave no JSON, coluna, conversão); chave None: coluna consultada mas não serializada
+Field = Tuple[Optional[str], Any, Optional[str]]
+
+
+class RowSerializer:
+    """Converte linhas de uma consulta em dicts com uma função gerada a partir dos campos"""
+
+    def __init__(self, name: str, fields: Sequence[Field]):
+        self.name = name
+        self.columns = [column for _, column, _ in fields]
+
+        variables = [f"v{i}" for i in range(len(fields))]
+        entries = [
+            f"{key!r}: {(conversion or '{v}').format(v=variable)}"
+            for variable, (key, _, conversion) in zip(variables, fields)
+            if key is not None
+        ]
+        source = (
+            f"def {name}(row):\n"
+            f"    {', '.join(variables)}, = row\n"
+            f"    return {{{', '.join(entries)}}}\n"
+        )
+        namespace: Dict[str, Any] = {}
+        exec(compile(source, f"<serializer {name}>", "exec"), namespace)
+        self.serialize = namespace[name]
+
+    def many(self, rows: Iterable[Sequence[Any]]) -> List[Dict[str, Any]]:
+        return list(map(self.serialize, rows))
+
+
+def items_count_column():
+    """Quantidade de itens da NF (subconsulta correlacionada)"""
+    return (
+        select(func.count(NotaFiscalItem.id))
+        .where(NotaFiscalItem.nota_id == NotaFiscal.id)
+        .correlate(NotaFiscal)
+        .scalar_subquery()
+    )
+
+
+# GET /nf (contrato via LEFT JOIN em Contract)
+NF_LIST = RowSerializer("serialize_nf_list", [
+    ("id", NotaFiscal.id, None),
+    ("number", NotaFiscal.numero, None),
+    ("series", NotaFiscal.serie, None),
+    ("supplier", NotaFiscal.nome_fornecedor, None),
+    ("contract", Contract.nome_projeto, None),
+    ("contract_id", NotaFiscal.contrato_id, None),
+    ("valor_total", NotaFiscal.valor_total, NUMBER_OR_ZERO),
+    ("date", NotaFiscal.data_emissao, DATE),
+    ("status", NotaFiscal.status_processamento, None),
+    ("pasta_origem", NotaFiscal.pasta_origem, None),
+    ("subpasta", NotaFiscal.subpasta, None),
+    ("chave_acesso", NotaFiscal.chave_acesso, None),
+    ("items_count", items_count_column(), None),
+    ("processed_at", NotaFiscal.processed_by_n8n_at, ISO),
+])
+
+# GET /nf/{nf_id} (contrato via LEFT JOIN em Contract)
+NF_DETAIL = RowSerializer("serialize_nf_detail", [
+    ("id", NotaFiscal.id, None),
+    ("number", NotaFiscal.numero, None),
+    ("series", NotaFiscal.serie, None),
+    ("chave_acesso", NotaFiscal.chave_acesso, None),
+    ("supplier", NotaFiscal.nome_fornecedor, None),
+    ("cnpj_fornecedor", NotaFiscal.cnpj_fornecedor, None),
+    ("contract", Contract.nome_projeto, None),
+    ("contract_id", NotaFiscal.contrato_id, None),
+    ("value", NotaFiscal.valor_total, NUMBER_OR_ZERO),
+    ("valor_produtos", NotaFiscal.valor_produtos, NUMBER_OR_ZERO),
+    ("valor_impostos", NotaFiscal.valor_impostos, NUMBER_OR_ZERO),
+    ("valor_frete", NotaFiscal.valor_frete, NUMBER_OR_ZERO),
+    ("date", NotaFiscal.data_emissao, DATE),
+    ("data_entrada", NotaFiscal.data_entrada, DATE),
+    ("status", NotaFiscal.status_processamento, None),
+    ("pasta_origem", NotaFiscal.pasta_origem, None),
+    ("subpasta", NotaFiscal.subpasta, None),
+    ("observacoes", NotaFiscal.observacoes, None),
+    ("ordem_compra_id", NotaFiscal.ordem_compra_id, None),
+    ("processed_at", NotaFiscal.processed_by_n8n_at, ISO),
+    ("created_at", NotaFiscal.created_at, ISO),
+])
+
+# Itens de GET /nf/{nf_id} (centro de custo via LEFT JOIN em CostCenter)
+NF_ITEM_DETAIL = RowSerializer("serialize_nf_item_detail", [
+    ("id", NotaFiscalItem.id, None),
+    ("numero_item", NotaFiscalItem.numero_item, None),
+    ("codigo_produto", NotaFiscalItem.codigo_produto, None),
+    ("description", NotaFiscalItem.descricao, None),
+    ("quantity", NotaFiscalItem.quantidade, NUMBER_OR_ZERO),
+    ("unitValue", NotaFiscalItem.valor_unitario, NUMBER_OR_ZERO),
+    ("totalValue", NotaFiscalItem.valor_total, NUMBER_OR_ZERO),
+    ("unit", NotaFiscalItem.unidade, None),
+    ("peso_liquido", NotaFiscalItem.peso_liquido, NUMBER_OR_NONE),
+    ("peso_bruto", NotaFiscalItem.peso_bruto, NUMBER_OR_NONE),
+    ("ncm", NotaFiscalItem.ncm, None),
+    ("centro_custo_id", NotaFiscalItem.centro_custo_id, None),
+    ("centro_custo", CostCenter.nome, None),
+    ("item_orcamento_id", NotaFiscalItem.item_orcamento_id, None),
+    ("classificationScore", NotaFiscalItem.score_classificacao, NUMBER_OR_NONE),
+    ("classificationSource", NotaFiscalItem.fonte_classificacao, None),
+    ("status_integracao", NotaFiscalItem.status_integracao, None),
+    ("integrado_em", NotaFiscalItem.integrado_em, ISO),
+])
+
+# GET /nf/contract/{contract_id}/detailed
+NF_CONTRACT_DETAIL = RowSerializer("serialize_nf_contract_detail", [
+    ("id", NotaFiscal.id, None),
+    ("numero", NotaFiscal.numero, None),
+    ("serie", NotaFiscal.serie, None),
+    ("chave_acesso", NotaFiscal.chave_acesso, None),
+    ("fornecedor", NotaFiscal.nome_fornecedor, None),
+    ("cnpj_fornecedor", NotaFiscal.cnpj_fornecedor, None),
+    ("valor_total", NotaFiscal.valor_total, NUMBER_OR_ZERO),
+    ("valor_produtos", NotaFiscal.valor_produtos, NUMBER_OR_ZERO),
+    ("valor_impostos", NotaFiscal.valor_impostos, NUMBER_OR_ZERO),
+    ("valor_frete", NotaFiscal.valor_frete, NUMBER_OR_ZERO),
+    ("data_emissao", NotaFiscal.data_emissao, DATE),
+    ("data_entrada", NotaFiscal.data_entrada, DATE),
+    ("status_processamento", NotaFiscal.status_processamento, None),
+    ("pasta_origem", NotaFiscal.pasta_origem, None),
+    ("subpasta", NotaFiscal.subpasta, None),
+    ("observacoes", NotaFiscal.observacoes, None),
+    ("created_at", NotaFiscal.created_at, ISO),
+    ("processed_at", NotaFiscal.processed_by_n8n_at, ISO),
+])
+
+# Itens de GET /nf/contract/{contract_id}/detailed (nota_id usado para agrupar por NF)
+NF_ITEM_CONTRACT_DETAIL = RowSerializer("serialize_nf_item_contract_detail", [
+    (None, NotaFiscalItem.nota_id, None),
+    ("id", NotaFiscalItem.id, None),
+    ("numero_item", NotaFiscalItem.numero_item, None),
+    ("codigo_produto", NotaFiscalItem.codigo_produto, None),
+    ("descricao", NotaFiscalItem.descricao, None),
+    ("ncm", NotaFiscalItem.ncm, None),
+    ("quantidade", NotaFiscalItem.quantidade, NUMBER_OR_ZERO),
+    ("unidade", NotaFiscalItem.unidade, None),
+    ("valor_unitario", NotaFiscalItem.valor_unitario, NUMBER_OR_ZERO),
+    ("valor_total", NotaFiscalItem.valor_total, NUMBER_OR_ZERO),
+    ("peso_liquido", NotaFiscalItem.peso_liquido, NUMBER_OR_NONE),
+    ("peso_bruto", NotaFiscalItem.peso_bruto, NUMBER_OR_NONE),
+    ("centro_custo_id", NotaFiscalItem.centro_custo_id, None),
+    ("centro_custo", CostCenter.nome, None),
+    ("item_orcamento_id", NotaFiscalItem.item_orcamento_id, None),
+    ("score_classificacao", NotaFiscalItem.score_classificacao, NUMBER_OR_NONE),
+    ("fonte_classificacao", NotaFiscalItem.fonte_classificacao, None),
+    ("status_integracao", NotaFiscalItem.status_integracao, None),
+    ("integrado_em", NotaFiscalItem.integrado_em, ISO),
+])
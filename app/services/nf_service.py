@@ -1,8 +1,8 @@
 """Serviço de negócio para Notas Fiscais"""
 
 from sqlalchemy.orm import Session
-from sqlalchemy import func, extract, and_
-from typing import List, Optional, Dict, Any
+from sqlalchemy import func, extract, and_, case
+from typing import List, Optional, Dict, Any, Iterator
 from decimal import Decimal
 from datetime import datetime, timedelta
 from fastapi import HTTPException, status
@@ -11,6 +11,16 @@ from app.models.notas_fiscais import NotaFiscal, NotaFiscalItem, ProcessamentoLo
 from app.models.contracts import Contract
 from app.models.purchases import PurchaseOrder
 from app.models.cost_centers import CostCenter
+from app.core.metrics import record_item_classified
+from app.services.nf_rollup_service import NotaFiscalRollupService, inicio_mes
+from app.services.nf_events import (
+    publish_nf_change,
+    publish_contract_totals,
+    NF_CREATED,
+    NF_UPDATED,
+    NF_DELETED,
+    NF_STATUS_EVENTS
+)
 from app.schemas.notas_fiscais import (
     NotaFiscalCreate,
     NotaFiscalUpdate,
@@ -23,6 +33,7 @@ from app.schemas.notas_fiscais import (
 class NotaFiscalService:
     def __init__(self, db: Session):
         self.db = db
+        self.rollup = NotaFiscalRollupService(db)
 
     # === NOTAS FISCAIS ===
 
@@ -40,7 +51,7 @@ class NotaFiscalService:
 
         # Aplicar filtros
         if status_filter:
-            query = query.filter(NotaFiscal.status_processamento.ilike(f"%{status_filter}%"))
+            query = query.filter(NotaFiscal.status_processamento == status_filter)
 
         if supplier:
             query = query.filter(NotaFiscal.nome_fornecedor.ilike(f"%{supplier}%"))
@@ -100,13 +111,17 @@ class NotaFiscalService:
         if nf_data.itens:
             for item_data in nf_data.itens:
                 item_dict = item_data.dict()
-                item_dict['nota_fiscal_id'] = nf.id
+                item_dict['nota_id'] = nf.id
                 item = NotaFiscalItem(**item_dict)
                 self.db.add(item)
 
             self.db.commit()
             self.db.refresh(nf)
 
+        self.rollup.refresh_nfs([nf])
+        publish_nf_change(self.db, NF_CREATED, [nf.id])
+        self.db.commit()
+
         return nf
 
     def update_nota_fiscal(self, nf_id: int, nf_data: NotaFiscalUpdate) -> Optional[NotaFiscal]:
@@ -115,11 +130,15 @@ class NotaFiscalService:
         if not nf:
             return None
 
+        grupo_anterior = self.rollup.grupo_da_nf(nf)
+
         # Atualizar campos fornecidos
         for field, value in nf_data.dict(exclude_unset=True).items():
             setattr(nf, field, value)
 
         nf.updated_at = datetime.now()
+        self.rollup.refresh_grupos([grupo_anterior, self.rollup.grupo_da_nf(nf)])
+        publish_nf_change(self.db, NF_UPDATED, [nf.id])
         self.db.commit()
         self.db.refresh(nf)
 
@@ -131,7 +150,10 @@ class NotaFiscalService:
         if not nf:
             return False
 
+        grupo = self.rollup.grupo_da_nf(nf)
         self.db.delete(nf)
+        self.rollup.refresh_grupos([grupo])
+        publish_nf_change(self.db, NF_DELETED, [nf_id])
         self.db.commit()
         return True
 
@@ -156,6 +178,7 @@ class NotaFiscalService:
             setattr(item, field, value)
 
         item.updated_at = datetime.now()
+        self.rollup.refresh_nfs([item.nota_fiscal])
         self.db.commit()
         self.db.refresh(item)
 
@@ -179,13 +202,114 @@ class NotaFiscalService:
         item.updated_at = datetime.now()
 
         # Atualizar nota fiscal com contrato
+        grupo_anterior = self.rollup.grupo_da_nf(item.nota_fiscal)
         if item.nota_fiscal.contrato_id != contrato_id:
             item.nota_fiscal.contrato_id = contrato_id
             item.nota_fiscal.updated_at = datetime.now()
 
+        self.rollup.refresh_grupos([grupo_anterior, self.rollup.grupo_da_nf(item.nota_fiscal)])
         self.db.commit()
         return True
 
+    # === VALIDAÇÃO EM LOTE ===
+
+    def change_status_batch(
+        self,
+        nf_ids: List[int],
+        novo_status: str,
+        motivo: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Valida ('validado') ou rejeita ('erro') várias NFs numa única transação.
+
+        As alterações são UPDATEs por conjunto em notas_fiscais e nf_itens (itens
+        pendentes das NFs com contrato passam a integrados na validação e voltam a
+        pendentes na rejeição). A variação do valor realizado de cada contrato vem
+        da leitura inicial das NFs; o total atualizado é lido do agregado mensal.
+        """
+        ids = list(dict.fromkeys(nf_ids))
+        agora = datetime.now()
+
+        nfs = self.db.query(
+            NotaFiscal.id,
+            NotaFiscal.status_processamento,
+            NotaFiscal.contrato_id,
+            NotaFiscal.valor_total,
+            NotaFiscal.data_emissao,
+            NotaFiscal.cnpj_fornecedor
+        ).filter(NotaFiscal.id.in_(ids)).all()
+
+        encontradas = {nf.id for nf in nfs}
+        alteradas = [nf for nf in nfs if nf.status_processamento != novo_status]
+        alterar_ids = [nf.id for nf in alteradas]
+
+        # Variação do valor realizado (NFs validadas) por contrato
+        deltas: Dict[int, Decimal] = {}
+        for nf in alteradas:
+            if nf.contrato_id is None or 'validado' not in (novo_status, nf.status_processamento):
+                continue
+            sinal = 1 if novo_status == 'validado' else -1
+            deltas[nf.contrato_id] = deltas.get(nf.contrato_id, Decimal('0')) + sinal * Decimal(nf.valor_total or 0)
+
+        itens_atualizados = 0
+        if alterar_ids:
+            valores = {"status_processamento": novo_status, "updated_at": agora}
+            if motivo:
+                valores["observacoes"] = func.coalesce(NotaFiscal.observacoes + "\n", "") + motivo
+            self.db.query(NotaFiscal).filter(
+                NotaFiscal.id.in_(alterar_ids)
+            ).update(valores, synchronize_session=False)
+
+            com_contrato = [nf.id for nf in alteradas if nf.contrato_id is not None]
+            if com_contrato and novo_status == 'validado':
+                itens_atualizados = self.db.query(NotaFiscalItem).filter(
+                    NotaFiscalItem.nota_id.in_(com_contrato),
+                    NotaFiscalItem.status_integracao == 'pendente'
+                ).update({
+                    "status_integracao": 'integrado',
+                    "integrado_em": agora,
+                    "updated_at": agora
+                }, synchronize_session=False)
+            elif com_contrato and novo_status == 'erro':
+                itens_atualizados = self.db.query(NotaFiscalItem).filter(
+                    NotaFiscalItem.nota_id.in_(com_contrato),
+                    NotaFiscalItem.status_integracao == 'integrado'
+                ).update({
+                    "status_integracao": 'pendente',
+                    "integrado_em": None,
+                    "updated_at": agora
+                }, synchronize_session=False)
+
+            self.rollup.refresh_grupos(
+                (inicio_mes(nf.data_emissao), nf.contrato_id, nf.cnpj_fornecedor)
+                for nf in alteradas if nf.data_emissao and nf.cnpj_fornecedor
+            )
+
+        # Totais lidos na transação (o agregado já reflete a alteração) para irem no evento
+        contratos = {nf.contrato_id for nf in nfs if nf.contrato_id is not None}
+        totais = self.rollup.get_contract_totals(contratos)
+        resumo_contratos = [
+            {
+                "contrato_id": contrato_id,
+                "delta_valor_realizado": float(deltas.get(contrato_id, 0)),
+                "valor_realizado": float(totais[contrato_id])
+            }
+            for contrato_id in sorted(contratos)
+        ]
+
+        publish_nf_change(self.db, NF_STATUS_EVENTS.get(novo_status, NF_UPDATED), alterar_ids)
+        publish_contract_totals(self.db, [c for c in resumo_contratos if c["delta_valor_realizado"]])
+        self.db.commit()
+
+        return {
+            "requested": len(ids),
+            "updated": len(alterar_ids),
+            "unchanged": len(nfs) - len(alterar_ids),
+            "not_found": [nf_id for nf_id in ids if nf_id not in encontradas],
+            "items_updated": itens_atualizados,
+            "contracts": resumo_contratos
+        }
+
     # === ESTATÍSTICAS ===
 
     def get_statistics(self) -> Dict[str, Any]:
@@ -206,23 +330,11 @@ class NotaFiscalService:
         total_value_result = self.db.query(func.sum(NotaFiscal.valor_total)).scalar()
         total_value = float(total_value_result) if total_value_result else 0
 
-        # Estatísticas mensais dos últimos 12 meses
+        # Estatísticas mensais dos últimos 12 meses (agregado nf_monthly_rollup,
+        # atualizado nas gravações e por POST /nf/rollup/sync)
         twelve_months_ago = datetime.now() - timedelta(days=365)
 
-        monthly_stats = self.db.query(
-            extract('month', NotaFiscal.data_emissao).label('month'),
-            extract('year', NotaFiscal.data_emissao).label('year'),
-            func.count(NotaFiscal.id).label('count'),
-            func.sum(NotaFiscal.valor_total).label('value')
-        ).filter(
-            NotaFiscal.data_emissao >= twelve_months_ago
-        ).group_by(
-            extract('month', NotaFiscal.data_emissao),
-            extract('year', NotaFiscal.data_emissao)
-        ).order_by(
-            extract('year', NotaFiscal.data_emissao).desc(),
-            extract('month', NotaFiscal.data_emissao).desc()
-        ).all()
+        monthly_stats = self.rollup.get_monthly_stats(twelve_months_ago)
 
         # Converter nomes dos meses
         month_names = {
@@ -231,14 +343,24 @@ class NotaFiscalService:
         }
 
         monthly_data = []
-        for month, year, count, value in monthly_stats:
+        for mes, count, value in monthly_stats:
             monthly_data.append({
-                "month": month_names.get(int(month), f"Mês {month}"),
-                "year": int(year),
-                "count": count,
+                "month": month_names.get(mes.month, f"Mês {mes.month}"),
+                "year": mes.year,
+                "count": int(count or 0),
                 "value": float(value) if value else 0
             })
 
+        top_suppliers = [
+            {
+                "cnpj": cnpj,
+                "nome": nome,
+                "count": int(count or 0),
+                "value": float(total or 0)
+            }
+            for cnpj, nome, count, total in self.rollup.get_top_suppliers(limit=5, desde=twelve_months_ago)
+        ]
+
         return {
             "total_nfs": total_nfs,
             "pending_validation": status_distribution.get("processado", 0),
@@ -246,6 +368,7 @@ class NotaFiscalService:
             "rejected": status_distribution.get("erro", 0),
             "total_value": total_value,
             "monthly_stats": monthly_data,
+            "top_suppliers": top_suppliers,
             "status_distribution": status_distribution
         }
 
@@ -364,9 +487,12 @@ class NotaFiscalService:
                     item.score_classificacao = Decimal(str(min(95, best_score * 20)))
                     item.fonte_classificacao = 'ai'
                     item.updated_at = datetime.now()
+                    self.rollup.refresh_nfs([item.nota_fiscal])
                     self.db.commit()
+                    record_item_classified('nf', True)
                     return center.id
 
+        record_item_classified('nf', False)
         return None
 
     # === KPIS AGREGADOS ===
@@ -412,24 +538,19 @@ class NotaFiscalService:
         # Valor médio por NF
         valor_medio_nf = float(total_valor_validado) / nfs_validadas if nfs_validadas > 0 else 0
 
-        # Estatísticas por centro de custo
-        centros_custo_stats = self.db.query(
-            CostCenter.nome,
-            func.count(NotaFiscalItem.id).label('total_itens'),
-            func.sum(NotaFiscalItem.valor_total).label('valor_total')
-        ).join(
-            NotaFiscalItem, CostCenter.id == NotaFiscalItem.centro_custo_id
-        ).join(
-            NotaFiscal, NotaFiscalItem.nota_fiscal_id == NotaFiscal.id
-        ).filter(
-            NotaFiscal.status_processamento == 'validado'
-        ).group_by(CostCenter.nome).all()
+        # Estatísticas por centro de custo (agregado nf_monthly_rollup)
+        centros_custo_stats = self.rollup.get_cost_center_totals(status='validado')
+        nomes_centros = dict(
+            self.db.query(CostCenter.id, CostCenter.nome).filter(
+                CostCenter.id.in_([centro_id for centro_id, _, _ in centros_custo_stats])
+            ).all()
+        ) if centros_custo_stats else {}
 
         centros_custo_data = []
-        for nome, total_itens, valor_total in centros_custo_stats:
+        for centro_id, total_itens, valor_total in centros_custo_stats:
             centros_custo_data.append({
-                "nome": nome,
-                "total_itens": total_itens,
+                "nome": nomes_centros.get(centro_id, f"Centro {centro_id}"),
+                "total_itens": int(total_itens or 0),
                 "valor_total": float(valor_total or 0)
             })
 
@@ -457,43 +578,64 @@ class NotaFiscalService:
             "generated_at": datetime.now().isoformat()
         }
 
-    def get_contracts_summary_with_nfs(self) -> List[Dict[str, Any]]:
-        """Retorna sumário de todos os contratos com informações das NFs"""
-
-        contracts = self.db.query(Contract).all()
-        contracts_summary = []
-
-        for contract in contracts:
-            # Buscar NFs do contrato
-            nfs_count = self.db.query(NotaFiscal).filter(
-                NotaFiscal.contrato_id == contract.id
-            ).count()
-
-            nfs_validadas = self.db.query(NotaFiscal).filter(
-                and_(
-                    NotaFiscal.contrato_id == contract.id,
-                    NotaFiscal.status_processamento == 'validado'
-                )
-            ).count()
-
-            # Calcular valor realizado
-            valor_realizado = self.calculate_contract_realized_value(contract.id)
-
-            contracts_summary.append({
-                "id": contract.id,
-                "numero_contrato": contract.numero_contrato,
-                "nome_projeto": contract.nome_projeto,
-                "cliente": contract.cliente,
-                "valor_original": float(contract.valor_original),
-                "valor_realizado": float(valor_realizado),
-                "percentual_realizado": (float(valor_realizado) / float(contract.valor_original) * 100) if contract.valor_original > 0 else 0,
-                "saldo_restante": float(contract.valor_original) - float(valor_realizado),
-                "status": contract.status,
+    def get_contracts_summary_with_nfs(self, stream: bool = False):
+        """
+        Retorna sumário de todos os contratos com informações das NFs
+
+        Uma única consulta (LEFT JOIN com as NFs agregadas por contrato) com
+        contagens e somas condicionais. Com stream=True retorna um gerador que
+        entrega cada contrato à medida que as linhas chegam do banco.
+        """
+        rows = self._iter_contracts_summary_with_nfs()
+        return rows if stream else list(rows)
+
+    def _iter_contracts_summary_with_nfs(self, batch_size: int = 500) -> Iterator[Dict[str, Any]]:
+        validada = NotaFiscal.status_processamento == 'validado'
+        nfs_por_contrato = self.db.query(
+            NotaFiscal.contrato_id.label('contrato_id'),
+            func.count(NotaFiscal.id).label('total_nfs'),
+            func.sum(case((validada, 1), else_=0)).label('nfs_validadas'),
+            func.sum(case((validada, NotaFiscal.valor_total), else_=0)).label('valor_realizado')
+        ).filter(
+            NotaFiscal.contrato_id.isnot(None)
+        ).group_by(NotaFiscal.contrato_id).subquery()
+
+        query = self.db.query(
+            Contract.id,
+            Contract.numero_contrato,
+            Contract.nome_projeto,
+            Contract.cliente,
+            Contract.valor_original,
+            Contract.status,
+            Contract.data_inicio,
+            Contract.data_fim_prevista,
+            func.coalesce(nfs_por_contrato.c.total_nfs, 0),
+            func.coalesce(nfs_por_contrato.c.nfs_validadas, 0),
+            func.coalesce(nfs_por_contrato.c.valor_realizado, 0)
+        ).outerjoin(
+            nfs_por_contrato, nfs_por_contrato.c.contrato_id == Contract.id
+        ).order_by(Contract.id).yield_per(batch_size)
+
+        for (contract_id, numero_contrato, nome_projeto, cliente, valor_original, contract_status,
+             data_inicio, data_fim_prevista, nfs_count, nfs_validadas, valor_realizado) in query:
+            valor_original = float(valor_original or 0)
+            valor_realizado = float(valor_realizado or 0)
+            nfs_count = int(nfs_count)
+            nfs_validadas = int(nfs_validadas)
+
+            yield {
+                "id": contract_id,
+                "numero_contrato": numero_contrato,
+                "nome_projeto": nome_projeto,
+                "cliente": cliente,
+                "valor_original": valor_original,
+                "valor_realizado": valor_realizado,
+                "percentual_realizado": (valor_realizado / valor_original * 100) if valor_original > 0 else 0,
+                "saldo_restante": valor_original - valor_realizado,
+                "status": contract_status,
                 "total_nfs": nfs_count,
                 "nfs_validadas": nfs_validadas,
                 "nfs_pendentes": nfs_count - nfs_validadas,
-                "data_inicio": contract.data_inicio.strftime("%Y-%m-%d") if contract.data_inicio else None,
-                "data_fim_prevista": contract.data_fim_prevista.strftime("%Y-%m-%d") if contract.data_fim_prevista else None
-            })
-
-        return contracts_summary
\ No newline at end of file
+                "data_inicio": data_inicio.strftime("%Y-%m-%d") if data_inicio else None,
+                "data_fim_prevista": data_fim_prevista.strftime("%Y-%m-%d") if data_fim_prevista else None
+            }
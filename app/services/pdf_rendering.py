@@ -0,0 +1,278 @@
+"""Renderização de PDFs (ReportLab) em um pool de processos, fora do event loop, com escrita em partes"""
+
+from io import BytesIO
+from itertools import islice
+from typing import Any, Dict, Iterable, Iterator, Optional, Sequence, Union
+from datetime import datetime
+
+from reportlab.lib.pagesizes import A4
+from reportlab.lib import colors
+from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, Flowable
+from reportlab.lib.units import inch
+
+from app.schemas.reports import AnalyticalReport, ContractBalanceReport
+from app.services.render_pool import (  # noqa: F401
+    get_render_pool, read_spool, render, render_async, shutdown_render_pool
+)
+
+
+# === ESCRITA EM PARTES ===
+
+# Margens padrão do SimpleDocTemplate (1 polegada)
+PAGE_MARGIN = inch
+
+# Padding padrão do Frame do SimpleDocTemplate (6pt em cada lado)
+FRAME_PADDING = 6
+
+
+class FlowableStream(list):
+    """
+    Lista de flowables alimentada sob demanda por um gerador.
+
+    O laço do doc.build consome a lista pela frente (del flowables[0]) e consulta
+    len() a cada iteração; aqui len() repõe o buffer a partir do gerador, de modo
+    que apenas alguns flowables existem em memória ao mesmo tempo.
+    """
+
+    def __init__(self, source: Iterable[Flowable], prefetch: int = 4):
+        super().__init__()
+        self._source: Optional[Iterator[Flowable]] = iter(source)
+        self._prefetch = prefetch
+        self._fill()
+
+    def _fill(self) -> None:
+        while self._source is not None and list.__len__(self) < self._prefetch:
+            try:
+                self.append(next(self._source))
+            except StopIteration:
+                self._source = None
+
+    def __len__(self) -> int:
+        self._fill()
+        return list.__len__(self)
+
+
+def rows_per_page(row_height: float, header_height: float, pagesize=A4) -> int:
+    """Quantidade de linhas de altura fixa que cabem em uma página"""
+    usable = pagesize[1] - 2 * PAGE_MARGIN - 2 * FRAME_PADDING - header_height
+    return max(1, int(usable // row_height))
+
+
+def table_chunks(
+    headers: Sequence[str],
+    rows: Iterable[Sequence[Any]],
+    col_widths: Sequence[float],
+    style: Sequence[tuple],
+    row_height: float,
+    header_height: float,
+    chunk_size: Optional[int] = None
+) -> Iterator[Table]:
+    """
+    Divide as linhas em tabelas do tamanho de uma página, repetindo o cabeçalho.
+    Larguras e alturas fixas evitam que o ReportLab meça todas as células, então o
+    custo por página é constante.
+    """
+    chunk_size = chunk_size or rows_per_page(row_height, header_height)
+    rows = iter(rows)
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            return
+        table = Table(
+            [list(headers)] + chunk,
+            colWidths=col_widths,
+            rowHeights=[header_height] + [row_height] * len(chunk),
+            repeatRows=1
+        )
+        table.setStyle(TableStyle(list(style)))
+        yield table
+
+
+def write_pdf(target: Union[str, BytesIO], flowables: Iterable[Flowable], pagesize=A4) -> None:
+    """Gera o PDF consumindo os flowables de forma incremental"""
+    doc = SimpleDocTemplate(target, pagesize=pagesize)
+    doc.build(FlowableStream(flowables))
+
+
+def _truncate(value: Any, limit: int) -> str:
+    text = "" if value is None else str(value)
+    return text[:limit] + "..." if len(text) > limit else text
+
+
+# === RENDERIZADORES (executados nos processos do pool) ===
+
+ANALYTICAL_TABLE_STYLE = [
+    ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
+    ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+    ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+    ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+    ('FONTSIZE', (0, 0), (-1, 0), 8),
+    ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
+    ('FONTSIZE', (0, 1), (-1, -1), 7),
+    ('GRID', (0, 0), (-1, -1), 1, colors.black)
+]
+
+BALANCE_TABLE_STYLE = [
+    ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
+    ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+    ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+    ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+    ('FONTSIZE', (0, 0), (-1, 0), 10),
+    ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
+    ('GRID', (0, 0), (-1, -1), 1, colors.black)
+]
+
+
+def render_analytical_pdf(report_data: AnalyticalReport, filepath: str, itens_path: Optional[str] = None) -> str:
+    """
+    Os itens vêm de report_data.itens ou, com itens_path, do arquivo gravado por
+    spool_rows (dicionários com as colunas do item), lido sob demanda.
+    """
+    styles = getSampleStyleSheet()
+    if itens_path:
+        itens = read_spool(itens_path)
+    else:
+        itens = (item.model_dump() for item in report_data.itens)
+
+    def story() -> Iterator[Flowable]:
+        # Título
+        yield Paragraph(f"Relatório Analítico - {report_data.nome_projeto}", styles['Title'])
+        yield Spacer(1, 12)
+
+        # Informações gerais
+        info = f"Contrato: {report_data.numero_contrato}<br/>Total Geral: R$ {report_data.total_geral:,.2f}"
+        yield Paragraph(info, styles['Normal'])
+        yield Spacer(1, 12)
+
+        # Tabela de itens (linhas formatadas sob demanda)
+        rows = (
+            [
+                _truncate(item["descricao"], 30),
+                _truncate(item["fornecedor"], 22),
+                _truncate(item["centro_custo"], 16),
+                item["numero_nf"] or "",
+                str(item["quantidade"] or ""),
+                f"R$ {item['valor_total']:,.2f}"
+            ]
+            for item in itens
+        )
+        yield from table_chunks(
+            ['Descrição', 'Fornecedor', 'Centro Custo', 'Nº NF', 'Quantidade', 'Valor Total'],
+            rows,
+            col_widths=[135, 95, 70, 50, 45, 56],
+            style=ANALYTICAL_TABLE_STYLE,
+            row_height=12,
+            header_height=20
+        )
+
+    write_pdf(filepath, story())
+    return filepath
+
+
+def render_balance_pdf(report_data: ContractBalanceReport, filepath: str) -> str:
+    styles = getSampleStyleSheet()
+
+    def story() -> Iterator[Flowable]:
+        # Título
+        yield Paragraph(f"Conta-Corrente do Contrato", styles['Title'])
+        yield Spacer(1, 12)
+
+        # Informações do contrato
+        info = f"""
+        Contrato: {report_data.numero_contrato}<br/>
+        Projeto: {report_data.nome_projeto}<br/>
+        Cliente: {report_data.cliente}<br/>
+        Valor Original: R$ {report_data.valor_original:,.2f}<br/>
+        Valor Realizado: R$ {report_data.valor_realizado:,.2f}<br/>
+        Saldo: R$ {report_data.saldo_contrato:,.2f}<br/>
+        % Realizado: {report_data.percentual_realizado:.1f}%
+        """
+        yield Paragraph(info, styles['Normal'])
+        yield Spacer(1, 20)
+
+        # Tabela de movimentações
+        rows = (
+            [
+                item.data.strftime('%d/%m/%Y'),
+                _truncate(item.numero_oc, 14),
+                _truncate(item.numero_nf, 14),
+                _truncate(item.fornecedor, 26),
+                f"R$ {item.valor_total:,.2f}"
+            ]
+            for item in report_data.itens_sinteticos
+        )
+        yield from table_chunks(
+            ['Data', 'Nº OC', 'Nº NF', 'Fornecedor', 'Valor'],
+            rows,
+            col_widths=[62, 80, 80, 144, 85],
+            style=BALANCE_TABLE_STYLE,
+            row_height=16,
+            header_height=22
+        )
+
+    write_pdf(filepath, story())
+    return filepath
+
+
+def render_contracts_pdf(report_data: Dict[str, Any]) -> bytes:
+    """Relatório de contratos do SimpleReportsService (retorna o PDF em memória)"""
+    styles = getSampleStyleSheet()
+    title_style = ParagraphStyle(
+        'CustomTitle',
+        parent=styles['Heading1'],
+        fontSize=18,
+        alignment=1  # Center alignment
+    )
+
+    def story() -> Iterator[Flowable]:
+        # Título
+        yield Paragraph(report_data.get("title", "Relatório"), title_style)
+        yield Spacer(1, 12)
+
+        # Data de geração
+        yield Paragraph(
+            f"Gerado em: {datetime.now().strftime('%d/%m/%Y %H:%M')}",
+            styles['Normal']
+        )
+        yield Spacer(1, 12)
+
+        # Conteúdo dos contratos
+        for contract in report_data.get("contracts", []):
+            # Nome do contrato
+            yield Paragraph(
+                f"<b>{contract.get('contract_name', contract.get('name', 'N/A'))}</b>",
+                styles['Heading2']
+            )
+
+            # Tabela com dados do contrato
+            data = [
+                ['Cliente:', contract.get('client_name', 'N/A')],
+                ['Valor do Contrato:', f"R$ {contract.get('contract_value', 0):,.2f}"],
+            ]
+
+            if 'realized_value' in contract:
+                data.extend([
+                    ['Valor Realizado:', f"R$ {contract.get('realized_value', 0):,.2f}"],
+                    ['Saldo do Contrato:', f"R$ {contract.get('contract_balance', 0):,.2f}"],
+                    ['Percentual Realizado:', f"{contract.get('realization_percentage', 0):.1f}%"],
+                    ['Economia Obtida:', f"R$ {contract.get('savings_obtained', 0):,.2f}"],
+                ])
+
+            table = Table(data, colWidths=[2*inch, 3*inch])
+            table.setStyle(TableStyle([
+                ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+                ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
+                ('FONTNAME', (1, 0), (1, -1), 'Helvetica'),
+                ('FONTSIZE', (0, 0), (-1, -1), 10),
+                ('GRID', (0, 0), (-1, -1), 1, colors.black),
+            ]))
+
+            yield table
+            yield Spacer(1, 12)
+
+    buffer = BytesIO()
+    write_pdf(buffer, story())
+    return buffer.getvalue()
@@ -0,0 +1,94 @@
+"""
+Pool de processos da renderização de relatórios (PDF).
+
+Separado de app.services.pdf_rendering para que a aplicação possa gerenciar o
+pool (ex.: encerrá-lo no shutdown) sem importar o ReportLab.
+"""
+
+import asyncio
+import multiprocessing
+import os
+import pickle
+import tempfile
+import threading
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+from typing import Any, Callable, Iterable, Iterator, Optional
+
+from app.core.config import settings
+
+
+_pool: Optional[Executor] = None
+_pool_lock = threading.Lock()
+
+
+def get_render_pool() -> Executor:
+    """
+    Pool compartilhado de renderização. Com report_render_workers = 0 a renderização
+    roda em uma thread (útil em ambientes sem suporte a multiprocessing).
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            if settings.report_render_workers > 0:
+                # spawn: não herdar threads/conexões do servidor via fork
+                _pool = ProcessPoolExecutor(
+                    max_workers=settings.report_render_workers,
+                    mp_context=multiprocessing.get_context("spawn")
+                )
+            else:
+                _pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="pdf-render")
+        return _pool
+
+
+def shutdown_render_pool() -> None:
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=True, cancel_futures=True)
+            _pool = None
+
+
+def render(func: Callable, *args: Any) -> Any:
+    """Executa a renderização no pool e bloqueia a thread chamadora até o fim"""
+    return get_render_pool().submit(func, *args).result()
+
+
+async def render_async(func: Callable, *args: Any) -> Any:
+    """Executa a renderização no pool sem bloquear o event loop"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_render_pool(), partial(func, *args))
+
+
+# === LINHAS EM ARQUIVO ===
+
+def spool_rows(rows: Iterable[Any]) -> str:
+    """
+    Grava as linhas em um arquivo temporário, uma a uma, e retorna o caminho.
+    O processo de renderização recebe apenas o caminho e lê as linhas sob demanda,
+    então nenhum dos dois lados mantém (ou serializa) a lista inteira em memória.
+    O arquivo é removido por quem o criou.
+    """
+    fd, path = tempfile.mkstemp(prefix="render_", suffix=".rows")
+    try:
+        with os.fdopen(fd, "wb") as spool:
+            pickler = pickle.Pickler(spool, protocol=pickle.HIGHEST_PROTOCOL)
+            for row in rows:
+                pickler.dump(row)
+                # Sem memo acumulado entre linhas
+                pickler.clear_memo()
+    except BaseException:
+        os.remove(path)
+        raise
+    return path
+
+
+def read_spool(path: str) -> Iterator[Any]:
+    """Lê as linhas gravadas por spool_rows, na mesma ordem"""
+    with open(path, "rb") as spool:
+        unpickler = pickle.Unpickler(spool)
+        while True:
+            try:
+                yield unpickler.load()
+            except EOFError:
+                return
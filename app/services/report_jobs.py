@@ -0,0 +1,205 @@
+"""Geração assíncrona de relatórios com armazenamento deduplicado de artefatos"""
+
+import hashlib
+import json
+import os
+import threading
+import uuid
+from sqlalchemy.orm import Session
+from sqlalchemy import func
+from typing import Dict, Optional, Any, Tuple
+from datetime import datetime
+
+from app.core.database import SessionLocal
+from app.models.contracts import Contract
+from app.models.purchases import PurchaseOrder, Invoice, InvoiceItem, Supplier
+from app.schemas.reports import ReportRequest, ReportFormat, ReportJobStatus
+from app.services.reports import ReportsService
+
+
+# Extensão do artefato por formato (JSON não gera arquivo)
+ARTIFACT_EXTENSIONS = {
+    ReportFormat.PDF: "pdf",
+    ReportFormat.EXCEL: "xlsx"
+}
+
+# Tabelas lidas pelos relatórios e usadas na versão dos dados
+VERSIONED_MODELS = [Contract, PurchaseOrder, Invoice, InvoiceItem, Supplier]
+
+
+class ReportArtifactStore:
+    """
+    Armazena os arquivos de relatório no diretório reports/ com nome derivado do
+    hash de (tipo, formato, filtros, versão dos dados). Requisições idênticas sobre
+    os mesmos dados apontam para o mesmo arquivo.
+    """
+
+    def __init__(self, reports_dir: str = "reports"):
+        self.reports_dir = reports_dir
+
+    def data_version(self, db: Session) -> str:
+        """Impressão digital das tabelas de origem (contagem, maior id e datas de alteração)"""
+        partes = []
+        for model in VERSIONED_MODELS:
+            colunas = [func.count(model.id), func.max(model.id), func.max(model.created_at)]
+            if hasattr(model, "updated_at"):
+                colunas.append(func.max(model.updated_at))
+            valores = db.query(*colunas).one()
+            partes.append(f"{model.__tablename__}:" + ",".join(str(v) for v in valores))
+        return hashlib.sha256("|".join(partes).encode()).hexdigest()[:16]
+
+    def artifact_key(self, request: ReportRequest, data_version: str) -> str:
+        payload = json.dumps({
+            "report_type": request.report_type.value,
+            "format": request.format.value,
+            "filters": request.filters.dict(),
+            "data_version": data_version
+        }, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def filename(self, key: str, report_format: ReportFormat) -> str:
+        return f"{key}.{ARTIFACT_EXTENSIONS[report_format]}"
+
+    def path(self, key: str, report_format: ReportFormat) -> str:
+        return os.path.join(self.reports_dir, self.filename(key, report_format))
+
+    def url(self, key: str, report_format: ReportFormat) -> str:
+        return f"/reports/download/{self.filename(key, report_format)}"
+
+    def exists(self, key: str, report_format: ReportFormat) -> bool:
+        return os.path.exists(self.path(key, report_format))
+
+    def find(self, key: str) -> Optional[ReportFormat]:
+        """Formato do artefato já gerado para a chave, se houver"""
+        for report_format in ARTIFACT_EXTENSIONS:
+            if self.exists(key, report_format):
+                return report_format
+        return None
+
+    def partial_name(self, key: str) -> str:
+        """
+        Nome temporário (sem extensão) usado durante a renderização. Único por
+        renderização (pid + uuid): dois workers que renderizam a mesma chave ao
+        mesmo tempo não escrevem no mesmo arquivo.
+        """
+        return f"{key}.{os.getpid()}-{uuid.uuid4().hex}.partial"
+
+    def partial_path(self, partial_name: str, report_format: ReportFormat) -> str:
+        return os.path.join(self.reports_dir, f"{partial_name}.{ARTIFACT_EXTENSIONS[report_format]}")
+
+    def publish(self, partial_name: str, key: str, report_format: ReportFormat) -> str:
+        """Move o arquivo temporário para o nome definitivo (operação atômica)"""
+        os.replace(self.partial_path(partial_name, report_format), self.path(key, report_format))
+        return self.url(key, report_format)
+
+    def discard(self, partial_name: str, report_format: ReportFormat) -> None:
+        temporario = self.partial_path(partial_name, report_format)
+        if os.path.exists(temporario):
+            os.remove(temporario)
+
+
+class ReportJobManager:
+    """
+    Registro em memória dos jobs de relatório. O id do job é a chave do artefato,
+    então jobs repetidos reaproveitam o job em andamento ou o arquivo já gerado.
+    """
+
+    def __init__(self, store: ReportArtifactStore):
+        self.store = store
+        self._jobs: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def submit(self, db: Session, request: ReportRequest) -> Tuple[Dict[str, Any], bool]:
+        """Registra o job; retorna (job, precisa_renderizar)"""
+        if request.format not in ARTIFACT_EXTENSIONS:
+            raise ValueError("Jobs de relatório disponíveis apenas para PDF e Excel")
+
+        key = self.store.artifact_key(request, self.store.data_version(db))
+
+        with self._lock:
+            job = self._jobs.get(key)
+            if job and job["status"] in (ReportJobStatus.PENDENTE, ReportJobStatus.PROCESSANDO):
+                return dict(job), False
+
+            if self.store.exists(key, request.format):
+                job = self._new_job(key, request, ReportJobStatus.CONCLUIDO)
+                job["finished_at"] = job["created_at"]
+                job["file_url"] = self.store.url(key, request.format)
+                self._jobs[key] = job
+                return dict(job), False
+
+            job = self._new_job(key, request, ReportJobStatus.PENDENTE)
+            self._jobs[key] = job
+            return dict(job), True
+
+    def run(self, job_id: str, request: ReportRequest) -> Dict[str, Any]:
+        """Renderiza o artefato do job em uma sessão própria (executado em segundo plano)"""
+        self._update(job_id, status=ReportJobStatus.PROCESSANDO)
+
+        partial_name = self.store.partial_name(job_id)
+        db = SessionLocal()
+        try:
+            os.makedirs(self.store.reports_dir, exist_ok=True)
+            ReportsService(db).generate_report(request, artifact_name=partial_name)
+            file_url = self.store.publish(partial_name, job_id, request.format)
+            self._update(
+                job_id,
+                status=ReportJobStatus.CONCLUIDO,
+                file_url=file_url,
+                finished_at=datetime.utcnow()
+            )
+        except Exception as e:
+            self.store.discard(partial_name, request.format)
+            self._update(
+                job_id,
+                status=ReportJobStatus.ERRO,
+                error=str(e),
+                finished_at=datetime.utcnow()
+            )
+        finally:
+            db.close()
+
+        return self.get(job_id)
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job:
+                return dict(job)
+
+        # Artefato gerado por outro worker ou antes de um restart
+        report_format = self.store.find(job_id)
+        if report_format is None:
+            return None
+
+        gerado_em = datetime.utcfromtimestamp(os.path.getmtime(self.store.path(job_id, report_format)))
+        return {
+            "job_id": job_id,
+            "status": ReportJobStatus.CONCLUIDO,
+            "report_type": None,
+            "format": report_format,
+            "created_at": gerado_em,
+            "finished_at": gerado_em,
+            "file_url": self.store.url(job_id, report_format),
+            "error": None
+        }
+
+    def _new_job(self, key: str, request: ReportRequest, status: ReportJobStatus) -> Dict[str, Any]:
+        return {
+            "job_id": key,
+            "status": status,
+            "report_type": request.report_type,
+            "format": request.format,
+            "created_at": datetime.utcnow(),
+            "finished_at": None,
+            "file_url": None,
+            "error": None
+        }
+
+    def _update(self, job_id: str, **campos) -> None:
+        with self._lock:
+            if job_id in self._jobs:
+                self._jobs[job_id].update(campos)
+
+
+report_jobs = ReportJobManager(ReportArtifactStore())
@@ -1,23 +1,44 @@
 from sqlalchemy.orm import Session
 from sqlalchemy import func, and_
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Iterator
 from decimal import Decimal
 from datetime import datetime
+import csv
+import io
+import json
 import uuid
 import os
-from reportlab.lib.pagesizes import letter, A4
-from reportlab.lib import colors
-from reportlab.lib.styles import getSampleStyleSheet
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
-from reportlab.lib.units import inch
-import pandas as pd
+from app.core.lazy import lazy_import
 from app.models.contracts import Contract, BudgetItem
 from app.models.purchases import PurchaseOrder, PurchaseOrderItem, Invoice, InvoiceItem, Supplier
 from app.schemas.reports import (
-    ReportFilter, ReportType, ReportFormat, ReportRequest,
+    ReportFilter, ReportType, ReportFormat, ReportRequest, ExportFormat,
     AnalyticalReport, AnalyticalReportItem, 
     ContractBalanceReport, SyntheticReportItem
 )
+from app.services.render_pool import render, spool_rows
+
+pd = lazy_import("pandas")
+openpyxl = lazy_import("openpyxl")
+
+
+# Colunas da exportação do relatório analítico (ordem do CSV)
+ANALYTICAL_EXPORT_COLUMNS = [
+    "id", "descricao", "fornecedor", "centro_custo", "numero_oc", "numero_nf",
+    "data_emissao", "data_entrega", "quantidade", "unidade", "peso",
+    "valor_unitario", "valor_total", "observacoes", "numero_contrato"
+]
+
+# Linhas buscadas por vez do cursor do servidor durante a exportação
+EXPORT_BATCH_SIZE = 1000
+
+
+def _export_value(value: Any) -> Any:
+    if isinstance(value, Decimal):
+        return str(value)
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
 
 
 class ReportsService:
@@ -26,27 +47,80 @@ class ReportsService:
         self.reports_dir = "reports"
         os.makedirs(self.reports_dir, exist_ok=True)
 
-    def generate_report(self, request: ReportRequest) -> Dict[str, Any]:
+    def generate_report(self, request: ReportRequest, artifact_name: Optional[str] = None) -> Dict[str, Any]:
+        """Gera o relatório; artifact_name fixa o nome do arquivo (sem extensão)"""
         if request.report_type == ReportType.ANALITICO:
-            return self._generate_analytical_report(request)
+            return self._generate_analytical_report(request, artifact_name)
         elif request.report_type == ReportType.SINTETICO:
-            return self._generate_synthetic_report(request)
+            return self._generate_synthetic_report(request, artifact_name)
         elif request.report_type == ReportType.CONTA_CORRENTE:
-            return self._generate_balance_report(request)
+            return self._generate_balance_report(request, artifact_name)
         else:
             raise ValueError("Tipo de relatório não suportado")
 
-    def _generate_analytical_report(self, request: ReportRequest) -> Dict[str, Any]:
+    def _generate_analytical_report(self, request: ReportRequest, artifact_name: Optional[str] = None) -> Dict[str, Any]:
         filters = request.filters
         
-        # Query base para itens de nota fiscal
+        query = self._build_analytical_query(filters)
+
+        # Total calculado no banco; os itens só são carregados para a resposta JSON.
+        # PDF e Excel leem as linhas em lotes (yield_per), como a exportação em stream.
+        total_geral = query.with_entities(func.sum(InvoiceItem.valor_total)).scalar() or Decimal('0')
+
+        items = []
+        if request.format == ReportFormat.JSON:
+            items = [AnalyticalReportItem(**row) for row in self._analytical_rows(query)]
+
+        # Buscar informações do contrato
+        contract_info = None
+        if filters.contract_id:
+            contract_info = self.db.query(Contract).filter(Contract.id == filters.contract_id).first()
+
+        report_data = AnalyticalReport(
+            contract_id=filters.contract_id or 0,
+            numero_contrato=contract_info.numero_contrato if contract_info else "Todos",
+            nome_projeto=contract_info.nome_projeto if contract_info else "Relatório Geral",
+            periodo_inicio=filters.data_inicio,
+            periodo_fim=filters.data_fim,
+            total_geral=total_geral,
+            itens=items
+        )
+
+        # Gerar arquivo se necessário
+        file_url = None
+        if request.format == ReportFormat.PDF:
+            file_url = self._generate_pdf_analytical(report_data, query, artifact_name)
+        elif request.format == ReportFormat.EXCEL:
+            file_url = self._generate_excel_analytical(report_data, query, artifact_name)
+
+        return {
+            "report_id": str(uuid.uuid4()),
+            "report_type": request.report_type,
+            "format": request.format,
+            "generated_at": datetime.utcnow(),
+            "file_url": file_url,
+            "data": report_data.dict() if request.format == ReportFormat.JSON else None
+        }
+
+    def _build_analytical_query(self, filters: ReportFilter):
+        # Query base para itens de nota fiscal (apenas as colunas do relatório)
         query = self.db.query(
-            InvoiceItem,
-            Invoice,
-            PurchaseOrder,
-            Contract,
-            Supplier
-        ).join(
+            InvoiceItem.id,
+            InvoiceItem.descricao,
+            Supplier.nome,
+            InvoiceItem.centro_custo,
+            PurchaseOrder.numero_oc,
+            Invoice.numero_nf,
+            Invoice.data_emissao,
+            PurchaseOrder.data_entrega_real,
+            InvoiceItem.quantidade,
+            InvoiceItem.unidade,
+            InvoiceItem.peso,
+            InvoiceItem.valor_unitario,
+            InvoiceItem.valor_total,
+            Invoice.observacoes,
+            Contract.numero_contrato
+        ).select_from(InvoiceItem).join(
             Invoice, InvoiceItem.invoice_id == Invoice.id
         ).join(
             PurchaseOrder, Invoice.purchase_order_id == PurchaseOrder.id
@@ -75,64 +149,44 @@ class ReportsService:
         if filters.fornecedor:
             query = query.filter(Supplier.nome.ilike(f"%{filters.fornecedor}%"))
 
-        results = query.all()
+        return query
 
-        # Processar resultados
-        items = []
-        total_geral = Decimal('0')
-        
-        for invoice_item, invoice, po, contract, supplier in results:
-            item = AnalyticalReportItem(
-                id=invoice_item.id,
-                descricao=invoice_item.descricao,
-                fornecedor=supplier.nome,
-                centro_custo=invoice_item.centro_custo,
-                numero_oc=po.numero_oc,
-                numero_nf=invoice.numero_nf,
-                data_emissao=invoice.data_emissao,
-                data_entrega=po.data_entrega_real,
-                quantidade=invoice_item.quantidade,
-                unidade=invoice_item.unidade,
-                peso=invoice_item.peso,
-                valor_unitario=invoice_item.valor_unitario,
-                valor_total=invoice_item.valor_total,
-                observacoes=invoice.observacoes
-            )
-            items.append(item)
-            total_geral += invoice_item.valor_total
+    def _analytical_rows(self, query) -> Iterator[Dict[str, Any]]:
+        """Itens do relatório analítico (colunas de AnalyticalReportItem), lidos em lotes"""
+        for row in query.order_by(InvoiceItem.id).yield_per(EXPORT_BATCH_SIZE):
+            yield {
+                column: value for column, value in zip(ANALYTICAL_EXPORT_COLUMNS, row)
+                if column != "numero_contrato"
+            }
 
-        # Buscar informações do contrato
-        contract_info = None
-        if filters.contract_id:
-            contract_info = self.db.query(Contract).filter(Contract.id == filters.contract_id).first()
+    def stream_analytical_report(self, filters: ReportFilter, export_format: ExportFormat) -> Iterator[str]:
+        """
+        Exporta o relatório analítico linha a linha em CSV ou NDJSON.
+        As linhas são lidas em lotes de um cursor do servidor (yield_per), então a
+        memória usada não depende do tamanho do relatório.
+        """
+        query = self._build_analytical_query(filters).order_by(InvoiceItem.id).yield_per(EXPORT_BATCH_SIZE)
 
-        report_data = AnalyticalReport(
-            contract_id=filters.contract_id or 0,
-            numero_contrato=contract_info.numero_contrato if contract_info else "Todos",
-            nome_projeto=contract_info.nome_projeto if contract_info else "Relatório Geral",
-            periodo_inicio=filters.data_inicio,
-            periodo_fim=filters.data_fim,
-            total_geral=total_geral,
-            itens=items
-        )
+        if export_format == ExportFormat.NDJSON:
+            for row in query:
+                record = {column: _export_value(value) for column, value in zip(ANALYTICAL_EXPORT_COLUMNS, row)}
+                yield json.dumps(record, ensure_ascii=False) + "\n"
+            return
 
-        # Gerar arquivo se necessário
-        file_url = None
-        if request.format == ReportFormat.PDF:
-            file_url = self._generate_pdf_analytical(report_data)
-        elif request.format == ReportFormat.EXCEL:
-            file_url = self._generate_excel_analytical(report_data)
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(ANALYTICAL_EXPORT_COLUMNS)
 
-        return {
-            "report_id": str(uuid.uuid4()),
-            "report_type": request.report_type,
-            "format": request.format,
-            "generated_at": datetime.utcnow(),
-            "file_url": file_url,
-            "data": report_data.dict() if request.format == ReportFormat.JSON else None
-        }
+        for count, row in enumerate(query, start=1):
+            writer.writerow([_export_value(value) for value in row])
+            if count % EXPORT_BATCH_SIZE == 0:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate(0)
 
-    def _generate_balance_report(self, request: ReportRequest) -> Dict[str, Any]:
+        yield buffer.getvalue()
+
+    def _generate_balance_report(self, request: ReportRequest, artifact_name: Optional[str] = None) -> Dict[str, Any]:
         filters = request.filters
         
         if not filters.contract_id:
@@ -200,9 +254,9 @@ class ReportsService:
         # Gerar arquivo se necessário
         file_url = None
         if request.format == ReportFormat.PDF:
-            file_url = self._generate_pdf_balance(report_data)
+            file_url = self._generate_pdf_balance(report_data, artifact_name)
         elif request.format == ReportFormat.EXCEL:
-            file_url = self._generate_excel_balance(report_data)
+            file_url = self._generate_excel_balance(report_data, artifact_name)
 
         return {
             "report_id": str(uuid.uuid4()),
@@ -213,161 +267,78 @@ class ReportsService:
             "data": report_data.dict() if request.format == ReportFormat.JSON else None
         }
 
-    def _generate_synthetic_report(self, request: ReportRequest) -> Dict[str, Any]:
+    def _generate_synthetic_report(self, request: ReportRequest, artifact_name: Optional[str] = None) -> Dict[str, Any]:
         # Para o relatório sintético, usamos a mesma lógica do conta-corrente
         # mas sem mostrar o saldo (apenas para clientes)
-        return self._generate_balance_report(request)
+        return self._generate_balance_report(request, artifact_name)
+
+    def _output_filename(self, prefix: str, extension: str, artifact_name: Optional[str] = None) -> str:
+        if artifact_name:
+            return f"{artifact_name}.{extension}"
+        return f"{prefix}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{extension}"
 
-    def _generate_pdf_analytical(self, report_data: AnalyticalReport) -> str:
-        filename = f"relatorio_analitico_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf"
+    def _generate_pdf_analytical(self, report_data: AnalyticalReport, query, artifact_name: Optional[str] = None) -> str:
+        filename = self._output_filename("relatorio_analitico", "pdf", artifact_name)
         filepath = os.path.join(self.reports_dir, filename)
-        
-        doc = SimpleDocTemplate(filepath, pagesize=A4)
-        styles = getSampleStyleSheet()
-        story = []
-
-        # Título
-        title = Paragraph(f"Relatório Analítico - {report_data.nome_projeto}", styles['Title'])
-        story.append(title)
-        story.append(Spacer(1, 12))
-
-        # Informações gerais
-        info = f"Contrato: {report_data.numero_contrato}<br/>Total Geral: R$ {report_data.total_geral:,.2f}"
-        info_para = Paragraph(info, styles['Normal'])
-        story.append(info_para)
-        story.append(Spacer(1, 12))
-
-        # Tabela de itens
-        headers = ['Descrição', 'Fornecedor', 'Centro Custo', 'Nº NF', 'Quantidade', 'Valor Total']
-        data = [headers]
-        
-        for item in report_data.itens:
-            row = [
-                item.descricao[:30] + "..." if len(item.descricao) > 30 else item.descricao,
-                item.fornecedor,
-                item.centro_custo,
-                item.numero_nf or "",
-                str(item.quantidade or ""),
-                f"R$ {item.valor_total:,.2f}"
-            ]
-            data.append(row)
-
-        table = Table(data)
-        table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, 0), 8),
-            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-            ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-            ('FONTSIZE', (0, 1), (-1, -1), 7),
-            ('GRID', (0, 0), (-1, -1), 1, colors.black)
-        ]))
-
-        story.append(table)
-        doc.build(story)
-        
+
+        # O processo de renderização recebe só o cabeçalho e o caminho das linhas
+        itens_path = spool_rows(self._analytical_rows(query))
+        try:
+            from app.services.pdf_rendering import render_analytical_pdf
+            render(render_analytical_pdf, report_data, filepath, itens_path)
+        finally:
+            os.remove(itens_path)
+
         return f"/reports/{filename}"
 
-    def _generate_excel_analytical(self, report_data: AnalyticalReport) -> str:
-        filename = f"relatorio_analitico_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
+    def _generate_excel_analytical(self, report_data: AnalyticalReport, query, artifact_name: Optional[str] = None) -> str:
+        filename = self._output_filename("relatorio_analitico", "xlsx", artifact_name)
         filepath = os.path.join(self.reports_dir, filename)
-        
-        # Converter dados para DataFrame
-        data = []
-        for item in report_data.itens:
-            data.append({
-                'Descrição': item.descricao,
-                'Fornecedor': item.fornecedor,
-                'Centro de Custo': item.centro_custo,
-                'Nº OC': item.numero_oc,
-                'Nº NF': item.numero_nf,
-                'Data Emissão': item.data_emissao,
-                'Quantidade': item.quantidade,
-                'Unidade': item.unidade,
-                'Peso': item.peso,
-                'Valor Unitário': item.valor_unitario,
-                'Valor Total': item.valor_total,
-                'Observações': item.observacoes
-            })
 
-        df = pd.DataFrame(data)
-        
-        with pd.ExcelWriter(filepath, engine='openpyxl') as writer:
-            df.to_excel(writer, sheet_name='Relatório Analítico', index=False)
-            
-            # Adicionar informações do cabeçalho
-            workbook = writer.book
-            worksheet = writer.sheets['Relatório Analítico']
-            
-            worksheet.insert_rows(1, 3)
-            worksheet['A1'] = f'Relatório Analítico - {report_data.nome_projeto}'
-            worksheet['A2'] = f'Contrato: {report_data.numero_contrato}'
-            worksheet['A3'] = f'Total Geral: R$ {report_data.total_geral:,.2f}'
+        # Planilha em modo write_only: as linhas vão direto para o arquivo
+        workbook = openpyxl.Workbook(write_only=True)
+        worksheet = workbook.create_sheet('Relatório Analítico')
+
+        # Informações do cabeçalho
+        worksheet.append([f'Relatório Analítico - {report_data.nome_projeto}'])
+        worksheet.append([f'Contrato: {report_data.numero_contrato}'])
+        worksheet.append([f'Total Geral: R$ {report_data.total_geral:,.2f}'])
+
+        worksheet.append([
+            'Descrição', 'Fornecedor', 'Centro de Custo', 'Nº OC', 'Nº NF', 'Data Emissão',
+            'Quantidade', 'Unidade', 'Peso', 'Valor Unitário', 'Valor Total', 'Observações'
+        ])
+        for item in self._analytical_rows(query):
+            worksheet.append([
+                item['descricao'],
+                item['fornecedor'],
+                item['centro_custo'],
+                item['numero_oc'],
+                item['numero_nf'],
+                item['data_emissao'],
+                item['quantidade'],
+                item['unidade'],
+                item['peso'],
+                item['valor_unitario'],
+                item['valor_total'],
+                item['observacoes']
+            ])
+
+        workbook.save(filepath)
 
         return f"/reports/{filename}"
 
-    def _generate_pdf_balance(self, report_data: ContractBalanceReport) -> str:
-        filename = f"conta_corrente_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf"
+    def _generate_pdf_balance(self, report_data: ContractBalanceReport, artifact_name: Optional[str] = None) -> str:
+        filename = self._output_filename("conta_corrente", "pdf", artifact_name)
         filepath = os.path.join(self.reports_dir, filename)
-        
-        doc = SimpleDocTemplate(filepath, pagesize=A4)
-        styles = getSampleStyleSheet()
-        story = []
-
-        # Título
-        title = Paragraph(f"Conta-Corrente do Contrato", styles['Title'])
-        story.append(title)
-        story.append(Spacer(1, 12))
-
-        # Informações do contrato
-        info = f"""
-        Contrato: {report_data.numero_contrato}<br/>
-        Projeto: {report_data.nome_projeto}<br/>
-        Cliente: {report_data.cliente}<br/>
-        Valor Original: R$ {report_data.valor_original:,.2f}<br/>
-        Valor Realizado: R$ {report_data.valor_realizado:,.2f}<br/>
-        Saldo: R$ {report_data.saldo_contrato:,.2f}<br/>
-        % Realizado: {report_data.percentual_realizado:.1f}%
-        """
-        info_para = Paragraph(info, styles['Normal'])
-        story.append(info_para)
-        story.append(Spacer(1, 20))
 
-        # Tabela de movimentações
-        headers = ['Data', 'Nº OC', 'Nº NF', 'Fornecedor', 'Valor']
-        data = [headers]
-        
-        for item in report_data.itens_sinteticos:
-            row = [
-                item.data.strftime('%d/%m/%Y'),
-                item.numero_oc,
-                item.numero_nf,
-                item.fornecedor,
-                f"R$ {item.valor_total:,.2f}"
-            ]
-            data.append(row)
-
-        table = Table(data)
-        table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, 0), 10),
-            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-            ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-            ('GRID', (0, 0), (-1, -1), 1, colors.black)
-        ]))
-
-        story.append(table)
-        doc.build(story)
-        
+        from app.services.pdf_rendering import render_balance_pdf
+        render(render_balance_pdf, report_data, filepath)
+
         return f"/reports/{filename}"
 
-    def _generate_excel_balance(self, report_data: ContractBalanceReport) -> str:
-        filename = f"conta_corrente_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
+    def _generate_excel_balance(self, report_data: ContractBalanceReport, artifact_name: Optional[str] = None) -> str:
+        filename = self._output_filename("conta_corrente", "xlsx", artifact_name)
         filepath = os.path.join(self.reports_dir, filename)
         
         # Converter dados para DataFrame
@@ -1,8 +1,9 @@
 """Serviço de relatórios simplificado sem dependências pesadas"""
 
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, selectinload
+from sqlalchemy import func
 from typing import List, Dict, Any, Optional
-from datetime import datetime, date
+from datetime import datetime, date, time, timedelta
 from decimal import Decimal
 import json
 from io import BytesIO
@@ -22,13 +23,27 @@ class SimpleReportsService:
         start_date: Optional[date] = None,
         end_date: Optional[date] = None
     ) -> Dict[str, Any]:
-        """Gera relatório analítico detalhado para uso interno"""
-
-        query = self.db.query(Contract)
+        """
+        Gera relatório analítico detalhado para uso interno.
+        O período (datas inclusivas) restringe as OCs e as NFs pela data de emissão;
+        o valor realizado considera apenas as OCs do período.
+        """
+
+        filtros_oc = self._period_filters(PurchaseOrder.data_emissao, start_date, end_date)
+        filtros_nf = self._period_filters(Invoice.data_emissao, start_date, end_date)
+        compras = Contract.purchase_orders.and_(*filtros_oc) if filtros_oc else Contract.purchase_orders
+        notas = PurchaseOrder.invoices.and_(*filtros_nf) if filtros_nf else PurchaseOrder.invoices
+
+        # Contratos, OCs, fornecedores e NFs carregados em consultas fixas (selectin);
+        # populate_existing recarrega coleções já carregadas na sessão sem o filtro de período
+        query = self.db.query(Contract).options(
+            selectinload(compras).selectinload(PurchaseOrder.supplier),
+            selectinload(compras).selectinload(notas)
+        ).execution_options(populate_existing=True)
         if contract_id:
             query = query.filter(Contract.id == contract_id)
 
-        contracts = query.all()
+        contracts = query.order_by(Contract.id).all()
 
         report_data = {
             "title": "Relatório Analítico - Custos de Obras",
@@ -41,24 +56,22 @@ class SimpleReportsService:
         }
 
         for contract in contracts:
+            purchases = contract.purchase_orders
+            valor_realizado = sum(float(po.valor_total) for po in purchases)
+
             contract_data = {
                 "id": contract.id,
-                "name": contract.nome_contrato,
+                "name": contract.nome_projeto,
                 "client_name": contract.cliente,
-                "contract_value": float(contract.valor_contrato or 0),
+                "contract_value": float(contract.valor_original or 0),
                 "start_date": contract.data_inicio.isoformat() if contract.data_inicio else None,
-                "end_date": contract.data_fim.isoformat() if contract.data_fim else None,
+                "end_date": contract.data_fim_prevista.isoformat() if contract.data_fim_prevista else None,
                 "status": contract.status,
                 "purchases": [],
                 "invoices": [],
-                "metrics": self._calculate_contract_metrics(contract.id)
+                "metrics": self._calculate_contract_metrics(contract, valor_realizado)
             }
 
-            # Buscar compras do contrato
-            purchases = self.db.query(PurchaseOrder).filter(
-                PurchaseOrder.contract_id == contract.id
-            ).all()
-
             for purchase in purchases:
                 purchase_data = {
                     "id": purchase.id,
@@ -70,12 +83,7 @@ class SimpleReportsService:
                 }
                 contract_data["purchases"].append(purchase_data)
 
-                # Buscar notas fiscais da compra
-                invoices = self.db.query(Invoice).filter(
-                    Invoice.purchase_order_id == purchase.id
-                ).all()
-
-                for invoice in invoices:
+                for invoice in purchase.invoices:
                     invoice_data = {
                         "id": invoice.id,
                         "numero_nf": invoice.numero_nf,
@@ -96,24 +104,31 @@ class SimpleReportsService:
     ) -> Dict[str, Any]:
         """Gera relatório sintético para clientes"""
 
-        query = self.db.query(Contract)
+        # Valor realizado (soma das OCs) agregado por contrato em uma única consulta
+        realizado = self.db.query(
+            PurchaseOrder.contract_id.label("contract_id"),
+            func.sum(PurchaseOrder.valor_total).label("valor_realizado")
+        ).group_by(PurchaseOrder.contract_id).subquery()
+
+        query = self.db.query(
+            Contract,
+            func.coalesce(realizado.c.valor_realizado, 0)
+        ).outerjoin(realizado, realizado.c.contract_id == Contract.id)
         if contract_id:
             query = query.filter(Contract.id == contract_id)
 
-        contracts = query.all()
-
         report_data = {
             "title": "Relatório de Conta-Corrente",
             "generated_at": datetime.now().isoformat(),
             "contracts": []
         }
 
-        for contract in contracts:
-            metrics = self._calculate_contract_metrics(contract.id)
+        for contract, valor_realizado in query.order_by(Contract.id).all():
+            metrics = self._calculate_contract_metrics(contract, float(valor_realizado))
             contract_data = {
-                "contract_name": contract.nome_contrato,
+                "contract_name": contract.nome_projeto,
                 "client_name": contract.cliente,
-                "contract_value": float(contract.valor_contrato or 0),
+                "contract_value": float(contract.valor_original or 0),
                 "realized_value": metrics.get("valor_realizado", 0),
                 "contract_balance": metrics.get("saldo_contrato", 0),
                 "realization_percentage": metrics.get("percentual_realizado", 0),
@@ -124,20 +139,20 @@ class SimpleReportsService:
 
         return report_data
 
-    def _calculate_contract_metrics(self, contract_id: int) -> Dict[str, float]:
-        """Calcula métricas básicas do contrato"""
+    @staticmethod
+    def _period_filters(coluna, start_date: Optional[date], end_date: Optional[date]) -> List[Any]:
+        """Filtros de período sobre uma coluna de data/hora (end_date inclui o dia inteiro)"""
+        filtros = []
+        if start_date:
+            filtros.append(coluna >= datetime.combine(start_date, time.min))
+        if end_date:
+            filtros.append(coluna < datetime.combine(end_date + timedelta(days=1), time.min))
+        return filtros
 
-        contract = self.db.query(Contract).filter(Contract.id == contract_id).first()
-        if not contract:
-            return {}
+    def _calculate_contract_metrics(self, contract: Contract, valor_realizado: float) -> Dict[str, float]:
+        """Calcula métricas básicas do contrato a partir do valor realizado já carregado"""
 
-        # Somar valor total das compras
-        total_purchases = self.db.query(PurchaseOrder).filter(
-            PurchaseOrder.contract_id == contract_id
-        ).all()
-
-        valor_realizado = sum(float(po.valor_total) for po in total_purchases)
-        valor_contrato = float(contract.valor_contrato or 0)
+        valor_contrato = float(contract.valor_original or 0)
         saldo_contrato = valor_contrato - valor_realizado
 
         percentual_realizado = (valor_realizado / valor_contrato * 100) if valor_contrato > 0 else 0
@@ -157,74 +172,7 @@ class SimpleReportsService:
         return json.dumps(report_data, indent=2, ensure_ascii=False)
 
     def generate_pdf_report(self, report_data: Dict[str, Any]) -> BytesIO:
-        """Gera relatório em PDF usando ReportLab"""
-        from reportlab.lib.pagesizes import letter, A4
-        from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
-        from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-        from reportlab.lib.units import inch
-        from reportlab.lib import colors
-
-        buffer = BytesIO()
-        doc = SimpleDocTemplate(buffer, pagesize=A4)
-
-        styles = getSampleStyleSheet()
-        title_style = ParagraphStyle(
-            'CustomTitle',
-            parent=styles['Heading1'],
-            fontSize=18,
-            alignment=1  # Center alignment
-        )
-
-        story = []
-
-        # Título
-        title = Paragraph(report_data.get("title", "Relatório"), title_style)
-        story.append(title)
-        story.append(Spacer(1, 12))
-
-        # Data de geração
-        generated_at = Paragraph(
-            f"Gerado em: {datetime.now().strftime('%d/%m/%Y %H:%M')}",
-            styles['Normal']
-        )
-        story.append(generated_at)
-        story.append(Spacer(1, 12))
-
-        # Conteúdo dos contratos
-        for contract in report_data.get("contracts", []):
-            # Nome do contrato
-            contract_title = Paragraph(
-                f"<b>{contract.get('contract_name', contract.get('name', 'N/A'))}</b>",
-                styles['Heading2']
-            )
-            story.append(contract_title)
-
-            # Tabela com dados do contrato
-            data = [
-                ['Cliente:', contract.get('client_name', 'N/A')],
-                ['Valor do Contrato:', f"R$ {contract.get('contract_value', 0):,.2f}"],
-            ]
-
-            if 'realized_value' in contract:
-                data.extend([
-                    ['Valor Realizado:', f"R$ {contract.get('realized_value', 0):,.2f}"],
-                    ['Saldo do Contrato:', f"R$ {contract.get('contract_balance', 0):,.2f}"],
-                    ['Percentual Realizado:', f"{contract.get('realization_percentage', 0):.1f}%"],
-                    ['Economia Obtida:', f"R$ {contract.get('savings_obtained', 0):,.2f}"],
-                ])
-
-            table = Table(data, colWidths=[2*inch, 3*inch])
-            table.setStyle(TableStyle([
-                ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-                ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
-                ('FONTNAME', (1, 0), (1, -1), 'Helvetica'),
-                ('FONTSIZE', (0, 0), (-1, -1), 10),
-                ('GRID', (0, 0), (-1, -1), 1, colors.black),
-            ]))
-
-            story.append(table)
-            story.append(Spacer(1, 12))
-
-        doc.build(story)
-        buffer.seek(0)
-        return buffer
\ No newline at end of file
+        """Gera relatório em PDF usando ReportLab (no pool de renderização)"""
+        from app.services.pdf_rendering import render, render_contracts_pdf
+
+        return BytesIO(render(render_contracts_pdf, report_data))
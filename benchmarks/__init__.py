@@ -0,0 +1 @@
+"""Benchmarks de desempenho da API (executar com python -m benchmarks.<cenário>)"""
@@ -0,0 +1,292 @@
+"""
+Gerador determinístico de dados sintéticos para os benchmarks.
+
+A partir de uma semente e de uma escala (número de contratos e quantidades por
+contrato) cria usuários, centros de custo, fornecedores, contratos, itens de
+orçamento, OCs, Notas Fiscais com itens e invoices, em SQLite ou PostgreSQL.
+Também gera arquivos de entrada para ingestão: XMLs de NF-e, ZIP de NF-e e
+planilha QQP (aba QQP_Cliente).
+
+    python -m benchmarks.data_generator --database-url sqlite:///bench.db --contracts 50
+
+Use sempre um banco descartável: as tabelas são criadas pelos models e os
+dados são inseridos com ids explícitos.
+"""
+
+import argparse
+import io
+import random
+import zipfile
+from dataclasses import dataclass, asdict
+from datetime import datetime, timedelta
+from decimal import Decimal
+from typing import Any, Dict, Iterable, List
+
+from sqlalchemy import create_engine, insert, text
+from sqlalchemy.engine import Engine
+
+from app.core.database import Base
+import app.models  # noqa: F401  (registra todas as tabelas no metadata)
+from app.models.contracts import BudgetItem, Contract, ContractStatus, ContractType
+from app.models.cost_centers import CostCenter
+from app.models.notas_fiscais import NotaFiscal, NotaFiscalItem
+from app.models.purchases import Invoice, InvoiceItem, PurchaseOrder, Supplier
+from app.models.users import User, UserRole
+
+
+CHUNK_SIZE = 5000
+
+CENTROS_CUSTO = [
+    ("materia_prima", "Matéria-prima"),
+    ("mao_de_obra", "Mão-de-obra"),
+    ("equipamento", "Equipamentos"),
+    ("transporte", "Mobilização"),
+    ("servicos", "Serviços"),
+]
+PRODUTOS = [
+    "Viga de aço W200", "Perfil metálico U", "Chapa de aço 6mm", "Cimento CP-II 50kg",
+    "Parafuso sextavado 1/2", "Tinta epóxi cinza", "Serviço de montagem", "Frete rodoviário",
+    "Eletrodo E7018", "Tubo galvanizado 2\"", "Locação de guindaste", "Concreto usinado fck30",
+]
+CLIENTES = ["Vale", "Petrobras", "Gerdau", "Usiminas", "CSN", "Braskem", "Suzano", "Klabin"]
+STATUS_NF = ["processado", "validado", "validado", "validado", "erro"]
+STATUS_CONTRATO = [ContractStatus.EM_ANDAMENTO] * 3 + [ContractStatus.FINALIZANDO, ContractStatus.CONCLUIDO]
+NFE_NS = "http://www.portalfiscal.inf.br/nfe"
+
+
+@dataclass
+class Scale:
+    """Quantidades geradas (por contrato, exceto contracts e suppliers)"""
+    contracts: int = 20
+    suppliers: int = 30
+    budget_items: int = 20
+    purchase_orders: int = 5
+    nfs: int = 40
+    items_per_nf: int = 8
+    invoices: int = 5
+
+
+def _cnpj(rnd: random.Random) -> str:
+    return f"{rnd.randrange(10**13, 10**14):014d}"
+
+
+def _chunks(rows: List[Dict[str, Any]]) -> Iterable[List[Dict[str, Any]]]:
+    for inicio in range(0, len(rows), CHUNK_SIZE):
+        yield rows[inicio:inicio + CHUNK_SIZE]
+
+
+class SyntheticDataGenerator:
+    """Gera e grava o conjunto de dados sintético (mesma semente, mesmos dados)"""
+
+    def __init__(self, engine: Engine, scale: Scale = None, seed: int = 42):
+        self.engine = engine
+        self.scale = scale or Scale()
+        self.seed = seed
+        self.rnd = random.Random(seed)
+        self.rows: Dict[Any, List[Dict[str, Any]]] = {}
+
+    def generate(self) -> Dict[str, int]:
+        """Cria o schema (se necessário), insere os dados e retorna a contagem por tabela"""
+        Base.metadata.create_all(self.engine)
+        self._build()
+
+        with self.engine.begin() as conn:
+            for model, rows in self.rows.items():
+                for chunk in _chunks(rows):
+                    conn.execute(insert(model.__table__), chunk)
+            if self.engine.dialect.name == "postgresql":
+                self._sync_sequences(conn)
+
+        return {model.__tablename__: len(rows) for model, rows in self.rows.items()}
+
+    # === CONSTRUÇÃO DAS LINHAS ===
+
+    def _build(self) -> None:
+        rnd, scale = self.rnd, self.scale
+        base_date = datetime(2025, 1, 1)
+
+        self.rows[User] = [{
+            "id": 1, "username": "bench", "email": "bench@gmx.com.br",
+            "password": "x", "role": UserRole.ADMIN.value,
+        }]
+        self.rows[CostCenter] = [
+            {"id": i, "codigo": codigo, "nome": nome}
+            for i, (codigo, nome) in enumerate(CENTROS_CUSTO, start=1)
+        ]
+        self.rows[Supplier] = [
+            {"id": i, "nome": f"Fornecedor {i:04d} Ltda", "cnpj": _cnpj(rnd), "is_approved": True}
+            for i in range(1, scale.suppliers + 1)
+        ]
+
+        contratos, orcamento, ocs, nfs, itens_nf, invoices, itens_invoice = [], [], [], [], [], [], []
+        for c in range(1, scale.contracts + 1):
+            inicio = base_date + timedelta(days=rnd.randrange(0, 365))
+            contratos.append({
+                "id": c, "numero_contrato": f"CT-{c:05d}", "nome_projeto": f"Obra {c:05d}",
+                "cliente": rnd.choice(CLIENTES), "tipo_contrato": rnd.choice(list(ContractType)).value,
+                "valor_original": Decimal(rnd.randrange(500_000, 20_000_000)),
+                "meta_reducao_percentual": Decimal(rnd.choice([5, 10, 15])),
+                "status": rnd.choice(STATUS_CONTRATO).value, "data_inicio": inicio,
+                "data_fim_prevista": inicio + timedelta(days=rnd.randrange(180, 900)), "criado_por": 1,
+            })
+
+            for b in range(scale.budget_items):
+                codigo, nome = rnd.choice(CENTROS_CUSTO)
+                orcamento.append({
+                    "id": len(orcamento) + 1, "contract_id": c, "codigo_item": f"{b + 1}.{c}",
+                    "descricao": rnd.choice(PRODUTOS), "centro_custo": nome,
+                    "valor_total_previsto": Decimal(rnd.randrange(10_000, 500_000)),
+                })
+
+            for _ in range(scale.purchase_orders):
+                ocs.append({
+                    "id": len(ocs) + 1, "contract_id": c, "numero_oc": f"OC-{len(ocs) + 1:07d}",
+                    "supplier_id": rnd.randrange(1, scale.suppliers + 1),
+                    "valor_total": Decimal(rnd.randrange(5_000, 300_000)),
+                    "data_emissao": inicio + timedelta(days=rnd.randrange(0, 300)), "criado_por": 1,
+                })
+
+            for _ in range(scale.invoices):
+                invoice_id = len(invoices) + 1
+                invoices.append({
+                    "id": invoice_id, "contract_id": c, "numero_nf": f"{rnd.randrange(1, 999999)}",
+                    "fornecedor": f"Fornecedor {rnd.randrange(1, scale.suppliers + 1):04d} Ltda",
+                    "valor_total": Decimal(rnd.randrange(1_000, 100_000)),
+                    "data_emissao": inicio + timedelta(days=rnd.randrange(0, 300)),
+                })
+                for _ in range(3):
+                    itens_invoice.append({
+                        "id": len(itens_invoice) + 1, "invoice_id": invoice_id,
+                        "descricao": rnd.choice(PRODUTOS), "centro_custo": rnd.choice(CENTROS_CUSTO)[1],
+                        "valor_total": Decimal(rnd.randrange(100, 30_000)),
+                    })
+
+            for _ in range(scale.nfs):
+                nf_id = len(nfs) + 1
+                fornecedor = rnd.randrange(1, scale.suppliers + 1)
+                itens = []
+                for n in range(1, scale.items_per_nf + 1):
+                    quantidade = Decimal(rnd.randrange(1, 200))
+                    unitario = Decimal(rnd.randrange(100, 50_000)) / 100
+                    itens.append({
+                        "id": len(itens_nf) + len(itens) + 1, "nota_id": nf_id, "numero_item": n,
+                        "codigo_produto": f"P{rnd.randrange(1, 5000):05d}", "descricao": rnd.choice(PRODUTOS),
+                        "ncm": f"{rnd.randrange(72000000, 73269099)}", "unidade": rnd.choice(["UN", "KG", "M"]),
+                        "quantidade": quantidade, "valor_unitario": unitario,
+                        "valor_total": (quantidade * unitario).quantize(Decimal("0.01")),
+                        "centro_custo_id": rnd.choice([None, 1, 2, 3, 4, 5]),
+                        "status_integracao": "pendente",
+                    })
+                itens_nf.extend(itens)
+                nfs.append({
+                    "id": nf_id, "numero": str(100000 + nf_id), "serie": "1",
+                    "chave_acesso": f"{nf_id:044d}", "cnpj_fornecedor": self.rows[Supplier][fornecedor - 1]["cnpj"],
+                    "nome_fornecedor": self.rows[Supplier][fornecedor - 1]["nome"],
+                    "valor_total": sum(item["valor_total"] for item in itens),
+                    "data_emissao": inicio + timedelta(days=rnd.randrange(0, 400), hours=rnd.randrange(0, 24)),
+                    "pasta_origem": f"obra_{c:05d}", "status_processamento": rnd.choice(STATUS_NF),
+                    "contrato_id": c,
+                })
+
+        self.rows[Contract] = contratos
+        self.rows[BudgetItem] = orcamento
+        self.rows[PurchaseOrder] = ocs
+        self.rows[Invoice] = invoices
+        self.rows[InvoiceItem] = itens_invoice
+        self.rows[NotaFiscal] = nfs
+        self.rows[NotaFiscalItem] = itens_nf
+
+    def _sync_sequences(self, conn) -> None:
+        # Ids explícitos não avançam as sequências do PostgreSQL
+        for model in self.rows:
+            table = model.__tablename__
+            conn.execute(text(
+                f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), "
+                f"COALESCE((SELECT MAX(id) FROM {table}), 1))"
+            ))
+
+
+# === ARQUIVOS DE INGESTÃO ===
+
+def build_nfe_xml(numero: int, rnd: random.Random, items: int = 5, namespace: bool = True) -> bytes:
+    """XML de NF-e (layout nfeProc) com itens aleatórios; namespace=False omite o xmlns da NF-e"""
+    dets, total = [], Decimal("0")
+    for n in range(1, items + 1):
+        quantidade = Decimal(rnd.randrange(1, 100))
+        unitario = Decimal(rnd.randrange(100, 20_000)) / 100
+        valor = (quantidade * unitario).quantize(Decimal("0.01"))
+        total += valor
+        dets.append(
+            f'<det nItem="{n}"><prod><cProd>P{n:04d}</cProd><xProd>{rnd.choice(PRODUTOS)}</xProd>'
+            f'<NCM>73089090</NCM><uCom>UN</uCom><qCom>{quantidade}</qCom><vUnCom>{unitario}</vUnCom>'
+            f'<vProd>{valor}</vProd></prod></det>'
+        )
+    emissao = datetime(2025, 1, 1) + timedelta(days=rnd.randrange(0, 365))
+    xmlns = f' xmlns="{NFE_NS}"' if namespace else ""
+    return (
+        f'<?xml version="1.0" encoding="UTF-8"?>'
+        f'<nfeProc{xmlns}><NFe><infNFe Id="NFe{numero:044d}">'
+        f'<ide><nNF>{numero}</nNF><serie>1</serie><dhEmi>{emissao.isoformat()}-03:00</dhEmi></ide>'
+        f'<emit><CNPJ>{_cnpj(rnd)}</CNPJ><xNome>Fornecedor {rnd.randrange(1, 100):04d} Ltda</xNome></emit>'
+        f'{"".join(dets)}<total><ICMSTot><vNF>{total}</vNF></ICMSTot></total>'
+        f'</infNFe></NFe></nfeProc>'
+    ).encode("utf-8")
+
+
+def build_nfe_zip(count: int, seed: int = 42, items: int = 5, namespace: bool = True) -> bytes:
+    """ZIP com count XMLs de NF-e"""
+    rnd = random.Random(seed)
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as zf:
+        for numero in range(1, count + 1):
+            zf.writestr(f"nfe_{numero:06d}.xml", build_nfe_xml(numero, rnd, items, namespace))
+    return buffer.getvalue()
+
+
+def build_qqp_workbook(seed: int = 42) -> bytes:
+    """Planilha QQP no layout lido por DataImportService.import_budget_from_excel"""
+    import openpyxl
+
+    rnd = random.Random(seed)
+    workbook = openpyxl.Workbook()
+    sheet = workbook.active
+    sheet.title = "QQP_Cliente"
+
+    total = 0
+    # Linhas 12-22 (índices 11-21): item, serviço, unidade, qtd mensal, duração, ..., preço total, observação
+    for linha in range(12, 23):
+        preco = rnd.randrange(10_000, 900_000)
+        total += preco
+        sheet.cell(row=linha, column=3, value=f"{linha - 11}.0")
+        sheet.cell(row=linha, column=4, value=rnd.choice(PRODUTOS))
+        sheet.cell(row=linha, column=5, value="mês")
+        sheet.cell(row=linha, column=6, value=rnd.randrange(1, 10))
+        sheet.cell(row=linha, column=7, value=rnd.randrange(6, 36))
+        sheet.cell(row=linha, column=13, value=preco)
+        sheet.cell(row=linha, column=14, value="gerado")
+    sheet.cell(row=41, column=5, value=float(total))
+
+    buffer = io.BytesIO()
+    workbook.save(buffer)
+    return buffer.getvalue()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", required=True, help="Banco descartável (SQLite ou PostgreSQL)")
+    parser.add_argument("--seed", type=int, default=42)
+    for campo, valor in asdict(Scale()).items():
+        parser.add_argument(f"--{campo.replace('_', '-')}", type=int, default=valor)
+    args = parser.parse_args()
+
+    scale = Scale(**{campo: getattr(args, campo) for campo in asdict(Scale())})
+    engine = create_engine(args.database_url)
+    contagem = SyntheticDataGenerator(engine, scale, args.seed).generate()
+    engine.dispose()
+
+    for tabela, linhas in contagem.items():
+        print(f"{tabela:<20} {linhas:>10}")
+
+
+if __name__ == "__main__":
+    main()
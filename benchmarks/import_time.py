@@ -0,0 +1,98 @@
+"""
+Tempo de importação da aplicação (python -X importtime).
+
+Importa o módulo num interpretador novo, várias vezes, e mostra o tempo
+acumulado da importação, os módulos mais caros e quais bibliotecas pesadas
+foram carregadas na subida (devem ser importadas sob demanda, app.core.lazy):
+
+    python -m benchmarks.import_time
+    python -m benchmarks.import_time --module app.main --repeats 5 --top 20
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from typing import Any, Dict, List
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Bibliotecas que não devem ser carregadas ao importar a aplicação
+HEAVY_MODULES = ("pandas", "numpy", "openpyxl", "reportlab", "httpx", "requests")
+
+
+def measure_import(module: str = "app.main") -> Dict[str, Any]:
+    """Importa o módulo num processo novo e retorna os tempos por módulo (µs)"""
+    resultado = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT, capture_output=True, text=True, check=True
+    )
+
+    modulos = []
+    for linha in resultado.stderr.splitlines():
+        if not linha.startswith("import time:") or "self [us]" in linha:
+            continue
+        self_us, cumulative_us, nome = linha[len("import time:"):].split("|")
+        modulos.append({
+            "module": nome.strip(),
+            "depth": (len(nome) - len(nome.lstrip()) - 1) // 2,
+            "self_us": int(self_us),
+            "cumulative_us": int(cumulative_us),
+        })
+
+    total = next(m["cumulative_us"] for m in reversed(modulos) if m["module"] == module)
+    carregados = {m["module"].split(".")[0] for m in modulos}
+    return {
+        "module": module,
+        "total_us": total,
+        "modules": modulos,
+        "heavy_loaded": [nome for nome in HEAVY_MODULES if nome in carregados],
+    }
+
+
+def run(module: str, repeats: int) -> Dict[str, Any]:
+    medicoes = [measure_import(module) for _ in range(repeats)]
+    totais = [m["total_us"] for m in medicoes]
+    # Detalhe por módulo da execução mais rápida (menos ruído de cache de disco)
+    melhor = medicoes[totais.index(min(totais))]
+    return {
+        "module": module,
+        "repeats": repeats,
+        "min_ms": round(min(totais) / 1000, 1),
+        "median_ms": round(statistics.median(totais) / 1000, 1),
+        "heavy_loaded": melhor["heavy_loaded"],
+        "modules": melhor["modules"],
+    }
+
+
+def top(modules: List[Dict[str, Any]], campo: str, limite: int) -> List[Dict[str, Any]]:
+    return sorted(modules, key=lambda m: m[campo], reverse=True)[:limite]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--module", default="app.main")
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15, help="Módulos mais caros exibidos")
+    parser.add_argument("--json", action="store_true", help="Imprime o resultado em JSON")
+    args = parser.parse_args()
+
+    resultado = run(args.module, args.repeats)
+
+    if args.json:
+        resultado["modules"] = top(resultado["modules"], "cumulative_us", args.top)
+        print(json.dumps(resultado, indent=2))
+        return
+
+    print(f"import {resultado['module']}: mínimo {resultado['min_ms']} ms, mediana {resultado['median_ms']} ms "
+          f"({resultado['repeats']} execuções)")
+    print(f"bibliotecas pesadas carregadas: {', '.join(resultado['heavy_loaded']) or 'nenhuma'}")
+    print(f"\n{'módulo':<50} {'próprio (ms)':>13} {'acumulado (ms)':>15}")
+    for m in top(resultado["modules"], "self_us", args.top):
+        print(f"{m['module'][:50]:<50} {m['self_us'] / 1000:>13.1f} {m['cumulative_us'] / 1000:>15.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+"""
+Latência da API enquanto PDFs grandes são renderizados.
+
+Compara a renderização direta na rota (bloqueia o event loop, comportamento antigo)
+com o pool de renderização: uma sonda chama /ping continuamente enquanto os PDFs
+são gerados e mede a latência observada a partir do instante previsto da chamada.
+
+    python -m benchmarks.report_rendering --rows 3000 --reports 4 [--json]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import tempfile
+import time
+from datetime import datetime
+from decimal import Decimal
+from typing import Dict, List
+
+import httpx
+from fastapi import FastAPI
+
+from app.schemas.reports import AnalyticalReport, AnalyticalReportItem
+from app.services.pdf_rendering import (
+    get_render_pool, render_analytical_pdf, render_async, shutdown_render_pool
+)
+
+
+def build_report(rows: int) -> AnalyticalReport:
+    itens = [
+        AnalyticalReportItem(
+            id=i,
+            descricao=f"Perfil metálico W200x{i % 90} - lote {i}",
+            fornecedor=f"Fornecedor {i % 40}",
+            centro_custo="Matéria-prima",
+            numero_nf=str(100000 + i),
+            quantidade=Decimal(i % 17 + 1),
+            valor_total=Decimal("1234.56") + i,
+            data_emissao=datetime(2026, 1, 1)
+        )
+        for i in range(rows)
+    ]
+    return AnalyticalReport(
+        contract_id=1,
+        numero_contrato="BENCH-001",
+        nome_projeto="Benchmark",
+        total_geral=sum(item.valor_total for item in itens),
+        itens=itens
+    )
+
+
+def build_app(report: AnalyticalReport, output_dir: str) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/ping")
+    async def ping():
+        return {"ok": True}
+
+    @app.post("/render/{mode}/{n}")
+    async def render_pdf(mode: str, n: int):
+        filepath = os.path.join(output_dir, f"{mode}_{n}.pdf")
+        if mode == "inline":
+            render_analytical_pdf(report, filepath)
+        else:
+            await render_async(render_analytical_pdf, report, filepath)
+        return {"file": filepath}
+
+    return app
+
+
+async def run_scenario(app: FastAPI, mode: str, reports: int, probe_interval: float) -> Dict[str, float]:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        latencias: List[float] = []
+        renders = [
+            asyncio.create_task(client.post(f"/render/{mode}/{n}"))
+            for n in range(reports)
+        ]
+
+        inicio = time.perf_counter()
+        while not all(task.done() for task in renders):
+            # Latência medida a partir do instante previsto da sonda: inclui o
+            # tempo em que o event loop ficou bloqueado pela renderização
+            previsto = time.perf_counter() + probe_interval
+            await asyncio.sleep(probe_interval)
+            await client.get("/ping")
+            latencias.append((time.perf_counter() - previsto) * 1000)
+        await asyncio.gather(*renders)
+        duracao = time.perf_counter() - inicio
+
+    latencias.sort()
+    return {
+        "mode": mode,
+        "reports": reports,
+        "wall_s": round(duracao, 3),
+        "probes": len(latencias),
+        "ping_p50_ms": round(statistics.median(latencias), 2),
+        "ping_p95_ms": round(latencias[int(len(latencias) * 0.95) - 1 if len(latencias) > 1 else 0], 2),
+        "ping_max_ms": round(latencias[-1], 2)
+    }
+
+
+async def main_async(args) -> List[Dict[str, float]]:
+    report = build_report(args.rows)
+    with tempfile.TemporaryDirectory() as output_dir:
+        app = build_app(report, output_dir)
+
+        # Aquecer os processos do pool antes de medir
+        await asyncio.gather(*[
+            render_async(render_analytical_pdf, build_report(10), os.path.join(output_dir, f"warmup_{i}.pdf"))
+            for i in range(4)
+        ])
+
+        resultados = []
+        for mode in ("inline", "pool"):
+            resultados.append(await run_scenario(app, mode, args.reports, args.probe_interval))
+        return resultados
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=3000, help="Linhas por relatório")
+    parser.add_argument("--reports", type=int, default=4, help="PDFs renderizados em paralelo")
+    parser.add_argument("--probe-interval", type=float, default=0.01, help="Intervalo entre sondas (s)")
+    parser.add_argument("--json", action="store_true", help="Saída em JSON")
+    args = parser.parse_args()
+
+    get_render_pool()
+    try:
+        resultados = asyncio.run(main_async(args))
+    finally:
+        shutdown_render_pool()
+
+    if args.json:
+        print(json.dumps(resultados, indent=2))
+        return
+
+    print(f"{'modo':<8} {'pdfs':>5} {'tempo(s)':>9} {'sondas':>7} {'p50(ms)':>9} {'p95(ms)':>9} {'max(ms)':>9}")
+    for r in resultados:
+        print(
+            f"{r['mode']:<8} {r['reports']:>5} {r['wall_s']:>9} {r['probes']:>7} "
+            f"{r['ping_p50_ms']:>9} {r['ping_p95_ms']:>9} {r['ping_max_ms']:>9}"
+        )
+
+
+if __name__ == "__main__":
+    main()
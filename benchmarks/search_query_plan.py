@@ -0,0 +1,166 @@
+"""
+Plano e latência de busca por substring (ilike '%x%') conforme a tabela cresce.
+
+Cria uma tabela temporária com o formato de notas_fiscais.nome_fornecedor, insere
+lotes crescentes de linhas e, a cada tamanho, mede a consulta com e sem o índice
+GIN de trigramas (PostgreSQL com pg_trgm). Um número fixo de linhas contém o termo
+buscado, então com o índice a latência deve ficar estável enquanto a varredura
+cresce linearmente.
+
+Sem pg_trgm no servidor a medição com índice é marcada como "não medido". Em SQLite
+não há índice para substring: é exibida apenas a varredura, cuja latência cresce
+com a tabela (ex.: 1.4 ms com 10 mil linhas e 13.8 ms com 100 mil). O ganho do
+índice de trigramas só é comprovado rodando este script contra um PostgreSQL com
+a extensão disponível.
+
+    python -m benchmarks.search_query_plan --sizes 10000,100000,1000000 [--json]
+"""
+
+import argparse
+import json
+import random
+import time
+from typing import Any, Dict, List
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine import Connection
+
+from app.core.config import settings
+
+
+TABLE = "bench_nf_busca"
+NEEDLE = "Siderurgica Zeta"
+NEEDLE_ROWS = 25
+NAMES = [
+    "Aço Forte", "Metalúrgica Brasil", "Cimentos do Vale", "Parafusos Sul",
+    "Tintas Real", "Madeireira Norte", "Elétrica Paulista", "Concreto Minas"
+]
+
+
+def _populate_postgres(conn: Connection, start: int, end: int) -> None:
+    conn.execute(text(f"""
+        INSERT INTO {TABLE} (id, nome_fornecedor)
+        SELECT g, (ARRAY[{", ".join(f"'{n}'" for n in NAMES)}])[1 + g % {len(NAMES)}]
+                  || ' ' || substr(md5(g::text), 1, 8)
+        FROM generate_series(:start, :end - 1) AS g
+    """), {"start": start, "end": end})
+
+
+def _populate_sqlite(conn: Connection, start: int, end: int) -> None:
+    rnd = random.Random(start)
+    conn.execute(
+        text(f"INSERT INTO {TABLE} (id, nome_fornecedor) VALUES (:id, :nome)"),
+        [
+            {"id": i, "nome": f"{NAMES[i % len(NAMES)]} {rnd.getrandbits(32):08x}"}
+            for i in range(start, end)
+        ]
+    )
+
+
+def _measure(conn: Connection, dialect: str, repeats: int) -> Dict[str, Any]:
+    query = f"SELECT id FROM {TABLE} WHERE nome_fornecedor ILIKE :termo"
+    params = {"termo": f"%{NEEDLE.split()[1]}%"}
+
+    if dialect == "postgresql":
+        plan = conn.execute(text(f"EXPLAIN (ANALYZE, FORMAT JSON) {query}"), params).scalar()[0]
+        node = plan["Plan"]
+        nodes = [node["Node Type"]] + [p["Node Type"] for p in node.get("Plans", [])]
+        plan_text = " > ".join(nodes)
+    else:
+        query = query.replace("ILIKE", "LIKE")
+        plan_text = " | ".join(row[-1] for row in conn.execute(text(f"EXPLAIN QUERY PLAN {query}"), params))
+
+    timings = []
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        found = len(conn.execute(text(query), params).all())
+        timings.append((time.perf_counter() - t0) * 1000)
+
+    return {"plan": plan_text, "found": found, "ms": round(min(timings), 3)}
+
+
+def _trigram_available(conn: Connection) -> bool:
+    return conn.execute(
+        text("SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm'")
+    ).first() is not None
+
+
+def run(database_url: str, sizes: List[int], repeats: int) -> List[Dict[str, Any]]:
+    engine = create_engine(database_url)
+    dialect = engine.dialect.name
+    results = []
+
+    with engine.connect() as conn:
+        conn.execute(text(f"CREATE TEMP TABLE {TABLE} (id INTEGER PRIMARY KEY, nome_fornecedor VARCHAR(255))"))
+        trigram = dialect == "postgresql" and _trigram_available(conn)
+        if trigram:
+            conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+
+        # Linhas com o termo buscado: quantidade fixa em todos os tamanhos
+        conn.execute(
+            text(f"INSERT INTO {TABLE} (id, nome_fornecedor) VALUES (:id, :nome)"),
+            [{"id": -i, "nome": f"{NEEDLE} {i}"} for i in range(1, NEEDLE_ROWS + 1)]
+        )
+
+        populated = 0
+        for size in sorted(sizes):
+            if dialect == "postgresql":
+                _populate_postgres(conn, populated, size)
+            else:
+                _populate_sqlite(conn, populated, size)
+            populated = size
+
+            result: Dict[str, Any] = {"rows": size, "dialect": dialect}
+
+            if dialect == "postgresql":
+                conn.execute(text(f"ANALYZE {TABLE}"))
+                result["seq_scan"] = _measure(conn, dialect, repeats)
+
+                if trigram:
+                    conn.execute(text(
+                        f"CREATE INDEX {TABLE}_trgm ON {TABLE} USING gin (nome_fornecedor gin_trgm_ops)"
+                    ))
+                    conn.execute(text(f"ANALYZE {TABLE}"))
+                    result["trigram"] = _measure(conn, dialect, repeats)
+                    conn.execute(text(f"DROP INDEX {TABLE}_trgm"))
+                else:
+                    result["trigram"] = None
+            else:
+                result["seq_scan"] = _measure(conn, dialect, repeats)
+
+            results.append(result)
+
+        conn.rollback()
+
+    engine.dispose()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", default=settings.database_url)
+    parser.add_argument("--sizes", default="10000,100000,1000000", help="Tamanhos da tabela (separados por vírgula)")
+    parser.add_argument("--repeats", type=int, default=5, help="Execuções por medição (usa a menor)")
+    parser.add_argument("--json", action="store_true", help="Saída em JSON")
+    args = parser.parse_args()
+
+    sizes = [int(s) for s in args.sizes.split(",") if s]
+    results = run(args.database_url, sizes, args.repeats)
+
+    if args.json:
+        print(json.dumps(results, indent=2, ensure_ascii=False))
+        return
+
+    for r in results:
+        for mode in ("seq_scan", "trigram"):
+            if mode not in r:
+                continue
+            m = r[mode]
+            if m is None:
+                print(f"{r['rows']:>10} {mode:<9} não medido: extensão pg_trgm indisponível no servidor")
+                continue
+            print(f"{r['rows']:>10} {mode:<9} {m['ms']:>10.3f} ms  encontrados={m['found']:<4} plano: {m['plan']}")
+
+
+if __name__ == "__main__":
+    main()
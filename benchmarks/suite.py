@@ -0,0 +1,310 @@
+"""
+Suíte de benchmarks da API sobre dados sintéticos.
+
+Gera o conjunto de dados (benchmarks.data_generator) num banco descartável e
+mede cenários cronometrados: listagens de contratos e NFs (inclusive a lista
+detalhada por contrato, com itens), dashboards de Suprimentos e Executivo,
+relatórios, ingestão de ZIP de NF-e e importação de QQP. Cada cenário
+registra latência (min/mediana/p95/máx) e consultas SQL por execução. O
+resultado em JSON pode ser comparado com o de outro commit:
+
+    python -m benchmarks.suite --contracts 50 --output atual.json
+    python -m benchmarks.suite --contracts 50 --compare base.json --tolerance 0.2
+
+Sem --database-url usa um SQLite temporário. Com PostgreSQL, informe um banco
+vazio e descartável.
+"""
+
+import argparse
+import asyncio
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from dataclasses import asdict
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.core.query_stats import track_queries
+from benchmarks.data_generator import (
+    Scale, SyntheticDataGenerator, build_nfe_zip, build_qqp_workbook
+)
+
+
+def _percentile(valores: List[float], p: float) -> float:
+    ordenados = sorted(valores)
+    indice = max(0, min(len(ordenados) - 1, round(p * (len(ordenados) - 1))))
+    return ordenados[indice]
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class BenchmarkSuite:
+    """Cenários cronometrados contra a aplicação real (TestClient) ou os serviços"""
+
+    def __init__(self, engine, repeats: int = 5, warmup: int = 1, zip_nfs: int = 50):
+        self.engine = engine
+        self.repeats = repeats
+        self.warmup = warmup
+        self.zip_nfs = zip_nfs
+        self.SessionBench = sessionmaker(bind=engine, autocommit=False, autoflush=False)
+        self.client = self._build_client()
+
+    def _build_client(self):
+        from fastapi.testclient import TestClient
+
+        from app.api import dependencies
+        from app.core.database import get_db
+        from app.main import app
+        from app.models.users import User, UserRole
+
+        admin = User(id=1, username="bench", email="bench@gmx.com.br", password="x", role=UserRole.ADMIN)
+
+        def override_get_db():
+            db = self.SessionBench()
+            try:
+                yield db
+            finally:
+                db.close()
+
+        app.dependency_overrides[get_db] = override_get_db
+        app.dependency_overrides[dependencies.get_current_user] = lambda: admin
+        return TestClient(app)
+
+    # === CENÁRIOS ===
+
+    def scenarios(self) -> Dict[str, Callable[[], Any]]:
+        from fastapi import UploadFile
+
+        from app.schemas.reports import ReportFilter, ReportFormat, ReportRequest, ReportType
+        from app.services.import_service import DataImportService
+        from app.services.reports import ReportsService
+        from app.services.reports_simple import SimpleReportsService
+
+        # InvoiceProcessingService só encontra os campos filhos em XMLs sem namespace
+        zip_bytes = build_nfe_zip(self.zip_nfs, namespace=False)
+        qqp_bytes = build_qqp_workbook()
+
+        def get(path, **params):
+            def call():
+                resposta = self.client.get(path, params=params)
+                resposta.raise_for_status()
+            return call
+
+        def with_session(fn):
+            def call():
+                db = self.SessionBench()
+                try:
+                    fn(db)
+                finally:
+                    db.close()
+            return call
+
+        def upload_zip():
+            resposta = self.client.post(
+                "/api/v1/invoices/upload-zip/1",
+                files={"file": ("nfes.zip", zip_bytes, "application/zip")}
+            )
+            resposta.raise_for_status()
+            assert resposta.json()["failed_count"] == 0, resposta.json()["errors"][:1]
+
+        def import_qqp(db):
+            arquivo = UploadFile(filename="qqp.xlsx", file=io.BytesIO(qqp_bytes))
+            resultado = asyncio.run(DataImportService(db).import_budget_from_excel(arquivo, contract_id=1))
+            assert resultado["success"]
+
+        return {
+            "contracts_list": get("/api/v1/contracts", limit=100),
+            "nf_list": get("/api/v1/nf", limit=100),
+            "nf_list_filtered": get("/api/v1/nf", limit=100, status="validado", contract_id=1),
+            "nf_contract_detailed": get("/api/v1/nf/contract/1/detailed", limit=100),
+            "dashboard_supplies": get("/api/v1/dashboards/supplies"),
+            "dashboard_executive": get("/api/v1/dashboards/executive"),
+            "report_analytical": with_session(lambda db: ReportsService(db).generate_report(
+                ReportRequest(report_type=ReportType.ANALITICO, format=ReportFormat.JSON)
+            )),
+            "report_balance": with_session(lambda db: ReportsService(db).generate_report(
+                ReportRequest(report_type=ReportType.CONTA_CORRENTE, format=ReportFormat.JSON,
+                              filters=ReportFilter(contract_id=1))
+            )),
+            "report_simple_analytical": with_session(lambda db: SimpleReportsService(db).generate_analytical_report()),
+            "report_simple_synthetic": with_session(lambda db: SimpleReportsService(db).generate_synthetic_report()),
+            "zip_ingestion": upload_zip,
+            "qqp_import": with_session(import_qqp),
+        }
+
+    def run(self, only: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        resultados = []
+        for nome, cenario in self.scenarios().items():
+            if only and nome not in only:
+                continue
+            resultados.append(self._measure(nome, cenario))
+        return resultados
+
+    def _measure(self, nome: str, cenario: Callable[[], Any]) -> Dict[str, Any]:
+        try:
+            for _ in range(self.warmup):
+                cenario()
+
+            tempos, consultas = [], []
+            for _ in range(self.repeats):
+                with track_queries(self.engine) as stats:
+                    inicio = time.perf_counter()
+                    cenario()
+                    tempos.append((time.perf_counter() - inicio) * 1000)
+                consultas.append(stats.queries)
+        except Exception as e:
+            mensagem = str(e).splitlines()[0] if str(e) else ""
+            return {"name": nome, "status": "erro", "error": f"{type(e).__name__}: {mensagem[:300]}"}
+
+        return {
+            "name": nome,
+            "status": "ok",
+            "runs": len(tempos),
+            "min_ms": round(min(tempos), 3),
+            "median_ms": round(statistics.median(tempos), 3),
+            "p95_ms": round(_percentile(tempos, 0.95), 3),
+            "max_ms": round(max(tempos), 3),
+            "queries": max(consultas),
+        }
+
+
+def compare(atual: Dict[str, Any], base: Dict[str, Any], tolerance: float) -> List[Dict[str, Any]]:
+    """
+    Diferença por cenário (mediana e consultas); regressão se piorar além da
+    tolerância, ou se o cenário passar a falhar (ok -> erro, ou erro em cenário novo)
+    """
+    anteriores = {r["name"]: r for r in base.get("scenarios", [])}
+    linhas = []
+    for r in atual["scenarios"]:
+        anterior = anteriores.get(r["name"])
+        status_base = anterior.get("status") if anterior else None
+
+        if r.get("status") != "ok" or status_base != "ok":
+            if r.get("status") == "ok" and status_base is None:
+                continue  # cenário novo, sem base para comparar
+            linhas.append({
+                "name": r["name"],
+                "base_status": status_base,
+                "status": r.get("status"),
+                "error": r.get("error"),
+                # Falha nova; um cenário que já falhava na base não conta de novo
+                "regression": r.get("status") != "ok" and status_base != r.get("status"),
+            })
+            continue
+
+        razao = r["median_ms"] / anterior["median_ms"] if anterior["median_ms"] else 1.0
+        linhas.append({
+            "name": r["name"],
+            "base_status": status_base,
+            "status": r["status"],
+            "base_median_ms": anterior["median_ms"],
+            "median_ms": r["median_ms"],
+            "ratio": round(razao, 3),
+            "base_queries": anterior.get("queries"),
+            "queries": r.get("queries"),
+            "regression": razao > 1 + tolerance or (r.get("queries") or 0) > (anterior.get("queries") or 0),
+        })
+    return linhas
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", help="Banco descartável (padrão: SQLite temporário)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--repeats", type=int, default=5, help="Execuções medidas por cenário")
+    parser.add_argument("--warmup", type=int, default=1, help="Execuções de aquecimento por cenário")
+    parser.add_argument("--zip-nfs", type=int, default=50, help="XMLs no ZIP do cenário de ingestão")
+    parser.add_argument("--scenarios", help="Cenários a executar (separados por vírgula)")
+    parser.add_argument("--output", help="Arquivo JSON de resultado")
+    parser.add_argument("--compare", help="JSON de uma execução anterior para comparar")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Piora relativa aceita na mediana")
+    parser.add_argument("--json", action="store_true", help="Imprime o resultado em JSON")
+    for campo, valor in asdict(Scale()).items():
+        parser.add_argument(f"--{campo.replace('_', '-')}", type=int, default=valor)
+    args = parser.parse_args()
+
+    scale = Scale(**{campo: getattr(args, campo) for campo in asdict(Scale())})
+
+    with tempfile.TemporaryDirectory() as tmp:
+        database_url = args.database_url or f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        connect_args = {"check_same_thread": False} if database_url.startswith("sqlite") else {}
+        engine = create_engine(database_url, connect_args=connect_args)
+
+        inicio = time.perf_counter()
+        contagem = SyntheticDataGenerator(engine, scale, args.seed).generate()
+        geracao_s = time.perf_counter() - inicio
+
+        suite = BenchmarkSuite(engine, repeats=args.repeats, warmup=args.warmup, zip_nfs=args.zip_nfs)
+        cenarios = suite.run(args.scenarios.split(",") if args.scenarios else None)
+        engine.dispose()
+
+    resultado = {
+        "meta": {
+            "commit": _git_commit(),
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "dialect": engine.dialect.name,
+            "seed": args.seed,
+            "scale": asdict(scale),
+            "rows": contagem,
+            "generation_s": round(geracao_s, 3),
+            "repeats": args.repeats,
+        },
+        "scenarios": cenarios,
+    }
+
+    regressoes = []
+    if args.compare:
+        with open(args.compare) as f:
+            resultado["comparison"] = compare(resultado, json.load(f), args.tolerance)
+        regressoes = [linha for linha in resultado["comparison"] if linha["regression"]]
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(resultado, f, indent=2, ensure_ascii=False)
+
+    if args.json:
+        print(json.dumps(resultado, indent=2, ensure_ascii=False))
+    else:
+        print(f"{'cenário':<26} {'min':>9} {'mediana':>9} {'p95':>9} {'máx':>9} {'consultas':>10}")
+        for r in cenarios:
+            if r["status"] != "ok":
+                print(f"{r['name']:<26} ERRO: {r['error']}")
+                continue
+            print(
+                f"{r['name']:<26} {r['min_ms']:>9.2f} {r['median_ms']:>9.2f} "
+                f"{r['p95_ms']:>9.2f} {r['max_ms']:>9.2f} {r['queries']:>10}"
+            )
+        for linha in resultado.get("comparison", []):
+            marca = "REGRESSÃO" if linha["regression"] else ""
+            if "median_ms" not in linha:
+                print(f"{linha['name']:<26} {linha['base_status'] or 'novo'} -> {linha['status']} {linha['error'] or ''} {marca}")
+                continue
+            print(
+                f"{linha['name']:<26} {linha['base_median_ms']:>9.2f} -> {linha['median_ms']:>9.2f} ms "
+                f"(x{linha['ratio']}) consultas {linha['base_queries']} -> {linha['queries']} {marca}"
+            )
+
+    if regressoes:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""Fixtures compartilhadas dos testes"""
+
+from contextlib import contextmanager
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.core.database import Base
+from app.core.query_stats import track_queries
+import app.models  # noqa: F401  (registra todas as tabelas no metadata)
+
+
+@pytest.fixture
+def db_engine():
+    """Banco SQLite em memória com o schema dos models"""
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool
+    )
+    Base.metadata.create_all(engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def db_session(db_engine):
+    session = sessionmaker(bind=db_engine, autocommit=False, autoflush=False)()
+    yield session
+    session.close()
+
+
+@pytest.fixture
+def query_budget(db_engine):
+    """
+    Limite de consultas SQL para um bloco (ex.: uma chamada de endpoint):
+
+        with query_budget(4):
+            client.get("/api/v1/nf")
+    """
+    @contextmanager
+    def budget(max_queries: int):
+        with track_queries(db_engine) as stats:
+            yield stats
+        assert stats.queries <= max_queries, (
+            f"Orçamento de {max_queries} consultas excedido\n{stats.describe()}"
+        )
+
+    return budget
+
+
+@pytest.fixture
+def api_client(db_engine):
+    """TestClient da API usando o banco de teste, autenticado como administrador"""
+    from fastapi.testclient import TestClient
+
+    from app.api import dependencies
+    from app.core.database import get_db
+    from app.main import app
+    from app.models.users import User, UserRole
+
+    SessionTest = sessionmaker(bind=db_engine, autocommit=False, autoflush=False)
+    admin = User(id=1, username="admin", email="admin@gmx.com.br", password="x", role=UserRole.ADMIN)
+
+    def override_get_db():
+        db = SessionTest()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    overrides = {
+        get_db: override_get_db,
+        dependencies.get_current_user: lambda: admin,
+    }
+    app.dependency_overrides.update(overrides)
+    yield TestClient(app)
+    for dependency in overrides:
+        app.dependency_overrides.pop(dependency, None)
+
+
+@pytest.fixture
+def seeded(db_session):
+    """Contrato com NFs pendentes (tests/factories.py:seed_contract)"""
+    from tests.factories import seed_contract
+
+    return seed_contract(db_session)
+
+
+@pytest.fixture
+def fake_n8n():
+    """Webhook do n8n simulado num servidor HTTP local (tests/fake_n8n.py)"""
+    from tests.fake_n8n import FakeN8nServer
+
+    server = FakeN8nServer().start()
+    yield server
+    server.stop()
@@ -0,0 +1,93 @@
+"""Dados e payloads compartilhados pelos testes (fixtures em conftest.py)"""
+
+from datetime import datetime
+from decimal import Decimal
+
+from app.models.contracts import Contract
+from app.models.cost_centers import CostCenter
+from app.models.notas_fiscais import NotaFiscal, NotaFiscalItem, NotaFiscalRollupMensal
+from app.models.purchases import Invoice, InvoiceItem, PurchaseOrder, Supplier
+from app.models.users import User
+
+
+NUM_NFS = 15
+
+
+def seed_contract(db_session):
+    """Contrato com NUM_NFS NFs pendentes (fornecedor 111), cada uma com 2 itens de 50 em Matéria-prima"""
+    usuario = User(username="seed", email="seed@gmx.com.br", password="x", role="admin")
+    db_session.add(usuario)
+    db_session.flush()
+
+    contrato = Contract(
+        numero_contrato="C-1", nome_projeto="Obra 1", cliente="Cliente", tipo_contrato="material",
+        valor_original=Decimal("1000"), data_inicio=datetime(2026, 1, 1), criado_por=usuario.id
+    )
+    centro = CostCenter(codigo="materia_prima", nome="Matéria-prima")
+    db_session.add_all([contrato, centro])
+    db_session.flush()
+
+    for i in range(NUM_NFS):
+        nf = NotaFiscal(
+            numero=str(i), serie="1", cnpj_fornecedor="111", nome_fornecedor="Fornecedor",
+            valor_total=Decimal("100"), data_emissao=datetime(2026, 3, 1 + i),
+            pasta_origem="obra1", contrato_id=contrato.id
+        )
+        nf.itens = [
+            NotaFiscalItem(numero_item=j, descricao=f"Item {j}", unidade="UN", quantidade=1,
+                           valor_unitario=50, valor_total=Decimal("50"), centro_custo_id=centro.id)
+            for j in range(2)
+        ]
+        db_session.add(nf)
+
+    db_session.commit()
+    return contrato
+
+
+def seed_purchase_order(db_session, contrato, numero_oc: str, data_emissao: datetime, notas=(), itens: int = 0,
+                        valor_total=Decimal("1000")):
+    """OC do contrato (fornecedor próprio) com uma nota por data em notas, cada uma com itens de 10.50"""
+    fornecedor = Supplier(nome=f"Fornecedor {numero_oc}")
+    db_session.add(fornecedor)
+    db_session.flush()
+
+    pedido = PurchaseOrder(
+        contract_id=contrato.id, numero_oc=numero_oc, supplier_id=fornecedor.id, valor_total=valor_total,
+        data_emissao=data_emissao, criado_por=contrato.criado_por
+    )
+    pedido.invoices = [
+        Invoice(numero_nf=f"{numero_oc}-{n}", valor_total=valor_total, data_emissao=data, items=[
+            InvoiceItem(descricao=f"Perfil {i}", centro_custo="Matéria-prima", quantidade=1,
+                        valor_unitario=Decimal("10.50"), valor_total=Decimal("10.50"))
+            for i in range(itens)
+        ])
+        for n, data in enumerate(notas, start=1)
+    ]
+    db_session.add(pedido)
+    db_session.commit()
+    return pedido
+
+
+def nf_payload(numero: str, chave: str = None, itens: int = 2, **campos):
+    """Payload de NotaFiscalCreate (fornecedor 222) com itens de 100"""
+    nf = {
+        "numero": numero, "serie": "1", "chave_acesso": chave,
+        "cnpj_fornecedor": "222", "nome_fornecedor": "Fornecedor Lote",
+        "valor_total": "300.00", "data_emissao": "2026-04-10T00:00:00", "pasta_origem": "lote",
+        "itens": [
+            {"numero_item": j, "descricao": f"Item {j}", "quantidade": "1", "unidade": "UN",
+             "valor_unitario": "100", "valor_total": "100"}
+            for j in range(1, itens + 1)
+        ]
+    }
+    nf.update(campos)
+    return nf
+
+
+def rollup_rows(db_session, cnpj: str):
+    """Linhas do nf_monthly_rollup de um fornecedor, comparáveis entre si"""
+    return sorted((
+        (r.mes, r.contrato_id or 0, r.cnpj_fornecedor, r.centro_custo_id or 0, r.status_processamento,
+         r.quantidade_nfs, r.valor_total, r.quantidade_itens, r.valor_itens)
+        for r in db_session.query(NotaFiscalRollupMensal).filter(NotaFiscalRollupMensal.cnpj_fornecedor == cnpj)
+    ))
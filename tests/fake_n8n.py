@@ -0,0 +1,88 @@
+"""
+Servidor HTTP local que simula o webhook do n8n nos testes.
+
+Responde cada POST com a próxima resposta programada (status e atraso; a
+última se repete) e registra as requisições e as conexões TCP abertas, para
+verificar keep-alive, novas tentativas e timeouts:
+
+    server.program((503, 0), (200, 0))
+    ...
+    assert server.connections == 1
+"""
+
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Tuple
+
+
+class FakeN8nServer:
+    def __init__(self):
+        self.requests: List[Dict[str, Any]] = []
+        self.connections = 0
+        self._responses: List[Tuple[int, float]] = [(200, 0.0)]
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, args=(0.05,), daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address
+        return f"http://{host}:{port}"
+
+    @property
+    def webhook_url(self) -> str:
+        return self.url + "/webhook/nome_pasta/{nome_pasta}"
+
+    def program(self, *responses: Tuple[int, float]) -> None:
+        """Respostas (status, atraso em segundos) das próximas requisições"""
+        with self._lock:
+            self._responses = list(responses)
+
+    def _next_response(self) -> Tuple[int, float]:
+        with self._lock:
+            return self._responses.pop(0) if len(self._responses) > 1 else self._responses[0]
+
+    def start(self) -> "FakeN8nServer":
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _handler_class(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # keep-alive
+
+            def setup(self):
+                super().setup()
+                with fake._lock:
+                    fake.connections += 1
+
+            def do_POST(self):
+                corpo = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                with fake._lock:
+                    fake.requests.append({"path": self.path, "json": json.loads(corpo or b"null")})
+                status, atraso = fake._next_response()
+                if atraso:
+                    time.sleep(atraso)
+
+                resposta = json.dumps({"ok": status < 400}).encode()
+                try:
+                    self.send_response(status)
+                    self.send_header("Content-Type", "application/json")
+                    self.send_header("Content-Length", str(len(resposta)))
+                    self.end_headers()
+                    self.wfile.write(resposta)
+                except (BrokenPipeError, ConnectionResetError):
+                    pass  # cliente desistiu (timeout)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
@@ -0,0 +1,93 @@
+"""Login: bcrypt fora do event loop e rehash transparente da senha"""
+
+import asyncio
+import time
+
+import httpx
+import pytest
+
+from app.core import auth
+from app.models.users import User
+
+
+LOGIN_BURST = 12
+
+
+@pytest.fixture
+def password_context(monkeypatch):
+    """Troca o custo do bcrypt (padrão baixo para os testes serem rápidos)"""
+    def configure(rounds: int):
+        monkeypatch.setattr(auth, "pwd_context", auth.build_password_context(rounds))
+    configure(4)
+    return configure
+
+
+@pytest.fixture
+def make_user(db_session):
+    def make(password: str) -> User:
+        user = User(username="operador", email="operador@gmx.com.br", password=password, role="suprimentos", isActive=True)
+        db_session.add(user)
+        db_session.commit()
+        return user
+    return make
+
+
+def _login(client, password: str):
+    return client.post("/api/v1/auth/login", data={"username": "operador@gmx.com.br", "password": password})
+
+
+def test_rehash_when_cost_changes(api_client, password_context, make_user, db_session):
+    user = make_user(auth.get_password_hash("segredo"))
+    assert user.password.startswith("$2b$04$")
+
+    password_context(5)
+    assert _login(api_client, "errada").status_code == 401
+    db_session.refresh(user)
+    assert user.password.startswith("$2b$04$")
+
+    assert _login(api_client, "segredo").status_code == 200
+    db_session.refresh(user)
+    assert user.password.startswith("$2b$05$")
+    assert auth.verify_password("segredo", user.password)
+
+
+def test_legacy_plaintext_password_is_hashed_on_login(api_client, password_context, make_user, db_session):
+    user = make_user("texto-puro")
+
+    assert _login(api_client, "texto-puro").status_code == 200
+    db_session.refresh(user)
+    assert auth.pwd_context.identify(user.password) == "bcrypt"
+    assert _login(api_client, "texto-puro").status_code == 200
+
+
+def test_other_endpoints_stay_responsive_during_login_burst(api_client, password_context, make_user):
+    password_context(11)
+    make_user(auth.get_password_hash("segredo"))
+
+    async def burst():
+        transport = httpx.ASGITransport(app=api_client.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            inicio = time.perf_counter()
+            logins = [
+                asyncio.create_task(client.post(
+                    "/api/v1/auth/login", data={"username": "operador@gmx.com.br", "password": "segredo"}
+                ))
+                for _ in range(LOGIN_BURST)
+            ]
+
+            latencias = []
+            while not all(task.done() for task in logins):
+                antes = time.perf_counter()
+                assert (await client.get("/health")).status_code == 200
+                latencias.append(time.perf_counter() - antes)
+                await asyncio.sleep(0.01)
+
+            respostas = await asyncio.gather(*logins)
+            return time.perf_counter() - inicio, latencias, respostas
+
+    duracao, latencias, respostas = asyncio.run(burst())
+
+    assert all(r.status_code == 200 for r in respostas)
+    # Os logins levam várias vezes o tempo de um bcrypt, mas /health responde durante toda a rajada
+    assert len(latencias) >= 5
+    assert max(latencias) < duracao / 3, f"máx {max(latencias):.3f}s em rajada de {duracao:.3f}s"
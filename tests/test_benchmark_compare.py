@@ -0,0 +1,24 @@
+"""Comparação de execuções do benchmark (benchmarks/suite.py --compare)"""
+
+from benchmarks.suite import compare
+
+
+def _ok(nome, mediana=10.0, consultas=3):
+    return {"name": nome, "status": "ok", "median_ms": mediana, "queries": consultas}
+
+
+def _erro(nome):
+    return {"name": nome, "status": "erro", "error": "RuntimeError: falhou"}
+
+
+def test_scenarios_that_start_failing_are_regressions():
+    base = {"scenarios": [_ok("estavel"), _ok("lento"), _ok("quebrou"), _erro("ja_falhava")]}
+    atual = {"scenarios": [
+        _ok("estavel", 10.5), _ok("lento", 20.0), _erro("quebrou"), _erro("ja_falhava"), _erro("novo"), _ok("novo_ok")
+    ]}
+
+    regressoes = {linha["name"]: linha["regression"] for linha in compare(atual, base, tolerance=0.2)}
+
+    assert regressoes == {
+        "estavel": False, "lento": True, "quebrou": True, "ja_falhava": False, "novo": True
+    }
@@ -0,0 +1,184 @@
+"""Barramento de alterações (publicação no commit) e stream SSE /events/stream"""
+
+import asyncio
+import json
+from datetime import datetime
+
+import pytest
+
+from app.core import events
+from app.core.events import ChangeBus, change_bus, publish_change
+from app.models.notas_fiscais import NotaFiscal, ProcessamentoLog
+from app.schemas.notas_fiscais import NotaFiscalCreate
+from app.services.nf_bulk_service import NotaFiscalBulkService
+from app.services.nf_service import NotaFiscalService
+from tests.factories import nf_payload
+
+
+async def _drain(assinatura, timeout: float = 0.2):
+    eventos = []
+    while (evento := await assinatura.get(timeout)) is not None:
+        eventos.append(evento)
+    return eventos
+
+
+def test_events_are_published_only_for_committed_chunks(db_session, monkeypatch):
+    gravar_bloco = NotaFiscalBulkService._gravar_bloco
+
+    def gravar_falhando_no_segundo(self, bloco, resultados):
+        gravar_bloco(self, bloco, resultados)
+        if bloco[0][0] >= 2:
+            raise RuntimeError("falha simulada")
+
+    monkeypatch.setattr(NotaFiscalBulkService, "_gravar_bloco", gravar_falhando_no_segundo)
+
+    async def executar():
+        assinatura = change_bus.subscribe(types={"nf"})
+        try:
+            nfs = [NotaFiscalCreate(**nf_payload(str(i))) for i in range(4)]
+            resultado = NotaFiscalBulkService(db_session).upsert(nfs, chunk_size=2)
+            return resultado, await _drain(assinatura)
+        finally:
+            assinatura.close()
+
+    resultado, eventos = asyncio.run(executar())
+
+    criadas = [r["id"] for r in resultado["resultados"] if r["status"] == "criada"]
+    assert [(e["type"], e["data"]["ids"]) for e in eventos] == [("nf.created", criadas)]
+    assert eventos[0]["data"]["count"] == 2
+
+
+def test_validation_and_processing_log_events(db_session, seeded):
+    ids = [nf_id for (nf_id,) in db_session.query(NotaFiscal.id)]
+
+    async def executar():
+        assinatura = change_bus.subscribe()
+        try:
+            log = ProcessamentoLog(pasta_nome="obra1", webhook_chamado_em=datetime.now(), status="iniciado")
+            db_session.add(log)
+            db_session.commit()
+            log.quantidade_nfs = 3
+            db_session.commit()  # sem mudança de status: sem evento
+            log.status = "concluido"
+            db_session.commit()
+
+            NotaFiscalService(db_session).change_status_batch(ids[:3], "validado")
+            return await _drain(assinatura)
+        finally:
+            assinatura.close()
+
+    eventos = asyncio.run(executar())
+
+    assert [e["type"] for e in eventos] == [
+        "processing_log.status", "processing_log.status", "nf.validated", "contract.totals"
+    ]
+    assert [e["data"]["status"] for e in eventos[:2]] == ["iniciado", "concluido"]
+    assert eventos[2]["data"]["ids"] == ids[:3]
+    assert eventos[3]["data"]["contracts"] == [
+        {"contrato_id": seeded.id, "delta_valor_realizado": 300.0, "valor_realizado": 300.0}
+    ]
+
+
+def test_notify_includes_events_published_by_final_flush(db_session, monkeypatch):
+    # Como no PostgreSQL: os eventos saem por NOTIFY dentro do commit
+    enviados = []
+    monkeypatch.setattr(change_bus, "uses_notify", lambda engine: True)
+    monkeypatch.setattr(events, "_send_notify", lambda session, payloads: enviados.append(payloads))
+
+    log = ProcessamentoLog(pasta_nome="obra1", webhook_chamado_em=datetime.now(), status="iniciado")
+    db_session.add(log)
+    db_session.commit()
+    log.status = "concluido"  # como a rota /process-folder: status alterado e commit
+    db_session.commit()
+
+    assert [[json.loads(p)["data"]["status"] for p in payloads] for payloads in enviados] == [
+        ["iniciado"], ["concluido"]
+    ]
+
+
+def test_rollback_discards_pending_events(db_session):
+    async def executar():
+        assinatura = change_bus.subscribe()
+        try:
+            db_session.add(ProcessamentoLog(pasta_nome="obra1", webhook_chamado_em=datetime.now(), status="iniciado"))
+            db_session.flush()
+            publish_change(db_session, "nf.created", ids=[1])
+            db_session.rollback()
+            db_session.commit()
+            return await _drain(assinatura)
+        finally:
+            assinatura.close()
+
+    assert asyncio.run(executar()) == []
+
+
+def test_replay_from_last_event_id_and_resync():
+    bus = ChangeBus(recent_events=3)
+
+    async def executar():
+        for i in range(5):
+            bus.dispatch("nf.updated", {"ids": [i]})
+
+        replay = bus.subscribe(last_event_id=3)
+        perdido = bus.subscribe(last_event_id=1)  # o evento 2 já saiu do histórico
+        outro_processo = bus.subscribe(last_event_id=99)
+        lenta = bus.subscribe(queue_size=2)
+        for i in range(3):
+            bus.dispatch("nf.updated", {"ids": [10 + i]})
+
+        return [await _drain(a, 0.05) for a in (replay, perdido, outro_processo, lenta)]
+
+    replay, perdido, outro_processo, lenta = asyncio.run(executar())
+
+    assert [e["id"] for e in replay] == [4, 5, 6, 7, 8]
+    assert perdido[0]["type"] == "resync" and outro_processo[0]["type"] == "resync"
+    assert [e["type"] for e in lenta] == ["resync"]  # 3 eventos numa fila de 2
+
+
+@pytest.mark.parametrize("types", ["nf", "contract"])
+def test_sse_endpoint_streams_filtered_events(api_client, types):
+    app = api_client.app
+
+    async def executar():
+        desconectar = asyncio.Event()
+        pedido_enviado = False
+        corpo = []
+
+        async def receive():
+            nonlocal pedido_enviado
+            if not pedido_enviado:
+                pedido_enviado = True
+                return {"type": "http.request", "body": b"", "more_body": False}
+            await desconectar.wait()
+            return {"type": "http.disconnect"}
+
+        async def send(mensagem):
+            if mensagem["type"] == "http.response.body":
+                corpo.append(mensagem.get("body", b"").decode())
+
+        scope = {
+            "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+            "scheme": "http", "path": "/api/v1/events/stream", "raw_path": b"/api/v1/events/stream",
+            "query_string": f"types={types}".encode(), "root_path": "",
+            "headers": [(b"host", b"test"), (b"authorization", b"Bearer teste")],
+            "client": ("127.0.0.1", 1234), "server": ("test", 80),
+        }
+        tarefa = asyncio.create_task(app(scope, receive, send))
+
+        while change_bus.subscriber_count == 0:
+            await asyncio.sleep(0.01)
+        change_bus.dispatch("contract.totals", {"contracts": []})
+        change_bus.dispatch("nf.created", {"ids": [7], "count": 1, "truncated": False})
+
+        while not any(f"event: {types}" in parte for parte in corpo):
+            await asyncio.sleep(0.01)
+        desconectar.set()
+        await asyncio.wait_for(tarefa, 5)
+        return "".join(corpo)
+
+    corpo = asyncio.run(executar())
+
+    assert corpo.startswith("retry: ")
+    eventos = [bloco for bloco in corpo.split("\n\n") if "event: " in bloco]
+    assert len(eventos) == 1 and f"event: {types}." in eventos[0]
+    assert change_bus.subscriber_count == 0
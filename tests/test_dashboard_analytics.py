@@ -0,0 +1,158 @@
+"""Métricas do dashboard executivo (ExecutiveAnalytics) conferidas com somas SQL diretas"""
+
+from datetime import datetime
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import func
+
+from app.models.contracts import BudgetItem, Contract
+from app.models.cost_centers import CostCenter
+from app.models.notas_fiscais import NotaFiscal, NotaFiscalItem
+from app.models.purchases import Invoice, InvoiceItem
+from app.schemas.dashboards import DashboardFilters
+from app.services.dashboard_analytics import ExecutiveAnalytics
+from app.services.dashboards import DashboardService
+from app.services.nf_service import NotaFiscalService
+from tests.factories import seed_purchase_order
+
+
+@pytest.fixture
+def dashboard_data(db_session, seeded):
+    """Contrato semeado (1000, orçamento 800, 5 NFs de 100 validadas) e um contrato sem NFs"""
+    sem_nfs = Contract(
+        numero_contrato="C-2", nome_projeto="Obra 2", cliente="Outro", tipo_contrato="material",
+        valor_original=Decimal("2000"), data_inicio=datetime(2026, 1, 1), criado_por=seeded.criado_por
+    )
+    db_session.add(sem_nfs)
+    db_session.flush()
+    db_session.add_all([
+        BudgetItem(contract_id=seeded.id, codigo_item="1", descricao="Aço", centro_custo="Matéria-prima",
+                   valor_total_previsto=Decimal("800")),
+        BudgetItem(contract_id=sem_nfs.id, codigo_item="1", descricao="Montagem", centro_custo="Mão-de-obra",
+                   valor_total_previsto=Decimal("1500")),
+    ])
+    db_session.commit()
+
+    ids = [nf_id for (nf_id,) in db_session.query(NotaFiscal.id).order_by(NotaFiscal.id).limit(5)]
+    NotaFiscalService(db_session).change_status_batch(ids, "validado")
+    return seeded, sem_nfs
+
+
+def _sql_totals(db_session):
+    valor_contratos = db_session.query(func.sum(Contract.valor_original)).scalar()
+    previsto = db_session.query(func.sum(BudgetItem.valor_total_previsto)).scalar()
+    realizado = db_session.query(func.sum(NotaFiscal.valor_total)).filter(
+        NotaFiscal.status_processamento == "validado", NotaFiscal.contrato_id.isnot(None)
+    ).scalar()
+    return Decimal(valor_contratos), Decimal(previsto), Decimal(realizado)
+
+
+def test_kpis_match_direct_sql_sums(db_session, dashboard_data):
+    valor_contratos, previsto, realizado = _sql_totals(db_session)
+    analytics = ExecutiveAnalytics.from_db(db_session, DashboardFilters())
+
+    assert (valor_contratos, previsto, realizado) == (Decimal("3000"), Decimal("2300"), Decimal("500"))
+    assert analytics.total_contracts_value() == int(valor_contratos * 100)
+    assert analytics.total_realized() == int(realizado * 100)
+    assert analytics.total_savings() == previsto - realizado
+    assert analytics.total_contract_balance() == valor_contratos - realizado
+    assert analytics.overall_completion_percentage() == round(realizado / valor_contratos * 100, 2)
+
+    itens_por_centro = dict(
+        db_session.query(CostCenter.nome, func.sum(NotaFiscalItem.valor_total))
+        .join(NotaFiscalItem, NotaFiscalItem.centro_custo_id == CostCenter.id)
+        .join(NotaFiscal, NotaFiscal.id == NotaFiscalItem.nota_id)
+        .filter(NotaFiscal.status_processamento == "validado")
+        .group_by(CostCenter.nome)
+    )
+    assert {
+        metrica.centro_custo: metrica.valor_realizado
+        for metrica in analytics.cost_centers_performance() if metrica.valor_realizado
+    } == {centro: Decimal(total) for centro, total in itens_por_centro.items()}
+
+
+def test_kpis_respect_contract_filter(db_session, dashboard_data):
+    seeded, sem_nfs = dashboard_data
+
+    analytics = ExecutiveAnalytics.from_db(db_session, DashboardFilters(contract_ids=[sem_nfs.id]))
+
+    assert analytics.total_realized() == 0
+    assert analytics.total_savings() == Decimal("1500")
+    assert analytics.total_contract_balance() == Decimal("2000")
+
+
+def test_executive_dashboard_endpoint(api_client, dashboard_data):
+    seeded, _ = dashboard_data
+
+    resposta = api_client.get("/api/v1/dashboards/executive")
+
+    assert resposta.status_code == 200, resposta.text
+    progresso = {c["contract_id"]: c["percentual_realizado"] for c in resposta.json()["contratos_progresso"]}
+    assert float(progresso[seeded.id]) == 50.0
+
+
+def test_executive_kpis_use_validated_nfs(api_client, db_session, dashboard_data):
+    valor_contratos, previsto, realizado = _sql_totals(db_session)
+
+    corpo = api_client.get("/api/v1/dashboards/executive").json()
+
+    assert Decimal(str(corpo["percentual_realizado_total"])) == round(realizado / valor_contratos * 100, 2)
+    assert Decimal(str(corpo["economia_total"])) == previsto - realizado
+    assert Decimal(str(corpo["saldo_contratos_total"])) == valor_contratos - realizado
+
+    # Mesmo realizado do gráfico previsto x realizado
+    realizado_grafico = corpo["previsto_vs_realizado"]["datasets"][1]["data"]
+    assert sum(realizado_grafico) == float(realizado)
+
+
+def test_supplies_savings_include_contracts_without_invoices(db_session, dashboard_data):
+    economia = DashboardService(db_session)._calculate_total_savings(DashboardFilters())
+
+    assert economia == Decimal("2300")  # nenhuma nota fiscal de compra lançada
+
+
+@pytest.fixture
+def notas_compra(db_session, dashboard_data):
+    """Notas fiscais de compra pela ordem de compra e vinculadas direto ao contrato (ingestão de ZIP)"""
+    seeded, sem_nfs = dashboard_data
+    seed_purchase_order(db_session, seeded, "OC-1", datetime(2026, 3, 1), notas=[datetime(2026, 3, 2)],
+                        itens=2, valor_total=Decimal("21"))
+
+    def nota(numero, contract_id, valor, centro=None):
+        itens = [InvoiceItem(descricao="Item", centro_custo=centro, valor_total=valor)] if centro else []
+        return Invoice(numero_nf=numero, contract_id=contract_id, valor_total=valor,
+                       data_emissao=datetime(2026, 3, 5), items=itens)
+
+    db_session.add_all([
+        nota("Z-1", sem_nfs.id, Decimal("300"), "Mobilização"),
+        nota("Z-2", seeded.id, Decimal("50")),              # sem itens: "Outros"
+        nota("Z-3", None, Decimal("999"), "Frete"),         # sem contrato: fora dos totais
+    ])
+    db_session.commit()
+    return seeded, sem_nfs
+
+
+def _gastos_por_centro(db_session, **filtros):
+    grafico = DashboardService(db_session)._get_spending_by_cost_center(DashboardFilters(**filtros))
+    return dict(zip(grafico.labels, grafico.datasets[0]["data"]))
+
+
+def test_cost_center_chart_counts_both_invoice_linkages(db_session, notas_compra):
+    seeded, sem_nfs = notas_compra
+
+    assert _gastos_por_centro(db_session) == {"Matéria-prima": 21.0, "Mobilização": 300.0, "Outros": 50.0}
+    assert _gastos_por_centro(db_session, contract_ids=[seeded.id]) == {"Matéria-prima": 21.0, "Outros": 50.0}
+    assert _gastos_por_centro(db_session, contract_ids=[sem_nfs.id]) == {"Mobilização": 300.0}
+
+
+def test_supplies_savings_and_chart_use_same_invoices(db_session, notas_compra):
+    seeded, sem_nfs = notas_compra
+    service = DashboardService(db_session)
+
+    for contract_ids, previsto in ((None, Decimal("2300")), ([seeded.id], Decimal("800")), ([sem_nfs.id], Decimal("1500"))):
+        economia = service._calculate_total_savings(DashboardFilters(contract_ids=contract_ids))
+        gastos = sum(_gastos_por_centro(db_session, contract_ids=contract_ids).values())
+        assert previsto - economia == Decimal(str(gastos))
+
+    assert service._calculate_total_savings(DashboardFilters()) == Decimal("2300") - Decimal("371")
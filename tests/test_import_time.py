@@ -0,0 +1,28 @@
+"""Tempo de subida: bibliotecas pesadas sob demanda e orçamento de importação"""
+
+import os
+
+from app.core.lazy import lazy_import
+from benchmarks.import_time import measure_import
+
+
+# Orçamento para `import app.main` (melhor de 3 execuções); ajustável em máquinas lentas
+IMPORT_BUDGET_MS = float(os.getenv("IMPORT_TIME_BUDGET_MS", "3000"))
+
+
+def test_app_import_does_not_load_heavy_libraries():
+    assert measure_import("app.main")["heavy_loaded"] == []
+
+
+def test_app_import_time_budget():
+    melhor_ms = min(measure_import("app.main")["total_us"] for _ in range(3)) / 1000
+    assert melhor_ms <= IMPORT_BUDGET_MS, f"import app.main levou {melhor_ms:.0f} ms (orçamento {IMPORT_BUDGET_MS:.0f} ms)"
+
+
+def test_lazy_module_loads_on_first_attribute_access():
+    modulo = lazy_import("json")
+    assert "não carregado" in repr(modulo)
+
+    assert modulo.loads("[1]") == [1]
+    assert "loads" in vars(modulo)  # atributos copiados: acessos seguintes sem __getattr__
+    assert "não carregado" not in repr(modulo)
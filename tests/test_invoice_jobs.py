@@ -0,0 +1,155 @@
+"""Jobs de ingestão de ZIP com progresso por arquivo (SSE) e cancelamento"""
+
+import asyncio
+import io
+import zipfile
+
+import pytest
+from sqlalchemy.orm import sessionmaker
+
+from app.api.routes import invoices as invoice_routes
+from app.models.purchases import Invoice, InvoiceItem
+from app.schemas.invoices import InvoiceJobStatus
+from app.services.invoice_jobs import InvoiceJobManager
+from app.services.invoice_processing_service import InvoiceProcessingService
+
+
+def _xml(numero: str, descricao: str = "Viga de aço W200") -> str:
+    return f"""<?xml version="1.0"?>
+    <NFe><infNFe>
+        <ide><nNF>{numero}</nNF><dhEmi>2024-01-15T10:00:00</dhEmi></ide>
+        <emit><xNome>Fornecedor {numero}</xNome></emit>
+        <total><ICMSTot><vNF>100.00</vNF></ICMSTot></total>
+        <det><prod><xProd>{descricao}</xProd><qCom>1</qCom><vUnCom>100.00</vUnCom><vProd>100.00</vProd><uCom>UN</uCom></prod></det>
+    </infNFe></NFe>"""
+
+
+def _zip(arquivos) -> bytes:
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as arquivo_zip:
+        for nome, conteudo in arquivos.items():
+            arquivo_zip.writestr(nome, conteudo)
+    return buffer.getvalue()
+
+
+ZIP_NFS = _zip({
+    "nf_1.xml": _xml("1"),
+    "nf_2.xml": _xml("2", "Frete da obra"),
+    "nf_3.xml": "<NFe>incompleto",
+    "leia-me.txt": "ignorado",
+})
+
+
+@pytest.fixture
+def jobs(db_engine, monkeypatch):
+    manager = InvoiceJobManager(session_factory=sessionmaker(bind=db_engine, autocommit=False, autoflush=False))
+    monkeypatch.setattr(invoice_routes, "invoice_jobs", manager)
+    return manager
+
+
+def _stream(app, job_id, iniciar=None):
+    """Lê o stream SSE do job até o servidor encerrá-lo"""
+
+    async def executar():
+        corpo = []
+        pedido_enviado = False
+
+        async def receive():
+            nonlocal pedido_enviado
+            if not pedido_enviado:
+                pedido_enviado = True
+                return {"type": "http.request", "body": b"", "more_body": False}
+            await asyncio.Event().wait()  # o cliente não desconecta
+
+        async def send(mensagem):
+            if mensagem["type"] == "http.response.body":
+                corpo.append(mensagem.get("body", b"").decode())
+
+        path = f"/api/v1/invoices/jobs/{job_id}/stream"
+        scope = {
+            "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+            "scheme": "http", "path": path, "raw_path": path.encode(), "query_string": b"", "root_path": "",
+            "headers": [(b"host", b"test")], "client": ("127.0.0.1", 1234), "server": ("test", 80),
+        }
+        tarefa = asyncio.create_task(app(scope, receive, send))
+        if iniciar is not None:
+            await iniciar()
+        await asyncio.wait_for(tarefa, 5)
+        return "".join(corpo)
+
+    corpo = asyncio.run(executar())
+    return [linha[len("event: "):] for linha in corpo.splitlines() if linha.startswith("event: ")]
+
+
+def test_zip_job_reports_progress_per_file(api_client, db_session, jobs):
+    resposta = api_client.post(
+        "/api/v1/invoices/upload-zip/1/jobs", files={"file": ("nfs.zip", ZIP_NFS, "application/zip")}
+    )
+
+    assert resposta.status_code == 202
+    job_id = resposta.json()["job_id"]
+
+    # O TestClient executa a tarefa em segundo plano antes de devolver a resposta
+    job = api_client.get(f"/api/v1/invoices/jobs/{job_id}").json()
+    assert job["status"] == InvoiceJobStatus.CONCLUIDO
+    assert (job["total_files"], job["processed_count"], job["failed_count"]) == (3, 2, 1)
+    assert job["errors"] == ["Não foi possível extrair dados de nf_3.xml"]
+    assert sorted(job["invoice_ids"]) == sorted(i for (i,) in db_session.query(Invoice.id))
+    assert {c for (c,) in db_session.query(InvoiceItem.centro_custo)} == {"Matéria-prima", "Mobilização"}
+
+    eventos = [(e["type"], e["data"].get("file")) for e in jobs.get(job_id).bus.recent(100)]
+    assert eventos == [
+        ("job.started", None),
+        ("file.parsed", "nf_1.xml"), ("file.classified", "nf_1.xml"), ("file.inserted", "nf_1.xml"),
+        ("file.parsed", "nf_2.xml"), ("file.classified", "nf_2.xml"), ("file.inserted", "nf_2.xml"),
+        ("file.failed", "nf_3.xml"),
+        ("job.finished", None),
+    ]
+    assert jobs.get(job_id).bus.recent(1)[0]["data"]["progress"] == {"total": 3, "processed": 2, "failed": 1, "done": 3}
+
+    # Job encerrado: o stream envia o estado e termina
+    assert _stream(api_client.app, job_id) == ["job.snapshot"]
+
+
+def test_resubmitting_running_job_returns_same_job(jobs):
+    job, precisa_processar = jobs.submit("zip", 1, 1, ZIP_NFS)
+    repetido, repetido_precisa = jobs.submit("zip", 1, 1, ZIP_NFS)
+    outro_contrato, _ = jobs.submit("zip", 2, 1, ZIP_NFS)
+
+    assert (precisa_processar, repetido_precisa) == (True, False)
+    assert repetido is job and outro_contrato is not job
+
+    jobs.run_zip(job.job_id, ZIP_NFS, "nfs.zip")
+    assert jobs.submit("zip", 1, 1, ZIP_NFS)[0] is not job  # encerrado: novo envio processa de novo
+
+
+def test_cancel_stops_before_next_file(api_client, db_session, jobs, monkeypatch):
+    job, _ = jobs.submit("zip", 1, 1, ZIP_NFS)
+    classificar = InvoiceProcessingService._classify_items
+
+    def classificar_e_cancelar(self, items):
+        api_client.post(f"/api/v1/invoices/jobs/{job.job_id}/cancel")
+        return classificar(self, items)
+
+    monkeypatch.setattr(InvoiceProcessingService, "_classify_items", classificar_e_cancelar)
+    jobs.run_zip(job.job_id, ZIP_NFS, "nfs.zip")
+
+    # O arquivo em andamento termina; os demais não são processados
+    assert (job.status, job.processed_count, job.failed_count) == (InvoiceJobStatus.CANCELADO, 1, 0)
+    assert db_session.query(Invoice).count() == 1
+    assert job.bus.recent(1)[0]["data"]["status"] == "cancelado"
+
+
+def test_stream_follows_running_job_until_finished(api_client, jobs):
+    job, _ = jobs.submit("zip", 1, 1, ZIP_NFS)
+
+    async def processar():
+        while job.bus.subscriber_count == 0:
+            await asyncio.sleep(0.01)
+        await asyncio.to_thread(jobs.run_zip, job.job_id, ZIP_NFS, "nfs.zip")
+
+    eventos = _stream(api_client.app, job.job_id, processar)
+
+    assert eventos[:2] == ["job.snapshot", "job.started"]
+    assert eventos.count("file.inserted") == 2 and eventos.count("file.failed") == 1
+    assert eventos[-1] == "job.finished"
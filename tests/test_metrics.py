@@ -0,0 +1,104 @@
+"""Métricas por rota (middleware) e contadores de ingestão"""
+
+import asyncio
+
+from fastapi import Depends, FastAPI, File, Response, UploadFile
+from fastapi.testclient import TestClient
+from prometheus_client import REGISTRY
+from sqlalchemy import text
+
+from app.core.metrics import MetricsMiddleware, render_metrics
+from app.services.invoice_processing_service import InvoiceProcessingService
+
+
+NFE_XML = """<?xml version="1.0" encoding="UTF-8"?>
+<nfeProc xmlns="http://www.portalfiscal.inf.br/nfe"><NFe><infNFe>
+  <ide><nNF>123</nNF><dhEmi>2025-03-10T10:00:00-03:00</dhEmi></ide>
+  <emit><xNome>Aço Forte</xNome></emit>
+  <det nItem="1"><prod><xProd>Viga de aço</xProd><qCom>2</qCom><vUnCom>10</vUnCom><vProd>20</vProd><uCom>UN</uCom></prod></det>
+  <total><ICMSTot><vNF>20</vNF></ICMSTot></total>
+</infNFe></NFe></nfeProc>"""
+
+
+def _sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+def _make_app(db_engine):
+    app = FastAPI()
+    app.add_middleware(MetricsMiddleware)
+
+    def get_conn():
+        with db_engine.connect() as conn:
+            yield conn
+
+    @app.get("/itens/{item_id}")
+    def get_item(item_id: int, conn=Depends(get_conn)):
+        conn.execute(text("SELECT count(*) FROM nf_itens")).scalar()
+        return {"id": item_id}
+
+    @app.post("/upload")
+    async def upload(file: UploadFile = File(...)):
+        return {"size": len(await file.read())}
+
+    @app.get("/metrics")
+    def metrics():
+        return Response(render_metrics(), media_type="text/plain")
+
+    return app
+
+
+def test_metrics_are_labelled_by_route_template(db_engine):
+    client = TestClient(_make_app(db_engine))
+    labels = {"method": "GET", "route": "/itens/{item_id}"}
+    antes = _sample("gmx_http_request_duration_seconds_count", **labels)
+    db_antes = _sample("gmx_http_request_db_seconds_sum", **labels)
+
+    for item_id in (1, 2, 3):
+        assert client.get(f"/itens/{item_id}").status_code == 200
+
+    assert _sample("gmx_http_request_duration_seconds_count", **labels) == antes + 3
+    assert _sample("gmx_http_requests_total", status="200", **labels) >= 3
+    assert _sample("gmx_http_request_db_seconds_sum", **labels) > db_antes
+    assert _sample("gmx_http_response_size_bytes_sum", **labels) > 0
+
+    corpo = client.get("/metrics").text
+    assert 'route="/itens/{item_id}"' in corpo
+    assert 'route="/itens/1"' not in corpo
+
+
+def test_unmatched_paths_share_one_label(db_engine):
+    client = TestClient(_make_app(db_engine))
+    antes = _sample("gmx_http_requests_total", method="GET", route="unmatched", status="404")
+
+    client.get("/nao-existe/1")
+    client.get("/nao-existe/2")
+
+    assert _sample("gmx_http_requests_total", method="GET", route="unmatched", status="404") == antes + 2
+
+
+def test_upload_bytes_are_counted(db_engine):
+    client = TestClient(_make_app(db_engine))
+    antes = _sample("gmx_upload_bytes_total", route="/upload")
+
+    resposta = client.post("/upload", files={"file": ("nf.xml", b"x" * 4096)})
+
+    assert resposta.json() == {"size": 4096}
+    assert _sample("gmx_upload_bytes_total", route="/upload") - antes >= 4096
+
+
+def test_ingestion_counters(db_session):
+    service = InvoiceProcessingService(db_session)
+    parsed = _sample("gmx_nf_parsed_total", formato="xml", resultado="ok")
+    falhas = _sample("gmx_nf_parsed_total", formato="xml", resultado="erro")
+    classificados = _sample("gmx_nf_items_classified_total", origem="invoice_processing", resultado="classificado")
+
+    asyncio.run(service._extract_from_xml(NFE_XML.encode(), is_content=True))
+    asyncio.run(service._extract_from_xml(b"<quebrado", is_content=True))
+    service._classify_cost_center("Viga de aço laminado")
+
+    assert _sample("gmx_nf_parsed_total", formato="xml", resultado="ok") == parsed + 1
+    assert _sample("gmx_nf_parsed_total", formato="xml", resultado="erro") == falhas + 1
+    assert _sample(
+        "gmx_nf_items_classified_total", origem="invoice_processing", resultado="classificado"
+    ) == classificados + 1
@@ -0,0 +1,146 @@
+"""Cliente do webhook do n8n: pool de conexões, novas tentativas e circuit breaker"""
+
+import asyncio
+import socket
+
+import httpx
+import pytest
+
+from app.services import n8n_client
+from app.services.n8n_client import CircuitBreaker, N8nClient, N8nResponseError, N8nUnavailableError
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def _client(webhook_url, **kwargs):
+    opcoes = {"timeout": 2.0, "connect_timeout": 1.0, "max_retries": 2, "backoff": 0.001}
+    opcoes.update(kwargs)
+    return N8nClient(webhook_url=webhook_url, **opcoes)
+
+
+def _unused_url() -> str:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        porta = sock.getsockname()[1]
+    return f"http://127.0.0.1:{porta}/webhook/nome_pasta/{{nome_pasta}}"
+
+
+def _run(client, *chamadas):
+    async def executar():
+        try:
+            resultados = []
+            for nome_pasta in chamadas:
+                try:
+                    resultados.append(await client.process_folder(nome_pasta, {"nome_pasta": nome_pasta}))
+                except Exception as e:
+                    resultados.append(e)
+            return resultados
+        finally:
+            await client.aclose()
+    return asyncio.run(executar())
+
+
+def test_connections_are_reused(fake_n8n):
+    respostas = _run(_client(fake_n8n.webhook_url), "obra 1", "obra 2", "obra 3")
+
+    assert [r.status_code for r in respostas] == [200, 200, 200]
+    assert len(fake_n8n.requests) == 3
+    assert fake_n8n.connections == 1
+    assert fake_n8n.requests[0]["path"] == "/webhook/nome_pasta/obra%201"
+    assert fake_n8n.requests[0]["json"] == {"nome_pasta": "obra 1"}
+
+
+def test_retries_unavailable_responses_then_succeeds(fake_n8n):
+    fake_n8n.program((503, 0), (429, 0), (200, 0))
+
+    [resposta] = _run(_client(fake_n8n.webhook_url), "obra")
+
+    assert resposta.status_code == 200
+    assert len(fake_n8n.requests) == 3
+
+
+def test_retries_are_bounded(fake_n8n):
+    fake_n8n.program((503, 0))
+
+    [erro] = _run(_client(fake_n8n.webhook_url, max_retries=1), "obra")
+
+    assert isinstance(erro, N8nResponseError) and erro.status_code == 503
+    assert len(fake_n8n.requests) == 2
+
+
+def test_gateway_errors_are_not_retried(fake_n8n):
+    # O proxy pode ter desistido depois de o webhook disparar o fluxo
+    fake_n8n.program((502, 0), (504, 0))
+
+    resultados = _run(_client(fake_n8n.webhook_url), "obra", "obra")
+
+    assert [r.status_code for r in resultados] == [502, 504]
+    assert all(isinstance(r, N8nResponseError) for r in resultados)
+    assert len(fake_n8n.requests) == 2
+
+
+def test_client_errors_and_read_timeouts_are_not_retried(fake_n8n):
+    fake_n8n.program((404, 0), (200, 1.0))
+
+    nao_encontrado, timeout = _run(_client(fake_n8n.webhook_url, timeout=0.3), "obra", "obra")
+
+    assert nao_encontrado.status_code == 404
+    assert isinstance(timeout, httpx.ReadTimeout)
+    assert len(fake_n8n.requests) == 2
+
+
+def test_circuit_breaker_fails_fast_and_recovers(fake_n8n):
+    relogio = FakeClock()
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=30, clock=relogio)
+
+    # n8n fora do ar: duas falhas abrem o circuito e a terceira chamada nem sai do processo
+    resultados = _run(_client(_unused_url(), breaker=breaker, max_retries=0), "a", "b", "c")
+    assert [type(r) for r in resultados] == [httpx.ConnectError, httpx.ConnectError, N8nUnavailableError]
+    assert breaker.state == "aberto"
+
+    # Após o período de espera uma chamada de teste fecha o circuito
+    relogio.now += 30
+    assert breaker.state == "meio-aberto"
+    [resposta] = _run(_client(fake_n8n.webhook_url, breaker=breaker), "d")
+    assert resposta.status_code == 200
+    assert breaker.state == "fechado"
+
+
+def test_failed_probe_reopens_circuit():
+    relogio = FakeClock()
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10, clock=relogio)
+    breaker.record_failure()
+
+    relogio.now += 10
+    breaker.before_call()
+    with pytest.raises(N8nUnavailableError):
+        breaker.before_call()  # apenas uma chamada de teste por vez
+
+    breaker.record_failure()
+    assert breaker.state == "aberto"
+
+
+def test_process_folder_endpoint(api_client, fake_n8n, monkeypatch):
+    cliente = _client(fake_n8n.webhook_url, breaker=CircuitBreaker(failure_threshold=1, reset_timeout=60))
+    monkeypatch.setattr(n8n_client, "_client", cliente)
+
+    resposta = api_client.post("/api/v1/nf/process-folder", json={"nome_pasta": "Obra Vale"})
+    assert resposta.status_code == 200
+    assert resposta.json()["n8n_url"] == fake_n8n.url + "/webhook/nome_pasta/Obra%20Vale"
+    assert fake_n8n.requests[-1]["json"]["nome_pasta"] == "Obra Vale"
+
+    fake_n8n.program((500, 0))
+    assert api_client.post("/api/v1/nf/process-folder", json={"nome_pasta": "Obra Vale"}).status_code == 502
+
+    # Circuito aberto: falha imediata, sem chamar o n8n
+    chamadas = len(fake_n8n.requests)
+    resposta = api_client.post("/api/v1/nf/process-folder", json={"nome_pasta": "Obra Vale"})
+    assert resposta.status_code == 503
+    assert int(resposta.headers["Retry-After"]) > 0
+    assert len(fake_n8n.requests) == chamadas
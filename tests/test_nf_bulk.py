@@ -0,0 +1,122 @@
+"""Gravação em lote de NFs (POST /nf/bulk) e criação individual com itens"""
+
+from decimal import Decimal
+
+from app.models.notas_fiscais import NotaFiscal, NotaFiscalItem
+from app.schemas.notas_fiscais import NotaFiscalCreate
+from app.services.nf_bulk_service import NotaFiscalBulkService
+from app.services.nf_rollup_service import NotaFiscalRollupService
+from app.services.nf_service import NotaFiscalService
+from tests.factories import nf_payload, rollup_rows
+
+
+def _bulk(api_client, nfs, **params):
+    resposta = api_client.post("/api/v1/nf/bulk", json={"nfs": nfs}, params=params)
+    assert resposta.status_code == 200, resposta.text
+    return resposta.json()
+
+
+def test_creates_then_updates_by_access_key(api_client, db_session, query_budget):
+    nfs = [nf_payload(str(i), chave=f"{i:044d}") for i in range(30)]
+
+    with query_budget(12):
+        resultado = _bulk(api_client, nfs)
+    assert (resultado["criadas"], resultado["atualizadas"], resultado["erros"]) == (30, 0, 0)
+    assert db_session.query(NotaFiscalItem).count() == 60
+
+    ids = [r["id"] for r in resultado["resultados"]]
+    nfs[0].update(valor_total="999.00", itens=nf_payload("0", itens=3)["itens"])
+    resultado = _bulk(api_client, nfs)
+
+    assert (resultado["criadas"], resultado["atualizadas"]) == (0, 30)
+    assert [r["id"] for r in resultado["resultados"]] == ids
+    assert db_session.query(NotaFiscal).count() == 30
+    assert db_session.query(NotaFiscalItem).count() == 61
+    assert db_session.get(NotaFiscal, ids[0]).valor_total == Decimal("999.00")
+
+
+def test_fallback_key_and_access_key_adoption(api_client, db_session):
+    [criada] = _bulk(api_client, [nf_payload("10")])["resultados"]
+    assert criada["status"] == "criada"
+
+    # Reenvio sem chave atualiza; com a chave, a mesma NF passa a tê-la
+    assert _bulk(api_client, [nf_payload("10", valor_total="150.00")])["resultados"][0]["id"] == criada["id"]
+    [com_chave] = _bulk(api_client, [nf_payload("10", chave="9" * 44)])["resultados"]
+    assert (com_chave["status"], com_chave["id"]) == ("atualizada", criada["id"])
+
+    [sem_chave] = _bulk(api_client, [nf_payload("10")])["resultados"]
+    assert sem_chave["id"] == criada["id"]
+    assert db_session.query(NotaFiscal).count() == 1
+    assert db_session.get(NotaFiscal, criada["id"]).chave_acesso == "9" * 44
+
+
+def test_blank_access_key_is_treated_as_missing(api_client, db_session):
+    nfs = [nf_payload("30", chave=""), nf_payload("31", chave="  ")]
+
+    resultado = _bulk(api_client, nfs)
+    assert (resultado["criadas"], resultado["erros"]) == (2, 0)
+
+    # Reenvio localiza pela chave natural número/série/CNPJ
+    nfs[0]["valor_total"] = "150.00"
+    resultado = _bulk(api_client, nfs)
+    assert (resultado["atualizadas"], resultado["erros"]) == (2, 0)
+    assert {chave for (chave,) in db_session.query(NotaFiscal.chave_acesso)} == {None}
+
+
+def test_resend_keeps_item_classification_and_manual_contract(api_client, db_session, seeded):
+    [criada] = _bulk(api_client, [nf_payload("20", chave="1" * 44)])["resultados"]
+    nf = db_session.get(NotaFiscal, criada["id"])
+    nf.contrato_id = seeded.id
+    nf.itens[0].centro_custo_id = 1
+    nf.itens[0].fonte_classificacao = "manual"
+    db_session.commit()
+
+    _bulk(api_client, [nf_payload("20", chave="1" * 44)])
+
+    db_session.expire_all()
+    nf = db_session.get(NotaFiscal, criada["id"])
+    assert nf.contrato_id == seeded.id
+    itens = {item.numero_item: item for item in nf.itens}
+    assert (itens[1].centro_custo_id, itens[1].fonte_classificacao) == (1, "manual")
+    assert itens[2].centro_custo_id is None
+
+
+def test_repeated_entries_and_failed_chunks(api_client, db_session, monkeypatch):
+    gravar_bloco = NotaFiscalBulkService._gravar_bloco
+    blocos = []
+
+    def gravar_falhando_no_segundo(self, bloco, resultados):
+        blocos.append(bloco)
+        gravar_bloco(self, bloco, resultados)
+        if len(blocos) == 2:
+            raise RuntimeError("falha simulada")
+
+    monkeypatch.setattr(NotaFiscalBulkService, "_gravar_bloco", gravar_falhando_no_segundo)
+    nfs = [nf_payload("30"), nf_payload("31"), nf_payload("30", valor_total="50.00"), nf_payload("32"), nf_payload("33")]
+
+    resultado = _bulk(api_client, nfs, chunk_size=2)
+
+    assert [r["status"] for r in resultado["resultados"]] == ["ignorada", "criada", "criada", "erro", "erro"]
+    assert resultado["success"] is False
+    assert sorted(n for (n,) in db_session.query(NotaFiscal.numero).all()) == ["30", "31"]
+    assert db_session.query(NotaFiscal.valor_total).filter(NotaFiscal.numero == "30").scalar() == Decimal("50.00")
+
+
+def test_rollup_matches_rebuild(api_client, db_session, seeded):
+    nfs = [nf_payload(str(i), data_emissao=f"2026-0{1 + i % 3}-05T00:00:00", contrato_id=seeded.id if i % 2 else None)
+           for i in range(40, 52)]
+    _bulk(api_client, nfs, chunk_size=5)
+
+    # Reenvio move NFs de mês e de contrato: os grupos antigos também são recalculados
+    for nf in nfs[:4]:
+        nf.update(data_emissao="2026-06-01T00:00:00", contrato_id=seeded.id)
+    _bulk(api_client, nfs, chunk_size=5)
+
+    incremental = rollup_rows(db_session, "222")
+    NotaFiscalRollupService(db_session).rebuild()
+    assert incremental == rollup_rows(db_session, "222")
+
+
+def test_create_nota_fiscal_with_items(db_session):
+    nf = NotaFiscalService(db_session).create_nota_fiscal(NotaFiscalCreate(**nf_payload("40", itens=3)))
+    assert [item.numero_item for item in nf.itens] == [1, 2, 3]
@@ -0,0 +1,69 @@
+"""Sumário de contratos com as NFs (contagens e somas condicionais numa única consulta)"""
+
+import json
+from datetime import datetime
+from decimal import Decimal
+
+import pytest
+
+from app.models.contracts import Contract
+from app.models.notas_fiscais import NotaFiscal
+from app.services.nf_service import NotaFiscalService
+from tests.factories import NUM_NFS
+
+
+@pytest.fixture
+def contratos(db_session, seeded):
+    """Contrato semeado com 5 NFs validadas, uma rejeitada e uma NF sem contrato; C-2 sem NFs"""
+    sem_nfs = Contract(
+        numero_contrato="C-2", nome_projeto="Obra 2", cliente="Outro", tipo_contrato="material",
+        valor_original=Decimal("2000"), data_inicio=datetime(2026, 1, 1), criado_por=seeded.criado_por
+    )
+    db_session.add_all([
+        sem_nfs,
+        NotaFiscal(numero="999", serie="1", cnpj_fornecedor="222", nome_fornecedor="Avulso",
+                   valor_total=Decimal("700"), data_emissao=datetime(2026, 3, 1), pasta_origem="obra1",
+                   status_processamento="validado"),
+    ])
+    db_session.commit()
+
+    ids = [nf_id for (nf_id,) in db_session.query(NotaFiscal.id).filter(
+        NotaFiscal.contrato_id == seeded.id
+    ).order_by(NotaFiscal.id).limit(6)]
+    service = NotaFiscalService(db_session)
+    service.change_status_batch(ids[:5], "validado")
+    service.change_status_batch(ids[5:], "rejeitado")
+    return seeded, sem_nfs
+
+
+def _campos(linha, esperado):
+    return {campo: linha[campo] for campo in esperado} == esperado
+
+
+def test_conditional_counts_and_sums(db_session, contratos):
+    seeded, sem_nfs = contratos
+
+    resumo = {row["id"]: row for row in NotaFiscalService(db_session).get_contracts_summary_with_nfs()}
+
+    assert list(resumo) == [seeded.id, sem_nfs.id]
+    assert _campos(resumo[seeded.id], {
+        "total_nfs": NUM_NFS, "nfs_validadas": 5, "nfs_pendentes": NUM_NFS - 5, "valor_original": 1000.0,
+        "valor_realizado": 500.0, "percentual_realizado": 50.0, "saldo_restante": 500.0
+    })
+    assert _campos(resumo[sem_nfs.id], {
+        "total_nfs": 0, "nfs_validadas": 0, "nfs_pendentes": 0, "valor_original": 2000.0,
+        "valor_realizado": 0.0, "percentual_realizado": 0, "saldo_restante": 2000.0
+    })
+
+
+def test_stream_matches_json_response(api_client, contratos):
+    resposta = api_client.get("/api/v1/nf/contracts/summary")
+    stream = api_client.get("/api/v1/nf/contracts/summary", params={"stream": "true"})
+
+    assert resposta.status_code == 200, resposta.text
+    assert stream.status_code == 200, stream.text
+    assert stream.headers["content-type"].startswith("application/x-ndjson")
+
+    linhas = [json.loads(linha) for linha in stream.text.splitlines()]
+    assert resposta.json()["total"] == len(linhas) == 2
+    assert linhas == resposta.json()["contracts"]
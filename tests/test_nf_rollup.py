@@ -0,0 +1,53 @@
+"""Estatísticas de NFs servidas pelo agregado mensal (nf_monthly_rollup)"""
+
+from datetime import datetime
+
+from sqlalchemy import func, update
+
+from app.models.notas_fiscais import NotaFiscal, NotaFiscalRollupMensal
+from app.services.nf_rollup_service import NotaFiscalRollupService
+from tests.factories import NUM_NFS, rollup_rows
+
+
+def _rebuilt(db_session):
+    incremental = rollup_rows(db_session, "111")
+    NotaFiscalRollupService(db_session).rebuild()
+    return incremental, rollup_rows(db_session, "111")
+
+
+def test_static_routes_are_not_captured_by_nf_id(api_client, seeded):
+    resposta = api_client.get("/api/v1/nf/stats")
+    assert resposta.status_code == 200, resposta.text
+    assert resposta.json()["total_nfs"] == NUM_NFS
+
+    assert api_client.get("/api/v1/nf/processing-logs").status_code == 200
+    assert api_client.get("/api/v1/nf/9999").status_code == 404
+
+
+def test_stats_do_not_write_and_sync_picks_up_external_writes(api_client, db_session, seeded):
+    # NFs gravadas fora da API (seed direto no banco) há algum tempo
+    db_session.execute(update(NotaFiscal).values(created_at=datetime(2026, 1, 1)))
+    db_session.commit()
+
+    # A leitura não altera o agregado
+    api_client.get("/api/v1/nf/stats")
+    assert db_session.query(NotaFiscalRollupMensal).count() == 0
+
+    resposta = api_client.post("/api/v1/nf/rollup/sync")
+    assert resposta.status_code == 200 and resposta.json()["rows"] > 0
+    incremental, reconstruido = _rebuilt(db_session)
+    assert incremental == reconstruido
+
+    # Alteração de status feita pelo n8n diretamente na tabela, com updated_at
+    db_session.execute(
+        update(NotaFiscal)
+        .where(NotaFiscal.numero.in_(["0", "1"]))
+        .values(status_processamento="validado", updated_at=func.now())
+    )
+    db_session.commit()
+
+    api_client.post("/api/v1/nf/rollup/sync")
+    db_session.expire_all()
+    incremental, reconstruido = _rebuilt(db_session)
+    assert incremental == reconstruido
+    assert any(linha[4] == "validado" for linha in incremental)
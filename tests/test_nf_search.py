@@ -0,0 +1,73 @@
+"""Busca textual em itens de NF (FTS5 no SQLite, criado junto com a tabela)"""
+
+from datetime import datetime
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import event
+
+from app.models.notas_fiscais import NotaFiscal, NotaFiscalItem
+from app.services.nf_search_service import NotaFiscalItemSearchService
+
+DESCRICOES = [
+    ("Viga de aço W200", "P-100", "73089010"),
+    ("Parafuso sextavado de aço inox com porca, arruela lisa e arruela de pressão", "P-200", "73181500"),
+    ("Cimento Portland CP-II", "C-300", "25232910"),
+]
+
+
+@pytest.fixture
+def itens(db_session, seeded):
+    nf = NotaFiscal(
+        numero="900", serie="1", cnpj_fornecedor="333", nome_fornecedor="Aços Brasil",
+        valor_total=Decimal("300"), data_emissao=datetime(2026, 4, 1), pasta_origem="obra1",
+        contrato_id=seeded.id
+    )
+    nf.itens = [
+        NotaFiscalItem(numero_item=i, descricao=descricao, codigo_produto=codigo, ncm=ncm, unidade="UN",
+                       quantidade=1, valor_unitario=100, valor_total=Decimal("100"))
+        for i, (descricao, codigo, ncm) in enumerate(DESCRICOES)
+    ]
+    db_session.add(nf)
+    db_session.commit()
+    return nf.itens
+
+
+def _descricoes(db_session, consulta):
+    resultados, _ = NotaFiscalItemSearchService(db_session).search(consulta)
+    return [item.descricao for item, _ in resultados]
+
+
+def test_ranking_accents_and_prefix(db_session, itens):
+    # O item mais curto com o termo vem primeiro (bm25)
+    assert _descricoes(db_session, "aço") == [DESCRICOES[0][0], DESCRICOES[1][0]]
+    assert _descricoes(db_session, "ACO") == _descricoes(db_session, "aço")
+    assert _descricoes(db_session, "parafu inox") == [DESCRICOES[1][0]]
+    assert _descricoes(db_session, "aço cimento") == []
+
+
+def test_lookup_by_ncm_and_product_code(db_session, itens):
+    assert _descricoes(db_session, "7308") == [DESCRICOES[0][0]]
+    assert _descricoes(db_session, "C-300") == [DESCRICOES[2][0]]
+
+
+def test_triggers_keep_index_in_sync(db_session, itens):
+    viga, parafuso, _ = itens
+
+    viga.descricao = "Perfil laminado"
+    db_session.delete(parafuso)
+    db_session.commit()
+
+    assert _descricoes(db_session, "aço") == []
+    assert _descricoes(db_session, "laminado") == [viga.descricao]
+
+
+def test_search_endpoint_runs_no_ddl(api_client, db_engine, itens):
+    comandos = []
+    event.listen(db_engine, "before_cursor_execute", lambda conn, cursor, sql, *args: comandos.append(sql))
+
+    resposta = api_client.get("/api/v1/nf/items/search", params={"q": "viga"})
+
+    assert resposta.status_code == 200, resposta.text
+    assert [item["description"] for item in resposta.json()["items"]] == [DESCRICOES[0][0]]
+    assert not [sql for sql in comandos if sql.lstrip().upper().startswith(("CREATE", "INSERT"))]
@@ -0,0 +1,50 @@
+"""Serializadores de linhas de NF e resposta JSON (orjson)"""
+
+from datetime import datetime
+from decimal import Decimal
+
+import orjson
+from sqlalchemy import column
+
+from app.core.responses import ORJSONResponse
+from app.services.nf_serializers import DATE, ISO, NUMBER_OR_NONE, NUMBER_OR_ZERO, RowSerializer
+from tests.factories import NUM_NFS
+
+
+def test_row_serializer_conversions():
+    serializer = RowSerializer("serialize_teste", [
+        (None, column("oculto"), None),
+        ("valor", column("valor"), NUMBER_OR_ZERO),
+        ("peso", column("peso"), NUMBER_OR_NONE),
+        ("data", column("data"), DATE),
+        ("criado", column("criado"), ISO),
+    ])
+    momento = datetime(2026, 3, 1, 10, 30)
+
+    assert serializer.serialize((1, Decimal("10.50"), Decimal("0"), momento, momento)) == {
+        "valor": 10.5, "peso": None, "data": "2026-03-01", "criado": "2026-03-01T10:30:00"
+    }
+    assert serializer.many([(1, None, None, None, None)]) == [
+        {"valor": 0, "peso": None, "data": None, "criado": None}
+    ]
+
+
+def test_orjson_response_handles_decimal_and_dates():
+    resposta = ORJSONResponse({"valor": Decimal("1.25"), "data": datetime(2026, 1, 2), 1: {"a"}})
+    assert orjson.loads(resposta.body) == {"valor": 1.25, "data": "2026-01-02T00:00:00", "1": ["a"]}
+
+
+def test_contract_detailed_groups_items_by_nf(api_client, seeded, query_budget):
+    with query_budget(6) as stats:
+        resposta = api_client.get(f"/api/v1/nf/contract/{seeded.id}/detailed", params={"limit": 100})
+
+    assert resposta.status_code == 200
+    assert not stats.repeated(threshold=1)
+    corpo = resposta.json()
+    assert corpo["summary"]["total_nfs"] == NUM_NFS
+    assert corpo["summary"]["total_itens"] == NUM_NFS * 2
+    assert corpo["summary"]["nfs_pendentes"] == NUM_NFS
+    assert all(
+        [item["numero_item"] for item in nf["items"]] == [0, 1] and nf["items"][0]["centro_custo"] == "Matéria-prima"
+        for nf in corpo["nfs"]
+    )
@@ -0,0 +1,63 @@
+"""Validação e rejeição de NFs em lote com variação do valor realizado por contrato"""
+
+from app.models.notas_fiscais import NotaFiscal, NotaFiscalItem
+from app.services.nf_rollup_service import NotaFiscalRollupService
+from app.services.nf_service import NotaFiscalService
+from tests.factories import NUM_NFS, rollup_rows
+
+
+def _ids(db_session):
+    return [nf_id for (nf_id,) in db_session.query(NotaFiscal.id).order_by(NotaFiscal.id)]
+
+
+def test_validate_batch(api_client, db_session, seeded, query_budget):
+    ids = _ids(db_session)
+
+    with query_budget(10):
+        resposta = api_client.post("/api/v1/nf/validate-batch", json={"nf_ids": ids + [9999]})
+
+    assert resposta.status_code == 200
+    resultado = resposta.json()
+    assert (resultado["updated"], resultado["unchanged"], resultado["not_found"]) == (NUM_NFS, 0, [9999])
+    assert resultado["items_updated"] == NUM_NFS * 2
+    assert resultado["contracts"] == [
+        {"contrato_id": seeded.id, "delta_valor_realizado": 100.0 * NUM_NFS, "valor_realizado": 100.0 * NUM_NFS}
+    ]
+    assert float(NotaFiscalService(db_session).calculate_contract_realized_value(seeded.id)) == 100.0 * NUM_NFS
+    assert db_session.query(NotaFiscalItem).filter(NotaFiscalItem.status_integracao != "integrado").count() == 0
+
+    # Repetir a validação não altera nada
+    resultado = api_client.post("/api/v1/nf/validate-batch", json={"nf_ids": ids}).json()
+    assert (resultado["updated"], resultado["unchanged"]) == (0, NUM_NFS)
+    assert resultado["contracts"][0]["delta_valor_realizado"] == 0
+
+
+def test_reject_batch_reverts_contract_totals(api_client, db_session, seeded):
+    ids = _ids(db_session)
+    api_client.post("/api/v1/nf/validate-batch", json={"nf_ids": ids})
+
+    resultado = api_client.post(
+        "/api/v1/nf/reject-batch", json={"nf_ids": ids[:5], "motivo": "Valor divergente"}
+    ).json()
+
+    assert resultado["updated"] == 5
+    assert resultado["contracts"][0]["delta_valor_realizado"] == -500.0
+    assert resultado["contracts"][0]["valor_realizado"] == 100.0 * (NUM_NFS - 5)
+
+    db_session.expire_all()
+    rejeitada = db_session.get(NotaFiscal, ids[0])
+    assert (rejeitada.status_processamento, rejeitada.observacoes) == ("erro", "Valor divergente")
+    assert {item.status_integracao for item in rejeitada.itens} == {"pendente"}
+
+    incremental = rollup_rows(db_session, "111")
+    NotaFiscalRollupService(db_session).rebuild()
+    assert incremental == rollup_rows(db_session, "111")
+
+
+def test_single_validate_endpoint(api_client, db_session, seeded):
+    nf_id = _ids(db_session)[0]
+
+    resposta = api_client.patch(f"/api/v1/nf/{nf_id}/validate")
+    assert resposta.status_code == 200
+    assert resposta.json()["valor_realizado_contrato"] == 100.0
+    assert api_client.patch("/api/v1/nf/9999/validate").status_code == 404
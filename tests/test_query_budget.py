@@ -0,0 +1,78 @@
+"""Contagem de consultas por requisição, detector de N+1 e orçamentos por endpoint"""
+
+from datetime import date, datetime
+
+from app.core.query_stats import report_n_plus_one, statement_shape, track_queries
+from app.models.notas_fiscais import NotaFiscal
+from app.services.reports_simple import SimpleReportsService
+from tests.factories import NUM_NFS, seed_purchase_order
+
+
+def test_statement_shape_ignores_literals_and_in_list_sizes():
+    assert statement_shape("SELECT * FROM t WHERE id IN (?, ?, ?)") == statement_shape(
+        "SELECT *\n  FROM t WHERE id IN (?, ?)"
+    )
+    assert statement_shape("SELECT * FROM t LIMIT 10") == statement_shape("SELECT * FROM t LIMIT 20")
+
+
+def test_detects_lazy_loading_in_loop(db_session, seeded, capsys):
+    with track_queries() as stats:
+        for nf in db_session.query(NotaFiscal).all():
+            len(nf.itens)
+
+    assert stats.queries == NUM_NFS + 1
+    repetidos = report_n_plus_one(stats, "teste", threshold=10)
+    assert [count for _, count in repetidos] == [NUM_NFS]
+    assert "[N+1] teste" in capsys.readouterr().out
+
+
+def test_nf_list_query_budget(api_client, seeded, query_budget):
+    with query_budget(2) as stats:
+        resposta = api_client.get("/api/v1/nf", params={"limit": NUM_NFS})
+
+    assert resposta.status_code == 200
+    assert len(resposta.json()["nfs"]) == NUM_NFS
+    assert not stats.repeated(threshold=1)
+
+
+def test_nf_detail_query_budget(api_client, seeded, query_budget, db_session):
+    nf_id = db_session.query(NotaFiscal.id).first()[0]
+
+    with query_budget(2):
+        resposta = api_client.get(f"/api/v1/nf/{nf_id}")
+
+    assert resposta.status_code == 200
+    assert all(item["centro_custo"] == "Matéria-prima" for item in resposta.json()["items"])
+
+
+def test_simple_analytical_report_query_budget(db_session, seeded, query_budget):
+    seed_purchase_order(db_session, seeded, "OC-1", datetime(2026, 3, 1), notas=[datetime(2026, 3, 2)])
+    seed_purchase_order(db_session, seeded, "OC-2", datetime(2026, 5, 10),
+                        notas=[datetime(2026, 5, 31, 18), datetime(2026, 6, 1)])
+    service = SimpleReportsService(db_session)
+
+    # Contratos, OCs, fornecedores e NFs: uma consulta cada, com ou sem período
+    with query_budget(4):
+        [completo] = service.generate_analytical_report()["contracts"]
+    with query_budget(4):
+        [periodo] = service.generate_analytical_report(
+            start_date=date(2026, 5, 1), end_date=date(2026, 5, 31)
+        )["contracts"]
+
+    assert [oc["numero_oc"] for oc in completo["purchases"]] == ["OC-1", "OC-2"]
+    assert len(completo["invoices"]) == 3
+    assert [oc["numero_oc"] for oc in periodo["purchases"]] == ["OC-2"]
+    assert [nf["numero_nf"] for nf in periodo["invoices"]] == ["OC-2-1"]
+    assert periodo["metrics"]["valor_realizado"] == 1000.0
+
+
+def test_debug_headers(api_client, seeded, monkeypatch):
+    from app.core.config import settings
+
+    monkeypatch.setattr(settings, "debug", True)
+    resposta = api_client.get("/api/v1/nf")
+    assert int(resposta.headers["X-DB-Queries"]) >= 2
+    assert float(resposta.headers["X-DB-Time"]) >= 0
+
+    monkeypatch.setattr(settings, "debug", False)
+    assert "X-DB-Queries" not in api_client.get("/api/v1/nf").headers
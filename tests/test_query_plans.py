@@ -0,0 +1,88 @@
+"""
+Regressão de planos de consulta: os caminhos quentes devem usar índices.
+
+Por padrão roda em SQLite (schema dos models, EXPLAIN QUERY PLAN). Com
+TEST_DATABASE_URL apontando para um PostgreSQL já migrado, roda EXPLAIN com
+enable_seqscan desligado: se ainda assim aparecer um Seq Scan, falta índice.
+"""
+
+import os
+from datetime import datetime
+from typing import Any, Dict, List
+
+import pytest
+from sqlalchemy import create_engine, func
+from sqlalchemy.orm import Session, sessionmaker
+
+from app.models.contracts import BudgetItem, ValorPrevisto
+from app.models.notas_fiscais import NotaFiscal, NotaFiscalItem
+from app.models.purchases import Invoice, InvoiceItem, PurchaseOrder
+
+
+HOT_QUERIES = {
+    "nfs_por_contrato_e_status": lambda db: db.query(NotaFiscal.id).filter(
+        NotaFiscal.contrato_id == 1, NotaFiscal.status_processamento == "validado"
+    ),
+    "nfs_por_status_e_periodo": lambda db: db.query(NotaFiscal.id).filter(
+        NotaFiscal.status_processamento == "validado",
+        NotaFiscal.data_emissao >= datetime(2026, 1, 1)
+    ),
+    "itens_nf_por_centro_custo": lambda db: db.query(
+        func.sum(NotaFiscalItem.valor_total)
+    ).filter(NotaFiscalItem.centro_custo_id == 1),
+    "invoices_por_contrato": lambda db: db.query(Invoice.id).filter(Invoice.contract_id == 1),
+    "invoices_por_oc": lambda db: db.query(Invoice.id).filter(Invoice.purchase_order_id == 1),
+    "itens_invoice_por_invoice": lambda db: db.query(InvoiceItem.id).filter(InvoiceItem.invoice_id == 1),
+    "ocs_por_contrato": lambda db: db.query(PurchaseOrder.id).filter(PurchaseOrder.contract_id == 1),
+    "orcamento_por_contrato": lambda db: db.query(BudgetItem.id).filter(BudgetItem.contract_id == 1),
+    "valor_previsto_por_contrato": lambda db: db.query(ValorPrevisto.id).filter(ValorPrevisto.contract_id == 1),
+}
+
+
+@pytest.fixture
+def plan_session(request):
+    url = os.getenv("TEST_DATABASE_URL")
+    if not url:
+        yield request.getfixturevalue("db_session")
+        return
+
+    engine = create_engine(url)
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.rollback()
+    session.close()
+    engine.dispose()
+
+
+def _explain(db: Session, query) -> List[str]:
+    """Retorna os nós do plano que indicam varredura completa de tabela"""
+    connection = db.connection()
+    compiled = query.statement.compile(dialect=connection.dialect)
+    if compiled.positional:
+        params: Any = tuple(compiled.params[name] for name in compiled.positiontup)
+    else:
+        params = compiled.params
+
+    if connection.dialect.name == "postgresql":
+        connection.exec_driver_sql("SET LOCAL enable_seqscan = off")
+        plan = connection.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {compiled}", params).scalar()
+
+        def walk(node: Dict[str, Any]):
+            yield node
+            for child in node.get("Plans", []):
+                yield from walk(child)
+
+        return [
+            f"Seq Scan on {node.get('Relation Name')}"
+            for node in walk(plan[0]["Plan"])
+            if node["Node Type"] == "Seq Scan"
+        ]
+
+    rows = connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {compiled}", params).all()
+    return [row[-1] for row in rows if row[-1].startswith("SCAN ")]
+
+
+@pytest.mark.parametrize("name", sorted(HOT_QUERIES))
+def test_hot_query_uses_index(plan_session, name):
+    scans = _explain(plan_session, HOT_QUERIES[name](plan_session))
+    assert not scans, f"{name} faz varredura completa: {scans}"
@@ -0,0 +1,105 @@
+"""Jobs de relatório: reaproveitamento do artefato por (filtros, versão dos dados) e falhas de renderização"""
+
+import os
+from datetime import datetime
+
+import pytest
+from sqlalchemy.orm import sessionmaker
+
+from app.api.routes import reports as reports_routes
+from app.schemas.reports import ReportFilter, ReportFormat, ReportJobStatus, ReportRequest, ReportType
+from app.services import report_jobs
+from app.services.report_jobs import ReportArtifactStore, ReportJobManager
+from tests.factories import seed_purchase_order
+
+
+@pytest.fixture
+def compras(db_session, seeded):
+    seed_purchase_order(db_session, seeded, "OC-1", datetime(2026, 3, 1), notas=[datetime(2026, 3, 2)], itens=3)
+    return seeded
+
+
+@pytest.fixture
+def manager(tmp_path, db_engine, monkeypatch):
+    """Gerenciador novo em reports/ de um diretório temporário; run() abre as sessões no banco de teste"""
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(report_jobs, "SessionLocal", sessionmaker(bind=db_engine))
+    manager = ReportJobManager(ReportArtifactStore())
+    monkeypatch.setattr(reports_routes, "report_jobs", manager)
+    return manager
+
+
+def _request(contract_id, report_format=ReportFormat.EXCEL):
+    return ReportRequest(report_type=ReportType.ANALITICO, format=report_format,
+                         filters=ReportFilter(contract_id=contract_id))
+
+
+def test_identical_requests_reuse_job_and_artifact(db_session, compras, manager):
+    request = _request(compras.id)
+
+    job, precisa_renderizar = manager.submit(db_session, request)
+    repetido, renderizar_de_novo = manager.submit(db_session, request)
+    assert precisa_renderizar and not renderizar_de_novo
+    assert repetido["job_id"] == job["job_id"] and repetido["status"] == ReportJobStatus.PENDENTE
+
+    concluido = manager.run(job["job_id"], request)
+    assert concluido["status"] == ReportJobStatus.CONCLUIDO, concluido["error"]
+    assert os.listdir(manager.store.reports_dir) == [f"{job['job_id']}.xlsx"]
+
+    # Outro worker (sem o job em memória) encontra o arquivo já gerado
+    outro_worker = ReportJobManager(manager.store)
+    assert outro_worker.get(job["job_id"])["file_url"] == concluido["file_url"]
+    reaproveitado, precisa_renderizar = outro_worker.submit(db_session, request)
+    assert not precisa_renderizar
+    assert (reaproveitado["status"], reaproveitado["file_url"]) == (ReportJobStatus.CONCLUIDO, concluido["file_url"])
+
+
+def test_data_change_forces_new_render(db_session, compras, manager):
+    request = _request(compras.id)
+    versao = manager.store.data_version(db_session)
+    job, _ = manager.submit(db_session, request)
+    manager.run(job["job_id"], request)
+
+    seed_purchase_order(db_session, compras, "OC-2", datetime(2026, 4, 1), notas=[datetime(2026, 4, 2)], itens=1)
+
+    assert manager.store.data_version(db_session) != versao
+    novo, precisa_renderizar = manager.submit(db_session, request)
+    assert precisa_renderizar and novo["job_id"] != job["job_id"]
+
+
+def test_failed_render_ends_in_error_without_partial_file(db_session, compras, manager, monkeypatch):
+    def render_falhando(self, request, artifact_name=None):
+        with open(manager.store.partial_path(artifact_name, request.format), "wb") as arquivo:
+            arquivo.write(b"incompleto")
+        raise RuntimeError("falha na renderização")
+
+    monkeypatch.setattr(report_jobs.ReportsService, "generate_report", render_falhando)
+    request = _request(compras.id)
+    job, _ = manager.submit(db_session, request)
+
+    resultado = manager.run(job["job_id"], request)
+
+    assert (resultado["status"], resultado["error"]) == (ReportJobStatus.ERRO, "falha na renderização")
+    assert os.listdir(manager.store.reports_dir) == []
+
+
+def test_job_endpoints_and_generate_conflict(api_client, db_session, compras, manager):
+    request = _request(compras.id)
+    em_andamento, _ = manager.submit(db_session, request)
+    corpo = request.model_dump(mode="json")
+
+    conflito = api_client.post("/api/v1/reports/generate", json=corpo)
+    agendado = api_client.post("/api/v1/reports/jobs", json=corpo)
+    assert conflito.status_code == 409, conflito.text
+    assert agendado.status_code == 202, agendado.text
+    assert agendado.json()["job_id"] == em_andamento["job_id"]
+    assert api_client.get(f"/api/v1/reports/jobs/{em_andamento['job_id']}").json()["status"] == "pendente"
+
+    # Um pedido novo é renderizado em segundo plano e consultado pelo id
+    todos = _request(None).model_dump(mode="json")
+    agendado = api_client.post("/api/v1/reports/jobs", json=todos)
+    job = api_client.get(f"/api/v1/reports/jobs/{agendado.json()['job_id']}").json()
+    assert job["status"] == "concluido", job
+    assert api_client.post("/api/v1/reports/generate", json=todos).json()["file_url"] == job["file_url"]
+
+    assert api_client.get("/api/v1/reports/jobs/inexistente").status_code == 404
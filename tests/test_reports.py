@@ -0,0 +1,180 @@
+"""Relatório analítico em PDF/Excel/CSV com as linhas lidas em lotes e paginação do PDF"""
+
+import csv
+import io
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from decimal import Decimal
+
+import openpyxl
+import pytest
+from reportlab.lib.pagesizes import A4
+
+from app.schemas.reports import ReportFilter, ReportFormat, ReportRequest, ReportType
+from app.api import dependencies
+from app.core.config import settings
+from app.main import app
+from app.models.users import User, UserRole
+from app.services import pdf_rendering, render_pool, reports
+from app.services.report_jobs import ReportArtifactStore
+from app.services.reports import ANALYTICAL_EXPORT_COLUMNS, ReportsService
+from app.services.reports_simple import SimpleReportsService
+from tests.factories import seed_purchase_order
+
+NUM_ITENS = 120
+
+
+@pytest.fixture
+def compras(db_session, seeded):
+    seed_purchase_order(db_session, seeded, "OC-1", datetime(2026, 3, 1), notas=[datetime(2026, 3, 2)], itens=NUM_ITENS)
+    return seeded
+
+
+@pytest.fixture
+def reports_dir(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    return tmp_path / "reports"
+
+
+def _request(report_format, contract_id):
+    return ReportRequest(report_type=ReportType.ANALITICO, format=report_format,
+                         filters=ReportFilter(contract_id=contract_id))
+
+
+def test_table_chunk_fits_page_frame():
+    rows = ([str(i)] * 6 for i in range(200))
+    chunk = next(pdf_rendering.table_chunks(
+        ['a'] * 6, rows, col_widths=[75] * 6, style=pdf_rendering.ANALYTICAL_TABLE_STYLE,
+        row_height=12, header_height=20
+    ))
+
+    frame_height = A4[1] - 2 * pdf_rendering.PAGE_MARGIN - 2 * pdf_rendering.FRAME_PADDING
+    assert chunk.wrap(A4[0], frame_height)[1] <= frame_height
+
+
+def test_analytical_pdf_receives_rows_from_spool(db_session, compras, reports_dir, monkeypatch):
+    chamadas = []
+
+    def render(func, report_data, filepath, itens_path):
+        chamadas.append((report_data, itens_path, list(pdf_rendering.read_spool(itens_path))))
+        return func(report_data, filepath, itens_path)
+
+    monkeypatch.setattr(reports, "render", render)
+
+    resultado = ReportsService(db_session).generate_report(_request(ReportFormat.PDF, compras.id))
+
+    report_data, itens_path, itens = chamadas[0]
+    assert report_data.itens == [] and report_data.total_geral == Decimal("10.50") * NUM_ITENS
+    assert [item["descricao"] for item in itens] == [f"Perfil {i}" for i in range(NUM_ITENS)]
+    assert os.path.getsize(reports_dir / os.path.basename(resultado["file_url"])) > 0
+    assert not os.path.exists(itens_path)
+
+
+def test_analytical_excel_and_json_match(db_session, compras, reports_dir):
+    service = ReportsService(db_session)
+
+    planilha = service.generate_report(_request(ReportFormat.EXCEL, compras.id))
+    dados = service.generate_report(_request(ReportFormat.JSON, compras.id))["data"]
+
+    linhas = list(openpyxl.load_workbook(reports_dir / os.path.basename(planilha["file_url"])).active.values)
+    assert linhas[2][0] == f"Total Geral: R$ {Decimal('10.50') * NUM_ITENS:,.2f}"
+    assert linhas[3][0] == "Descrição"
+    assert [linha[0] for linha in linhas[4:]] == [item["descricao"] for item in dados["itens"]]
+    assert len(dados["itens"]) == NUM_ITENS and dados["total_geral"] == Decimal("10.50") * NUM_ITENS
+
+
+def test_partial_artifacts_are_unique_per_render(tmp_path):
+    store = ReportArtifactStore(str(tmp_path))
+    primeiro, segundo = store.partial_name("chave"), store.partial_name("chave")
+    assert primeiro != segundo
+
+    for nome in (primeiro, segundo):
+        open(store.partial_path(nome, ReportFormat.PDF), "wb").close()
+    store.publish(primeiro, "chave", ReportFormat.PDF)
+    store.discard(segundo, ReportFormat.PDF)
+
+    assert os.listdir(tmp_path) == ["chave.pdf"]
+
+
+def test_preview_endpoints(api_client, compras, reports_dir):
+    analitico = api_client.get(f"/api/v1/reports/analytical/preview?contract_id={compras.id}")
+    conta_corrente = api_client.get(f"/api/v1/reports/balance/preview?contract_id={compras.id}")
+
+    assert analitico.status_code == 200, analitico.text
+    assert len(analitico.json()["itens"]) == NUM_ITENS
+    assert conta_corrente.status_code == 200, conta_corrente.text
+    assert conta_corrente.json()["numero_contrato"] == "C-1"
+    assert len(conta_corrente.json()["itens_sinteticos"]) == 1
+
+
+def test_contracts_pdf_renders_in_spawn_worker(db_session, compras, monkeypatch):
+    monkeypatch.setattr(settings, "report_render_workers", 1)
+    render_pool.shutdown_render_pool()
+    service = SimpleReportsService(db_session)
+    try:
+        assert isinstance(render_pool.get_render_pool(), ProcessPoolExecutor)
+        pdf = service.generate_pdf_report(service.generate_analytical_report()).getvalue()
+    finally:
+        render_pool.shutdown_render_pool()
+
+    assert pdf.startswith(b"%PDF") and len(pdf) > 1000
+
+
+def _export(api_client, **params):
+    resposta = api_client.get("/api/v1/reports/analytical/export", params=params)
+    assert resposta.status_code == 200, resposta.text
+    return resposta
+
+
+def test_csv_export_matches_json_report(api_client, db_session, compras, reports_dir):
+    dados = ReportsService(db_session).generate_report(_request(ReportFormat.JSON, compras.id))["data"]
+
+    resposta = _export(api_client, contract_id=compras.id)
+    cabecalho, *linhas = list(csv.reader(io.StringIO(resposta.text)))
+
+    assert resposta.headers["content-type"].startswith("text/csv")
+    assert cabecalho == ANALYTICAL_EXPORT_COLUMNS
+    assert len(linhas) == len(dados["itens"]) == NUM_ITENS
+    assert [linha[1] for linha in linhas] == [item["descricao"] for item in dados["itens"]]
+    assert sum(Decimal(linha[12]) for linha in linhas) == dados["total_geral"]
+
+
+def test_ndjson_export_rows(api_client, compras, reports_dir):
+    resposta = _export(api_client, format="ndjson", contract_id=compras.id)
+    linhas = [json.loads(linha) for linha in resposta.text.splitlines()]
+
+    assert resposta.headers["content-type"].startswith("application/x-ndjson")
+    assert len(linhas) == NUM_ITENS
+    assert all(list(linha) == ANALYTICAL_EXPORT_COLUMNS for linha in linhas)
+    assert {(linha["numero_oc"], linha["numero_contrato"]) for linha in linhas} == {("OC-1", "C-1")}
+    assert sum(Decimal(linha["valor_total"]) for linha in linhas) == Decimal("10.50") * NUM_ITENS
+
+
+def test_export_filters(api_client, db_session, compras, reports_dir):
+    seed_purchase_order(db_session, compras, "OC-2", datetime(2026, 4, 1), notas=[datetime(2026, 4, 10)], itens=4)
+
+    def numeros_oc(**params):
+        linhas = _export(api_client, format="ndjson", **params).text.splitlines()
+        return [json.loads(linha)["numero_oc"] for linha in linhas]
+
+    assert numeros_oc(data_inicio="2026-04-01T00:00:00") == ["OC-2"] * 4
+    assert numeros_oc(data_fim="2026-03-31T00:00:00") == ["OC-1"] * NUM_ITENS
+    assert numeros_oc(fornecedor="oc-2") == ["OC-2"] * 4
+    assert numeros_oc(cliente="Outro") == []
+    assert len(numeros_oc(centro_custo="matéria")) == NUM_ITENS + 4
+    # Sem linhas, o CSV ainda traz o cabeçalho
+    assert _export(api_client, contract_id=compras.id + 1).text.splitlines() == [",".join(ANALYTICAL_EXPORT_COLUMNS)]
+
+
+@pytest.mark.parametrize("role, status_code", [
+    (UserRole.CLIENTE, 403), (UserRole.COMERCIAL, 403), (UserRole.SUPRIMENTOS, 200), (UserRole.DIRETORIA, 200)
+])
+def test_export_access_by_role(api_client, compras, reports_dir, monkeypatch, role, status_code):
+    usuario = User(id=2, username=role.value, email=f"{role.value}@gmx.com.br", password="x", role=role)
+    monkeypatch.setitem(app.dependency_overrides, dependencies.get_current_user, lambda: usuario)
+
+    resposta = api_client.get("/api/v1/reports/analytical/export", params={"contract_id": compras.id})
+
+    assert resposta.status_code == status_code, resposta.text
@@ -0,0 +1,82 @@
+"""Registro de consultas lentas, captura do plano e endpoint administrativo"""
+
+import pytest
+from sqlalchemy import text
+
+from app.core.slow_queries import SKIP_OPTION, slow_query_log
+
+
+@pytest.fixture
+def slow_log(monkeypatch):
+    """Registro ativo com limite zero (toda consulta conta como lenta)"""
+    monkeypatch.setattr(slow_query_log, "enabled", True)
+    monkeypatch.setattr(slow_query_log, "threshold_ms", 0)
+    slow_query_log.clear()
+    yield slow_query_log
+    slow_query_log.flush(timeout=5)
+    slow_query_log.clear()
+
+
+def test_records_route_parameters_and_plan(api_client, slow_log):
+    resposta = api_client.get("/api/v1/nf", params={"status": "validado"})
+    assert resposta.status_code == 200
+    slow_log.flush(timeout=5)
+
+    registros = slow_log.entries(route="/api/v1/nf")
+    select_nf = next(r for r in registros if "FROM notas_fiscais" in r["statement"] and "validado" in str(r["parameters"]))
+    assert select_nf["route"] == "GET /api/v1/nf"
+    assert select_nf["plan_status"] == "ok"
+    assert "notas_fiscais" in select_nf["plan"]
+    # O próprio EXPLAIN não é registrado
+    assert not any(r["statement"].startswith("EXPLAIN") for r in slow_log.entries(limit=1000))
+
+
+def test_writes_are_not_explained(db_engine, slow_log):
+    with db_engine.begin() as conn:
+        conn.execute(text("INSERT INTO cost_centers (codigo, nome) VALUES ('x', 'X')"))
+    slow_log.flush(timeout=5)
+
+    insert = next(r for r in slow_log.entries() if r["statement"].startswith("INSERT"))
+    assert insert["plan_status"] == "ignorado"
+    assert insert["route"] is None
+
+
+def test_threshold_and_skip_option(db_engine, slow_log, monkeypatch):
+    monkeypatch.setattr(slow_log, "threshold_ms", 60_000)
+    with db_engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+    assert slow_log.entries() == []
+
+    monkeypatch.setattr(slow_log, "threshold_ms", 0)
+    with db_engine.connect().execution_options(**{SKIP_OPTION: False}) as conn:
+        conn.execute(text("SELECT 1"))
+    assert slow_log.entries() == []
+
+
+def test_ring_buffer_keeps_most_recent(db_engine, slow_log, monkeypatch):
+    monkeypatch.setattr(slow_log, "_entries", type(slow_log._entries)(maxlen=3))
+    monkeypatch.setattr(slow_log, "explain_timeout_ms", 0)
+    with db_engine.connect() as conn:
+        for i in range(5):
+            conn.execute(text(f"SELECT {i}"))
+
+    registros = slow_log.entries()
+    assert [r["statement"] for r in registros] == ["SELECT 4", "SELECT 3", "SELECT 2"]
+    assert registros[0]["plan_status"] == "desativado"
+
+
+def test_admin_endpoint(api_client, slow_log):
+    api_client.get("/api/v1/nf")
+    slow_log.flush(timeout=5)
+
+    resposta = api_client.get("/api/v1/admin/slow-queries", params={"route": "/nf"})
+    assert resposta.status_code == 200
+    corpo = resposta.json()
+    assert corpo["enabled"] is True
+    assert corpo["queries"]
+
+    query_id = corpo["queries"][0]["id"]
+    assert api_client.get(f"/api/v1/admin/slow-queries/{query_id}").json()["id"] == query_id
+
+    assert api_client.delete("/api/v1/admin/slow-queries").json()["success"]
+    assert api_client.get(f"/api/v1/admin/slow-queries/{query_id}").status_code == 404